@@ -0,0 +1,193 @@
+"""
+Adaptive concurrency and circuit breaking toward model endpoints.
+
+Each endpoint gets an AIMD concurrency limit: it grows by one request per
+limit's worth of successful requests while latency stays within
+LATENCY_TOLERANCE of the endpoint's unloaded latency (the fastest recent
+request), holds on slower samples, shrinks by LATENCY_BACKOFF when smoothed
+latency rises past it (requests are queueing inside the server), and halves
+on overload failures (timeouts, connection errors, 429 and 5xx). The limit
+settles around the concurrency the endpoint actually serves in parallel, so
+throughput stays near its optimum without a queue building up.
+
+A circuit breaker opens after CIRCUIT_FAILURES consecutive overload failures
+and holds requests back for CIRCUIT_OPEN_S, doubling up to CIRCUIT_MAX_OPEN_S
+while trial requests keep failing. Once the cooldown passes, a single trial
+request probes the endpoint; success closes the circuit.
+"""
+
+import os
+import time
+from typing import Optional
+
+# Concurrency an endpoint's limit may grow to
+MAX_CONCURRENCY = int(os.environ.get("EVAL_FORGE_MAX_CONCURRENCY_PER_ENDPOINT", "8"))
+# Latency up to this multiple of the unloaded latency counts as not saturated
+LATENCY_TOLERANCE = float(os.environ.get("EVAL_FORGE_LATENCY_TOLERANCE", "1.5"))
+# Multiplicative decreases for rising latency and for overload failures
+LATENCY_BACKOFF = 0.9
+FAILURE_BACKOFF = 0.5
+# Weight of each latency sample in the smoothed latency
+LATENCY_SMOOTHING = 0.2
+# How fast the unloaded latency estimate may rise per sample, so it follows slower prompts. Kept well
+# below the limit's growth: a faster drift follows queueing latency up and the limit never backs off
+BASELINE_DRIFT = 0.001
+
+# Consecutive overload failures before an endpoint's circuit opens
+CIRCUIT_FAILURES = int(os.environ.get("EVAL_FORGE_CIRCUIT_FAILURES", "3"))
+# First cooldown of an open circuit, doubled after each failed trial request
+CIRCUIT_OPEN_S = float(os.environ.get("EVAL_FORGE_CIRCUIT_OPEN_S", "5"))
+CIRCUIT_MAX_OPEN_S = float(os.environ.get("EVAL_FORGE_CIRCUIT_MAX_OPEN_S", "60"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """No endpoint of a model accepts requests and the circuit has been open too long to keep waiting."""
+
+
+class AIMDLimit:
+    """Additive-increase, multiplicative-decrease concurrency limit driven by latency and failures."""
+
+    def __init__(self, initial: int = 1, max_limit: int = MAX_CONCURRENCY, min_limit: int = 1,
+                 latency_tolerance: float = LATENCY_TOLERANCE):
+        """
+        Args:
+            initial: Starting limit, e.g. the endpoint's configured parallel requests
+            max_limit: Upper bound on the limit
+            min_limit: Lower bound on the limit
+            latency_tolerance: Smoothed latency above this multiple of the unloaded latency shrinks the limit
+        """
+        self.min_limit = max(min_limit, 1)
+        self.max_limit = max(max_limit, initial, self.min_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.baseline_s: Optional[float] = None  # Unloaded latency estimate
+        self.smoothed_s: Optional[float] = None
+        self.increases = 0
+        self.decreases = 0
+        self._decreased_at = 0.0
+
+    @property
+    def allowed(self) -> int:
+        """Requests that may be in flight now."""
+        return max(int(self.limit), self.min_limit)
+
+    def on_success(self, latency_s: float, started_at: float):
+        """
+        Record a successful request.
+
+        Args:
+            latency_s: Request duration
+            started_at: time.monotonic() when the request was sent
+        """
+        if self.smoothed_s is None:
+            self.smoothed_s = latency_s
+        else:
+            self.smoothed_s += LATENCY_SMOOTHING * (latency_s - self.smoothed_s)
+        if self.baseline_s is None:
+            self.baseline_s = latency_s
+        else:
+            self.baseline_s = min(self.baseline_s * (1 + BASELINE_DRIFT), latency_s)
+
+        threshold = self.baseline_s * self.latency_tolerance
+        if self.smoothed_s > threshold:
+            self._decrease(LATENCY_BACKOFF, started_at)
+        elif latency_s <= threshold and self.limit < self.max_limit:
+            # A slow sample alone (a long answer, or queueing starting) holds the limit
+            self.limit = min(self.limit + 1 / self.limit, self.max_limit)
+            self.increases += 1
+
+    def on_overload(self, started_at: float):
+        """Record a request that failed because the endpoint is overloaded or unreachable."""
+        self._decrease(FAILURE_BACKOFF, started_at)
+
+    def _decrease(self, factor: float, started_at: float):
+        # Requests sent before the last decrease saw the old limit; counting them again would collapse it
+        if started_at < self._decreased_at:
+            return
+        self.limit = max(self.limit * factor, self.min_limit)
+        self.decreases += 1
+        self._decreased_at = time.monotonic()
+
+
+class CircuitBreaker:
+    """Stop sending requests to a failing endpoint, then probe it with one trial request at a time."""
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURES, open_s: float = CIRCUIT_OPEN_S,
+                 max_open_s: float = CIRCUIT_MAX_OPEN_S):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            open_s: First cooldown before a trial request
+            max_open_s: Longest cooldown, reached by doubling after failed trials
+        """
+        self.failure_threshold = max(failure_threshold, 1)
+        self.open_s = open_s
+        self.max_open_s = max(max_open_s, open_s)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.cooldown_s = open_s
+        self.opened_at: Optional[float] = None  # When the current cooldown started
+        self.down_since: Optional[float] = None  # When the circuit first opened in this outage
+        self.trips = 0
+
+    @property
+    def retry_at(self) -> Optional[float]:
+        """When an open circuit admits a trial request."""
+        return self.opened_at + self.cooldown_s if self.state == OPEN else None
+
+    def available(self, now: float) -> bool:
+        """Whether a request may be sent now; a half-open circuit already has its trial request out."""
+        if self.state == CLOSED:
+            return True
+        return self.state == OPEN and now >= self.retry_at
+
+    def admit(self, now: float):
+        """Count a request as sent; the first request after the cooldown is the trial."""
+        if self.state == OPEN and now >= self.retry_at:
+            self.state = HALF_OPEN
+
+    def record_success(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.cooldown_s = self.open_s
+        self.opened_at = None
+        self.down_since = None
+
+    def record_failure(self, now: float) -> bool:
+        """
+        Record an overload failure.
+
+        Returns:
+            True if the circuit opened because of it
+        """
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            self.cooldown_s = min(self.cooldown_s * 2, self.max_open_s)
+            self._open(now)
+            return True
+        if self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open(now)
+            return True
+        return False
+
+    def trip(self, now: float):
+        """Open the circuit now, e.g. when a health probe finds the model missing."""
+        if self.state != OPEN:
+            self._open(now)
+
+    def abandon(self):
+        """A trial request was cancelled before it finished: let the next request be the trial."""
+        if self.state == HALF_OPEN:
+            self.state = OPEN
+            self.opened_at = time.monotonic() - self.cooldown_s
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        if self.down_since is None:
+            self.down_since = now
+            self.trips += 1
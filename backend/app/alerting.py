@@ -0,0 +1,503 @@
+"""
+Alerting on synthetic test executions.
+
+Each test's `alert_thresholds` JSON configures its rules, for example:
+
+    {
+        "consecutive_failures": 3,
+        "error_rate": {"percent": 20, "window_minutes": 10, "min_samples": 5},
+        "p95_latency_ms": 2000,
+        "webhook_url": "https://hooks.example.com/eval-forge"
+    }
+
+The older {"response_time": ms, "success_rate": percent} form is read as a p95
+latency limit and an error rate limit of 100 - success_rate.
+
+Every new execution updates the test's sliding window (time buckets of counts
+and latency histograms) in constant time, and the rules are checked against
+the window. An alert row is opened when a rule starts failing and resolved
+once it has passed RESOLVE_AFTER times in a row. Only those transitions are
+notified, and rules that keep flipping are marked flapping and go quiet until
+they settle.
+
+Executions of one test can be stored by several processes. Before checking the
+rules, a process folds in every execution of the test stored since the last one
+it saw, in id order, so each process's window and streaks follow the same
+sequence. A process that hasn't seen a test recently rebuilds the test's window
+from the database first. A partial unique index allows one open alert per test
+and rule: a process finding the alert already open, or already resolved, adopts
+that state without notifying again.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import run_db
+
+logger = logging.getLogger(__name__)
+
+# Default destination for notifications; tests can set their own webhook_url
+ALERT_WEBHOOK_URL = os.environ.get("EVAL_FORGE_ALERT_WEBHOOK_URL")
+
+DEFAULT_WINDOW_MINUTES = 15
+DEFAULT_MIN_SAMPLES = 5
+WINDOW_BUCKETS = 30  # Time buckets per window; expiry is accurate to window / WINDOW_BUCKETS
+
+# Log-spaced latency bins from 1ms to LATENCY_MAX_MS, each about 13% wide
+LATENCY_BINS = 96
+LATENCY_MAX_MS = 120000
+_LATENCY_LOG_STEP = math.log(LATENCY_MAX_MS) / (LATENCY_BINS - 1)
+
+RESOLVE_AFTER = 3  # Consecutive passing evaluations before a firing alert resolves
+FLAP_MAX_TRANSITIONS = 4  # This many fire/resolve transitions...
+FLAP_WINDOW_S = 30 * 60  # ...within this long mark a rule as flapping
+
+WEBHOOK_TIMEOUT_S = 10
+
+RULES = ("consecutive_failures", "error_rate", "p95_latency")
+
+
+def _latency_bin(latency_ms: float) -> int:
+    if latency_ms <= 1:
+        return 0
+    return min(LATENCY_BINS - 1, int(math.log(latency_ms) / _LATENCY_LOG_STEP) + 1)
+
+
+def _bin_upper_ms(index: int) -> float:
+    return math.exp(index * _LATENCY_LOG_STEP)
+
+
+class SlidingWindow:
+    """Execution counts and a latency histogram over the last window_s seconds, in a ring of time buckets."""
+
+    def __init__(self, window_s: float, buckets: int = WINDOW_BUCKETS):
+        self.bucket_s = window_s / buckets
+        self.buckets = buckets
+        self._counts = [[0, 0] for _ in range(buckets)]  # executions, failures
+        self._histograms = [[0] * LATENCY_BINS for _ in range(buckets)]
+        self.total = 0
+        self.failures = 0
+        self._histogram = [0] * LATENCY_BINS
+        self._newest: Optional[int] = None
+
+    def advance(self, timestamp: float):
+        """Expire buckets older than the window ending at timestamp. At most `buckets` steps."""
+        index = int(timestamp // self.bucket_s)
+        if self._newest is None:
+            self._newest = index
+            return
+        if index <= self._newest:
+            return
+        for step in range(1, min(index - self._newest, self.buckets) + 1):
+            slot = (self._newest + step) % self.buckets
+            counts = self._counts[slot]
+            if counts[0]:
+                self.total -= counts[0]
+                self.failures -= counts[1]
+                histogram = self._histograms[slot]
+                for latency_bin in range(LATENCY_BINS):
+                    self._histogram[latency_bin] -= histogram[latency_bin]
+                    histogram[latency_bin] = 0
+                counts[0] = counts[1] = 0
+        self._newest = index
+
+    def add(self, timestamp: float, failed: bool, latency_ms: Optional[float]):
+        self.advance(timestamp)
+        # Late executions count toward the newest bucket
+        slot = self._newest % self.buckets
+        self._counts[slot][0] += 1
+        self.total += 1
+        if failed:
+            self._counts[slot][1] += 1
+            self.failures += 1
+        if latency_ms is not None:
+            latency_bin = _latency_bin(latency_ms)
+            self._histograms[slot][latency_bin] += 1
+            self._histogram[latency_bin] += 1
+
+    def error_rate(self) -> Optional[float]:
+        return self.failures / self.total * 100 if self.total else None
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Latency percentile in ms, as the upper edge of the bin it falls in."""
+        samples = sum(self._histogram)
+        if not samples:
+            return None
+        rank = math.ceil(samples * percent / 100)
+        seen = 0
+        for latency_bin, count in enumerate(self._histogram):
+            seen += count
+            if seen >= rank:
+                return round(_bin_upper_ms(latency_bin), 1)
+        return None
+
+
+class AlertRules:
+    """A test's parsed alert_thresholds."""
+
+    def __init__(self, config: Dict):
+        """
+        Raises:
+            ValueError: If a threshold is malformed
+        """
+        if not isinstance(config, dict):
+            raise ValueError("Alert thresholds must be a JSON object")
+        self.window_minutes = self._number(config.get("window_minutes", DEFAULT_WINDOW_MINUTES), "window_minutes")
+        self.min_samples = int(self._number(config.get("min_samples", DEFAULT_MIN_SAMPLES), "min_samples"))
+
+        consecutive = config.get("consecutive_failures")
+        self.consecutive_failures = int(self._number(consecutive, "consecutive_failures")) if consecutive else None
+
+        error_rate = config.get("error_rate")
+        if isinstance(error_rate, dict):
+            self.error_rate_percent = self._number(error_rate.get("percent"), "error_rate.percent")
+            self.window_minutes = self._number(error_rate.get("window_minutes", self.window_minutes),
+                                               "error_rate.window_minutes")
+            self.min_samples = int(self._number(error_rate.get("min_samples", self.min_samples),
+                                                "error_rate.min_samples"))
+        elif error_rate is not None:
+            self.error_rate_percent = self._number(error_rate, "error_rate")
+        elif config.get("success_rate") is not None:
+            self.error_rate_percent = 100 - self._number(config["success_rate"], "success_rate")
+        else:
+            self.error_rate_percent = None
+
+        latency = config.get("p95_latency_ms", config.get("response_time"))
+        self.p95_latency_ms = self._number(latency, "p95_latency_ms") if latency is not None else None
+
+        self.webhook_url = config.get("webhook_url")
+
+    @staticmethod
+    def _number(value, name: str) -> float:
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError(f"Alert threshold '{name}' must be a positive number")
+        return value
+
+    @property
+    def empty(self) -> bool:
+        return self.consecutive_failures is None and self.error_rate_percent is None and self.p95_latency_ms is None
+
+
+def parse_alert_thresholds(source: Optional[str]) -> Optional[AlertRules]:
+    """
+    Parse an alert_thresholds JSON string.
+
+    Raises:
+        ValueError: If the JSON or a threshold in it is invalid
+    """
+    if not source:
+        return None
+    rules = AlertRules(json.loads(source))
+    return None if rules.empty else rules
+
+
+class _RuleState:
+    def __init__(self):
+        self.alert_id: Optional[int] = None  # Open alert row while firing
+        self.last_alert_id: Optional[int] = None  # Most recently opened or resolved alert row
+        self.passing_streak = 0
+        self.transitions = deque(maxlen=FLAP_MAX_TRANSITIONS)
+        self.flapping = False
+
+
+class _TestState:
+    def __init__(self, rules_source: str, rules: AlertRules):
+        self.rules_source = rules_source
+        self.rules = rules
+        self.window = SlidingWindow(rules.window_minutes * 60)
+        self.consecutive_failures = 0
+        self.last_seen: Optional[float] = None
+        self.last_execution_id = 0  # Executions up to this id are folded into the window
+        self.rule_states = {rule: _RuleState() for rule in RULES}
+
+    def add(self, timestamp: float, failed: bool, latency_ms: Optional[float]):
+        self.window.add(timestamp, failed, latency_ms)
+        self.consecutive_failures = self.consecutive_failures + 1 if failed else 0
+        self.last_seen = timestamp
+
+    def check(self, rule: str) -> Optional[Dict]:
+        """The rule's current value and threshold if it is failing, else None."""
+        rules, window = self.rules, self.window
+        if rule == "consecutive_failures" and rules.consecutive_failures:
+            if self.consecutive_failures >= rules.consecutive_failures:
+                return {"value": self.consecutive_failures, "threshold": rules.consecutive_failures,
+                        "message": f"{self.consecutive_failures} consecutive failed executions"}
+        elif rule == "error_rate" and rules.error_rate_percent and window.total >= rules.min_samples:
+            error_rate = window.error_rate()
+            if error_rate >= rules.error_rate_percent:
+                return {"value": round(error_rate, 1), "threshold": rules.error_rate_percent,
+                        "message": f"Error rate {error_rate:.1f}% over the last {rules.window_minutes:g} minutes "
+                                   f"({window.failures}/{window.total})"}
+        elif rule == "p95_latency" and rules.p95_latency_ms and window.total >= rules.min_samples:
+            p95 = window.percentile(95)
+            if p95 is not None and p95 >= rules.p95_latency_ms:
+                return {"value": p95, "threshold": rules.p95_latency_ms,
+                        "message": f"p95 latency {p95:.0f}ms over the last {rules.window_minutes:g} minutes"}
+        return None
+
+
+class Notifier(ABC):
+    """Where alert notifications are delivered."""
+
+    @abstractmethod
+    async def send(self, notification: Dict):
+        """Deliver one firing or resolved notification."""
+
+
+class LogNotifier(Notifier):
+    async def send(self, notification: Dict):
+        logger.warning(f"Alert {notification['status']}: {notification['test_name']} - {notification['message']}")
+
+
+class WebhookNotifier(Notifier):
+    """POSTs each notification as JSON."""
+
+    def __init__(self, url: str, timeout: float = WEBHOOK_TIMEOUT_S):
+        self.url = url
+        self.timeout = timeout
+
+    async def send(self, notification: Dict):
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.post(self.url, json=notification)
+            response.raise_for_status()
+
+
+def _is_failure(execution: models.SyntheticExecution) -> bool:
+    return execution.status != "success"
+
+
+class AlertEngine:
+    """Evaluates executions against their test's alert rules and notifies on state changes."""
+
+    def __init__(self, notifier: Optional[Notifier] = None):
+        self.notifier = notifier or (WebhookNotifier(ALERT_WEBHOOK_URL) if ALERT_WEBHOOK_URL else LogNotifier())
+        self._states: Dict[int, _TestState] = {}
+        # Executions of one test can be observed from several database threads at once; different
+        # tests' executions are applied in parallel
+        self._locks: Dict[int, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._deliveries = set()
+
+    def _notifier_for(self, rules: AlertRules) -> Notifier:
+        return WebhookNotifier(rules.webhook_url) if rules.webhook_url else self.notifier
+
+    async def observe(self, test: models.SyntheticTest, execution: models.SyntheticExecution, db: Session):
+        """Fold one new execution into its test's window and fire or resolve alerts."""
+        # Window updates and alert writes run on the database threads; only delivery stays on the loop
+        deliveries = await run_db(self._apply, test, execution, db)
+        for notifier, notification in deliveries:
+            self._deliver(notifier, notification)
+
+    def _apply(self, test: models.SyntheticTest, execution: models.SyntheticExecution,
+               db: Session) -> List[Tuple[Notifier, Dict]]:
+        """Update the test's window and alerts. Returns the notifications to deliver."""
+        with self._locks_guard:
+            lock = self._locks.setdefault(test.id, threading.Lock())
+        with lock:
+            return self._apply_locked(test, execution, db)
+
+    def _apply_locked(self, test: models.SyntheticTest, execution: models.SyntheticExecution,
+                      db: Session) -> List[Tuple[Notifier, Dict]]:
+        state = self._states.get(test.id)
+        if state is not None and state.rules_source == test.alert_thresholds:
+            rules = state.rules
+        else:
+            try:
+                rules = parse_alert_thresholds(test.alert_thresholds)
+            except ValueError as e:
+                logger.error(f"Invalid alert thresholds on test {test.id}: {e}")
+                return []
+            if rules is None:
+                self._states.pop(test.id, None)
+                return []
+
+        timestamp = execution.executed_at.timestamp()
+        stale = state is None or state.last_seen is None or \
+            timestamp - state.last_seen > 2 * max(test.interval or 0, 60)
+        if stale or state.rules_source != test.alert_thresholds:
+            state = self._load_state(test, rules, execution, db)
+            self._states[test.id] = state
+        elif execution.id <= state.last_execution_id:
+            # Already folded in while catching up on a later execution
+            return []
+
+        # Executions of this test other processes stored since we last looked, then this one
+        executions = db.query(models.SyntheticExecution).filter(
+            models.SyntheticExecution.test_id == test.id,
+            models.SyntheticExecution.id > state.last_execution_id,
+            models.SyntheticExecution.id <= execution.id
+        ).order_by(models.SyntheticExecution.id).all()
+        notifications = []
+        for current in executions:
+            current_timestamp = current.executed_at.timestamp()
+            state.add(current_timestamp, _is_failure(current), current.response_time)
+            notifications.extend(
+                notification for rule in RULES
+                if (notification := self._evaluate(test, state, rule, current_timestamp, db)) is not None
+            )
+        state.last_execution_id = execution.id
+        db.commit()
+
+        return [(self._notifier_for(rules), notification) for notification in notifications]
+
+    def _load_state(self, test: models.SyntheticTest, rules: AlertRules,
+                    execution: models.SyntheticExecution, db: Session) -> _TestState:
+        """Rebuild a test's window from stored executions and its open alerts."""
+        state = _TestState(test.alert_thresholds, rules)
+        since = execution.executed_at - timedelta(minutes=rules.window_minutes)
+        history = db.query(models.SyntheticExecution).filter(
+            models.SyntheticExecution.test_id == test.id,
+            models.SyntheticExecution.executed_at >= since,
+            models.SyntheticExecution.id < execution.id
+        ).order_by(models.SyntheticExecution.id).all()
+        for previous in history:
+            state.add(previous.executed_at.timestamp(), _is_failure(previous), previous.response_time)
+        state.last_execution_id = execution.id - 1
+
+        for alert in db.query(models.Alert).filter(models.Alert.test_id == test.id,
+                                                    models.Alert.status == "firing").all():
+            rule_state = state.rule_states.get(alert.rule)
+            if rule_state is None:
+                continue
+            rule_state.alert_id = rule_state.last_alert_id = alert.id
+            if alert.flapping:
+                # Restart the quiet period before it counts as settled
+                rule_state.flapping = True
+                rule_state.transitions.append(execution.executed_at.timestamp())
+        return state
+
+    def _evaluate(self, test: models.SyntheticTest, state: _TestState, rule: str, timestamp: float,
+                  db: Session) -> Optional[Dict]:
+        """Apply one rule's result to its alert state. Returns a notification to send, if any."""
+        rule_state = state.rule_states[rule]
+        failing = state.check(rule)
+        now = datetime.fromtimestamp(timestamp)
+        alert = None
+
+        if failing:
+            rule_state.passing_streak = 0
+            if rule_state.alert_id is None:
+                alert, opened = self._open_alert(test, rule, failing, now, db)
+                if alert is None:
+                    return None
+                rule_state.alert_id = alert.id
+                if not opened:
+                    # Another process opened it and notified
+                    rule_state.transitions.append(timestamp)
+                    rule_state.last_alert_id = alert.id
+                    return None
+            # Otherwise already firing: deduplicated
+        elif rule_state.alert_id is not None:
+            rule_state.passing_streak += 1
+            if rule_state.passing_streak >= RESOLVE_AFTER:
+                alert_id = rule_state.alert_id
+                rule_state.alert_id = None
+                rule_state.passing_streak = 0
+                resolved = db.query(models.Alert).filter(
+                    models.Alert.id == alert_id, models.Alert.status == "firing"
+                ).update({models.Alert.status: "resolved", models.Alert.resolved_at: now}, synchronize_session=False)
+                if not resolved:
+                    # Another process resolved it and notified
+                    rule_state.transitions.append(timestamp)
+                    rule_state.last_alert_id = alert_id
+                    return None
+                alert = db.get(models.Alert, alert_id, populate_existing=True)
+
+        if alert is not None:
+            rule_state.transitions.append(timestamp)
+            rule_state.last_alert_id = alert.id
+
+        if rule_state.flapping:
+            if alert is not None:
+                alert.flapping = True
+                return None
+            if timestamp - rule_state.transitions[-1] <= FLAP_WINDOW_S:
+                return None
+            # Settled: tell receivers which state it settled in
+            rule_state.flapping = False
+            alert = db.query(models.Alert).filter(models.Alert.id == rule_state.last_alert_id).first()
+            if alert is None:
+                return None
+            alert.flapping = False
+            return self._notification(test, alert)
+
+        if alert is None:
+            return None
+        if len(rule_state.transitions) == FLAP_MAX_TRANSITIONS and \
+                timestamp - rule_state.transitions[0] <= FLAP_WINDOW_S:
+            rule_state.flapping = True
+            alert.flapping = True
+            return self._notification(test, alert, status="flapping")
+        return self._notification(test, alert)
+
+    @staticmethod
+    def _firing_alert(test_id: int, rule: str, db: Session) -> Optional[models.Alert]:
+        return db.query(models.Alert).filter(models.Alert.test_id == test_id, models.Alert.rule == rule,
+                                             models.Alert.status == "firing").first()
+
+    def _open_alert(self, test: models.SyntheticTest, rule: str, failing: Dict, now: datetime,
+                    db: Session) -> Tuple[Optional[models.Alert], bool]:
+        """The rule's open alert, opened here unless another process already has. Returns (alert, opened_here)."""
+        existing = self._firing_alert(test.id, rule, db)
+        if existing is not None:
+            return existing, False
+        alert = models.Alert(test_id=test.id, rule=rule, status="firing", value=failing["value"],
+                             threshold=failing["threshold"], message=failing["message"], started_at=now)
+        try:
+            # A savepoint, so losing the race leaves this evaluation's other alert changes in place
+            with db.begin_nested():
+                db.add(alert)
+        except IntegrityError:
+            # Opened by another process between the lookup and the insert
+            return self._firing_alert(test.id, rule, db), False
+        return alert, True
+
+    @staticmethod
+    def _notification(test: models.SyntheticTest, alert: models.Alert, status: Optional[str] = None) -> Dict:
+        return {
+            "alert_id": alert.id,
+            "test_id": test.id,
+            "test_name": test.name,
+            "service_name": test.service_name,
+            "rule": alert.rule,
+            "status": status or alert.status,
+            "value": alert.value,
+            "threshold": alert.threshold,
+            "message": alert.message,
+            "started_at": alert.started_at.isoformat() if alert.started_at else None,
+            "resolved_at": alert.resolved_at.isoformat() if alert.resolved_at else None
+        }
+
+    def _deliver(self, notifier: Notifier, notification: Dict):
+        # Delivery runs in the background so a slow receiver doesn't hold up checks
+        task = asyncio.create_task(self._send(notifier, notification))
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+
+    async def _send(self, notifier: Notifier, notification: Dict):
+        try:
+            await notifier.send(notification)
+        except Exception as e:
+            logger.error(f"Error delivering alert {notification['alert_id']} ({notification['status']}): {e}")
+
+    async def drain(self):
+        """Wait for notifications still being delivered."""
+        if self._deliveries:
+            await asyncio.gather(*list(self._deliveries))
+
+
+# Global alert engine instance
+alert_engine = AlertEngine()
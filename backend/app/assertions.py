@@ -0,0 +1,285 @@
+"""
+Response assertions for synthetic API checks.
+
+A test's `assertions` column holds a JSON list such as:
+
+    [
+        {"type": "jsonpath", "path": "$.data.items[0].status", "op": "equals", "value": "ok"},
+        {"type": "regex", "pattern": "\"version\":\\s*\"2\\."},
+        {"type": "header", "name": "content-type", "op": "contains", "value": "json"},
+        {"type": "latency", "metric": "first_byte_time", "max_ms": 300}
+    ]
+
+Definitions are compiled once (regexes compiled, JSONPaths parsed into steps) and
+cached per test until its assertions change, so executions only evaluate.
+"""
+
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .response_body import StreamingBodyCheck
+
+OPS = ("equals", "not_equals", "contains", "matches", "exists", "not_exists", "less_than", "greater_than")
+LATENCY_METRICS = ("response_time", "first_byte_time")
+
+_JSONPATH_STEP_RE = re.compile(r"\.(\w+)|\.\*|\[\*\]|\[(-?\d+)\]|\['([^']*)'\]|\[\"([^\"]*)\"\]")
+_WILDCARD = object()
+
+
+def _compile_regex(pattern):
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        source = pattern.decode() if isinstance(pattern, bytes) else pattern
+        raise ValueError(f"Invalid regex '{source}': {e}")
+
+
+def compile_jsonpath(path: str) -> Tuple:
+    """
+    Parse the JSONPath subset $, .key, ['key'], [index], .* and [*] into steps.
+
+    Raises:
+        ValueError: If the path uses anything outside the subset
+    """
+    if not path.startswith("$"):
+        raise ValueError(f"JSONPath '{path}' must start with '$'")
+    steps = []
+    position = 1
+    while position < len(path):
+        match = _JSONPATH_STEP_RE.match(path, position)
+        if not match:
+            raise ValueError(f"Unsupported JSONPath syntax at '{path[position:]}' in '{path}'")
+        key, index, quoted, double_quoted = match.groups()
+        if key is not None:
+            steps.append(key)
+        elif index is not None:
+            steps.append(int(index))
+        elif quoted is not None or double_quoted is not None:
+            steps.append(quoted if quoted is not None else double_quoted)
+        else:
+            steps.append(_WILDCARD)
+        position = match.end()
+    return tuple(steps)
+
+
+def evaluate_jsonpath(steps: Tuple, document: Any) -> List[Any]:
+    """All values at the compiled path."""
+    values = [document]
+    for step in steps:
+        matched = []
+        for value in values:
+            if step is _WILDCARD:
+                if isinstance(value, dict):
+                    matched.extend(value.values())
+                elif isinstance(value, list):
+                    matched.extend(value)
+            elif isinstance(step, int):
+                if isinstance(value, list) and -len(value) <= step < len(value):
+                    matched.append(value[step])
+            elif isinstance(value, dict) and step in value:
+                matched.append(value[step])
+        values = matched
+    return values
+
+
+class _Comparison:
+    """An operator and expected value, with any regex compiled up front."""
+
+    def __init__(self, op: str, value: Any):
+        if op not in OPS:
+            raise ValueError(f"Unknown op '{op}', expected one of {', '.join(OPS)}")
+        if op not in ("exists", "not_exists") and value is None:
+            raise ValueError(f"Op '{op}' needs a value")
+        if op in ("less_than", "greater_than") and not isinstance(value, (int, float)):
+            raise ValueError(f"Op '{op}' needs a numeric value")
+        # Substring and regex checks against a number or object would raise when the test runs
+        if op in ("contains", "matches") and not isinstance(value, str):
+            raise ValueError(f"Op '{op}' needs a string value")
+        self.op = op
+        self.value = value
+        self.pattern = _compile_regex(value) if op == "matches" else None
+
+    def test(self, values: List[Any]) -> bool:
+        """Whether any of the found values satisfies the comparison."""
+        if self.op == "exists":
+            return bool(values)
+        if self.op == "not_exists":
+            return not values
+        if self.op == "not_equals":
+            return bool(values) and all(value != self.value for value in values)
+        return any(self._test_one(value) for value in values)
+
+    def _test_one(self, value: Any) -> bool:
+        if self.op == "equals":
+            return value == self.value
+        if self.op == "contains":
+            return isinstance(value, (str, list)) and self.value in value
+        if self.op == "matches":
+            return isinstance(value, str) and self.pattern.search(value) is not None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        return value < self.value if self.op == "less_than" else value > self.value
+
+    def describe(self) -> str:
+        return self.op if self.value is None else f"{self.op} {self.value!r}"
+
+
+class CompiledAssertions:
+    """One test's assertions, ready to evaluate against an execution."""
+
+    def __init__(self, definitions: List[Dict]):
+        """
+        Args:
+            definitions: Parsed assertion objects
+
+        Raises:
+            ValueError: If a definition is malformed
+        """
+        self.json_paths: List[Tuple[str, Tuple, _Comparison]] = []
+        self.patterns: List[Tuple[str, re.Pattern, bool]] = []
+        self.headers: List[Tuple[str, str, _Comparison]] = []
+        self.latency: List[Tuple[str, str, float]] = []
+
+        for definition in definitions:
+            if not isinstance(definition, dict):
+                raise ValueError("Each assertion must be an object")
+            kind = definition.get("type")
+            if kind == "jsonpath":
+                path = definition.get("path", "")
+                if not isinstance(path, str):
+                    raise ValueError("JSONPath assertion needs a path string")
+                comparison = _Comparison(definition.get("op", "exists"), definition.get("value"))
+                self.json_paths.append((f"{path} {comparison.describe()}", compile_jsonpath(path), comparison))
+            elif kind == "regex":
+                pattern = definition.get("pattern")
+                if not pattern or not isinstance(pattern, str):
+                    raise ValueError("Regex assertion needs a pattern string")
+                negate = bool(definition.get("negate", False))
+                description = f"body {'does not match' if negate else 'matches'} /{pattern}/"
+                self.patterns.append((description, _compile_regex(pattern.encode()), negate))
+            elif kind == "header":
+                name = definition.get("name")
+                if not name or not isinstance(name, str):
+                    raise ValueError("Header assertion needs a name string")
+                comparison = _Comparison(definition.get("op", "exists"), definition.get("value"))
+                self.headers.append((f"header {name} {comparison.describe()}", name.lower(), comparison))
+            elif kind == "latency":
+                metric = definition.get("metric", "response_time")
+                if metric not in LATENCY_METRICS:
+                    raise ValueError(f"Unknown latency metric '{metric}', expected one of {', '.join(LATENCY_METRICS)}")
+                max_ms = definition.get("max_ms")
+                if not isinstance(max_ms, (int, float)):
+                    raise ValueError("Latency assertion needs a numeric max_ms")
+                self.latency.append((f"{metric} <= {max_ms}ms", metric, float(max_ms)))
+            else:
+                raise ValueError(f"Unknown assertion type '{kind}'")
+
+    @property
+    def needs_body(self) -> bool:
+        """JSONPath assertions parse the whole (capped) body; the others stream or skip it."""
+        return bool(self.json_paths)
+
+    def body_checks(self) -> List[StreamingBodyCheck]:
+        """Fresh incremental checks for one execution, in self.patterns order."""
+        return [StreamingBodyCheck(pattern=pattern) for _, pattern, _ in self.patterns]
+
+    def evaluate(self, headers, body: Optional[bytes], body_truncated: bool,
+                 body_checks: List[StreamingBodyCheck], timings: Dict[str, Optional[float]]) -> List[Dict]:
+        """
+        Evaluate every assertion for one execution.
+
+        Args:
+            headers: Response headers (case-insensitive mapping)
+            body: Full body when needs_body, else None
+            body_truncated: Whether the body was cut off at the byte cap
+            body_checks: The checks from body_checks(), fed with the body
+            timings: Latency metric values in milliseconds
+
+        Returns:
+            List of {"assertion", "passed", "actual"} dicts
+        """
+        results = []
+
+        if self.json_paths:
+            document, error = None, None
+            if body_truncated:
+                error = "body exceeds the read cap"
+            else:
+                try:
+                    document = json.loads(body or b"")
+                except ValueError:
+                    error = "body is not JSON"
+            for description, steps, comparison in self.json_paths:
+                if error:
+                    results.append({"assertion": description, "passed": False, "actual": error})
+                    continue
+                values = evaluate_jsonpath(steps, document)
+                results.append({
+                    "assertion": description,
+                    "passed": comparison.test(values),
+                    "actual": values[0] if len(values) == 1 else values
+                })
+
+        for (description, _, negate), check in zip(self.patterns, body_checks):
+            results.append({"assertion": description, "passed": check.matched != negate, "actual": check.matched})
+
+        for description, name, comparison in self.headers:
+            value = headers.get(name)
+            results.append({
+                "assertion": description,
+                "passed": comparison.test([] if value is None else [value]),
+                "actual": value
+            })
+
+        for description, metric, max_ms in self.latency:
+            value = timings.get(metric)
+            results.append({
+                "assertion": description,
+                "passed": value is not None and value <= max_ms,
+                "actual": round(value, 1) if value is not None else None
+            })
+
+        return results
+
+
+def compile_assertions(source: Optional[str]) -> Optional[CompiledAssertions]:
+    """
+    Compile an assertions JSON string.
+
+    Raises:
+        ValueError: If the JSON or an assertion in it is invalid
+    """
+    if not source:
+        return None
+    definitions = json.loads(source)
+    if not isinstance(definitions, list):
+        raise ValueError("Assertions must be a JSON list")
+    return CompiledAssertions(definitions)
+
+
+class AssertionCache:
+    """Compiled assertions per test, recompiled only when the test's definition changes."""
+
+    def __init__(self):
+        self._compiled: Dict[int, Tuple[Optional[str], Optional[CompiledAssertions]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, test) -> Optional[CompiledAssertions]:
+        # Keyed on the source text too, so updates made through any process are picked up
+        cached = self._compiled.get(test.id)
+        if cached is not None and cached[0] == test.assertions:
+            return cached[1]
+        compiled = compile_assertions(test.assertions)
+        with self._lock:
+            self._compiled[test.id] = (test.assertions, compiled)
+        return compiled
+
+    def invalidate(self, test_id: int):
+        with self._lock:
+            self._compiled.pop(test_id, None)
+
+
+# Global assertion cache instance
+assertion_cache = AssertionCache()
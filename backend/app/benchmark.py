@@ -0,0 +1,234 @@
+"""
+Load testing for registered model endpoints.
+Drives a model endpoint at increasing concurrency levels or request rates
+using question bank prompts and records latency, throughput and error rates.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import run_db
+from .providers import api_key_for, get_provider
+from .question_bank import load_question_bank
+from .telemetry import InstrumentedTransport
+
+logger = logging.getLogger(__name__)
+
+# A step is considered saturated when it adds less than this fraction of
+# throughput over the best step so far, or fails more than MAX_ERROR_RATE.
+SATURATION_GAIN = 0.10
+MAX_ERROR_RATE = 0.05
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = rank - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+def summarize_step(samples: List[Dict], wall_time: float) -> Dict:
+    """Aggregate per-request samples of a step into throughput and latency statistics."""
+    total = len(samples)
+    successful = [s for s in samples if s["ok"]]
+    latencies = sorted(s["latency_ms"] for s in successful)
+    tokens = sum(s["tokens"] for s in successful)
+    wall_time = max(wall_time, 1e-9)
+
+    return {
+        "total_requests": total,
+        "successful_requests": len(successful),
+        "failed_requests": total - len(successful),
+        "error_rate": (total - len(successful)) / total if total else 0.0,
+        "throughput": len(successful) / wall_time,
+        "tokens_per_second": tokens / wall_time,
+        "avg_latency": sum(latencies) / len(latencies) if latencies else None,
+        "p50_latency": percentile(latencies, 50),
+        "p90_latency": percentile(latencies, 90),
+        "p95_latency": percentile(latencies, 95),
+        "p99_latency": percentile(latencies, 99),
+        "duration": wall_time,
+    }
+
+
+def find_saturation_point(steps: List[Dict]) -> Optional[float]:
+    """
+    Find the load level past which the endpoint stops scaling.
+
+    Args:
+        steps: Step summaries in the order they were run, each with a "level"
+
+    Returns:
+        Level of the best step before throughput flattened or errors rose,
+        or None if every step still scaled
+    """
+    best = None
+    for step in steps:
+        if step["error_rate"] > MAX_ERROR_RATE:
+            return best["level"] if best else step["level"]
+        if best is not None and step["throughput"] < best["throughput"] * (1 + SATURATION_GAIN):
+            return best["level"]
+        best = step
+    return None
+
+
+class BenchmarkRunningError(Exception):
+    """The benchmark is already running."""
+
+
+class ModelBenchmarkRunner:
+    """Run load steps against a model's generate endpoint and store the results."""
+
+    def __init__(self, request_timeout: float = 60.0):
+        self.request_timeout = request_timeout
+
+    def _load_prompts(self) -> List[str]:
+        prompts = [q["question"] for q in load_question_bank()]
+        return prompts or ["What is the capital of France?"]
+
+    async def _generate(self, client: httpx.AsyncClient, db_model: models.Model, prompt: str, max_tokens: int) -> Dict:
+        """Send one generate request and return a latency/token sample."""
+        start_time = time.perf_counter()
+        try:
+            provider = get_provider(db_model.type or "ollama")
+            path, body = provider.generate_request(db_model.model_name, prompt, {"max_tokens": max_tokens})
+            response = await client.post(provider.url(db_model.endpoint, path), json=body,
+                                         headers=provider.headers(api_key_for(db_model.api_key_env)))
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            if response.status_code != 200:
+                return {"ok": False, "latency_ms": latency_ms, "tokens": 0, "error": f"HTTP {response.status_code}"}
+
+            generation = provider.parse_generation(response.json())
+            return {"ok": True, "latency_ms": latency_ms, "tokens": generation.completion_tokens or 0, "error": None}
+        except Exception as e:
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            return {"ok": False, "latency_ms": latency_ms, "tokens": 0, "error": str(e)}
+
+    async def run_concurrency_step(self, db_model: models.Model, prompts: List[str], concurrency: int,
+                                   num_requests: int, max_tokens: int) -> Dict:
+        """Closed-loop step: keep `concurrency` requests in flight until `num_requests` are done."""
+        if num_requests < 1:
+            raise ValueError("num_requests must be at least 1")
+        concurrency = max(1, int(concurrency))
+        samples = []
+        next_index = 0
+
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        transport = InstrumentedTransport("benchmark", limits=limits)
+        async with httpx.AsyncClient(timeout=self.request_timeout, transport=transport) as client:
+            async def worker():
+                nonlocal next_index
+                while next_index < num_requests:
+                    index = next_index
+                    next_index += 1
+                    prompt = prompts[index % len(prompts)]
+                    samples.append(await self._generate(client, db_model, prompt, max_tokens))
+
+            start_time = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            wall_time = time.perf_counter() - start_time
+
+        return summarize_step(samples, wall_time)
+
+    async def run_rate_step(self, db_model: models.Model, prompts: List[str], rate: float,
+                            num_requests: int, max_tokens: int) -> Dict:
+        """Open-loop step: start requests at a fixed `rate` per second regardless of completions."""
+        if num_requests < 1:
+            raise ValueError("num_requests must be at least 1")
+        rate = max(0.001, float(rate))
+        interval = 1.0 / rate
+
+        # Requests in flight never exceed rate * timeout (later ones would have timed out) nor the step size;
+        # a smaller connection pool would queue requests in the client and count that as server latency
+        max_in_flight = min(num_requests, math.ceil(rate * self.request_timeout) + 1)
+        limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+        async with httpx.AsyncClient(timeout=self.request_timeout,
+                                     transport=InstrumentedTransport("benchmark", limits=limits)) as client:
+            start_time = time.perf_counter()
+            tasks = []
+            for index in range(num_requests):
+                delay = start_time + index * interval - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                prompt = prompts[index % len(prompts)]
+                tasks.append(asyncio.create_task(self._generate(client, db_model, prompt, max_tokens)))
+            samples = await asyncio.gather(*tasks)
+            wall_time = time.perf_counter() - start_time
+
+        return summarize_step(list(samples), wall_time)
+
+    async def run_benchmark(self, benchmark: models.Benchmark, db: Session) -> models.Benchmark:
+        """
+        Run every configured step of a benchmark and persist the step results.
+
+        Raises:
+            BenchmarkRunningError: The benchmark is already running
+        """
+        levels = json.loads(benchmark.levels) if benchmark.levels else [1]
+        prompts = self._load_prompts()
+        db_model = await run_db(self._start, benchmark, db)
+
+        summaries = []
+        for level in levels:
+            if benchmark.mode == "rate":
+                summary = await self.run_rate_step(db_model, prompts, level, benchmark.requests_per_step, benchmark.max_tokens)
+            else:
+                summary = await self.run_concurrency_step(db_model, prompts, level, benchmark.requests_per_step, benchmark.max_tokens)
+            summary["level"] = float(level)
+            summaries.append(summary)
+
+            await run_db(self._save_step, benchmark, summary, db)
+            logger.info(f"Benchmark {benchmark.id} step {level}: {summary['throughput']:.2f} req/s, "
+                        f"p95 {summary['p95_latency']} ms, errors {summary['error_rate']:.1%}")
+
+        return await run_db(self._finish, benchmark, summaries, db)
+
+    def _start(self, benchmark: models.Benchmark, db: Session) -> models.Model:
+        # Claim the benchmark in one conditional update, so of two requests running it only one clears its steps
+        claimed = db.query(models.Benchmark).filter(
+            models.Benchmark.id == benchmark.id,
+            models.Benchmark.status != "running"
+        ).update({models.Benchmark.status: "running"}, synchronize_session=False)
+        if not claimed:
+            db.rollback()
+            raise BenchmarkRunningError(f"Benchmark {benchmark.id} is already running")
+
+        db_model = benchmark.model
+        benchmark.status = "running"
+        benchmark.started_at = datetime.utcnow()
+        db.query(models.BenchmarkStep).filter(models.BenchmarkStep.benchmark_id == benchmark.id).delete()
+        db.commit()
+        return db_model
+
+    def _save_step(self, benchmark: models.Benchmark, summary: Dict, db: Session):
+        db.add(models.BenchmarkStep(benchmark_id=benchmark.id, **summary))
+        db.commit()
+
+    def _finish(self, benchmark: models.Benchmark, summaries: List[Dict], db: Session) -> models.Benchmark:
+        benchmark.saturation_level = find_saturation_point(summaries)
+        benchmark.peak_throughput = max((s["throughput"] for s in summaries), default=None)
+        benchmark.status = "completed"
+        benchmark.completed_at = datetime.utcnow()
+        db.commit()
+        db.refresh(benchmark)
+        return benchmark
+
+
+# Global runner instance
+benchmark_runner = ModelBenchmarkRunner()
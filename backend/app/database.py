@@ -1,23 +1,70 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
 import os
+import time
+
+from .profiling import trace_queries
+from .telemetry import db_executor_wait, instrument_engine
 
 # Use absolute path to ensure database is always in project root
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DATABASE_PATH = os.path.join(PROJECT_ROOT, "eval_forge.db")
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
 
+# Threads that run database work for async code. SQLite serializes writers anyway,
+# so a few threads are enough; they are kept apart from the default executor so
+# queries never wait behind scoring batches.
+DB_THREADS = int(os.environ.get("EVAL_FORGE_DB_THREADS", "4"))
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_engine(engine)
+trace_queries(engine)
+# Objects stay loaded after commit: async code reads them on the event loop, where
+# an expired attribute would mean a blocking query
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
+db_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="eval-forge-db")
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def run_db(fn, *args, **kwargs):
+    """
+    Run blocking database work on the database threads and await its result.
+
+    Async code must not query or commit on the event loop: an SQLite fsync would
+    stall every other request and check. A session may be passed in and used by
+    successive run_db calls, but never by two at once.
+
+    Each call should leave the session without an open transaction (commit after
+    writes, fetch_first for reads): a session awaiting network I/O while holding a
+    pooled connection can starve the database threads of connections.
+    """
+    loop = asyncio.get_running_loop()
+    submitted = time.perf_counter()
+    # Carry context variables (the request's profiling spans) onto the database thread
+    context = contextvars.copy_context()
+
+    def work():
+        db_executor_wait.observe(time.perf_counter() - submitted)
+        return context.run(fn, *args, **kwargs)
+
+    return await loop.run_in_executor(db_executor, work)
+
+def fetch_first(query):
+    """First row of a query, with the read transaction ended so the session returns its connection to the pool"""
+    row = query.first()
+    query.session.commit()
+    return row
@@ -0,0 +1,160 @@
+"""
+Content-addressed dataset store.
+Question/answer pairs are stored once, keyed by a hash of their text, and
+datasets are versioned, ordered lists of those items shared by evaluations.
+Each distinct content's members are stored once; every name it is uploaded
+under gets its own dataset row pointing at them.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Stay well below SQLite's bound-parameter limit for IN (...) lookups
+LOOKUP_CHUNK_SIZE = 500
+
+
+def item_hash(question: str, answer: str) -> str:
+    """Content hash identifying a question/answer pair."""
+    return hashlib.sha256(f"{question}\x1f{answer}".encode("utf-8")).hexdigest()
+
+
+def dataset_hash(item_hashes: List[str]) -> str:
+    """Content hash of an ordered list of items."""
+    return hashlib.sha256("\n".join(item_hashes).encode("utf-8")).hexdigest()
+
+
+def _get_or_create_items(db: Session, questions: List[Dict[str, str]], hashes: List[str]) -> Dict[str, int]:
+    """Insert items that are not stored yet and return a hash -> item id map."""
+    unique_hashes = list(dict.fromkeys(hashes))
+    item_ids = {}
+    for start in range(0, len(unique_hashes), LOOKUP_CHUNK_SIZE):
+        chunk = unique_hashes[start:start + LOOKUP_CHUNK_SIZE]
+        rows = db.query(models.DatasetItem.content_hash, models.DatasetItem.id)\
+            .filter(models.DatasetItem.content_hash.in_(chunk))\
+            .all()
+        item_ids.update(dict(rows))
+
+    new_items = {}
+    for q, content_hash in zip(questions, hashes):
+        if content_hash not in item_ids and content_hash not in new_items:
+            new_items[content_hash] = {
+                "content_hash": content_hash,
+                "question": q["question"],
+                "expected_answer": q["answer"]
+            }
+
+    if new_items:
+        db.execute(insert(models.DatasetItem), list(new_items.values()))
+        new_hashes = list(new_items)
+        for start in range(0, len(new_hashes), LOOKUP_CHUNK_SIZE):
+            chunk = new_hashes[start:start + LOOKUP_CHUNK_SIZE]
+            rows = db.query(models.DatasetItem.content_hash, models.DatasetItem.id)\
+                .filter(models.DatasetItem.content_hash.in_(chunk))\
+                .all()
+            item_ids.update(dict(rows))
+
+    return item_ids
+
+
+# Attempts to store a dataset when concurrent uploads of the same content or name collide
+STORE_ATTEMPTS = 3
+
+
+def get_or_create_dataset(db: Session, name: str, questions: List[Dict[str, str]]) -> models.Dataset:
+    """
+    Store a dataset, reusing existing items and datasets with identical content.
+
+    Content is stored once: a name uploading content stored under another name gets its own
+    dataset row pointing at the stored members (content_dataset_id), so the name is kept.
+
+    Args:
+        db: Database session
+        name: Dataset name; a new version is created when content under this name changes
+        questions: List of {"question": ..., "answer": ...} dictionaries
+
+    Returns:
+        The dataset with this name and content, or a newly stored one
+
+    Raises:
+        IntegrityError: Concurrent uploads kept colliding after STORE_ATTEMPTS
+    """
+    hashes = [item_hash(q["question"], q["answer"]) for q in questions]
+    content_hash = dataset_hash(hashes)
+
+    for attempt in range(STORE_ATTEMPTS):
+        try:
+            return _store_dataset(db, name, questions, hashes, content_hash)
+        except IntegrityError:
+            # Another upload stored the same content, items or version first: re-read and reuse them
+            db.rollback()
+            if attempt == STORE_ATTEMPTS - 1:
+                raise
+
+
+def _store_dataset(db: Session, name: str, questions: List[Dict[str, str]], hashes: List[str],
+                   content_hash: str) -> models.Dataset:
+    existing = db.query(models.Dataset)\
+        .filter(models.Dataset.name == name, models.Dataset.content_hash == content_hash)\
+        .first()
+    if existing:
+        return existing
+
+    owner = db.query(models.Dataset)\
+        .filter(models.Dataset.content_hash == content_hash, models.Dataset.content_dataset_id.is_(None))\
+        .first()
+
+    version = (db.query(func.max(models.Dataset.version)).filter(models.Dataset.name == name).scalar() or 0) + 1
+    db_dataset = models.Dataset(
+        name=name,
+        version=version,
+        content_hash=content_hash,
+        content_dataset_id=owner.id if owner else None,
+        item_count=len(questions),
+        created_at=datetime.utcnow()
+    )
+
+    item_ids = {} if owner else _get_or_create_items(db, questions, hashes)
+    db.add(db_dataset)
+    db.flush()
+
+    if hashes and not owner:
+        db.execute(insert(models.DatasetMember), [
+            {"dataset_id": db_dataset.id, "item_id": item_ids[h], "position": position}
+            for position, h in enumerate(hashes)
+        ])
+
+    db.commit()
+    db.refresh(db_dataset)
+    return db_dataset
+
+
+def content_dataset_id(db: Session, dataset_id: int) -> int:
+    """The dataset holding a dataset's members: itself, or the dataset whose content it reuses."""
+    owner_id = db.query(models.Dataset.content_dataset_id).filter(models.Dataset.id == dataset_id).scalar()
+    return owner_id or dataset_id
+
+
+def get_dataset_items(db: Session, dataset_id: int, limit: Optional[int] = None, offset: int = 0) -> List[models.DatasetItem]:
+    """Items of a dataset in their original order."""
+    query = db.query(models.DatasetItem)\
+        .join(models.DatasetMember, models.DatasetMember.item_id == models.DatasetItem.id)\
+        .filter(models.DatasetMember.dataset_id == content_dataset_id(db, dataset_id))\
+        .order_by(models.DatasetMember.position)\
+        .offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def get_evaluation_items(db: Session, evaluation: models.Evaluation) -> list:
+    """Items to ask for an evaluation: dataset items, or legacy per-evaluation questions."""
+    if evaluation.dataset_id:
+        return get_dataset_items(db, evaluation.dataset_id)
+    return db.query(models.Question).filter(models.Question.evaluation_id == evaluation.id).all()
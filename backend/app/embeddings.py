@@ -0,0 +1,136 @@
+"""
+Sentence embedding backends for semantic similarity.
+The default backend runs sentence-transformers on PyTorch; the ONNX backends run
+an exported (optionally int8-quantized) copy of the same model on onnxruntime,
+which avoids loading PyTorch into the API process. Export the ONNX model with
+`python provision_models.py`.
+"""
+
+import logging
+import os
+from typing import List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# "torch", "onnx" (fp32 export) or "onnx-int8" (dynamically quantized export)
+EMBEDDING_BACKEND = os.environ.get("EVAL_FORGE_EMBEDDING_BACKEND", "torch")
+
+# Intra-op threads for the runtime; 0 keeps the runtime's default
+EMBEDDING_THREADS = int(os.environ.get("EVAL_FORGE_EMBEDDING_THREADS", "0"))
+
+# Texts per forward pass
+EMBEDDING_BATCH_SIZE = 32
+
+# all-MiniLM-L6-v2 truncates inputs to 256 word pieces
+EMBEDDING_MAX_LENGTH = 256
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model_int8.onnx"
+ONNX_TOKENIZER_FILE = "tokenizer.json"
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+class TorchEmbeddingBackend:
+    """sentence-transformers model running on PyTorch, on the GPU when one is available."""
+
+    def __init__(self, model_path: str, model_name: str, cache_dir: str, threads: int = 0):
+        """
+        Args:
+            model_path: Directory of a model saved with SentenceTransformer.save
+            model_name: Hub name, used when model_path doesn't exist
+            cache_dir: Hugging Face cache to look the hub name up in (no downloads)
+            threads: PyTorch intra-op threads (0 for the default)
+        """
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+
+        if os.path.isdir(model_path):
+            self._model = SentenceTransformer(model_path)
+        else:
+            self._model = SentenceTransformer(model_name, cache_folder=cache_dir, local_files_only=True)
+        self.device = "gpu" if self._model.device.type == "cuda" else "cpu"
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self._model.encode(list(texts), batch_size=EMBEDDING_BATCH_SIZE)
+
+
+class OnnxEmbeddingBackend:
+    """Exported transformer on onnxruntime, with sentence-transformers' mean pooling and normalization."""
+
+    def __init__(self, onnx_dir: str, quantized: bool = False, threads: int = 0):
+        """
+        Args:
+            onnx_dir: Directory with the exported model and tokenizer.json
+            quantized: Use the int8-quantized export
+            threads: onnxruntime intra-op threads (0 for the default)
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_file = os.path.join(onnx_dir, ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        if not os.path.isfile(model_file):
+            raise FileNotFoundError(f"{model_file} not found; run provision_models.py to export it")
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = onnxruntime.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.device = "cpu"
+        self._input_names = {model_input.name for model_input in self._session.get_inputs()}
+
+        self._tokenizer = Tokenizer.from_file(os.path.join(onnx_dir, ONNX_TOKENIZER_FILE))
+        self._tokenizer.enable_truncation(max_length=EMBEDDING_MAX_LENGTH)
+        pad_id = self._tokenizer.token_to_id("[PAD]") or 0
+        self._tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        batches = []
+        texts = list(texts)
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            encodings = self._tokenizer.encode_batch(texts[start:start + EMBEDDING_BATCH_SIZE])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self._input_names:
+                feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+            hidden = self._session.run(None, feeds)[0]
+
+            # Mean over real tokens, then L2 normalize, as the model's Pooling and Normalize modules do
+            mask = attention_mask[:, :, None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            batches.append(pooled / np.clip(norms, 1e-12, None))
+
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(batches)
+
+
+def load_embedding_backend(backend: str, model_path: str, model_name: str, cache_dir: str, onnx_dir: str,
+                           threads: int = EMBEDDING_THREADS):
+    """
+    Load an embedding backend by name.
+
+    Args:
+        backend: One of BACKENDS
+        model_path: Saved sentence-transformers model directory
+        model_name: Hub name of the model
+        cache_dir: Local model cache
+        onnx_dir: Directory of the ONNX export
+        threads: Runtime intra-op threads (0 for the default)
+
+    Returns:
+        Object with encode(texts) -> np.ndarray of normalized embeddings, and the device ("cpu" or "gpu") it runs on
+    """
+    if backend == "torch":
+        return TorchEmbeddingBackend(model_path, model_name, cache_dir, threads)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEmbeddingBackend(onnx_dir, quantized=backend == "onnx-int8", threads=threads)
+    raise ValueError(f"Unknown embedding backend '{backend}', expected one of {', '.join(BACKENDS)}")
@@ -0,0 +1,262 @@
+"""
+Sweeps of external app endpoints.
+
+A sweep checks every active endpoint of an app at once. Endpoints inherit the
+app's base_url, authentication and timeout (an endpoint's own timeout overrides
+it), and all of an app's requests go through one client, so they share the
+app host's connection pool. At most APP_CONCURRENCY requests per app are in
+flight, which keeps a large app from overwhelming its own backend. Results are
+collected in memory and written in a single transaction at the end, so a sweep
+costs one commit however many endpoints it covers. An app that can't be swept,
+e.g. because its auth_credentials are malformed, gets a sweep recording the
+error and its endpoints fail; the other apps are swept as usual.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import run_db
+from .response_body import StreamingBodyCheck, read_response_body
+from .synthetic_monitoring import auth_headers
+from .telemetry import InstrumentedTransport
+
+logger = logging.getLogger(__name__)
+
+APP_CONCURRENCY = 20  # Requests in flight per app, and connections in its pool
+SWEEP_APPS_CONCURRENCY = 4  # Apps swept at once by sweep_all
+
+
+class _Endpoint(NamedTuple):
+    """What a check needs from an endpoint row, read before any request goes out."""
+    id: int
+    method: str
+    path: str
+    headers: Optional[str]  # JSON, parsed per check so a malformed one fails only its endpoint
+    body: Optional[str]
+    expected_status: int
+    expected_response_contains: Optional[str]
+    timeout: Optional[int]
+
+
+class _AppSweep(NamedTuple):
+    app_id: int
+    started_at: datetime
+    duration_ms: float
+    checks: List[Dict]
+    error: Optional[str] = None
+
+
+class EndpointSweepRunner:
+    """Checks external app endpoints concurrently and records each sweep."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 app_concurrency: int = APP_CONCURRENCY):
+        """
+        Args:
+            transport: Transport for every app client (tests pass an httpx.MockTransport)
+            app_concurrency: Requests in flight per app
+        """
+        self.transport = transport
+        self.app_concurrency = app_concurrency
+
+    async def sweep_app(self, app: models.ExternalApp, db: Session) -> models.EndpointSweep:
+        """
+        Check every active endpoint of one app.
+
+        Args:
+            app: External app to sweep
+            db: Database session the sweep and its checks are written to
+
+        Returns:
+            The recorded EndpointSweep
+        """
+        endpoints = await run_db(_active_endpoints, app, db)
+        result = await self._run_app(app, endpoints)
+        sweeps = await run_db(self._record, db, [result])
+        return sweeps[0]
+
+    async def sweep_all(self, db: Session) -> List[models.EndpointSweep]:
+        """
+        Check every active endpoint of every active app, recording all sweeps in one transaction.
+
+        Returns:
+            The recorded EndpointSweeps, one per app
+        """
+        apps = await run_db(_active_apps, db)
+        gate = asyncio.Semaphore(SWEEP_APPS_CONCURRENCY)
+
+        async def run(app, endpoints):
+            async with gate:
+                try:
+                    return await self._run_app(app, endpoints)
+                except Exception as e:
+                    # One broken app must not cost every other app its sweep
+                    logger.error(f"Sweep of '{app.name}' failed: {e}")
+                    return _failed_sweep(app, endpoints, datetime.now(), str(e) or type(e).__name__)
+
+        results = await asyncio.gather(*(run(app, endpoints) for app, endpoints in apps))
+        return await run_db(self._record, db, results)
+
+    async def _run_app(self, app: models.ExternalApp, endpoints: List[_Endpoint]) -> _AppSweep:
+        started_at = datetime.now()
+        start_time = time.time()
+        try:
+            headers = auth_headers(app.auth_type, app.auth_credentials)
+        except (ValueError, AttributeError) as e:
+            logger.error(f"Not sweeping '{app.name}': invalid auth_credentials: {e}")
+            return _failed_sweep(app, endpoints, started_at, f"Invalid auth_credentials: {e}")
+
+        limits = httpx.Limits(max_connections=self.app_concurrency,
+                              max_keepalive_connections=self.app_concurrency)
+        semaphore = asyncio.Semaphore(self.app_concurrency)
+        async with httpx.AsyncClient(
+            base_url=app.base_url,
+            headers=headers,
+            timeout=app.timeout,
+            transport=InstrumentedTransport("endpoint_sweep", self.transport, limits=limits)
+        ) as client:
+            checks = await asyncio.gather(
+                *(self._check(client, semaphore, endpoint, app.timeout) for endpoint in endpoints)
+            )
+
+        duration_ms = (time.time() - start_time) * 1000
+        logger.info(f"Swept {len(endpoints)} endpoints of '{app.name}' in {duration_ms:.0f}ms")
+        return _AppSweep(app.id, started_at, duration_ms, checks)
+
+    async def _check(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore,
+                     endpoint: _Endpoint, app_timeout: int) -> Dict:
+        timeout = endpoint.timeout or app_timeout
+        async with semaphore:
+            executed_at = datetime.now()
+            start_time = time.time()
+            try:
+                headers = json.loads(endpoint.headers) if endpoint.headers else {}
+                body = json.loads(endpoint.body) if endpoint.body else None
+                request = client.build_request(
+                    method=endpoint.method,
+                    url=endpoint.path,
+                    headers=headers,
+                    json=body if body else None,
+                    timeout=timeout
+                )
+                response = await client.send(request, stream=True)
+                try:
+                    check = None
+                    if endpoint.expected_response_contains:
+                        check = StreamingBodyCheck.for_text(endpoint.expected_response_contains, response.encoding)
+                    # Reading stops once the check is decided; a body read to the end returns its
+                    # connection to the pool, one cut short is closed by aclose() below
+                    await read_response_body(response, [check] if check else [])
+                finally:
+                    await response.aclose()
+
+                status_ok = response.status_code == endpoint.expected_status
+                content_ok = check.matched if check else True
+                error_message = None
+                if not status_ok:
+                    error_message = f"Expected status {endpoint.expected_status}, got {response.status_code}"
+                elif not content_ok:
+                    error_message = "Response does not contain the expected text"
+                status = "success" if status_ok and content_ok else "failure"
+                status_code = response.status_code
+                response_time = (time.time() - start_time) * 1000
+            except httpx.TimeoutException:
+                status, status_code, response_time = "timeout", None, timeout * 1000
+                error_message = f"Request timeout after {timeout} seconds"
+            except Exception as e:
+                status, status_code = "error", None
+                response_time = (time.time() - start_time) * 1000
+                error_message = str(e) or type(e).__name__
+
+        return {
+            "endpoint_id": endpoint.id,
+            "status": status,
+            "status_code": status_code,
+            "response_time": response_time,
+            "error_message": error_message,
+            "executed_at": executed_at
+        }
+
+    def _record(self, db: Session, results: List[_AppSweep]) -> List[models.EndpointSweep]:
+        """Write the sweeps and all their checks with one commit."""
+        completed_at = datetime.now()
+        sweeps = []
+        for result in results:
+            succeeded = sum(1 for check in result.checks if check["status"] == "success")
+            sweeps.append(models.EndpointSweep(
+                external_app_id=result.app_id,
+                total=len(result.checks),
+                succeeded=succeeded,
+                failed=len(result.checks) - succeeded,
+                duration_ms=result.duration_ms,
+                started_at=result.started_at,
+                completed_at=completed_at,
+                error=result.error
+            ))
+        db.add_all(sweeps)
+        db.flush()
+
+        rows = [
+            dict(check, sweep_id=sweep.id)
+            for sweep, result in zip(sweeps, results)
+            for check in result.checks
+        ]
+        if rows:
+            # One executemany rather than an ORM object per check
+            db.execute(insert(models.EndpointCheck), rows)
+        db.commit()
+        return sweeps
+
+
+def _failed_sweep(app: models.ExternalApp, endpoints: List[_Endpoint], started_at: datetime,
+                  error: str) -> _AppSweep:
+    """A sweep of an app whose endpoints couldn't be checked: each fails with the app's error."""
+    checks = [{
+        "endpoint_id": endpoint.id,
+        "status": "error",
+        "status_code": None,
+        "response_time": 0.0,
+        "error_message": error,
+        "executed_at": started_at
+    } for endpoint in endpoints]
+    return _AppSweep(app.id, started_at, 0.0, checks, error)
+
+
+def _active_endpoints(app: models.ExternalApp, db: Session) -> List[_Endpoint]:
+    endpoints = [_endpoint(endpoint) for endpoint in app.endpoints if endpoint.is_active]
+    # End the read so the session holds no connection during the sweep
+    db.commit()
+    return endpoints
+
+
+def _active_apps(db: Session) -> List[Tuple[models.ExternalApp, List[_Endpoint]]]:
+    apps = db.query(models.ExternalApp).filter(models.ExternalApp.is_active == True).all()
+    snapshot = [(app, [_endpoint(endpoint) for endpoint in app.endpoints if endpoint.is_active]) for app in apps]
+    db.commit()
+    return snapshot
+
+
+def _endpoint(endpoint: models.ExternalAppEndpoint) -> _Endpoint:
+    return _Endpoint(
+        id=endpoint.id,
+        method=endpoint.method or "GET",
+        path=endpoint.endpoint_path,
+        headers=endpoint.headers,
+        body=endpoint.body,
+        expected_status=endpoint.expected_status or 200,
+        expected_response_contains=endpoint.expected_response_contains,
+        timeout=endpoint.timeout
+    )
+
+
+# Global sweep runner instance
+endpoint_sweep_runner = EndpointSweepRunner()
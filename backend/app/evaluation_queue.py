@@ -0,0 +1,280 @@
+"""
+Residency-aware evaluation queue.
+
+Ollama loads models on demand and keeps a limited number in memory, so
+evaluations of different models running against one endpoint at the same time
+make it swap models back and forth, paying a multi-second load each time.
+Evaluations are queued per endpoint instead, and each endpoint serves one
+model at a time: up to EVALUATIONS_PER_MODEL evaluations of the loaded model
+run together, and the endpoint only switches to another model when none are
+left or another model's oldest evaluation has waited RESIDENCY_MAX_WAIT_S.
+Before switching, the previous model is unloaded (keep_alive 0) so the next
+one loads into free memory; an idle endpoint gets a short keep_alive so the
+last model does not hold memory for the whole evaluation keep_alive.
+
+An evaluation of a model pool also sends requests to the pool's replicas, so a
+lane covers every endpoint its evaluations touch: an evaluation joins the lane
+of any endpoint it shares, whether that is its own endpoint or a replica.
+Jobs that would bridge two existing lanes join the oldest one; the other lane
+keeps managing its own endpoints until it drains.
+
+Providers whose servers keep their models loaded (OpenAI-compatible APIs)
+have nothing to swap: their evaluations get a lane per endpoint and model,
+and no keep_alive requests are sent.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from . import models
+from .database import SessionLocal, fetch_first, run_db
+from .evaluation_runner import EvaluationRunner, evaluation_runner
+from .providers import Provider, get_provider
+from .telemetry import InstrumentedTransport, evaluations_queued, model_swaps
+
+logger = logging.getLogger(__name__)
+
+# Evaluations of the loaded model run together on one endpoint, like Ollama's parallel slots
+EVALUATIONS_PER_MODEL = int(os.environ.get("EVAL_FORGE_EVALUATIONS_PER_MODEL", "4"))
+# Switch models anyway once another model's evaluation has waited this long
+RESIDENCY_MAX_WAIT_S = float(os.environ.get("EVAL_FORGE_RESIDENCY_MAX_WAIT_S", "1800"))
+# keep_alive set when an endpoint's queue empties
+IDLE_KEEP_ALIVE = os.environ.get("EVAL_FORGE_OLLAMA_IDLE_KEEP_ALIVE", "5m")
+
+
+class QueuedEvaluation:
+    def __init__(self, evaluation_id: int, endpoint: str, model_name: str, resume: bool,
+                 replica_endpoints: Optional[List[str]] = None, model_type: str = "ollama"):
+        self.evaluation_id = evaluation_id
+        self.endpoint = endpoint
+        # Every endpoint the evaluation sends requests to, for keep_alive changes
+        self.endpoints = list(dict.fromkeys([endpoint, *(replica_endpoints or [])]))
+        self.model_name = model_name
+        self.model_type = model_type
+        self.resume = resume
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def to_dict(self) -> Dict:
+        now = time.monotonic()
+        return {
+            "evaluation_id": self.evaluation_id,
+            "model_name": self.model_name,
+            "resume": self.resume,
+            "waited_s": round((self.started_at or now) - self.enqueued_at, 3),
+            "running_s": round(now - self.started_at, 3) if self.started_at else None
+        }
+
+
+class EndpointLane:
+    """The queued and running evaluations of one endpoint, served one model at a time."""
+
+    def __init__(self, queue: "EvaluationQueue", endpoint: str, provider: Optional[Provider] = None):
+        self.queue = queue
+        self.endpoint = endpoint
+        self.provider = provider or get_provider("ollama")
+        self.resident: Optional[str] = None  # Model this lane last ran, presumably still loaded
+        self.resident_endpoints: List[str] = [endpoint]  # Where it was loaded, with a model pool's replicas
+        self.endpoints: List[str] = [endpoint]  # Every endpoint its evaluations have touched, for routing
+        self.pending: List[QueuedEvaluation] = []
+        self.running: List[QueuedEvaluation] = []
+        self.swaps = 0
+        self.completed = 0
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, job: QueuedEvaluation):
+        self.pending.append(job)
+        self.endpoints = list(dict.fromkeys(self.endpoints + job.endpoints))
+        if not self._task:
+            # A fresh event per worker task, bound to the loop the task runs on
+            self._changed = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        self._changed.set()
+
+    def next_model(self, now: float) -> Optional[str]:
+        """The model to run next: stay on the resident model while it has work and nobody has waited too long."""
+        if not self.pending:
+            return None
+        others = [job for job in self.pending if job.model_name != self.resident]
+        if len(others) == len(self.pending):
+            return others[0].model_name
+        if not others or now - others[0].enqueued_at < self.queue.max_wait_s:
+            return self.resident
+        return others[0].model_name
+
+    async def _run(self):
+        while True:
+            while self.pending or self.running:
+                self._changed.clear()
+                model = self.next_model(time.monotonic())
+                if model is not None and model != self.resident and not self.running:
+                    await self._switch(model)
+                if model == self.resident:
+                    while len(self.running) < self.queue.evaluations_per_model:
+                        job = next((job for job in self.pending if job.model_name == model), None)
+                        if not job:
+                            break
+                        self._start(job)
+                # Woken when an evaluation finishes or is queued
+                await self._changed.wait()
+
+            if self.resident and self.provider.manages_residency:
+                await self.queue.set_keep_alive(self.resident_endpoints, self.resident, self.queue.idle_keep_alive)
+            if not self.pending:
+                break
+        self._task = None
+
+    async def _switch(self, model: str):
+        if self.resident and self.provider.manages_residency:
+            logger.info(f"Switching {self.endpoint} from {self.resident} to {model}")
+            # Free the previous model's memory now rather than letting Ollama evict it under load
+            await self.queue.set_keep_alive(self.resident_endpoints, self.resident, 0)
+            self.swaps += 1
+            model_swaps.inc()
+        self.resident = model
+        self.resident_endpoints = [self.endpoint]
+
+    def _start(self, job: QueuedEvaluation):
+        self.pending.remove(job)
+        evaluations_queued.dec()
+        self.running.append(job)
+        self.resident_endpoints = list(dict.fromkeys(self.resident_endpoints + job.endpoints))
+        job.started_at = time.monotonic()
+        asyncio.create_task(self._execute(job))
+
+    async def _execute(self, job: QueuedEvaluation):
+        try:
+            await self.queue.run_job(job)
+            if not job.future.done():
+                job.future.set_result(None)
+        except Exception as e:
+            logger.error(f"Queued evaluation {job.evaluation_id} failed: {e}")
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            self.running.remove(job)
+            self.completed += 1
+            self._changed.set()
+
+    def to_dict(self) -> Dict:
+        return {
+            "endpoint": self.endpoint,
+            "provider": self.provider.name,
+            "resident_model": self.resident,
+            "running": [job.to_dict() for job in self.running],
+            "queued": [job.to_dict() for job in self.pending],
+            "swaps": self.swaps,
+            "completed": self.completed
+        }
+
+
+class EvaluationQueue:
+    """Queue evaluations per endpoint and order them to keep models loaded."""
+
+    def __init__(self, runner: EvaluationRunner = evaluation_runner, session_factory: Callable = SessionLocal,
+                 evaluations_per_model: int = EVALUATIONS_PER_MODEL, max_wait_s: float = RESIDENCY_MAX_WAIT_S,
+                 idle_keep_alive: str = IDLE_KEEP_ALIVE):
+        """
+        Args:
+            runner: Runs each evaluation
+            session_factory: Sessions for the evaluations, one per run
+            evaluations_per_model: Evaluations of the loaded model run together on an endpoint
+            max_wait_s: How long another model's evaluation waits before the endpoint switches to it
+            idle_keep_alive: keep_alive for the last model when an endpoint's queue empties
+        """
+        self.runner = runner
+        self.session_factory = session_factory
+        self.evaluations_per_model = evaluations_per_model
+        self.max_wait_s = max_wait_s
+        self.idle_keep_alive = idle_keep_alive
+        self.lanes: Dict[Tuple[str, Optional[str]], EndpointLane] = {}
+
+    def submit(self, evaluation_id: int, endpoint: str, model_name: str, resume: bool = False,
+               replica_endpoints: Optional[List[str]] = None, model_type: str = "ollama") -> asyncio.Future:
+        """
+        Queue an evaluation on the lane of its model's endpoint or replicas.
+
+        Args:
+            replica_endpoints: Other endpoints of the model's pool, shared with their lanes and unloaded
+                along with the endpoint
+            model_type: The model's provider; providers that don't swap models get a lane per model
+
+        Returns:
+            A future resolved when the evaluation finishes, or failed with its error
+
+        Raises:
+            ValueError: The evaluation is already queued or running
+        """
+        if self.find(evaluation_id):
+            raise ValueError(f"Evaluation {evaluation_id} is already queued or running")
+        endpoint = endpoint.rstrip("/")
+        provider = get_provider(model_type)
+        job = QueuedEvaluation(evaluation_id, endpoint, model_name, resume,
+                               [url.rstrip("/") for url in replica_endpoints or []], model_type)
+        lane = self.lane_for(job, provider)
+        if not lane:
+            key = (endpoint, None if provider.manages_residency else model_name)
+            lane = self.lanes[key] = EndpointLane(self, endpoint, provider)
+        # Failures are logged; callers that submit without waiting shouldn't trigger "never retrieved" warnings
+        job.future.add_done_callback(lambda future: future.cancelled() or future.exception())
+        evaluations_queued.inc()
+        lane.add(job)
+        return job.future
+
+    async def run(self, evaluation_id: int, endpoint: str, model_name: str, resume: bool = False,
+                  replica_endpoints: Optional[List[str]] = None, model_type: str = "ollama"):
+        """Queue an evaluation and wait for it to finish."""
+        await self.submit(evaluation_id, endpoint, model_name, resume, replica_endpoints, model_type)
+
+    def lane_for(self, job: QueuedEvaluation, provider: Provider) -> Optional[EndpointLane]:
+        """The lane serving any endpoint the evaluation touches, or None when it needs a new one."""
+        if not provider.manages_residency:
+            return self.lanes.get((job.endpoint, job.model_name))
+        for lane in self.lanes.values():
+            if lane.provider.manages_residency and any(endpoint in lane.endpoints for endpoint in job.endpoints):
+                return lane
+        return None
+
+    def find(self, evaluation_id: int) -> Optional[QueuedEvaluation]:
+        for lane in self.lanes.values():
+            for job in lane.pending + lane.running:
+                if job.evaluation_id == evaluation_id:
+                    return job
+        return None
+
+    def status(self) -> List[Dict]:
+        return [lane.to_dict() for lane in self.lanes.values()]
+
+    async def run_job(self, job: QueuedEvaluation):
+        db = self.session_factory()
+        try:
+            db_evaluation = await run_db(fetch_first, db.query(models.Evaluation)
+                                         .filter(models.Evaluation.id == job.evaluation_id))
+            if not db_evaluation:
+                raise ValueError(f"Evaluation {job.evaluation_id} no longer exists")
+            await self.runner.run(db_evaluation, db, resume=job.resume)
+        finally:
+            await run_db(db.close)
+
+    async def set_keep_alive(self, endpoints: List[str], model_name: str, keep_alive):
+        """Load request with no prompt on each endpoint: sets how long Ollama keeps the model, 0 unloads it."""
+        async with httpx.AsyncClient(transport=InstrumentedTransport("model")) as client:
+            async def send(endpoint: str):
+                try:
+                    await client.post(f"{endpoint}/api/generate",
+                                      json={"model": model_name, "keep_alive": keep_alive}, timeout=30.0)
+                except httpx.HTTPError as e:
+                    logger.warning(f"Could not set keep_alive={keep_alive} for {model_name} on {endpoint}: {e}")
+
+            await asyncio.gather(*(send(endpoint) for endpoint in endpoints))
+
+
+# Global queue instance
+evaluation_queue = EvaluationQueue()
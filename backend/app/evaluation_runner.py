@@ -0,0 +1,548 @@
+"""
+Evaluation execution: asks every pending question of an evaluation, scores
+the answers and keeps enough per-question state that an interrupted run can
+be resumed without asking already answered questions again.
+
+The process running an evaluation holds a lease on its row, renewed while it
+runs. Another process only resumes or marks the evaluation interrupted once
+that lease has expired, so a run alive in another API worker is left alone.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import httpx
+from sqlalchemy import case, func, or_
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import models
+from .database import SessionLocal, run_db
+from .datasets import get_evaluation_items
+from .model_pool import ModelPool, model_pools, replica_error
+from .profiling import PROFILING_ENABLED, SpanTimings
+from .providers import Generation, estimate_tokens
+from .rate_limit import retry_after_seconds
+from .result_writer import ResultWriter, active_writers
+from .scheduler import WORKER_ID
+from .scorers import ScorerTimings, metrics_to_result_fields
+from .scoring_stage import ScoringStage
+from .sequential import SequentialEstimator
+from .telemetry import (InstrumentedTransport, evaluation_model_load_seconds, evaluation_question_duration,
+                        evaluation_questions, evaluations_finished, evaluations_running, model_request_retries)
+
+logger = logging.getLogger(__name__)
+
+# A reported load_duration above this means the model was loaded (not already resident)
+MODEL_LOAD_MIN_MS = 100.0
+# Retries of a question whose request hit an overload failure, on the least loaded replica
+MODEL_RETRIES = int(os.environ.get("EVAL_FORGE_MODEL_RETRIES", "2"))
+MODEL_RETRY_DELAY_S = 0.5
+# Retries of a request the server rate limited with a Retry-After, which pauses the model's requests instead
+RATE_LIMIT_RETRIES = int(os.environ.get("EVAL_FORGE_RATE_LIMIT_RETRIES", "10"))
+# A running evaluation whose lease isn't renewed for this long belongs to a dead process
+EVALUATION_LEASE_S = int(os.environ.get("EVAL_FORGE_EVALUATION_LEASE_S", "60"))
+EVALUATION_HEARTBEAT_S = EVALUATION_LEASE_S / 4
+
+
+class EvaluationOwnedError(Exception):
+    """The evaluation is running in another process that still holds its lease."""
+
+
+def lease_expired(db_evaluation: models.Evaluation) -> bool:
+    """Whether no live process owns the evaluation. Rows from before leases existed have none."""
+    return db_evaluation.lease_expires_at is None or db_evaluation.lease_expires_at < datetime.utcnow()
+
+
+class ModelLoads:
+    """Model load time Ollama reported while answering one evaluation's questions."""
+
+    def __init__(self):
+        self.total_ms = 0.0
+        self.loads = 0
+
+    def add(self, load_duration_ns: Optional[int]):
+        load_ms = (load_duration_ns or 0) / 1e6
+        self.total_ms += load_ms
+        if load_ms >= MODEL_LOAD_MIN_MS:
+            self.loads += 1
+        evaluation_model_load_seconds.inc(load_ms / 1000)
+
+
+class EvaluationRunner:
+    """Run and resume evaluations against a model endpoint."""
+
+    def _build_estimator(self, db: Session, db_evaluation: models.Evaluation,
+                         horizon: Optional[int] = None) -> SequentialEstimator:
+        baseline = None
+        if db_evaluation.baseline_evaluation_id:
+            baseline_eval = db.query(models.Evaluation).filter(models.Evaluation.id == db_evaluation.baseline_evaluation_id).first()
+            if baseline_eval:
+                baseline = (baseline_eval.correct_answers, baseline_eval.correct_answers + baseline_eval.incorrect_answers)
+
+        return SequentialEstimator(
+            confidence_level=db_evaluation.confidence_level or 0.95,
+            target_width=db_evaluation.target_ci_width,
+            baseline=baseline,
+            min_samples=db_evaluation.min_questions or 0,
+            horizon=horizon
+        )
+
+    def _pending_items(self, db: Session, db_evaluation: models.Evaluation, stored: List[models.Result]) -> list:
+        """Items of the evaluation that have no stored result yet."""
+        items = get_evaluation_items(db, db_evaluation)
+        if db_evaluation.dataset_id:
+            answered = {r.dataset_item_id for r in stored if r.dataset_item_id is not None}
+            return [item for item in items if item.id not in answered]
+
+        # Legacy questions: match on question_id, or on text for results written before it existed
+        answered_ids = {r.question_id for r in stored if r.question_id is not None}
+        answered_texts = {r.question for r in stored if r.question_id is None}
+        return [q for q in items if q.id not in answered_ids and q.question not in answered_texts]
+
+    def rebuild_aggregates(self, db: Session, db_evaluation: models.Evaluation):
+        """
+        Recompute accuracy and metric averages from the results stored for an evaluation.
+
+        Infrastructure errors say nothing about the model, so they are counted separately
+        and left out of accuracy and the averages.
+        """
+        answered, correct, avg_bleu, avg_rouge1, avg_rouge2, avg_rougel, avg_semantic, avg_response_time = db.query(
+            func.count(models.Result.id),
+            func.sum(case((models.Result.is_correct == True, 1), else_=0)),
+            func.avg(models.Result.bleu_score),
+            func.avg(models.Result.rouge_1_score),
+            func.avg(models.Result.rouge_2_score),
+            func.avg(models.Result.rouge_l_score),
+            func.avg(models.Result.semantic_similarity),
+            func.avg(models.Result.response_time)
+        ).filter(models.Result.evaluation_id == db_evaluation.id,
+                 models.Result.infrastructure_error.isnot(True)).one()
+        db_evaluation.infrastructure_errors = db.query(func.count(models.Result.id)).filter(
+            models.Result.evaluation_id == db_evaluation.id,
+            models.Result.infrastructure_error == True
+        ).scalar()
+
+        correct = correct or 0
+        db_evaluation.accuracy = correct / answered if answered > 0 else 0
+        db_evaluation.correct_answers = correct
+        db_evaluation.incorrect_answers = answered - correct
+
+        # AVG skips NULLs, matching the "excluding None values" averages
+        db_evaluation.avg_bleu_score = avg_bleu
+        db_evaluation.avg_rouge_1_score = avg_rouge1
+        db_evaluation.avg_rouge_2_score = avg_rouge2
+        db_evaluation.avg_rouge_l_score = avg_rougel
+        db_evaluation.avg_semantic_similarity = avg_semantic
+        db_evaluation.avg_response_time = avg_response_time
+
+    async def run(self, db_evaluation: models.Evaluation, db: Session, resume: bool = False):
+        """
+        Run an evaluation, or resume it by only asking questions without a stored result.
+
+        Args:
+            db_evaluation: Evaluation to run
+            db: Database session
+            resume: Keep existing results and skip their questions instead of starting over
+
+        Raises:
+            EvaluationOwnedError: Another process is running the evaluation, or took it over
+                after this process stopped renewing its lease
+        """
+        evaluation_id = db_evaluation.id
+        await run_db(self._mark_running, db_evaluation, db, resume)
+        evaluations_running.inc()
+        lease = {"owned": True}
+        heartbeat = asyncio.create_task(self._keep_lease(evaluation_id, sessionmaker(bind=db.get_bind()), lease))
+
+        try:
+            # Get model and questions, with stored results replayed into the estimator
+            db_model, questions, estimator = await run_db(self._prepare, db_evaluation, db)
+            pool = model_pools.get(db_model)
+
+            scorer_names = json.loads(db_evaluation.metrics) if db_evaluation.metrics else None
+            timings = ScorerTimings()
+            # Generation, scoring and result write time, when profiling is enabled
+            spans = SpanTimings(enabled=PROFILING_ENABLED)
+            model_loads = ModelLoads()
+
+            adaptive = db_evaluation.mode == "adaptive"
+            if adaptive:
+                # Random order keeps every prefix an unbiased sample of the dataset
+                random.shuffle(questions)
+
+            stop = {"reason": None}
+            if resume:
+                logger.info(f"Resuming evaluation {evaluation_id}: {estimator.total} answered, {len(questions)} pending")
+
+            # Results are buffered and bulk inserted in periodic commits by the writer task
+            writer = ResultWriter(spans=spans)
+            await writer.start()
+            active_writers[evaluation_id] = writer
+
+            async def record(result_row: dict, metrics: Optional[dict]):
+                if metrics is not None:
+                    result_row.update(metrics_to_result_fields(metrics))
+                    estimator.add(result_row["is_correct"], metrics)
+                await writer.add(result_row)
+
+            # Answers are scored in batches by the scoring task while the workers ask the next questions
+            scoring = ScoringStage(scorer_names, record, timings=timings, spans=spans)
+            await scoring.start()
+
+            # One client for the run: connections are kept alive between questions, and its SSL context,
+            # which blocks the event loop for tens of milliseconds to build, is only built once
+            limits = httpx.Limits(max_connections=pool.max_concurrency, max_keepalive_connections=pool.max_concurrency)
+            client = httpx.AsyncClient(transport=InstrumentedTransport("model", limits=limits))
+
+            pending = iter(questions)
+            # Providers that answer several prompts per request get the model's batch size per request
+            batch_size = max(db_model.batch_size or 1, 1) if pool.provider.supports_batches else 1
+
+            async def ask_pending():
+                # Workers share the iterator, so each question is asked once
+                while lease["owned"]:
+                    if adaptive:
+                        stop["reason"] = stop["reason"] or estimator.stop_reason()
+                        if stop["reason"]:
+                            break
+                    batch = list(itertools.islice(pending, batch_size))
+                    if not batch:
+                        break
+
+                    result_rows = await self._ask(client, db_evaluation, db_model, batch, spans, model_loads, pool)
+                    for result_row in result_rows:
+                        await scoring.add(result_row, result_row.pop("_pair"))
+
+            # Enough workers for every replica at its highest concurrency limit; the pool's adaptive
+            # limits decide how many questions are actually in flight. Adaptive runs check the
+            # stopping rule before each question; questions already in flight or waiting to be scored
+            # when it triggers still finish.
+            workers = [asyncio.create_task(ask_pending()) for _ in range(pool.max_concurrency)]
+            try:
+                await asyncio.gather(*workers)
+            except BaseException:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                raise
+            finally:
+                await client.aclose()
+                try:
+                    await scoring.close()
+                finally:
+                    await writer.close()
+                    active_writers.pop(evaluation_id, None)
+                logger.info(f"Evaluation {evaluation_id} scoring: {scoring.stats()}")
+                logger.info(f"Evaluation {evaluation_id} result writes: {writer.stats()}")
+                if model_loads.loads:
+                    logger.info(f"Evaluation {evaluation_id} waited {model_loads.total_ms:.0f}ms "
+                                f"for {model_loads.loads} model loads")
+                logger.info(f"Evaluation {evaluation_id} endpoints: {pool.stats()['replicas']}")
+
+            if not lease["owned"]:
+                raise EvaluationOwnedError(f"Evaluation {evaluation_id} was taken over by another process")
+            await run_db(self._complete, db_evaluation, db, estimator, stop["reason"], timings, spans, model_loads)
+            evaluations_finished.labels("completed").inc()
+
+        except Exception:
+            evaluations_finished.labels("failed").inc()
+            await run_db(self._fail, db_evaluation, db)
+            raise
+        finally:
+            heartbeat.cancel()
+            evaluations_running.dec()
+
+    def _mark_running(self, db_evaluation: models.Evaluation, db: Session, resume: bool):
+        # Take the lease in one conditional update, so of two processes starting the evaluation only one runs it
+        now = datetime.utcnow()
+        claimed = db.query(models.Evaluation).filter(
+            models.Evaluation.id == db_evaluation.id,
+            or_(models.Evaluation.status != "running", models.Evaluation.lease_expires_at.is_(None),
+                models.Evaluation.lease_expires_at < now)
+        ).update({
+            models.Evaluation.owner_id: WORKER_ID,
+            models.Evaluation.lease_expires_at: now + timedelta(seconds=EVALUATION_LEASE_S)
+        }, synchronize_session=False)
+        if not claimed:
+            db.rollback()
+            raise EvaluationOwnedError(f"Evaluation {db_evaluation.id} is running in {db_evaluation.owner_id}")
+
+        if not resume:
+            db.query(models.Result).filter(models.Result.evaluation_id == db_evaluation.id).delete()
+            db_evaluation.model_load_ms = None
+            db_evaluation.model_loads = None
+        else:
+            # Questions that hit infrastructure errors are asked again
+            db.query(models.Result).filter(models.Result.evaluation_id == db_evaluation.id,
+                                           models.Result.infrastructure_error == True).delete()
+
+        db_evaluation.status = "running"
+        if not resume or not db_evaluation.started_at:
+            db_evaluation.started_at = datetime.utcnow()
+        db_evaluation.completed_at = None
+        db.commit()
+
+    def _renew_lease(self, evaluation_id: int, session_factory) -> bool:
+        """Extend this process's lease on a running evaluation. Returns False if another process holds it."""
+        db = session_factory()
+        try:
+            renewed = db.query(models.Evaluation).filter(
+                models.Evaluation.id == evaluation_id,
+                models.Evaluation.owner_id == WORKER_ID,
+                models.Evaluation.status == "running"
+            ).update({models.Evaluation.lease_expires_at: datetime.utcnow() + timedelta(seconds=EVALUATION_LEASE_S)},
+                     synchronize_session=False)
+            db.commit()
+            return bool(renewed)
+        finally:
+            db.close()
+
+    async def _keep_lease(self, evaluation_id: int, session_factory, lease: dict):
+        """Renew the lease until cancelled; on losing it, workers stop taking questions."""
+        while True:
+            await asyncio.sleep(EVALUATION_HEARTBEAT_S)
+            try:
+                lease["owned"] = await run_db(self._renew_lease, evaluation_id, session_factory)
+            except Exception as e:
+                # A missed renewal is harmless until the lease actually expires
+                logger.warning(f"Could not renew the lease of evaluation {evaluation_id}: {e}")
+                continue
+            if not lease["owned"]:
+                logger.error(f"Evaluation {evaluation_id} lost its lease to another process, stopping")
+                return
+
+    def _prepare(self, db_evaluation: models.Evaluation, db: Session):
+        """Load the model and pending questions, and an estimator that already accounts for stored results."""
+        db_model = db_evaluation.model
+        stored = db.query(models.Result).filter(models.Result.evaluation_id == db_evaluation.id).all()
+        questions = self._pending_items(db, db_evaluation, stored)
+
+        # Replay stored results so adaptive stopping accounts for them
+        estimator = self._build_estimator(db, db_evaluation, horizon=len(stored) + len(questions))
+        for r in stored:
+            estimator.add(r.is_correct, {
+                'bleu_score': r.bleu_score,
+                'rouge1': r.rouge_1_score,
+                'rouge2': r.rouge_2_score,
+                'rougeL': r.rouge_l_score,
+                'semantic_similarity': r.semantic_similarity,
+                **(json.loads(r.extra_metrics) if r.extra_metrics else {})
+            })
+        # End the read so the session holds no connection while questions are asked
+        db.commit()
+        return db_model, questions, estimator
+
+    def _complete(self, db_evaluation: models.Evaluation, db: Session, estimator: SequentialEstimator,
+                  stop_reason: Optional[str], timings: ScorerTimings, spans: SpanTimings, model_loads: ModelLoads):
+        # Aggregates come from everything stored, including results from before a resume
+        self.rebuild_aggregates(db, db_evaluation)
+        db_evaluation.status = "completed"
+        db_evaluation.completed_at = datetime.utcnow()
+        db_evaluation.lease_expires_at = None
+
+        # Store confidence intervals and why sampling stopped early, if it did
+        db_evaluation.accuracy_ci_lower, db_evaluation.accuracy_ci_upper = estimator.accuracy_interval()
+        db_evaluation.metric_intervals = json.dumps(estimator.metric_intervals())
+        db_evaluation.stop_reason = stop_reason
+        db_evaluation.scorer_timings = json.dumps(timings.summary())
+        db_evaluation.phase_timings = json.dumps(spans.summary()) if spans.enabled else None
+        # Load overhead accumulates across resumes
+        db_evaluation.model_load_ms = (db_evaluation.model_load_ms or 0) + model_loads.total_ms
+        db_evaluation.model_loads = (db_evaluation.model_loads or 0) + model_loads.loads
+
+        db.commit()
+
+    def _fail(self, db_evaluation: models.Evaluation, db: Session):
+        db.rollback()
+        if db_evaluation.owner_id != WORKER_ID:
+            # Taken over by another process, whose run decides the status
+            return
+        db_evaluation.status = "failed"
+        db_evaluation.completed_at = datetime.utcnow()
+        db_evaluation.lease_expires_at = None
+        db.commit()
+
+    async def _generate(self, client: httpx.AsyncClient, pool: ModelPool, path: str, body: dict,
+                        tokens: int = 0) -> httpx.Response:
+        """
+        Send a request to the pool within its rate limits, retrying overload failures on the least loaded replica.
+
+        A 429 or 503 with a Retry-After pauses every request to the model for that long and is retried
+        without counting against the replica or MODEL_RETRIES.
+
+        Args:
+            path: Provider API path, e.g. /api/generate
+            body: JSON body
+            tokens: Estimated tokens of the request, charged to the tokens-per-minute limit
+
+        Raises:
+            httpx.HTTPError: The last attempt failed to get a response
+            CircuitOpenError: Every replica has been failing for too long to keep waiting
+        """
+        replica = None
+        attempt = rate_limited = 0
+        while True:
+            # Wait for the rate limit before taking a concurrency slot, so waiting requests don't hold slots
+            await pool.rate_limiter.acquire(tokens)
+            replica = await pool.acquire(avoid=replica)
+            started_at = time.monotonic()
+            try:
+                response = await client.post(pool.provider.url(replica.endpoint, path), json=body,
+                                             headers=pool.headers, timeout=60.0)
+            except httpx.HTTPError as e:
+                pool.release(replica, started_at, replica_error(None, e))
+                if attempt == MODEL_RETRIES:
+                    raise
+                attempt += 1
+                model_request_retries.inc()
+                await asyncio.sleep(MODEL_RETRY_DELAY_S * attempt)
+                continue
+            except BaseException:
+                # Cancelled with the evaluation: says nothing about the replica
+                pool.abandon(replica)
+                raise
+
+            retry_after = retry_after_seconds(response) if response.status_code in (429, 503) else None
+            if retry_after is not None and rate_limited < RATE_LIMIT_RETRIES:
+                # The server's rate limit, not the replica's health
+                pool.abandon(replica)
+                pool.rate_limiter.pause(retry_after)
+                rate_limited += 1
+                model_request_retries.inc()
+                continue
+
+            error = replica_error(response, None)
+            pool.release(replica, started_at, error)
+            if error is None or attempt == MODEL_RETRIES:
+                return response
+            attempt += 1
+            model_request_retries.inc()
+            await asyncio.sleep(MODEL_RETRY_DELAY_S * attempt)
+
+    async def _ask(self, client: httpx.AsyncClient, db_evaluation: models.Evaluation, db_model: models.Model,
+                   questions: list, spans: SpanTimings, model_loads: Optional[ModelLoads] = None,
+                   pool: Optional[ModelPool] = None) -> List[dict]:
+        """
+        Ask questions in one request and return their unscored result rows, with the (reference, answer)
+        pair to score under "_pair" (None when there is no answer).
+
+        Several questions go out as one batch request; a single question uses the provider's
+        generate request. Failures to get an answer (unreachable or overloaded endpoints, error
+        responses) are stored as infrastructure errors rather than incorrect answers.
+        """
+        start_time = time.time()
+
+        # Dataset-backed results reference the shared item instead of copying its text
+        dataset_backed = bool(db_evaluation.dataset_id)
+        result_rows = [{
+            "evaluation_id": db_evaluation.id,
+            "dataset_item_id": question.id if dataset_backed else None,
+            "question_id": None if dataset_backed else question.id,
+            "question": None if dataset_backed else question.question,
+            "expected_answer": None if dataset_backed else question.expected_answer,
+            "infrastructure_error": False,
+            **metrics_to_result_fields({}),
+            "_pair": None
+        } for question in questions]
+
+        pool = pool or model_pools.get(db_model)
+        provider = pool.provider
+        prompts = [question.question for question in questions]
+        settings = {
+            "temperature": db_evaluation.temperature,
+            "max_tokens": db_evaluation.max_tokens,
+            "top_p": db_evaluation.top_p
+        }
+        try:
+            if len(prompts) > 1:
+                path, body = provider.batch_request(db_model.model_name, prompts, settings)
+            else:
+                path, body = provider.generate_request(db_model.model_name, prompts[0], settings)
+            estimated_tokens = estimate_tokens(prompts, db_evaluation.max_tokens)
+
+            with spans.span("generation"):
+                response = await self._generate(client, pool, path, body, estimated_tokens)
+
+            if response.status_code == 200:
+                if len(prompts) > 1:
+                    generations = provider.parse_batch(response.json(), len(prompts))
+                else:
+                    generations = [provider.parse_generation(response.json())]
+                used = [generation.total_tokens for generation in generations]
+                pool.rate_limiter.settle(estimated_tokens, None if None in used else sum(used))
+
+                response_time = int((time.time() - start_time) * 1000)
+                for question, generation, result_row in zip(questions, generations, result_rows):
+                    self._record_answer(question, generation, result_row, response_time, model_loads)
+            else:
+                for result_row in result_rows:
+                    result_row.update(
+                        model_response=f"Error: Failed to get response (HTTP {response.status_code})",
+                        is_correct=False,
+                        infrastructure_error=True,
+                        response_time=int((time.time() - start_time) * 1000)
+                    )
+
+        except Exception as e:
+            for result_row in result_rows:
+                if result_row["_pair"] is None:
+                    result_row.update(
+                        model_response=f"Error: {str(e)}",
+                        is_correct=False,
+                        infrastructure_error=True,
+                        response_time=int((time.time() - start_time) * 1000)
+                    )
+
+        for result_row in result_rows:
+            if result_row["_pair"] is None:
+                outcome = "error"
+            else:
+                outcome = "correct" if result_row["is_correct"] else "incorrect"
+            evaluation_questions.labels(outcome).inc()
+            evaluation_question_duration.observe(time.time() - start_time)
+        return result_rows
+
+    def _record_answer(self, question, generation: Generation, result_row: dict, response_time: int,
+                       model_loads: Optional[ModelLoads]):
+        """Fill a result row from the model's answer to its question, leaving its metrics to the scoring stage."""
+        model_response = generation.text
+        if model_loads:
+            model_loads.add(generation.load_duration_ns)
+
+        # Simple accuracy check (case-insensitive contains)
+        is_correct = question.expected_answer.lower() in model_response.lower()
+
+        result_row.update(
+            model_response=model_response,
+            is_correct=is_correct,
+            response_time=response_time,
+            _pair=(question.expected_answer, model_response)
+        )
+
+    def mark_interrupted_evaluations(self, session_factory=SessionLocal):
+        """Flag evaluations left "running" by a process that died, i.e. whose lease expired, so they can be resumed."""
+        db = session_factory()
+        try:
+            now = datetime.utcnow()
+            stale = db.query(models.Evaluation).filter(
+                models.Evaluation.status == "running",
+                or_(models.Evaluation.lease_expires_at.is_(None), models.Evaluation.lease_expires_at < now)
+            ).all()
+            for db_evaluation in stale:
+                db_evaluation.status = "interrupted"
+            db.commit()
+            if stale:
+                logger.info(f"Marked {len(stale)} evaluations as interrupted")
+        finally:
+            db.close()
+
+
+# Global runner instance
+evaluation_runner = EvaluationRunner()
@@ -0,0 +1,383 @@
+"""
+Vectorized lexical metrics: BLEU and ROUGE-1/2/L.
+Every text is tokenized and stemmed once, mapped to integer token IDs and
+cached, and n-gram matching and LCS run in NumPy over whole batches of pairs.
+Scores match MetricsCalculator's NLTK sentence_bleu (method4 smoothing) and
+rouge_score (Porter stemmer) implementations.
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from itertools import chain
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .metrics import metrics_calculator
+
+logger = logging.getLogger(__name__)
+
+# Tokenized texts kept in memory; references repeat across evaluations and models
+TOKEN_CACHE_SIZE = 50000
+
+# Pairs per LCS block; pairs are sorted by length first so padding stays small
+LCS_BLOCK_SIZE = 512
+
+BLEU_MAX_ORDER = 4
+BLEU_SMOOTHING_K = 5  # nltk SmoothingFunction default
+
+# rouge_score's DefaultTokenizer rules
+_NON_ALPHANUM_RE = re.compile(r"[^a-z0-9]+")
+_VALID_TOKEN_RE = re.compile(r"^[a-z0-9]+$")
+
+# Characters left by MetricsCalculator._clean_text; other text goes through NLTK unchanged
+_CLEANED_TEXT_RE = re.compile(r"[\w\s.,!?-]*")
+
+# Punkt only considers a break at [.?!] followed by [?!] or whitespace and another token
+_SENTENCE_BREAK_RE = re.compile(r"[.?!](?:[?!]|\s+\S)")
+
+# NLTKWordTokenizer's rules that can match cleaned text; its quote, bracket, symbol
+# and apostrophe rules never fire on it
+_FINAL_PERIOD_RE = re.compile(r"([^\.])(\.)([\]\)}>\"\'»”’ ]*)\s*$")
+_FINAL_PERIOD_AGAIN_RE = re.compile(r"([^\.])(\.)([\]\)}>\"\']*)\s*$")
+_COMMA_RE = re.compile(r"([:,])([^\d])")
+_COMMA_LOOKAHEAD_RE = re.compile(r",(?=\D)")
+_ELLIPSIS_RE = re.compile(r"\.{2,}")
+_CONTRACTIONS_RE = re.compile(
+    r"(?i)\b(?:(can)(not)|(gim)(me)|(gon)(na)|(got)(ta)|(lem)(me))\b|\b(wan)(na)(?=\s)"
+)
+_CONTRACTION_WORDS = ("cannot", "gimme", "gonna", "gotta", "lemme", "wanna")
+
+_EMPTY_ROUGE = {"rouge1": None, "rouge2": None, "rougeL": None}
+
+
+def _split_contraction(match: re.Match) -> str:
+    first, second = [group for group in match.groups() if group is not None]
+    return f" {first} {second} "
+
+
+def _treebank_tokens(sentence: str) -> List[str]:
+    """
+    NLTKWordTokenizer.tokenize for text containing only word characters, whitespace
+    and .,!?- (what _clean_text leaves). Applies the same rules in the same order,
+    skipping each one when the text cannot match it and using plain string
+    operations where they are equivalent.
+    """
+    if sentence.rstrip().endswith("."):
+        match = _FINAL_PERIOD_RE.search(sentence)
+        if match:
+            sentence = f"{sentence[:match.start(2)]} . {match.group(3)} "
+    if "," in sentence:
+        if ",," in sentence:
+            sentence = _COMMA_RE.sub(r" \1 \2", sentence)
+        else:
+            # Without adjacent commas, consuming the following character is the same as looking ahead
+            sentence = _COMMA_LOOKAHEAD_RE.sub(" , ", sentence)
+        if sentence.endswith(","):
+            sentence = sentence[:-1] + " , "
+    if ".." in sentence:
+        sentence = _ELLIPSIS_RE.sub(r" \g<0> ", sentence)
+    if sentence.rstrip().endswith("."):
+        match = _FINAL_PERIOD_AGAIN_RE.search(sentence)
+        if match:
+            sentence = f"{sentence[:match.start(2)]} .{match.group(3)} "
+    if "?" in sentence:
+        sentence = sentence.replace("?", " ? ")
+    if "!" in sentence:
+        sentence = sentence.replace("!", " ! ")
+    if "--" in sentence:
+        sentence = sentence.replace("--", " -- ")
+
+    tokens = sentence.split()
+    lowered = sentence.lower()
+    if not any(word in lowered for word in _CONTRACTION_WORDS):
+        return tokens
+
+    # The contraction patterns only look one character past a word, so applying them to
+    # each whitespace-separated chunk that contains one is the same as to the whole text
+    split_tokens = []
+    for token in tokens:
+        if any(word in token.lower() for word in _CONTRACTION_WORDS):
+            split_tokens.extend(_CONTRACTIONS_RE.sub(_split_contraction, f" {token} ").split())
+        else:
+            split_tokens.append(token)
+    return split_tokens
+
+
+class TokenizedText(NamedTuple):
+    """Token IDs of one text for each metric family."""
+    bleu: np.ndarray   # NLTK word tokens of the lowercased text
+    rouge: np.ndarray  # rouge_score tokens, Porter-stemmed
+
+
+class _PairTokens:
+    """Candidate and reference token IDs of a batch of pairs, concatenated into flat arrays."""
+
+    def __init__(self, candidates: List[np.ndarray], references: List[np.ndarray]):
+        self.size = len(candidates)
+        sequences = list(candidates) + list(references)
+        self.lengths = np.fromiter(map(len, sequences), dtype=np.int64, count=len(sequences))
+        self.flat = np.concatenate(sequences).astype(np.int64) if self.lengths.any() else np.zeros(0, dtype=np.int64)
+        self.sequence_of = np.repeat(np.arange(len(sequences), dtype=np.int64), self.lengths)
+        self.pair_of = self.sequence_of % max(self.size, 1)
+        self.is_candidate = self.sequence_of < self.size
+
+    @property
+    def candidate_lengths(self) -> np.ndarray:
+        return self.lengths[:self.size]
+
+    @property
+    def reference_lengths(self) -> np.ndarray:
+        return self.lengths[self.size:]
+
+    def ngram_matches(self, max_n: int) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        For n = 1..max_n, count per pair the candidate n-grams found in the reference,
+        clipped to the reference count (BLEU's modified precision and ROUGE-N overlap).
+
+        Yields:
+            (matches, candidate_counts, reference_counts), one entry per pair
+        """
+        flat = self.flat
+        width = int(flat.max()) + 1 if len(flat) else 1
+        starts = np.arange(len(flat))
+        previous = None
+
+        for n in range(1, max_n + 1):
+            counts = np.maximum(self.lengths - n + 1, 0)
+            if n == 1:
+                prefixes = self.pair_of
+            else:
+                # An n-gram is the (n-1)-gram at the same start extended by one token
+                starts = starts[starts + n - 1 < len(flat)]
+                starts = starts[self.sequence_of[starts] == self.sequence_of[starts + n - 1]]
+                prefixes = previous[starts]
+            if len(starts) == 0:
+                yield np.zeros(self.size, dtype=np.int64), counts[:self.size], counts[self.size:]
+                continue
+
+            # Dense ID per (pair, n-gram); re-densifying every order keeps keys from overflowing
+            _, dense = np.unique(prefixes * width + flat[starts + n - 1], return_inverse=True)
+            dense = dense.ravel()
+            slots = int(dense.max()) + 1
+            is_candidate = self.is_candidate[starts]
+            candidate_hist = np.bincount(dense[is_candidate], minlength=slots)
+            reference_hist = np.bincount(dense[~is_candidate], minlength=slots)
+            slot_pair = np.zeros(slots, dtype=np.int64)
+            slot_pair[dense] = self.pair_of[starts]
+            matches = np.bincount(slot_pair, weights=np.minimum(candidate_hist, reference_hist), minlength=self.size)
+
+            previous = np.zeros(len(flat), dtype=np.int64)
+            previous[starts] = dense
+            yield matches.astype(np.int64), counts[:self.size], counts[self.size:]
+
+    def lcs_lengths(self) -> np.ndarray:
+        """
+        Longest common subsequence length of each (reference, candidate) pair.
+
+        Runs the classic DP one reference row at a time for a whole block of pairs:
+        with M[j] = L[i-1][j-1] + 1 on a match and L[i-1][j] otherwise, row i is the
+        running maximum of M, so each row is a single vectorized accumulate.
+        """
+        size = self.size
+        cand_lengths, ref_lengths = self.candidate_lengths, self.reference_lengths
+        offsets = np.concatenate(([0], np.cumsum(self.lengths)))
+        result = np.zeros(size, dtype=np.int64)
+
+        order = np.lexsort((ref_lengths, cand_lengths))
+        order = order[(ref_lengths[order] > 0) & (cand_lengths[order] > 0)]
+        for block_start in range(0, len(order), LCS_BLOCK_SIZE):
+            block = order[block_start:block_start + LCS_BLOCK_SIZE]
+            # Padding values never match each other or a real token ID
+            cand_matrix = self._pad(block, offsets, cand_lengths[block], -2)
+            ref_matrix = self._pad(block + size, offsets, ref_lengths[block], -1)
+
+            table = np.zeros((len(block), cand_matrix.shape[1] + 1), dtype=np.int64)
+            for i in range(ref_matrix.shape[1]):
+                match = cand_matrix == ref_matrix[:, i:i + 1]
+                row = np.where(match, table[:, :-1] + 1, table[:, 1:])
+                table[:, 1:] = np.maximum.accumulate(row, axis=1)
+            result[block] = table[np.arange(len(block)), cand_lengths[block]]
+
+        return result
+
+    def _pad(self, sequences: np.ndarray, offsets: np.ndarray, lengths: np.ndarray, fill: int) -> np.ndarray:
+        """Rows of the given sequences, right-padded with fill."""
+        matrix = np.full((len(sequences), int(lengths.max())), fill, dtype=np.int64)
+        rows = np.repeat(np.arange(len(sequences)), lengths)
+        columns = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        matrix[rows, columns] = self.flat[np.repeat(offsets[sequences], lengths) + columns]
+        return matrix
+
+
+def _fmeasure(overlap: np.ndarray, candidate_total: np.ndarray, reference_total: np.ndarray) -> np.ndarray:
+    """rouge_score's precision/recall/F1 with its max(count, 1) denominators."""
+    precision = overlap / np.maximum(candidate_total, 1)
+    recall = overlap / np.maximum(reference_total, 1)
+    total = precision + recall
+    return np.where(total > 0, 2 * precision * recall / np.where(total > 0, total, 1), 0.0)
+
+
+class LexicalScorer:
+    """Batch BLEU/ROUGE scorer with a shared token cache."""
+
+    def __init__(self, cache_size: int = TOKEN_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._vocab: Dict[str, int] = {}
+        self._stems: Dict[str, str] = {}
+        self._texts: "OrderedDict[str, TokenizedText]" = OrderedDict()
+        self._last_batch: Dict[str, TokenizedText] = {}
+        self._stemmer = None
+        self._lock = threading.Lock()
+
+    def _token_ids(self, tokens: List[str]) -> np.ndarray:
+        vocab = self._vocab
+        for token in set(tokens).difference(vocab):
+            vocab[token] = len(vocab)
+        return np.fromiter(map(vocab.__getitem__, tokens), dtype=np.int32, count=len(tokens))
+
+    def _stems_of(self, words: List[str]) -> List[str]:
+        """Porter stems as rouge_score applies them (words over 3 characters), cached per word."""
+        stems = self._stems
+        for word in set(words).difference(stems):
+            stem = self._stemmer.stem(word) if len(word) > 3 else word
+            # rouge_score drops tokens that are not purely [a-z0-9] after stemming
+            stems[word] = stem if _VALID_TOKEN_RE.match(stem) else ""
+        return list(map(stems.__getitem__, words))
+
+    def _bleu_tokens(self, text: str) -> List[str]:
+        """NLTK word_tokenize, through the regex subset that applies to cleaned text when possible."""
+        if not _CLEANED_TEXT_RE.fullmatch(text):
+            return metrics_calculator._word_tokenize(text)
+        if metrics_calculator._punkt_available and _SENTENCE_BREAK_RE.search(text):
+            from nltk.tokenize import sent_tokenize
+            return [token for sentence in sent_tokenize(text) for token in _treebank_tokens(sentence)]
+        return _treebank_tokens(text)
+
+    def _rouge_tokens(self, text: str) -> List[str]:
+        """rouge_score's DefaultTokenizer(use_stemmer=True) on lowercased text."""
+        return list(filter(None, self._stems_of(_NON_ALPHANUM_RE.sub(" ", text).split())))
+
+    def tokenize(self, text: str) -> TokenizedText:
+        """Token IDs of a cleaned text, tokenizing and stemming it only the first time it is seen."""
+        with self._lock:
+            cached = self._texts.get(text)
+            if cached is not None:
+                self._texts.move_to_end(text)
+                return cached
+
+            if self._stemmer is None:
+                from nltk.stem import porter
+                self._stemmer = porter.PorterStemmer()
+
+            lowered = text.lower()
+            tokenized = TokenizedText(
+                bleu=self._token_ids(self._bleu_tokens(lowered)),
+                rouge=self._token_ids(self._rouge_tokens(lowered))
+            )
+            self._texts[text] = tokenized
+            if len(self._texts) > self.cache_size:
+                self._texts.popitem(last=False)
+            return tokenized
+
+    def _tokenize_pairs(self, references: List[str], candidates: List[str]) -> Optional[Tuple[List[TokenizedText], List[TokenizedText]]]:
+        """Tokenize a batch, reusing the previous batch's tokens so BLEU and ROUGE on the same pairs tokenize once."""
+        if not metrics_calculator._init_nltk():
+            return None
+        try:
+            previous = self._last_batch
+            batch = {}
+            for text in chain(references, candidates):
+                if text not in batch:
+                    batch[text] = previous.get(text) or self.tokenize(text)
+            self._last_batch = batch
+            return [batch[text] for text in references], [batch[text] for text in candidates]
+        except Exception as e:
+            logger.error(f"Lexical tokenization failed: {e}")
+            return None
+
+    def bleu_batch(self, references: List[str], candidates: List[str]) -> List[Optional[float]]:
+        """
+        Sentence BLEU (4-gram, smoothing method4) of many pairs.
+
+        Args:
+            references: Cleaned reference texts
+            candidates: Cleaned candidate texts, aligned with references
+
+        Returns:
+            BLEU scores (0.0-1.0), or None entries if tokenization is unavailable
+        """
+        tokenized = self._tokenize_pairs(references, candidates)
+        if tokenized is None:
+            return [None] * len(references)
+        if not references:
+            return []
+
+        pairs = _PairTokens([t.bleu for t in tokenized[1]], [t.bleu for t in tokenized[0]])
+        hyp_len, ref_len = pairs.candidate_lengths, pairs.reference_lengths
+
+        numerators = np.zeros((pairs.size, BLEU_MAX_ORDER), dtype=np.int64)
+        denominators = np.zeros((pairs.size, BLEU_MAX_ORDER), dtype=np.int64)
+        for n, (matches, candidate_counts, _) in enumerate(pairs.ngram_matches(BLEU_MAX_ORDER)):
+            numerators[:, n] = matches
+            denominators[:, n] = np.maximum(candidate_counts, 1)
+
+        # Smoothing method4: the k-th zero precision becomes 1 / (2^k * K / ln(hyp_len)) / denominator
+        precisions = numerators / denominators
+        smoothed = (numerators == 0) & (hyp_len > 1)[:, None]
+        increments = np.cumsum(smoothed, axis=1)
+        log_len = np.log(np.where(hyp_len > 1, hyp_len, 2))[:, None]
+        precisions = np.where(smoothed, 1 / (2.0 ** increments * BLEU_SMOOTHING_K / log_len) / denominators, precisions)
+
+        positive = precisions > 0
+        log_terms = np.where(positive, (1 / BLEU_MAX_ORDER) * np.log(np.where(positive, precisions, 1)), 0.0)
+        brevity = np.where(hyp_len > ref_len, 1.0,
+                           np.where(hyp_len == 0, 0.0, np.exp(1 - ref_len / np.maximum(hyp_len, 1))))
+        scores = brevity * np.exp(log_terms.sum(axis=1))
+        scores = np.where(numerators[:, 0] == 0, 0.0, scores)
+
+        return [round(score, 4) for score in scores.tolist()]
+
+    def rouge_batch(self, references: List[str], candidates: List[str]) -> List[Dict[str, Optional[float]]]:
+        """
+        ROUGE-1, ROUGE-2 and ROUGE-L F-measure of many pairs.
+
+        Args:
+            references: Cleaned reference texts
+            candidates: Cleaned candidate texts, aligned with references
+
+        Returns:
+            Dictionary with rouge1, rouge2, rougeL per pair (None values if tokenization is unavailable)
+        """
+        tokenized = self._tokenize_pairs(references, candidates)
+        if tokenized is None:
+            return [dict(_EMPTY_ROUGE) for _ in references]
+        if not references:
+            return []
+
+        pairs = _PairTokens([t.rouge for t in tokenized[1]], [t.rouge for t in tokenized[0]])
+        columns = {}
+        for n, (matches, candidate_counts, reference_counts) in enumerate(pairs.ngram_matches(2), start=1):
+            columns[f"rouge{n}"] = _fmeasure(matches, candidate_counts, reference_counts).tolist()
+
+        # Empty token lists score 0, as in rouge_score's _score_lcs
+        cand_len, ref_len = pairs.candidate_lengths, pairs.reference_lengths
+        rouge_l = _fmeasure(pairs.lcs_lengths(), cand_len, ref_len)
+        columns["rougeL"] = np.where((cand_len > 0) & (ref_len > 0), rouge_l, 0.0).tolist()
+
+        return [
+            {name: round(values[i], 4) for name, values in columns.items()}
+            for i in range(pairs.size)
+        ]
+
+    def bleu(self, reference: str, candidate: str) -> Optional[float]:
+        return self.bleu_batch([reference], [candidate])[0]
+
+    def rouge(self, reference: str, candidate: str) -> Dict[str, Optional[float]]:
+        return self.rouge_batch([reference], [candidate])[0]
+
+
+# Global instance sharing one token cache
+lexical_scorer = LexicalScorer()
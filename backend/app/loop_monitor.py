@@ -0,0 +1,84 @@
+"""
+Event loop lag measurement.
+
+A task asks to wake every SAMPLE_INTERVAL_S and records how late it actually
+woke. Lateness is time the loop spent running something else without yielding,
+such as a synchronous query or commit, so the totals show how long the loop has
+been blocked and by how much at worst.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from .telemetry import registry
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL_S = 0.05
+# Lateness above this counts as blocking rather than scheduling jitter
+BLOCKED_THRESHOLD_MS = 5.0
+# Single stalls above this are logged
+SLOW_STALL_MS = 100.0
+
+
+class LoopLagMonitor:
+    """Samples how late the running event loop wakes a sleeping task."""
+
+    def __init__(self, interval_s: float = SAMPLE_INTERVAL_S, blocked_threshold_ms: float = BLOCKED_THRESHOLD_MS):
+        self.interval_s = interval_s
+        self.blocked_threshold_ms = blocked_threshold_ms
+        self.reset()
+        self._task: Optional[asyncio.Task] = None
+
+    def reset(self):
+        self.samples = 0
+        self.blocked_ms = 0.0  # Sum of lateness over the threshold
+        self.stalls = 0  # Samples over the threshold
+        self.max_lag_ms = 0.0
+        self.last_lag_ms = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval_s
+            await asyncio.sleep(self.interval_s)
+            self.record(max(0.0, loop.time() - expected) * 1000)
+
+    def record(self, lag_ms: float):
+        self.samples += 1
+        self.last_lag_ms = lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        if lag_ms > self.blocked_threshold_ms:
+            self.stalls += 1
+            self.blocked_ms += lag_ms
+            if lag_ms > SLOW_STALL_MS:
+                logger.warning(f"Event loop blocked for {lag_ms:.0f}ms")
+
+    def stats(self) -> Dict:
+        return {
+            "samples": self.samples,
+            "sample_interval_ms": self.interval_s * 1000,
+            "blocked_ms": round(self.blocked_ms, 1),
+            "stalls": self.stalls,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "last_lag_ms": round(self.last_lag_ms, 1) if self.last_lag_ms is not None else None
+        }
+
+
+# Global monitor for the API's event loop
+loop_monitor = LoopLagMonitor()
+
+registry.counter("eval_forge_event_loop_blocked_seconds_total", "Time the API event loop was blocked",
+                 function=lambda: loop_monitor.blocked_ms / 1000)
+registry.gauge("eval_forge_event_loop_max_lag_seconds", "Longest single event loop stall since startup",
+               function=lambda: loop_monitor.max_lag_ms / 1000)
@@ -1,19 +1,45 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, UploadFile, File, Form, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, Response
 from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
 from datetime import datetime
 from typing import List, Optional
-import httpx
-import time
 import csv
 import io
 import asyncio
+import json
+import logging
+import os
+import time
 from . import models, schemas, database
-from .metrics import calculate_metrics
-from .database import get_db
+from .datasets import get_or_create_dataset, get_dataset_items
+from .result_writer import active_writers
+from .evaluation_runner import EvaluationOwnedError, evaluation_runner, lease_expired
+from .evaluation_queue import evaluation_queue
+from .model_pool import model_pools, pool_endpoints
+from .providers import get_provider
+from .metrics import metrics_calculator
+from .scorers import scorer_registry
+from .scoring_service import scoring_client
+from .benchmark import BenchmarkRunningError, benchmark_runner
+from .database import fetch_first, get_db, run_db
+from .loop_monitor import loop_monitor
 from .question_bank import get_random_sample_dataset
 from .synthetic_monitoring import synthetic_service
 from .scheduler import scheduler
+from .monitoring_runner import MONITORING_MODE, get_worker_health
+from .assertions import assertion_cache, compile_assertions
+from .alerting import parse_alert_thresholds
+from .endpoint_sweep import endpoint_sweep_runner
+from .profiling import PROFILING_ENABLED, SLOW_REQUEST_MS, SpanTimings, current_spans, profile_manager, slow_queries
+from .telemetry import CONTENT_TYPE, http_request_duration, http_requests, http_requests_in_progress, registry
+
+logger = logging.getLogger(__name__)
+
+# Admin endpoints (profiling) are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get("EVAL_FORGE_ADMIN_TOKEN")
 
 app = FastAPI(title="Eval Forge API", version="1.0.0")
 
@@ -26,37 +52,143 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create tables
-models.Base.metadata.create_all(bind=database.engine)
-
-# Startup event to start scheduler
+# Request metrics, labelled by route template so /api/evaluations/{evaluation_id}
+# is one series rather than one per evaluation
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    http_requests_in_progress.inc()
+    start_time = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start_time
+        http_requests_in_progress.dec()
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        http_requests.labels(request.method, route_path, status).inc()
+        http_request_duration.labels(request.method, route_path).observe(elapsed)
+
+# Per-request span timing, when profiling is enabled: SQL time is attributed to the
+# request through a context variable and reported in a Server-Timing header
+@app.middleware("http")
+async def record_request_spans(request: Request, call_next):
+    if not PROFILING_ENABLED:
+        return await call_next(request)
+
+    spans = SpanTimings()
+    token = current_spans.set(spans)
+    start_time = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        current_spans.reset(token)
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    spans.record("app", elapsed_ms)
+    response.headers["Server-Timing"] = spans.server_timing()
+    if elapsed_ms >= SLOW_REQUEST_MS:
+        logger.info(f"Slow request {request.method} {request.url.path}: {spans.summary()}")
+    return response
+
+# Startup: create tables, recover interrupted runs, start the scheduler and
+# warm up scorers in the background so the API is ready immediately. With a
+# scoring sidecar the models live there, so workers don't load their own copy;
+# should the sidecar become unreachable, in-process scoring loads them on the
+# scoring threads, never on the event loop.
 @app.on_event("startup")
 async def startup_event():
-    await scheduler.start()
+    for attempt in range(3):
+        try:
+            models.Base.metadata.create_all(bind=database.engine)
+            break
+        except OperationalError:
+            # Another worker created a table between the existence check and CREATE; check again
+            if attempt == 2:
+                raise
+    evaluation_runner.mark_interrupted_evaluations()
+    # With a dedicated monitoring runner, synthetic tests stay off the API's event loop
+    if MONITORING_MODE == "embedded":
+        await scheduler.start()
+    if not scoring_client:
+        metrics_calculator.start_warm_up()
+    loop_monitor.start()
 
 # Shutdown event to stop scheduler
 @app.on_event("shutdown")
 async def shutdown_event():
     scheduler.stop()
+    loop_monitor.stop()
 
 
 @app.get("/")
 async def root():
     return {"message": "Eval Forge API"}
 
+@app.get("/api/ready")
+async def readiness():
+    if scoring_client:
+        try:
+            readiness = await scoring_client.readiness()
+        except (OSError, ConnectionError, asyncio.TimeoutError) as e:
+            return JSONResponse(content={"status": "unavailable", "error": f"Scoring sidecar: {e}"},
+                                status_code=503)
+    else:
+        readiness = metrics_calculator.readiness()
+    status_code = 503 if readiness["status"] == "warming" else 200
+    return JSONResponse(content=readiness, status_code=status_code)
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape endpoint for this process"""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+@app.get("/api/event-loop")
+def get_event_loop_health():
+    """How long the API's event loop has been blocked since startup"""
+    return loop_monitor.stats()
+
 # Models endpoints
 @app.get("/api/models", response_model=List[schemas.Model])
 def get_models(db: Session = Depends(get_db)):
     return db.query(models.Model).all()
 
+def validate_model_pool(model: schemas.ModelCreate):
+    try:
+        provider = get_provider(model.type)
+        pool_endpoints(model.endpoint, model.replica_endpoints)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if model.parallel_requests < 1:
+        raise HTTPException(status_code=400, detail="parallel_requests must be at least 1")
+    if model.batch_size < 1 or (model.batch_size > 1 and not provider.supports_batches):
+        raise HTTPException(status_code=400, detail=f"batch_size must be 1 for {model.type} models")
+    if any(limit is not None and limit < 1 for limit in (model.requests_per_minute, model.tokens_per_minute)):
+        raise HTTPException(status_code=400, detail="Rate limits must be positive")
+
 @app.post("/api/models", response_model=schemas.Model)
 def create_model(model: schemas.ModelCreate, db: Session = Depends(get_db)):
+    validate_model_pool(model)
     db_model = models.Model(**model.dict(), status="unknown")
     db.add(db_model)
     db.commit()
     db.refresh(db_model)
     return db_model
 
+@app.put("/api/models/{model_id}", response_model=schemas.Model)
+def update_model(model_id: int, model: schemas.ModelCreate, db: Session = Depends(get_db)):
+    db_model = db.query(models.Model).filter(models.Model.id == model_id).first()
+    if not db_model:
+        raise HTTPException(status_code=404, detail="Model not found")
+    validate_model_pool(model)
+    for field, value in model.dict().items():
+        setattr(db_model, field, value)
+    db_model.status = "unknown"
+    db.commit()
+    db.refresh(db_model)
+    return db_model
+
 @app.delete("/api/models/{model_id}")
 def delete_model(model_id: int, db: Session = Depends(get_db)):
     db_model = db.query(models.Model).filter(models.Model.id == model_id).first()
@@ -64,56 +196,77 @@ def delete_model(model_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Model not found")
     db.delete(db_model)
     db.commit()
+    model_pools.discard(model_id)
     return {"message": "Model deleted"}
 
+@app.get("/api/models/{model_id}/replicas")
+async def get_model_replicas(model_id: int, db: Session = Depends(get_db)):
+    """Routing state of a model's replicas: circuit, concurrency limit, outstanding requests, errors and latency."""
+    db_model = await run_db(fetch_first, db.query(models.Model).filter(models.Model.id == model_id))
+    if not db_model:
+        raise HTTPException(status_code=404, detail="Model not found")
+    return model_pools.get(db_model).stats()
+
 @app.get("/api/models/{model_id}/test")
 async def test_model_connection(model_id: int, db: Session = Depends(get_db)):
-    db_model = db.query(models.Model).filter(models.Model.id == model_id).first()
+    db_model = await run_db(fetch_first, db.query(models.Model).filter(models.Model.id == model_id))
     if not db_model:
         raise HTTPException(status_code=404, detail="Model not found")
     
     # Update status to testing
     db_model.status = "testing"
-    db.commit()
+    await run_db(db.commit)
     
     try:
-        if db_model.type == "ollama":
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{db_model.endpoint}/api/tags")
-                if response.status_code == 200:
-                    tags = response.json()
-                    available_models = tags.get("models", [])
-                    model_names = [model["name"] for model in available_models]
-                    
-                    # Check for exact match first
-                    if db_model.model_name in model_names:
-                        db_model.status = "connected"
-                    else:
-                        # Check for partial match (e.g., "llama3.2" matches "llama3.2:latest")
-                        partial_match = any(
-                            name.startswith(db_model.model_name + ":") or 
-                            name == db_model.model_name
-                            for name in model_names
-                        )
-                        if partial_match:
-                            db_model.status = "connected"
-                        else:
-                            db_model.status = "error"
-                else:
-                    db_model.status = "error"
-        else:
-            db_model.status = "error"
-    except httpx.TimeoutException:
-        db_model.status = "error"
-    except httpx.ConnectError:
-        db_model.status = "error"
+        # Probe every replica of the model's pool; replicas without the model get their circuit opened
+        pool = model_pools.get(db_model)
+        probes = await pool.probe_all()
+        db_model.status = "connected" if any(probe["available"] for probe in probes) else "error"
     except Exception:
         db_model.status = "error"
     
-    db.commit()
-    db.refresh(db_model)
+    await run_db(db.commit)
+    await run_db(db.refresh, db_model)
     return db_model
 
+async def read_csv_dataset(dataset_file: UploadFile) -> List[dict]:
+    content = await dataset_file.read()
+    csv_content = content.decode('utf-8')
+    csv_reader = csv.DictReader(io.StringIO(csv_content))
+    return [{"question": row["question"], "answer": row["answer"]} for row in csv_reader]
+
+# Datasets endpoints
+@app.get("/api/datasets", response_model=List[schemas.Dataset])
+def get_datasets(db: Session = Depends(get_db)):
+    return db.query(models.Dataset).order_by(models.Dataset.name, models.Dataset.version).all()
+
+@app.post("/api/datasets", response_model=schemas.Dataset)
+async def create_dataset(
+    name: str = Form(...),
+    dataset_file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    rows = await read_csv_dataset(dataset_file)
+    return await run_db(get_or_create_dataset, db, name, rows)
+
+@app.get("/api/datasets/{dataset_id}", response_model=schemas.Dataset)
+def get_dataset(dataset_id: int, db: Session = Depends(get_db)):
+    db_dataset = db.query(models.Dataset).filter(models.Dataset.id == dataset_id).first()
+    if not db_dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return db_dataset
+
+@app.get("/api/datasets/{dataset_id}/items", response_model=List[schemas.DatasetItem])
+def get_dataset_item_list(dataset_id: int, limit: int = 100, offset: int = 0, db: Session = Depends(get_db)):
+    db_dataset = db.query(models.Dataset).filter(models.Dataset.id == dataset_id).first()
+    if not db_dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return get_dataset_items(db, dataset_id, limit=limit, offset=offset)
+
+@app.get("/api/scorers")
+def get_scorers():
+    return scorer_registry.describe()
+
 # Evaluations endpoints
 @app.get("/api/evaluations", response_model=List[schemas.Evaluation])
 def get_evaluations(db: Session = Depends(get_db)):
@@ -131,14 +284,54 @@ async def create_evaluation(
     temperature: float = Form(0.7),
     max_tokens: int = Form(512),
     top_p: float = Form(0.9),
+    mode: str = Form("full"),
+    target_ci_width: Optional[float] = Form(None),
+    confidence_level: float = Form(0.95),
+    min_questions: int = Form(30),
+    baseline_evaluation_id: Optional[int] = Form(None),
+    dataset_id: Optional[int] = Form(None),
+    metrics: Optional[str] = Form(None),
     dataset_file: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db)
 ):
+    if mode not in ("full", "adaptive"):
+        raise HTTPException(status_code=400, detail="Mode must be 'full' or 'adaptive'")
+    if not 0 < confidence_level < 1:
+        raise HTTPException(status_code=400, detail="Confidence level must be between 0 and 1")
+    if mode == "adaptive" and target_ci_width is None and baseline_evaluation_id is None:
+        raise HTTPException(status_code=400, detail="Adaptive evaluations need a target interval width or a baseline evaluation")
+    if metrics is not None:
+        # JSONDecodeError is a ValueError, as is anything but a list of registered scorer names
+        try:
+            scorer_registry.resolve(json.loads(metrics))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid metrics selection: {e}")
+    
+    # Read an upload on the event loop; everything touching the database runs on the database threads
+    uploaded_rows = None
+    if dataset_id is None and not use_sample and dataset_file:
+        uploaded_rows = await read_csv_dataset(dataset_file)
+    
+    return await run_db(
+        store_evaluation, db, name, model_id, use_sample, temperature, max_tokens, top_p, mode, target_ci_width,
+        confidence_level, min_questions, baseline_evaluation_id, dataset_id, metrics,
+        dataset_file.filename if dataset_file else None, uploaded_rows
+    )
+
+def store_evaluation(db: Session, name: str, model_id: int, use_sample: bool, temperature: float, max_tokens: int,
+                     top_p: float, mode: str, target_ci_width: Optional[float], confidence_level: float,
+                     min_questions: int, baseline_evaluation_id: Optional[int], dataset_id: Optional[int],
+                     metrics: Optional[str], upload_name: Optional[str], uploaded_rows: Optional[List[dict]]):
     # Verify model exists
     db_model = db.query(models.Model).filter(models.Model.id == model_id).first()
     if not db_model:
         raise HTTPException(status_code=404, detail="Model not found")
     
+    if baseline_evaluation_id is not None:
+        baseline = db.query(models.Evaluation).filter(models.Evaluation.id == baseline_evaluation_id).first()
+        if not baseline or baseline.status != "completed":
+            raise HTTPException(status_code=400, detail="Baseline evaluation must exist and be completed")
+    
     # Create evaluation
     db_evaluation = models.Evaluation(
         name=name,
@@ -147,169 +340,130 @@ async def create_evaluation(
         temperature=temperature,
         max_tokens=max_tokens,
         top_p=top_p,
+        mode=mode,
+        target_ci_width=target_ci_width,
+        confidence_level=confidence_level,
+        min_questions=min_questions,
+        baseline_evaluation_id=baseline_evaluation_id,
+        metrics=metrics,
         created_at=datetime.utcnow()
     )
-    db.add(db_evaluation)
-    db.commit()
-    db.refresh(db_evaluation)
     
-    # Handle dataset
-    questions = []
-    if use_sample:
-        questions = get_random_sample_dataset(10)
-    elif dataset_file:
-        content = await dataset_file.read()
-        csv_content = content.decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(csv_content))
-        questions = [{"question": row["question"], "answer": row["answer"]} for row in csv_reader]
-    
-    # Store questions
-    for q in questions:
-        db_question = models.Question(
-            evaluation_id=db_evaluation.id,
-            question=q["question"],
-            expected_answer=q["answer"]
-        )
-        db.add(db_question)
-    
-    db_evaluation.total_questions = len(questions)
+    # Handle dataset: reuse a stored one, or store the uploaded/sample questions once
+    db_dataset = None
+    if dataset_id is not None:
+        db_dataset = db.query(models.Dataset).filter(models.Dataset.id == dataset_id).first()
+        if not db_dataset:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+    elif use_sample:
+        db_dataset = get_or_create_dataset(db, "Sample dataset", get_random_sample_dataset(10))
+    elif uploaded_rows is not None:
+        db_dataset = get_or_create_dataset(db, upload_name or name, uploaded_rows)
+    
+    if db_dataset:
+        db_evaluation.dataset_id = db_dataset.id
+        db_evaluation.total_questions = db_dataset.item_count
+    db.add(db_evaluation)
     db.commit()
     db.refresh(db_evaluation)
     db_evaluation.model_name = db_model.name
     return db_evaluation
 
+def fetch_evaluation_target(db: Session, evaluation_id: int):
+    """An evaluation with the evaluation queue arguments for its model, or Nones"""
+    row = db.query(models.Evaluation, models.Model.endpoint, models.Model.model_name,
+                   models.Model.replica_endpoints, models.Model.type)\
+        .join(models.Model, models.Evaluation.model_id == models.Model.id)\
+        .filter(models.Evaluation.id == evaluation_id)\
+        .first()
+    db.commit()
+    if not row:
+        return None, None
+    db_evaluation, endpoint, model_name, replica_endpoints, model_type = row
+    return db_evaluation, {
+        "endpoint": endpoint,
+        "model_name": model_name,
+        "replica_endpoints": pool_endpoints(endpoint, replica_endpoints)[1:],
+        "model_type": model_type or "ollama"
+    }
+
+# Evaluations run through the residency-aware queue, which groups them by
+# endpoint and model so a shared Ollama host doesn't swap models back and forth
 @app.post("/api/evaluations/{evaluation_id}/run")
 async def run_evaluation(evaluation_id: int, db: Session = Depends(get_db)):
-    db_evaluation = db.query(models.Evaluation).filter(models.Evaluation.id == evaluation_id).first()
+    db_evaluation, target = await run_db(fetch_evaluation_target, db, evaluation_id)
     if not db_evaluation:
         raise HTTPException(status_code=404, detail="Evaluation not found")
     
-    db_evaluation.status = "running"
-    db_evaluation.started_at = datetime.utcnow()
-    db.commit()
+    try:
+        future = evaluation_queue.submit(evaluation_id, **target)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        await future
+    except EvaluationOwnedError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Evaluation failed: {str(e)}")
+    
+    return {"message": "Evaluation completed"}
+
+@app.post("/api/evaluations/{evaluation_id}/resume")
+async def resume_evaluation(evaluation_id: int, db: Session = Depends(get_db)):
+    db_evaluation, target = await run_db(fetch_evaluation_target, db, evaluation_id)
+    if not db_evaluation:
+        raise HTTPException(status_code=404, detail="Evaluation not found")
+    # A "running" evaluation is only resumed once the process running it stopped renewing its lease
+    if db_evaluation.status not in ("running", "interrupted", "failed") or evaluation_id in active_writers \
+            or evaluation_queue.find(evaluation_id) \
+            or (db_evaluation.status == "running" and not lease_expired(db_evaluation)):
+        raise HTTPException(status_code=400, detail=f"Evaluation is {db_evaluation.status} and cannot be resumed")
     
     try:
-        # Get model and questions
-        db_model = db_evaluation.model
-        questions = db.query(models.Question).filter(models.Question.evaluation_id == evaluation_id).all()
-        
-        correct_count = 0
-        total_count = len(questions)
-        
-        for question in questions:
-            start_time = time.time()
-            
-            try:
-                # Call Ollama API
-                async with httpx.AsyncClient() as client:
-                    payload = {
-                        "model": db_model.model_name,
-                        "prompt": question.question,
-                        "stream": False,
-                        "options": {
-                            "temperature": db_evaluation.temperature,
-                            "num_predict": db_evaluation.max_tokens,
-                            "top_p": db_evaluation.top_p
-                        }
-                    }
-                    
-                    response = await client.post(
-                        f"{db_model.endpoint}/api/generate",
-                        json=payload,
-                        timeout=60.0
-                    )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        model_response = result.get("response", "").strip()
-                        
-                        # Simple accuracy check (case-insensitive contains)
-                        is_correct = question.expected_answer.lower() in model_response.lower()
-                        if is_correct:
-                            correct_count += 1
-                        
-                        # Calculate advanced metrics
-
-                        metrics = calculate_metrics(question.expected_answer, model_response)
-                        #print(f"Metrics calculated: {metrics}")
-                        
-                        # Store result with advanced metrics
-                        db_result = models.Result(
-                            evaluation_id=evaluation_id,
-                            question=question.question,
-                            expected_answer=question.expected_answer,
-                            model_response=model_response,
-                            is_correct=is_correct,
-                            response_time=int((time.time() - start_time) * 1000),
-                            bleu_score=metrics.get('bleu_score'),
-                            rouge_1_score=metrics.get('rouge1'),
-                            rouge_2_score=metrics.get('rouge2'),
-                            rouge_l_score=metrics.get('rougeL'),
-                            semantic_similarity=metrics.get('semantic_similarity')
-                        )
-                        db.add(db_result)
-                    else:
-                        # Store error result
-                        db_result = models.Result(
-                            evaluation_id=evaluation_id,
-                            question=question.question,
-                            expected_answer=question.expected_answer,
-                            model_response="Error: Failed to get response",
-                            is_correct=False,
-                            response_time=int((time.time() - start_time) * 1000)
-                        )
-                        db.add(db_result)
-                        
-            except Exception as e:
-                # Store error result
-                db_result = models.Result(
-                    evaluation_id=evaluation_id,
-                    question=question.question,
-                    expected_answer=question.expected_answer,
-                    model_response=f"Error: {str(e)}",
-                    is_correct=False,
-                    response_time=int((time.time() - start_time) * 1000)
-                )
-                db.add(db_result)
-        
-        # Calculate aggregate metrics from all results
-        all_results = db.query(models.Result).filter(models.Result.evaluation_id == evaluation_id).all()
-        
-        # Calculate averages for advanced metrics (excluding None values)
-        valid_bleu = [r.bleu_score for r in all_results if r.bleu_score is not None]
-        valid_rouge1 = [r.rouge_1_score for r in all_results if r.rouge_1_score is not None]
-        valid_rouge2 = [r.rouge_2_score for r in all_results if r.rouge_2_score is not None]
-        valid_rougel = [r.rouge_l_score for r in all_results if r.rouge_l_score is not None]
-        valid_semantic = [r.semantic_similarity for r in all_results if r.semantic_similarity is not None]
-        valid_response_times = [r.response_time for r in all_results if r.response_time is not None]
-        
-        
-        # Update evaluation with results and aggregate metrics
-        db_evaluation.status = "completed"
-        db_evaluation.completed_at = datetime.utcnow()
-        db_evaluation.accuracy = correct_count / total_count if total_count > 0 else 0
-        db_evaluation.correct_answers = correct_count
-        db_evaluation.incorrect_answers = total_count - correct_count
-        
-        # Store aggregate advanced metrics
-        db_evaluation.avg_bleu_score = sum(valid_bleu) / len(valid_bleu) if valid_bleu else None
-        db_evaluation.avg_rouge_1_score = sum(valid_rouge1) / len(valid_rouge1) if valid_rouge1 else None
-        db_evaluation.avg_rouge_2_score = sum(valid_rouge2) / len(valid_rouge2) if valid_rouge2 else None
-        db_evaluation.avg_rouge_l_score = sum(valid_rougel) / len(valid_rougel) if valid_rougel else None
-        db_evaluation.avg_semantic_similarity = sum(valid_semantic) / len(valid_semantic) if valid_semantic else None
-        db_evaluation.avg_response_time = sum(valid_response_times) / len(valid_response_times) if valid_response_times else None
-        
-        
-        db.commit()
-        
+        await evaluation_queue.run(evaluation_id, resume=True, **target)
+    except EvaluationOwnedError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        db_evaluation.status = "failed"
-        db_evaluation.completed_at = datetime.utcnow()
-        db.commit()
         raise HTTPException(status_code=500, detail=f"Evaluation failed: {str(e)}")
     
     return {"message": "Evaluation completed"}
 
+@app.post("/api/evaluations/queue")
+async def queue_evaluations(request: schemas.EvaluationQueueRequest, db: Session = Depends(get_db)):
+    """Queue several evaluations without waiting; the queue orders them to minimize model swaps."""
+    targets = []
+    for evaluation_id in dict.fromkeys(request.evaluation_ids):
+        db_evaluation, target = await run_db(fetch_evaluation_target, db, evaluation_id)
+        if not db_evaluation:
+            raise HTTPException(status_code=404, detail=f"Evaluation {evaluation_id} not found")
+        if evaluation_queue.find(evaluation_id):
+            raise HTTPException(status_code=400, detail=f"Evaluation {evaluation_id} is already queued or running")
+        targets.append((evaluation_id, target))
+    
+    for evaluation_id, target in targets:
+        evaluation_queue.submit(evaluation_id, resume=request.resume, **target)
+    return {"queued": [target[0] for target in targets]}
+
+@app.get("/api/evaluation-queue")
+async def get_evaluation_queue():
+    """Per-endpoint queue: the resident model, running and queued evaluations, and model swaps."""
+    return evaluation_queue.status()
+
+@app.get("/api/evaluations/{evaluation_id}/progress")
+def get_evaluation_progress(evaluation_id: int, db: Session = Depends(get_db)):
+    db_evaluation = db.query(models.Evaluation).filter(models.Evaluation.id == evaluation_id).first()
+    if not db_evaluation:
+        raise HTTPException(status_code=404, detail="Evaluation not found")
+    
+    answered = db.query(func.count(models.Result.id)).filter(models.Result.evaluation_id == evaluation_id).scalar()
+    writer = active_writers.get(evaluation_id)
+    return {
+        "status": db_evaluation.status,
+        "total_questions": db_evaluation.total_questions,
+        "answered_questions": answered,
+        "result_writer": writer.stats() if writer else None
+    }
+
 # Results endpoints
 @app.get("/api/results")
 def get_results(db: Session = Depends(get_db)):
@@ -333,7 +487,15 @@ def get_evaluation_results(evaluation_id: int, db: Session = Depends(get_db)):
     if not db_evaluation:
         raise HTTPException(status_code=404, detail="Evaluation not found")
     
-    results = db.query(models.Result).filter(models.Result.evaluation_id == evaluation_id).all()
+    # Dataset-backed results carry only an item id; join the text in at read time
+    results = db.query(
+        models.Result,
+        func.coalesce(models.Result.question, models.DatasetItem.question),
+        func.coalesce(models.Result.expected_answer, models.DatasetItem.expected_answer)
+    ).outerjoin(models.DatasetItem, models.Result.dataset_item_id == models.DatasetItem.id)\
+        .filter(models.Result.evaluation_id == evaluation_id)\
+        .order_by(models.Result.id)\
+        .all()
     
     return {
         "evaluation_name": db_evaluation.name,
@@ -341,16 +503,18 @@ def get_evaluation_results(evaluation_id: int, db: Session = Depends(get_db)):
         "accuracy": db_evaluation.accuracy,
         "correct_answers": db_evaluation.correct_answers,
         "incorrect_answers": db_evaluation.incorrect_answers,
+        "infrastructure_errors": db_evaluation.infrastructure_errors,
         "total_questions": db_evaluation.total_questions,
         "questions": [
             {
-                "question": r.question,
-                "expected_answer": r.expected_answer,
+                "question": question,
+                "expected_answer": expected_answer,
                 "model_response": r.model_response,
                 "is_correct": r.is_correct,
+                "infrastructure_error": bool(r.infrastructure_error),
                 "response_time": r.response_time
             }
-            for r in results
+            for r, question, expected_answer in results
         ]
     }
 
@@ -368,13 +532,102 @@ def delete_evaluation_results(evaluation_id: int, db: Session = Depends(get_db))
     
     return {"message": "Evaluation and results deleted"}
 
+# Benchmark endpoints
+@app.get("/api/benchmarks", response_model=List[schemas.Benchmark])
+def get_benchmarks(db: Session = Depends(get_db)):
+    benchmarks = db.query(models.Benchmark).order_by(models.Benchmark.created_at.desc()).all()
+    for benchmark in benchmarks:
+        if benchmark.model:
+            benchmark.model_name = benchmark.model.name
+    return benchmarks
+
+@app.post("/api/benchmarks", response_model=schemas.Benchmark)
+def create_benchmark(benchmark: schemas.BenchmarkCreate, db: Session = Depends(get_db)):
+    db_model = db.query(models.Model).filter(models.Model.id == benchmark.model_id).first()
+    if not db_model:
+        raise HTTPException(status_code=404, detail="Model not found")
+    if benchmark.mode not in ("concurrency", "rate"):
+        raise HTTPException(status_code=400, detail="Mode must be 'concurrency' or 'rate'")
+    if benchmark.requests_per_step < 1:
+        raise HTTPException(status_code=400, detail="requests_per_step must be at least 1")
+    try:
+        levels = json.loads(benchmark.levels)
+        if not levels or not all(isinstance(level, (int, float)) and level > 0 for level in levels):
+            raise ValueError
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Levels must be a JSON list of positive numbers")
+    
+    db_benchmark = models.Benchmark(**benchmark.dict(), status="draft", created_at=datetime.utcnow())
+    db.add(db_benchmark)
+    db.commit()
+    db.refresh(db_benchmark)
+    db_benchmark.model_name = db_model.name
+    return db_benchmark
+
+@app.get("/api/benchmarks/{benchmark_id}", response_model=schemas.Benchmark)
+def get_benchmark(benchmark_id: int, db: Session = Depends(get_db)):
+    db_benchmark = db.query(models.Benchmark).filter(models.Benchmark.id == benchmark_id).first()
+    if not db_benchmark:
+        raise HTTPException(status_code=404, detail="Benchmark not found")
+    if db_benchmark.model:
+        db_benchmark.model_name = db_benchmark.model.name
+    return db_benchmark
+
+@app.post("/api/benchmarks/{benchmark_id}/run", response_model=schemas.Benchmark)
+async def run_benchmark(benchmark_id: int, db: Session = Depends(get_db)):
+    db_benchmark = await run_db(fetch_first, db.query(models.Benchmark).filter(models.Benchmark.id == benchmark_id))
+    if not db_benchmark:
+        raise HTTPException(status_code=404, detail="Benchmark not found")
+    
+    try:
+        db_benchmark = await benchmark_runner.run_benchmark(db_benchmark, db)
+    except BenchmarkRunningError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        # A failed query leaves the session needing a rollback before the status can be saved
+        await run_db(db.rollback)
+        db_benchmark.status = "failed"
+        db_benchmark.completed_at = datetime.utcnow()
+        await run_db(db.commit)
+        raise HTTPException(status_code=500, detail=f"Benchmark failed: {str(e)}")
+    
+    # Load what the response reads here, so serializing it doesn't query on the event loop
+    await run_db(db.refresh, db_benchmark, ["model", "steps"])
+    db_benchmark.model_name = db_benchmark.model.name
+    return db_benchmark
+
+@app.delete("/api/benchmarks/{benchmark_id}")
+def delete_benchmark(benchmark_id: int, db: Session = Depends(get_db)):
+    db_benchmark = db.query(models.Benchmark).filter(models.Benchmark.id == benchmark_id).first()
+    if not db_benchmark:
+        raise HTTPException(status_code=404, detail="Benchmark not found")
+    
+    db.delete(db_benchmark)
+    db.commit()
+    
+    return {"message": "Benchmark deleted"}
+
 # Synthetic Monitoring endpoints
 @app.get("/api/synthetic-tests", response_model=List[schemas.SyntheticTest])
 def get_synthetic_tests(db: Session = Depends(get_db)):
     return db.query(models.SyntheticTest).filter(models.SyntheticTest.id == models.SyntheticTest.id).all()
 
+def validate_assertions(assertions: Optional[str]):
+    try:
+        compile_assertions(assertions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid assertions: {e}")
+
+def validate_alert_thresholds(alert_thresholds: Optional[str]):
+    try:
+        parse_alert_thresholds(alert_thresholds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid alert thresholds: {e}")
+
 @app.post("/api/synthetic-tests", response_model=schemas.SyntheticTest)
-async def create_synthetic_test(test: schemas.SyntheticTestCreate, db: Session = Depends(get_db)):
+def create_synthetic_test(test: schemas.SyntheticTestCreate, db: Session = Depends(get_db)):
+    validate_assertions(test.assertions)
+    validate_alert_thresholds(test.alert_thresholds)
     db_test = models.SyntheticTest(**test.dict(), created_at=datetime.now())
     db.add(db_test)
     db.commit()
@@ -394,10 +647,12 @@ def get_synthetic_test(test_id: int, db: Session = Depends(get_db)):
     return db_test
 
 @app.put("/api/synthetic-tests/{test_id}", response_model=schemas.SyntheticTest)
-async def update_synthetic_test(test_id: int, test: schemas.SyntheticTestCreate, db: Session = Depends(get_db)):
+def update_synthetic_test(test_id: int, test: schemas.SyntheticTestCreate, db: Session = Depends(get_db)):
     db_test = db.query(models.SyntheticTest).filter(models.SyntheticTest.id == test_id).first()
     if not db_test:
         raise HTTPException(status_code=404, detail="Synthetic test not found")
+    validate_assertions(test.assertions)
+    validate_alert_thresholds(test.alert_thresholds)
     
     # Store old active state
     was_active = db_test.is_active
@@ -422,16 +677,19 @@ async def update_synthetic_test(test_id: int, test: schemas.SyntheticTestCreate,
     return db_test
 
 @app.delete("/api/synthetic-tests/{test_id}")
-async def delete_synthetic_test(test_id: int, db: Session = Depends(get_db)):
+def delete_synthetic_test(test_id: int, db: Session = Depends(get_db)):
     db_test = db.query(models.SyntheticTest).filter(models.SyntheticTest.id == test_id).first()
     if not db_test:
         raise HTTPException(status_code=404, detail="Synthetic test not found")
     
     # Unschedule the test
     scheduler.unschedule_test(test_id)
+    assertion_cache.invalidate(test_id)
     
-    # Delete executions first
+    # Delete executions, alerts and queued runs first
     db.query(models.SyntheticExecution).filter(models.SyntheticExecution.test_id == test_id).delete()
+    db.query(models.Alert).filter(models.Alert.test_id == test_id).delete()
+    db.query(models.SyntheticTestRun).filter(models.SyntheticTestRun.test_id == test_id).delete()
     db.delete(db_test)
     db.commit()
     
@@ -439,7 +697,7 @@ async def delete_synthetic_test(test_id: int, db: Session = Depends(get_db)):
 
 @app.post("/api/synthetic-tests/{test_id}/execute")
 async def execute_synthetic_test(test_id: int, db: Session = Depends(get_db)):
-    db_test = db.query(models.SyntheticTest).filter(models.SyntheticTest.id == test_id).first()
+    db_test = await run_db(fetch_first, db.query(models.SyntheticTest).filter(models.SyntheticTest.id == test_id))
     if not db_test:
         raise HTTPException(status_code=404, detail="Synthetic test not found")
     
@@ -464,7 +722,7 @@ def get_all_executions(limit: int = 100, db: Session = Depends(get_db)):
     return executions
 
 @app.get("/api/synthetic-monitoring/metrics")
-async def get_monitoring_metrics(db: Session = Depends(get_db)):
+def get_monitoring_metrics(db: Session = Depends(get_db)):
     try:
         # Get metrics for each test type
         uptime_metrics = synthetic_service.get_monitoring_metrics(db, "uptime")
@@ -480,6 +738,24 @@ async def get_monitoring_metrics(db: Session = Depends(get_db)):
         logger.error(f"Error getting monitoring metrics: {e}")
         raise HTTPException(status_code=500, detail="Something went wrong while fetching metrics")
 
+@app.get("/api/alerts", response_model=List[schemas.Alert])
+def get_alerts(status: Optional[str] = None, test_id: Optional[int] = None, limit: int = 100,
+               db: Session = Depends(get_db)):
+    query = db.query(models.Alert)
+    if status:
+        query = query.filter(models.Alert.status == status)
+    if test_id:
+        query = query.filter(models.Alert.test_id == test_id)
+    return query.order_by(models.Alert.started_at.desc()).limit(limit).all()
+
+@app.get("/api/synthetic-monitoring/scheduler")
+def get_scheduler_status():
+    return scheduler.status()
+
+@app.get("/api/synthetic-monitoring/workers")
+def get_monitoring_workers(db: Session = Depends(get_db)):
+    return {"mode": MONITORING_MODE, "workers": get_worker_health(db)}
+
 # External Apps endpoints
 @app.get("/api/external-apps", response_model=List[schemas.ExternalApp])
 def get_external_apps(db: Session = Depends(get_db)):
@@ -525,6 +801,38 @@ def delete_external_app(app_id: int, db: Session = Depends(get_db)):
     
     return {"message": "External app deleted"}
 
+# External App sweeps
+@app.post("/api/external-apps/sweep", response_model=List[schemas.EndpointSweep])
+async def sweep_external_apps(db: Session = Depends(get_db)):
+    """Check every active endpoint of every active external app"""
+    return await endpoint_sweep_runner.sweep_all(db)
+
+@app.post("/api/external-apps/{app_id}/sweep", response_model=schemas.EndpointSweepDetail)
+async def sweep_external_app(app_id: int, db: Session = Depends(get_db)):
+    """Check every active endpoint of one external app"""
+    db_app = await run_db(fetch_first, db.query(models.ExternalApp).filter(models.ExternalApp.id == app_id))
+    if not db_app:
+        raise HTTPException(status_code=404, detail="External app not found")
+    sweep = await endpoint_sweep_runner.sweep_app(db_app, db)
+    await run_db(db.refresh, sweep, ["checks"])
+    return sweep
+
+@app.get("/api/external-apps/{app_id}/sweeps", response_model=List[schemas.EndpointSweep])
+def get_external_app_sweeps(app_id: int, limit: int = 20, db: Session = Depends(get_db)):
+    db_app = db.query(models.ExternalApp).filter(models.ExternalApp.id == app_id).first()
+    if not db_app:
+        raise HTTPException(status_code=404, detail="External app not found")
+    return db.query(models.EndpointSweep).filter(
+        models.EndpointSweep.external_app_id == app_id
+    ).order_by(models.EndpointSweep.started_at.desc()).limit(limit).all()
+
+@app.get("/api/endpoint-sweeps/{sweep_id}", response_model=schemas.EndpointSweepDetail)
+def get_endpoint_sweep(sweep_id: int, db: Session = Depends(get_db)):
+    sweep = db.query(models.EndpointSweep).filter(models.EndpointSweep.id == sweep_id).first()
+    if not sweep:
+        raise HTTPException(status_code=404, detail="Endpoint sweep not found")
+    return sweep
+
 # External App Endpoints endpoints
 @app.get("/api/external-apps/{app_id}/endpoints", response_model=List[schemas.ExternalAppEndpoint])
 def get_external_app_endpoints(app_id: int, db: Session = Depends(get_db)):
@@ -574,7 +882,50 @@ def delete_external_app_endpoint(endpoint_id: int, db: Session = Depends(get_db)
     if not db_endpoint:
         raise HTTPException(status_code=404, detail="External app endpoint not found")
     
+    db.query(models.EndpointCheck).filter(models.EndpointCheck.endpoint_id == endpoint_id).delete()
     db.delete(db_endpoint)
     db.commit()
     
     return {"message": "External app endpoint deleted"}
+
+# Admin profiling endpoints
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set EVAL_FORGE_ADMIN_TOKEN")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.post("/api/admin/profiles", dependencies=[Depends(require_admin)])
+def start_profile(request: schemas.ProfileCreate):
+    """Capture a CPU or memory profile of this process for duration_s seconds"""
+    try:
+        profile = profile_manager.start(request.kind, request.duration_s, request.interval_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return profile.to_dict()
+
+@app.get("/api/admin/profiles", dependencies=[Depends(require_admin)])
+def list_profiles():
+    return [profile.to_dict(include_summary=False) for profile in profile_manager.list()]
+
+@app.get("/api/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def get_profile(profile_id: int):
+    profile = profile_manager.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile.to_dict()
+
+@app.get("/api/admin/profiles/{profile_id}/download", dependencies=[Depends(require_admin)])
+def download_profile(profile_id: int):
+    profile = profile_manager.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if profile.status != "completed":
+        raise HTTPException(status_code=400, detail=f"Profile is {profile.status}")
+    media_type = "text/plain" if profile.kind == "cpu" else "application/octet-stream"
+    return FileResponse(profile.path, media_type=media_type, filename=profile.filename)
+
+@app.get("/api/admin/slow-queries", dependencies=[Depends(require_admin)])
+def get_slow_queries():
+    """Recent statements slower than EVAL_FORGE_SLOW_QUERY_MS, newest first"""
+    return list(reversed(slow_queries))
@@ -4,76 +4,183 @@ Provides BLEU, ROUGE, and semantic similarity scoring with robust error handling
 """
 
 import logging
-from typing import Optional, Dict, Any
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, List
 import re
 import warnings
 
+from .embeddings import EMBEDDING_BACKEND, load_embedding_backend
+from .telemetry import registry, scorer_warm_up_seconds
+
 # Suppress warnings from transformers and other libraries
 warnings.filterwarnings("ignore", category=UserWarning)
 warnings.filterwarnings("ignore", category=FutureWarning)
 
 logger = logging.getLogger(__name__)
 
+# Pre-provisioned model and NLTK assets (see provision_models.py); nothing is downloaded at runtime
+MODEL_CACHE_DIR = os.environ.get(
+    "EVAL_FORGE_MODEL_CACHE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "model-cache")
+)
+NLTK_DATA_DIR = os.path.join(MODEL_CACHE_DIR, "nltk_data")
+SENTENCE_MODEL_NAME = 'all-MiniLM-L6-v2'
+ONNX_MODEL_DIR = os.path.join(MODEL_CACHE_DIR, f"{SENTENCE_MODEL_NAME}-onnx")
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s.,!?-]')
+
 class MetricsCalculator:
     """Calculate advanced metrics for LLM evaluation with graceful error handling."""
     
-    def __init__(self):
+    def __init__(self, embedding_backend: str = EMBEDDING_BACKEND):
+        self.embedding_backend = embedding_backend
         self._nltk_initialized = False
+        self._punkt_available = False
         self._rouge_scorer = None
         self._sentence_model = None
+        self._init_lock = threading.RLock()
+        # not_loaded, loading, ready, failed - reported by the readiness endpoint
+        self.scorer_states = {"bleu": "not_loaded", "rouge": "not_loaded", "semantic_similarity": "not_loaded"}
+        self.scorer_errors = {}
+    
+    def _set_state(self, scorer: str, state: str, error: Optional[str] = None):
+        self.scorer_states[scorer] = state
+        if error:
+            self.scorer_errors[scorer] = error
         
     def _init_nltk(self):
-        """Initialize NLTK with error handling."""
+        """Initialize NLTK from the local data directory with error handling."""
         if self._nltk_initialized:
             return True
+        if self.scorer_states["bleu"] == "failed":
+            return False
+        
+        with self._init_lock:
+            if self._nltk_initialized:
+                return True
             
-        try:
-            import nltk
-            # Download required NLTK data if not present
-            required_data = ['punkt', 'punkt_tab']
-            
-            for data_name in required_data:
+            self._set_state("bleu", "loading")
+            try:
+                import nltk
+                if NLTK_DATA_DIR not in nltk.data.path:
+                    nltk.data.path.insert(0, NLTK_DATA_DIR)
+                
                 try:
-                    if data_name == 'punkt':
-                        nltk.data.find('tokenizers/punkt')
-                    elif data_name == 'punkt_tab':
-                        nltk.data.find('tokenizers/punkt_tab')
+                    nltk.data.find('tokenizers/punkt_tab')
+                    self._punkt_available = True
                 except LookupError:
-                    logger.info(f"Downloading NLTK {data_name} data...")
-                    nltk.download(data_name, quiet=True)
-            
-            self._nltk_initialized = True
-            return True
-        except Exception as e:
-            logger.error(f"Failed to initialize NLTK: {e}")
-            return False
+                    logger.warning(f"NLTK punkt_tab not found (looked in {NLTK_DATA_DIR}); "
+                                   "tokenizing without sentence splitting. Run provision_models.py to install it.")
+                
+                self._nltk_initialized = True
+                self._set_state("bleu", "ready")
+                return True
+            except Exception as e:
+                logger.error(f"Failed to initialize NLTK: {e}")
+                self._set_state("bleu", "failed", str(e))
+                return False
     
     def _init_rouge(self):
         """Initialize ROUGE scorer with error handling."""
         if self._rouge_scorer is not None:
             return True
-            
-        try:
-            from rouge_score import rouge_scorer
-            self._rouge_scorer = rouge_scorer.RougeScorer(['rouge1', 'rouge2', 'rougeL'], use_stemmer=True)
-            return True
-        except Exception as e:
-            logger.error(f"Failed to initialize ROUGE scorer: {e}")
+        if self.scorer_states["rouge"] == "failed":
             return False
+        
+        with self._init_lock:
+            if self._rouge_scorer is not None:
+                return True
+            
+            self._set_state("rouge", "loading")
+            try:
+                from rouge_score import rouge_scorer
+                self._rouge_scorer = rouge_scorer.RougeScorer(['rouge1', 'rouge2', 'rougeL'], use_stemmer=True)
+                self._set_state("rouge", "ready")
+                return True
+            except Exception as e:
+                logger.error(f"Failed to initialize ROUGE scorer: {e}")
+                self._set_state("rouge", "failed", str(e))
+                return False
     
     def _init_sentence_model(self):
-        """Initialize sentence transformer model with error handling."""
+        """Initialize the sentence embedding backend from the local cache with error handling."""
         if self._sentence_model is not None:
             return True
-            
-        try:
-            from sentence_transformers import SentenceTransformer
-            # Use a lightweight model for better performance
-            self._sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
-            return True
-        except Exception as e:
-            logger.error(f"Failed to initialize sentence transformer: {e}")
+        if self.scorer_states["semantic_similarity"] == "failed":
             return False
+        
+        with self._init_lock:
+            if self._sentence_model is not None:
+                return True
+            
+            self._set_state("semantic_similarity", "loading")
+            try:
+                # Use a lightweight model for better performance
+                self._sentence_model = load_embedding_backend(
+                    self.embedding_backend,
+                    model_path=os.path.join(MODEL_CACHE_DIR, SENTENCE_MODEL_NAME),
+                    model_name=SENTENCE_MODEL_NAME,
+                    cache_dir=MODEL_CACHE_DIR,
+                    onnx_dir=ONNX_MODEL_DIR
+                )
+                self._set_state("semantic_similarity", "ready")
+                return True
+            except Exception as e:
+                logger.error(f"Failed to initialize {self.embedding_backend} embedding backend: {e}")
+                self._set_state("semantic_similarity", "failed", str(e))
+                return False
+    
+    def warm_up(self):
+        """Load every scorer and run one encode so the first evaluation doesn't pay for it."""
+        start_time = time.perf_counter()
+        self._init_nltk()
+        self._init_rouge()
+        if self._init_sentence_model():
+            try:
+                self._sentence_model.encode(["warm up"])
+            except Exception as e:
+                logger.error(f"Sentence transformer warm-up failed: {e}")
+        scorer_warm_up_seconds.set(time.perf_counter() - start_time)
+        logger.info(f"Scorer warm-up finished: {self.scorer_states}")
+    
+    def start_warm_up(self) -> threading.Thread:
+        """Run warm_up on a background thread."""
+        thread = threading.Thread(target=self.warm_up, name="scorer-warm-up", daemon=True)
+        thread.start()
+        return thread
+    
+    def embedding_device(self) -> Optional[str]:
+        """Device of the loaded embedding model; None while a PyTorch model, which may pick the GPU, isn't loaded."""
+        if self._sentence_model is not None:
+            return getattr(self._sentence_model, "device", "cpu")
+        return "cpu" if self.embedding_backend.startswith("onnx") else None
+    
+    def readiness(self) -> Dict[str, Any]:
+        """Overall readiness plus the state of each scorer."""
+        states = self.scorer_states.values()
+        if any(state in ("not_loaded", "loading") for state in states):
+            status = "warming"
+        elif any(state == "failed" for state in states):
+            status = "degraded"
+        else:
+            status = "ready"
+        return {
+            "status": status,
+            "scorers": dict(self.scorer_states),
+            "errors": dict(self.scorer_errors),
+            "embedding_backend": self.embedding_backend
+        }
+    
+    def _word_tokenize(self, text: str) -> list:
+        """NLTK word tokenization, skipping sentence splitting when punkt data isn't installed."""
+        if self._punkt_available:
+            from nltk.tokenize import word_tokenize
+            return word_tokenize(text)
+        from nltk.tokenize import NLTKWordTokenizer
+        return NLTKWordTokenizer().tokenize(text)
     
     def calculate_bleu_score(self, reference: str, candidate: str) -> Optional[float]:
         """
@@ -91,11 +198,10 @@ class MetricsCalculator:
                 return None
             
             from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
-            from nltk.tokenize import word_tokenize
             
             # Tokenize texts
-            reference_tokens = [word_tokenize(reference.lower())]
-            candidate_tokens = word_tokenize(candidate.lower())
+            reference_tokens = [self._word_tokenize(reference.lower())]
+            candidate_tokens = self._word_tokenize(candidate.lower())
             
             # Use smoothing to avoid division by zero and compatibility issues
             smoothie = SmoothingFunction().method4
@@ -174,6 +280,38 @@ class MetricsCalculator:
             logger.error(f"Semantic similarity calculation failed: {e}")
             return None
     
+    def calculate_semantic_similarity_batch(self, references: List[str], candidates: List[str]) -> List[Optional[float]]:
+        """
+        Calculate semantic similarity for many pairs with one batched encode.
+        
+        Args:
+            references: Expected/reference texts
+            candidates: Model-generated texts, aligned with references
+            
+        Returns:
+            Cosine similarity scores (0.0-1.0), or None entries if calculation fails
+        """
+        try:
+            if not self._init_sentence_model():
+                return [None] * len(references)
+            
+            import numpy as np
+            
+            embeddings = self._sentence_model.encode(list(references) + list(candidates))
+            ref_embeddings = embeddings[:len(references)]
+            cand_embeddings = embeddings[len(references):]
+            
+            dots = np.sum(ref_embeddings * cand_embeddings, axis=1)
+            norms = np.linalg.norm(ref_embeddings, axis=1) * np.linalg.norm(cand_embeddings, axis=1)
+            similarities = np.where(norms > 0, dots / np.where(norms > 0, norms, 1.0), 0.0)
+            similarities = np.clip(similarities, 0.0, 1.0)
+            
+            return [round(float(similarity), 4) for similarity in similarities]
+            
+        except Exception as e:
+            logger.error(f"Batch semantic similarity calculation failed: {e}")
+            return [None] * len(references)
+    
     def calculate_all_metrics(self, reference: str, candidate: str) -> Dict[str, Any]:
         """
         Calculate all available metrics for a reference-candidate pair.
@@ -217,8 +355,7 @@ class MetricsCalculator:
                 # Fallback to simple tokenization
                 return text.lower().split()
             
-            import nltk
-            tokens = nltk.word_tokenize(text.lower())
+            tokens = self._word_tokenize(text.lower())
             # Filter out punctuation
             return [token for token in tokens if token.isalnum()]
             
@@ -232,10 +369,10 @@ class MetricsCalculator:
             return ""
         
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text.strip())
+        text = _WHITESPACE_RE.sub(' ', text.strip())
         
         # Remove special characters but keep basic punctuation
-        text = re.sub(r'[^\w\s.,!?-]', '', text)
+        text = _SPECIAL_CHARS_RE.sub('', text)
         
         return text
     
@@ -253,6 +390,11 @@ class MetricsCalculator:
 # Global instance for reuse
 metrics_calculator = MetricsCalculator()
 
+registry.gauge(
+    "eval_forge_scorer_ready", "Whether each scorer has loaded (1) or not yet or failed (0)", ("scorer",),
+    function=lambda: {(name,): 1 if state == "ready" else 0 for name, state in metrics_calculator.scorer_states.items()}
+)
+
 
 def calculate_metrics(reference: str, candidate: str) -> Dict[str, Any]:
     """
@@ -0,0 +1,285 @@
+"""
+Model pools: one logical model served by several Ollama replicas.
+
+A model's endpoint plus its replica_endpoints form its pool. Evaluation
+requests go to the replica with the fewest outstanding requests among those
+under their adaptive concurrency limit and with a closed circuit, so a large
+evaluation spreads over every replica and backs off from saturated ones (see
+adaptive_concurrency). When every replica's circuit is open, requests wait
+for the next trial request; after CIRCUIT_MAX_WAIT_S of outage they fail
+fast with CircuitOpenError so the evaluation can finish and be resumed later.
+The pool also carries what every request to the model shares: its provider,
+API key and rate limiter.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from .adaptive_concurrency import CLOSED, AIMDLimit, CircuitBreaker, CircuitOpenError
+from .providers import Provider, api_key_for, get_provider
+from .rate_limit import RateLimiter
+from .telemetry import (circuit_trips, replica_concurrency_limit, replica_healthy, replica_outstanding,
+                        replica_requests)
+
+logger = logging.getLogger(__name__)
+
+# How long requests wait while every replica's circuit is open before failing fast
+CIRCUIT_MAX_WAIT_S = float(os.environ.get("EVAL_FORGE_CIRCUIT_MAX_WAIT_S", "300"))
+
+
+def pool_endpoints(endpoint: str, replica_endpoints: Optional[str]) -> List[str]:
+    """
+    Every endpoint of a model: its endpoint first, then its replicas.
+
+    Args:
+        endpoint: The model's endpoint
+        replica_endpoints: JSON list of additional endpoints, or None
+
+    Raises:
+        ValueError: replica_endpoints is not a JSON list of strings
+    """
+    replicas = json.loads(replica_endpoints) if replica_endpoints else []
+    if not isinstance(replicas, list) or not all(isinstance(url, str) for url in replicas):
+        raise ValueError("replica_endpoints must be a JSON list of URLs")
+    return list(dict.fromkeys(url.rstrip("/") for url in [endpoint, *replicas] if url))
+
+
+def replica_error(response: Optional[httpx.Response], error: Optional[BaseException]) -> Optional[str]:
+    """Why a request counts as an overload failure: transport errors, timeouts, 429 and 5xx responses."""
+    if isinstance(error, httpx.HTTPError):
+        return f"{type(error).__name__}: {error}"
+    if response is not None and (response.status_code == 429 or response.status_code >= 500):
+        return f"HTTP {response.status_code}"
+    return None
+
+
+class Replica:
+    """One endpoint of a pool, with its concurrency limit, circuit breaker and request statistics."""
+
+    def __init__(self, endpoint: str, parallel_requests: int = 1):
+        self.endpoint = endpoint
+        self.limiter = AIMDLimit(initial=parallel_requests)
+        self.breaker = CircuitBreaker()
+        self.outstanding = 0
+        self.requests = 0
+        self.succeeded = 0
+        self.errors = 0
+        self.total_latency_s = 0.0
+        self.last_error: Optional[str] = None
+        replica_healthy.labels(endpoint).set(1)
+        replica_concurrency_limit.labels(endpoint).set(self.limiter.allowed)
+
+    @property
+    def healthy(self) -> bool:
+        return self.breaker.state == CLOSED
+
+    def stats(self) -> Dict:
+        return {
+            "endpoint": self.endpoint,
+            "healthy": self.healthy,
+            "circuit": self.breaker.state,
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_latency_ms": round(self.total_latency_s / self.succeeded * 1000, 2) if self.succeeded else None,
+            "unloaded_latency_ms": round(self.limiter.baseline_s * 1000, 2) if self.limiter.baseline_s else None,
+            "trips": self.breaker.trips,
+            "down_for_s": (round(time.monotonic() - self.breaker.down_since, 1)
+                           if self.breaker.down_since is not None else None),
+            "last_error": self.last_error
+        }
+
+
+class ModelPool:
+    """Route one model's requests over its replicas within each replica's adaptive limit."""
+
+    def __init__(self, model_name: str, endpoints: List[str], parallel_requests: int = 1,
+                 provider: Optional[Provider] = None, api_key: Optional[str] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
+        """
+        Args:
+            model_name: Model every replica serves
+            endpoints: Replica endpoints
+            parallel_requests: Starting concurrency limit of each replica
+            provider: API the replicas speak; Ollama by default
+            api_key: Sent with every request, for providers that take one
+            rate_limiter: Requests and tokens per minute across all replicas
+        """
+        self.model_name = model_name
+        self.provider = provider or get_provider("ollama")
+        self.headers = self.provider.headers(api_key)
+        self.api_key = api_key
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.parallel_requests = max(parallel_requests, 1)
+        self.replicas = [Replica(endpoint, self.parallel_requests) for endpoint in endpoints]
+        self._waiters: List[asyncio.Future] = []
+
+    @property
+    def endpoints(self) -> List[str]:
+        return [replica.endpoint for replica in self.replicas]
+
+    @property
+    def max_concurrency(self) -> int:
+        """Most requests the pool's limits could ever allow at once: how many workers an evaluation starts."""
+        return sum(replica.limiter.max_limit for replica in self.replicas)
+
+    async def acquire(self, avoid: Optional[Replica] = None) -> Replica:
+        """
+        Wait for a replica that can take a request and count the request against it.
+
+        Args:
+            avoid: Replica to use only if no other has room, e.g. the one a retried request just failed on
+
+        Raises:
+            CircuitOpenError: Every replica's circuit has been open for CIRCUIT_MAX_WAIT_S
+        """
+        while True:
+            now = time.monotonic()
+            candidates = [replica for replica in self.replicas
+                          if replica.outstanding < replica.limiter.allowed and replica.breaker.available(now)]
+            if candidates:
+                # Closed circuits first; a trial request goes out only when nothing healthy has room
+                replica = min(candidates, key=lambda replica: (not replica.healthy, replica is avoid,
+                                                               replica.outstanding, replica.requests))
+                replica.breaker.admit(now)
+                replica.outstanding += 1
+                replica.requests += 1
+                replica_outstanding.labels(replica.endpoint).inc()
+                return replica
+
+            if not any(replica.healthy for replica in self.replicas):
+                down_for = now - max(replica.breaker.down_since or now for replica in self.replicas)
+                if down_for >= CIRCUIT_MAX_WAIT_S:
+                    raise CircuitOpenError(f"Every endpoint of {self.model_name} has been failing for "
+                                           f"{down_for:.0f}s: {self.replicas[0].last_error}")
+            # Woken by a finished request, or when the next open circuit admits a trial request
+            retry_at = [replica.breaker.retry_at for replica in self.replicas if replica.breaker.retry_at]
+            timeout = min([at - now for at in retry_at] + [1.0])
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait([waiter], timeout=max(timeout, 0.001))
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def release(self, replica: Replica, started_at: float, error: Optional[str] = None):
+        """
+        Record how a request to a replica ended.
+
+        Args:
+            replica: Replica returned by acquire()
+            started_at: time.monotonic() when the request was sent
+            error: Why the request failed, for overload failures (see replica_error)
+        """
+        now = time.monotonic()
+        self._finish(replica)
+        if error is None:
+            replica.succeeded += 1
+            replica.total_latency_s += now - started_at
+            replica.limiter.on_success(now - started_at, started_at)
+            if not replica.healthy:
+                logger.info(f"Closing the circuit of {replica.endpoint} in the {self.model_name} pool")
+                replica_healthy.labels(replica.endpoint).set(1)
+            replica.breaker.record_success()
+            replica_requests.labels(replica.endpoint, "ok").inc()
+        else:
+            replica.errors += 1
+            replica.last_error = error
+            replica.limiter.on_overload(started_at)
+            if replica.breaker.record_failure(now):
+                self._opened(replica)
+            replica_requests.labels(replica.endpoint, "error").inc()
+        replica_concurrency_limit.labels(replica.endpoint).set(replica.limiter.allowed)
+
+    def abandon(self, replica: Replica):
+        """Return the slot of a request cancelled before it finished, without judging the replica."""
+        self._finish(replica)
+        replica.breaker.abandon()
+
+    def _finish(self, replica: Replica):
+        replica.outstanding -= 1
+        replica_outstanding.labels(replica.endpoint).dec()
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _opened(self, replica: Replica):
+        breaker = replica.breaker
+        logger.warning(f"Opening the circuit of {replica.endpoint} in the {self.model_name} pool for "
+                       f"{breaker.cooldown_s:.0f}s after {breaker.consecutive_failures} failures: "
+                       f"{replica.last_error}")
+        replica_healthy.labels(replica.endpoint).set(0)
+        circuit_trips.labels(replica.endpoint).inc()
+
+    async def probe_all(self) -> List[Dict]:
+        """Probe every replica now, closing or opening each one's circuit by the result."""
+        results = await asyncio.gather(*(self.provider.probe(endpoint, self.model_name, self.api_key)
+                                         for endpoint in self.endpoints))
+        now = time.monotonic()
+        for replica, (available, reason) in zip(self.replicas, results):
+            if available:
+                replica.breaker.record_success()
+                replica_healthy.labels(replica.endpoint).set(1)
+            else:
+                replica.last_error = reason
+                # A lone endpoint keeps taking requests so they fail with the real error
+                if replica.healthy and len(self.replicas) > 1:
+                    replica.breaker.trip(now)
+                    self._opened(replica)
+        return [{"endpoint": replica.endpoint, "available": available, "error": reason}
+                for replica, (available, reason) in zip(self.replicas, results)]
+
+    def stats(self) -> Dict:
+        return {
+            "model_name": self.model_name,
+            "provider": self.provider.name,
+            "parallel_requests": self.parallel_requests,
+            "rate_limits": self.rate_limiter.stats(),
+            "concurrency_limit": sum(replica.limiter.allowed for replica in self.replicas if replica.healthy),
+            "replicas": [replica.stats() for replica in self.replicas]
+        }
+
+
+class ModelPoolRegistry:
+    """The pool of each model, kept across evaluations so health and stats persist."""
+
+    def __init__(self):
+        self._pools: Dict[int, Tuple[tuple, ModelPool]] = {}
+
+    def get(self, db_model) -> ModelPool:
+        """
+        The pool for a models.Model, rebuilt when its configuration changes.
+
+        Raises:
+            ValueError: The model's type has no provider
+        """
+        key = (db_model.model_name, tuple(pool_endpoints(db_model.endpoint, db_model.replica_endpoints)),
+               db_model.parallel_requests or 1, db_model.type or "ollama", db_model.api_key_env,
+               db_model.requests_per_minute, db_model.tokens_per_minute)
+        entry = self._pools.get(db_model.id)
+        if not entry or entry[0] != key:
+            model_name, endpoints, parallel_requests, model_type, api_key_env, rpm, tpm = key
+            entry = (key, ModelPool(model_name, list(endpoints), parallel_requests, get_provider(model_type),
+                                    api_key_for(api_key_env), RateLimiter(rpm, tpm)))
+            self._pools[db_model.id] = entry
+        return entry[1]
+
+    def find(self, model_id: int) -> Optional[ModelPool]:
+        entry = self._pools.get(model_id)
+        return entry[1] if entry else None
+
+    def discard(self, model_id: int):
+        self._pools.pop(model_id, None)
+
+
+# Global pool registry
+model_pools = ModelPoolRegistry()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -13,8 +13,15 @@ class Model(Base):
     endpoint = Column(String)
     model_name = Column(String)
     status = Column(String, default="unknown")  # unknown, connected, error, testing
+    replica_endpoints = Column(Text, nullable=True)  # JSON list of more endpoints serving the same model
+    parallel_requests = Column(Integer, default=1)  # Starting concurrency per replica
+    api_key_env = Column(String, nullable=True)  # Environment variable holding the API key, for hosted providers
+    requests_per_minute = Column(Integer, nullable=True)  # Provider rate limits, null for none
+    tokens_per_minute = Column(Integer, nullable=True)
+    batch_size = Column(Integer, default=1)  # Questions per request, for providers that take prompt lists
     
     evaluations = relationship("Evaluation", back_populates="model")
+    benchmarks = relationship("Benchmark", back_populates="model")
 
 class Evaluation(Base):
     __tablename__ = "evaluations"
@@ -22,7 +29,8 @@ class Evaluation(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     model_id = Column(Integer, ForeignKey("models.id"))
-    status = Column(String, default="draft")  # draft, running, completed, failed
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), nullable=True)
+    status = Column(String, default="draft")  # draft, running, completed, failed, interrupted
     temperature = Column(Float, default=0.7)
     max_tokens = Column(Integer, default=512)
     top_p = Column(Float, default=0.9)
@@ -42,10 +50,74 @@ class Evaluation(Base):
     avg_semantic_similarity = Column(Float, nullable=True)
     avg_response_time = Column(Float, nullable=True)
     
+    # Adaptive (sequential sampling) mode
+    mode = Column(String, default="full")  # full, adaptive
+    target_ci_width = Column(Float, nullable=True)  # Stop once the accuracy interval is this narrow
+    confidence_level = Column(Float, default=0.95)
+    min_questions = Column(Integer, default=30)  # Never stop before this many answers
+    baseline_evaluation_id = Column(Integer, ForeignKey("evaluations.id"), nullable=True)
+    accuracy_ci_lower = Column(Float, nullable=True)
+    accuracy_ci_upper = Column(Float, nullable=True)
+    metric_intervals = Column(Text, nullable=True)  # JSON of per-metric mean and bounds
+    stop_reason = Column(String, nullable=True)  # target_width_reached, better_than_baseline, worse_than_baseline
+    
+    # Scorer selection and cost accounting
+    metrics = Column(Text, nullable=True)  # JSON list of scorer names, null for the defaults
+    scorer_timings = Column(Text, nullable=True)  # JSON of per-scorer calls, cache hits and time
+    phase_timings = Column(Text, nullable=True)  # JSON of generation/scoring/db_write spans, when profiling
+    model_load_ms = Column(Float, nullable=True)  # Load time Ollama reported across the evaluation's requests
+    model_loads = Column(Integer, nullable=True)  # Requests that had to load the model first
+    infrastructure_errors = Column(Integer, nullable=True)  # Questions without an answer: endpoint down or overloaded
+    
+    # Ownership while running: the process holding the lease renews it; once it expires the run can be resumed
+    owner_id = Column(String, nullable=True)  # Worker id of the process running the evaluation
+    lease_expires_at = Column(DateTime, nullable=True)
+    
     model = relationship("Model", back_populates="evaluations")
+    dataset = relationship("Dataset", back_populates="evaluations")
     questions = relationship("Question", back_populates="evaluation")
     results = relationship("Result", back_populates="evaluation")
 
+class Dataset(Base):
+    __tablename__ = "datasets"
+    __table_args__ = (
+        # One dataset holds the members of each content; other names for it point at that one
+        Index("ux_datasets_content_owner", "content_hash", unique=True,
+              sqlite_where=text("content_dataset_id IS NULL"), postgresql_where=text("content_dataset_id IS NULL")),
+        Index("ux_datasets_name_version", "name", "version", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, index=True)
+    version = Column(Integer, default=1)
+    content_hash = Column(String, index=True)  # sha256 over the ordered item hashes
+    content_dataset_id = Column(Integer, ForeignKey("datasets.id"), nullable=True)  # Dataset holding the members, for a name reusing stored content
+    item_count = Column(Integer, default=0)
+    created_at = Column(DateTime)
+    
+    members = relationship("DatasetMember", back_populates="dataset", cascade="all, delete-orphan")
+    evaluations = relationship("Evaluation", back_populates="dataset")
+
+class DatasetItem(Base):
+    __tablename__ = "dataset_items"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String, unique=True, index=True)  # sha256 of question + answer
+    question = Column(Text)
+    expected_answer = Column(Text)
+
+class DatasetMember(Base):
+    __tablename__ = "dataset_members"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), index=True)
+    item_id = Column(Integer, ForeignKey("dataset_items.id"))
+    position = Column(Integer)
+    
+    dataset = relationship("Dataset", back_populates="members")
+    item = relationship("DatasetItem")
+
+# Legacy per-evaluation copy of questions, kept for evaluations created before datasets
 class Question(Base):
     __tablename__ = "questions"
     
@@ -61,11 +133,14 @@ class Result(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     evaluation_id = Column(Integer, ForeignKey("evaluations.id"))
-    question = Column(Text)
-    expected_answer = Column(Text)
+    dataset_item_id = Column(Integer, ForeignKey("dataset_items.id"), nullable=True, index=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=True)  # Legacy question this answers
+    question = Column(Text, nullable=True)  # Only set for legacy results without a dataset item
+    expected_answer = Column(Text, nullable=True)
     model_response = Column(Text)
     is_correct = Column(Boolean)
     response_time = Column(Integer)  # in milliseconds
+    infrastructure_error = Column(Boolean, default=False)  # No answer from the endpoint; left out of accuracy
     
     # Advanced metrics
     bleu_score = Column(Float, nullable=True)
@@ -73,8 +148,51 @@ class Result(Base):
     rouge_2_score = Column(Float, nullable=True)
     rouge_l_score = Column(Float, nullable=True)
     semantic_similarity = Column(Float, nullable=True)
+    extra_metrics = Column(Text, nullable=True)  # JSON of scorer outputs without a dedicated column
     
     evaluation = relationship("Evaluation", back_populates="results")
+    item = relationship("DatasetItem")
+
+class Benchmark(Base):
+    __tablename__ = "benchmarks"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, index=True)
+    model_id = Column(Integer, ForeignKey("models.id"))
+    mode = Column(String, default="concurrency")  # concurrency, rate
+    levels = Column(Text)  # JSON list of concurrency levels or requests/sec
+    requests_per_step = Column(Integer, default=20)
+    max_tokens = Column(Integer, default=128)
+    status = Column(String, default="draft")  # draft, running, completed, failed
+    saturation_level = Column(Float, nullable=True)  # Level past which throughput stops scaling
+    peak_throughput = Column(Float, nullable=True)  # requests/sec
+    created_at = Column(DateTime)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    
+    model = relationship("Model", back_populates="benchmarks")
+    steps = relationship("BenchmarkStep", back_populates="benchmark", cascade="all, delete-orphan")
+
+class BenchmarkStep(Base):
+    __tablename__ = "benchmark_steps"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    benchmark_id = Column(Integer, ForeignKey("benchmarks.id"))
+    level = Column(Float)  # concurrency or requests/sec for this step
+    total_requests = Column(Integer)
+    successful_requests = Column(Integer)
+    failed_requests = Column(Integer)
+    error_rate = Column(Float)
+    throughput = Column(Float)  # successful requests/sec
+    tokens_per_second = Column(Float)
+    avg_latency = Column(Float, nullable=True)  # in milliseconds
+    p50_latency = Column(Float, nullable=True)
+    p90_latency = Column(Float, nullable=True)
+    p95_latency = Column(Float, nullable=True)
+    p99_latency = Column(Float, nullable=True)
+    duration = Column(Float)  # wall time of the step in seconds
+    
+    benchmark = relationship("Benchmark", back_populates="steps")
 
 # Synthetic Monitoring Models
 class SyntheticTest(Base):
@@ -102,6 +220,7 @@ class SyntheticTest(Base):
     # SSL and advanced monitoring
     ssl_check_enabled = Column(Boolean, default=False)
     alert_thresholds = Column(Text, nullable=True)  # JSON config for alerting
+    assertions = Column(Text, nullable=True)  # JSON list of response assertions, see assertions.py
     
     # Browser automation specific
     browser_steps = Column(Text, nullable=True)  # JSON string of steps
@@ -127,6 +246,59 @@ class SyntheticExecution(Base):
     
     test = relationship("SyntheticTest", back_populates="executions")
 
+class SyntheticTestRun(Base):
+    __tablename__ = "synthetic_test_runs"
+    
+    # Queue of due scheduled runs; any worker process claims and executes them
+    id = Column(Integer, primary_key=True, index=True)
+    test_id = Column(Integer, ForeignKey("synthetic_tests.id"), index=True)
+    enqueued_at = Column(DateTime)
+    claimed_by = Column(String, nullable=True, index=True)  # Worker id, NULL while waiting
+    claimed_at = Column(DateTime, nullable=True)
+
+class Lease(Base):
+    __tablename__ = "leases"
+    
+    # Time-limited leadership held by one process, e.g. the synthetic test scheduler
+    name = Column(String, primary_key=True)
+    holder = Column(String)  # Worker id of the current holder
+    acquired_at = Column(DateTime)
+    expires_at = Column(DateTime)
+
+class Alert(Base):
+    __tablename__ = "alerts"
+    __table_args__ = (
+        # At most one open alert per test and rule, however many processes evaluate the test
+        Index("ux_alerts_firing_rule", "test_id", "rule", unique=True,
+              sqlite_where=text("status = 'firing'"), postgresql_where=text("status = 'firing'")),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    test_id = Column(Integer, ForeignKey("synthetic_tests.id"), index=True)
+    rule = Column(String)  # consecutive_failures, error_rate, p95_latency
+    status = Column(String, index=True)  # firing, resolved
+    value = Column(Float)  # Rule value when the alert fired
+    threshold = Column(Float)
+    message = Column(Text)
+    flapping = Column(Boolean, default=False)  # Notifications held back while the rule keeps flipping
+    started_at = Column(DateTime)
+    resolved_at = Column(DateTime, nullable=True)
+
+class MonitoringWorker(Base):
+    __tablename__ = "monitoring_workers"
+    
+    # Heartbeat and health of a dedicated monitoring runner process
+    worker_id = Column(String, primary_key=True)  # Stable per host and slot, e.g. "host:monitor-0"
+    host = Column(String)
+    pid = Column(Integer)
+    started_at = Column(DateTime)
+    heartbeat_at = Column(DateTime, index=True)
+    owned_tests = Column(Integer, default=0)  # Active tests hashed to this worker
+    executions = Column(Integer, default=0)
+    failures = Column(Integer, default=0)  # Executions that didn't succeed
+    loop_lag_ms = Column(Float, nullable=True)  # Event loop delay at the last heartbeat
+    last_error = Column(Text, nullable=True)
+
 class ExternalApp(Base):
     __tablename__ = "external_apps"
     
@@ -144,6 +316,7 @@ class ExternalApp(Base):
     updated_at = Column(DateTime)
     
     endpoints = relationship("ExternalAppEndpoint", back_populates="external_app", cascade="all, delete-orphan")
+    sweeps = relationship("EndpointSweep", cascade="all, delete-orphan")
 
 class ExternalAppEndpoint(Base):
     __tablename__ = "external_app_endpoints"
@@ -164,3 +337,34 @@ class ExternalAppEndpoint(Base):
     updated_at = Column(DateTime)
     
     external_app = relationship("ExternalApp", back_populates="endpoints")
+
+class EndpointSweep(Base):
+    __tablename__ = "endpoint_sweeps"
+    
+    # One concurrent health check of every active endpoint of an external app
+    id = Column(Integer, primary_key=True, index=True)
+    external_app_id = Column(Integer, ForeignKey("external_apps.id"), index=True)
+    total = Column(Integer, default=0)
+    succeeded = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    duration_ms = Column(Float)
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    error = Column(Text, nullable=True)  # Why the app's endpoints couldn't be checked, e.g. malformed auth_credentials
+    
+    checks = relationship("EndpointCheck", back_populates="sweep", cascade="all, delete-orphan")
+
+class EndpointCheck(Base):
+    __tablename__ = "endpoint_checks"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    sweep_id = Column(Integer, ForeignKey("endpoint_sweeps.id"), index=True)
+    endpoint_id = Column(Integer, ForeignKey("external_app_endpoints.id"), index=True)
+    status = Column(String)  # success, failure, timeout, error
+    status_code = Column(Integer, nullable=True)
+    response_time = Column(Float)  # in milliseconds
+    error_message = Column(Text, nullable=True)
+    executed_at = Column(DateTime)
+    
+    sweep = relationship("EndpointSweep", back_populates="checks")
+
@@ -0,0 +1,281 @@
+"""
+Dedicated synthetic monitoring runner.
+
+`python run_monitor.py --workers K` starts K worker processes, each with its own
+event loop, scheduler and HTTP connection pool, so monitoring load stays off the
+API's event loop and scales with cores. Workers heartbeat into the
+monitoring_workers table; every live worker places the others on a consistent
+hash ring and schedules only the active tests that hash to itself. When a worker
+joins or dies, only the tests on its arc of the ring move.
+
+Set EVAL_FORGE_MONITORING_MODE=external on the API so it leaves synthetic tests
+to the runner instead of scheduling them itself.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, fetch_first, run_db
+from .models import MonitoringWorker, SyntheticTest
+from .synthetic_monitoring import SyntheticMonitoringService
+from .telemetry import InstrumentedTransport
+
+logger = logging.getLogger(__name__)
+
+# "embedded": API workers run synthetic tests (see scheduler.py); "external": run_monitor.py does
+MONITORING_MODE = os.environ.get("EVAL_FORGE_MONITORING_MODE", "embedded")
+
+HEARTBEAT_S = 5
+WORKER_TTL_S = 20  # Workers silent for longer are dropped from the ring
+HASH_RING_REPLICAS = 64  # Virtual nodes per worker, evening out shard sizes
+MAX_CONNECTIONS = 100  # Per worker connection pool
+SUPERVISE_INTERVAL_S = 2
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to nodes."""
+
+    def __init__(self, nodes: Iterable[str], replicas: int = HASH_RING_REPLICAS):
+        ring = sorted((_hash(f"{node}#{replica}"), node) for node in nodes for replica in range(replicas))
+        self._hashes = [point for point, _ in ring]
+        self._nodes = [node for _, node in ring]
+
+    def node_for(self, key) -> Optional[str]:
+        """The node owning key: the first ring point clockwise from the key's hash."""
+        if not self._nodes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(str(key))) % len(self._hashes)
+        return self._nodes[index]
+
+
+class MonitoringShardWorker:
+    """One runner process: executes the active tests that hash to it."""
+
+    def __init__(self, worker_id: str):
+        self.worker_id = worker_id
+        self.scheduler = None
+        self.service: Optional[SyntheticMonitoringService] = None
+        self.owned_tests = 0
+        self.executions = 0
+        self.failures = 0
+        self.loop_lag_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.started_at = datetime.utcnow()
+        self._stopping: Optional[asyncio.Event] = None
+
+    async def run(self):
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self._stopping.set)
+
+        limits = httpx.Limits(max_connections=MAX_CONNECTIONS)
+        client = httpx.AsyncClient(transport=InstrumentedTransport("monitoring", limits=limits))
+        self.service = SyntheticMonitoringService(client=client)
+        self.scheduler = AsyncIOScheduler()
+        self.scheduler.start()
+        logger.info(f"Monitoring worker {self.worker_id} started (pid {os.getpid()})")
+
+        try:
+            while not self._stopping.is_set():
+                try:
+                    await run_db(self.heartbeat)
+                    await self.rebalance()
+                except Exception as e:
+                    self.last_error = str(e)
+                    logger.error(f"Monitoring worker {self.worker_id} heartbeat failed: {e}")
+
+                woke_at = loop.time() + HEARTBEAT_S
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    # How late the loop got back to us is how long checks are being delayed
+                    self.loop_lag_ms = round(max(0.0, loop.time() - woke_at) * 1000, 1)
+        finally:
+            self.scheduler.shutdown(wait=False)
+            await client.aclose()
+            await run_db(self.deregister)
+            logger.info(f"Monitoring worker {self.worker_id} stopped")
+
+    def heartbeat(self):
+        db = SessionLocal()
+        try:
+            values = {
+                "host": socket.gethostname(),
+                "pid": os.getpid(),
+                "started_at": self.started_at,
+                "heartbeat_at": datetime.utcnow(),
+                "owned_tests": self.owned_tests,
+                "executions": self.executions,
+                "failures": self.failures,
+                "loop_lag_ms": self.loop_lag_ms,
+                "last_error": self.last_error
+            }
+            stmt = sqlite_insert(MonitoringWorker).values(worker_id=self.worker_id, **values)
+            db.execute(stmt.on_conflict_do_update(index_elements=[MonitoringWorker.worker_id], set_=values))
+            db.commit()
+        finally:
+            db.close()
+
+    def deregister(self):
+        """Remove this worker's heartbeat so peers take over its tests on their next heartbeat."""
+        db = SessionLocal()
+        try:
+            db.query(MonitoringWorker).filter(MonitoringWorker.worker_id == self.worker_id).delete()
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error deregistering monitoring worker {self.worker_id}: {e}")
+        finally:
+            db.close()
+
+    async def rebalance(self):
+        """Schedule the active tests this worker owns on the current ring and drop the rest."""
+        from apscheduler.triggers.interval import IntervalTrigger
+
+        worker_ids, active_tests = await run_db(_ring_snapshot)
+        ring = HashRing(worker_ids)
+
+        owned = {
+            f"test_{test.id}": test for test in active_tests
+            if test.interval > 0 and ring.node_for(test.id) == self.worker_id
+        }
+        self.owned_tests = len(owned)
+
+        for job in self.scheduler.get_jobs():
+            if job.id not in owned:
+                self.scheduler.remove_job(job.id)
+                logger.info(f"Monitoring worker {self.worker_id} released {job.id}")
+
+        for job_id, test in owned.items():
+            job = self.scheduler.get_job(job_id)
+            if job and job.trigger.interval.total_seconds() == test.interval:
+                continue
+            self.scheduler.add_job(
+                self.execute_test,
+                IntervalTrigger(seconds=test.interval),
+                args=[test.id],
+                id=job_id,
+                replace_existing=True,
+                # Newly owned tests start soon, and spread out rather than all at once
+                next_run_time=datetime.now() + timedelta(seconds=1 + (test.id % HEARTBEAT_S))
+            )
+            logger.info(f"Monitoring worker {self.worker_id} scheduled '{test.name}' every {test.interval}s")
+
+    async def execute_test(self, test_id: int):
+        db = SessionLocal()
+        try:
+            test = await run_db(fetch_first, db.query(SyntheticTest).filter(SyntheticTest.id == test_id))
+            if not test or not test.is_active:
+                return
+
+            execution = await self.service.execute_test(test, db)
+            self.executions += 1
+            if execution.status != "success":
+                self.failures += 1
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Error executing synthetic test {test_id} on {self.worker_id}: {e}")
+        finally:
+            await run_db(db.close)
+
+
+def live_worker_ids(db: Session) -> List[str]:
+    cutoff = datetime.utcnow() - timedelta(seconds=WORKER_TTL_S)
+    return [worker_id for (worker_id,) in
+            db.query(MonitoringWorker.worker_id).filter(MonitoringWorker.heartbeat_at >= cutoff).all()]
+
+
+def _ring_snapshot() -> Tuple[List[str], List[SyntheticTest]]:
+    db = SessionLocal()
+    try:
+        return live_worker_ids(db), db.query(SyntheticTest).filter(SyntheticTest.is_active == True).all()
+    finally:
+        db.close()
+
+
+def get_worker_health(db: Session) -> List[Dict]:
+    """Heartbeat and counters for every registered monitoring worker."""
+    cutoff = datetime.utcnow() - timedelta(seconds=WORKER_TTL_S)
+    return [
+        {
+            "worker_id": worker.worker_id,
+            "host": worker.host,
+            "pid": worker.pid,
+            "alive": worker.heartbeat_at >= cutoff,
+            "started_at": worker.started_at,
+            "heartbeat_at": worker.heartbeat_at,
+            "owned_tests": worker.owned_tests,
+            "executions": worker.executions,
+            "failures": worker.failures,
+            "loop_lag_ms": worker.loop_lag_ms,
+            "last_error": worker.last_error
+        }
+        for worker in db.query(MonitoringWorker).order_by(MonitoringWorker.worker_id).all()
+    ]
+
+
+def _worker_main(worker_id: str):
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(MonitoringShardWorker(worker_id).run())
+
+
+def run_monitoring_workers(count: int):
+    """Start count worker processes and restart any that exit until told to stop."""
+    from . import models
+    from .database import engine
+    models.Base.metadata.create_all(bind=engine)
+
+    context = multiprocessing.get_context("spawn")
+    host = socket.gethostname()
+    worker_ids = [f"{host}:monitor-{index}" for index in range(count)]
+    processes: Dict[str, multiprocessing.Process] = {}
+
+    def start(worker_id: str):
+        process = context.Process(target=_worker_main, args=(worker_id,), name=worker_id)
+        process.start()
+        processes[worker_id] = process
+
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    for worker_id in worker_ids:
+        start(worker_id)
+    logger.info(f"Started {count} monitoring workers")
+
+    while not stopping:
+        time.sleep(SUPERVISE_INTERVAL_S)
+        for worker_id, process in list(processes.items()):
+            if not process.is_alive() and not stopping:
+                logger.warning(f"Monitoring worker {worker_id} exited with code {process.exitcode}, restarting")
+                start(worker_id)
+
+    for process in processes.values():
+        if process.is_alive():
+            process.terminate()
+    for process in processes.values():
+        process.join(timeout=10)
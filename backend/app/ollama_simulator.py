@@ -0,0 +1,624 @@
+"""
+A lightweight Ollama-compatible server for load, latency and failure testing.
+
+It implements /api/tags, /api/ps and /api/generate (streaming and
+non-streaming), plus the OpenAI-compatible /v1/models, /v1/chat/completions
+and /v1/completions (non-streaming; a list of prompts is answered as one
+batch in one slot, as vLLM batches them) with configurable latency, generation speed, concurrency slots
+and injected errors and timeouts. Model residency follows Ollama: a model not
+in memory takes load_ms to load, at most max_loaded_models stay loaded (least
+recently used first out), and keep_alive sets how long a model stays after
+its last request. Answers are deterministic: questions from the question bank are
+answered correctly with probability `accuracy`, decided by a hash of the model,
+prompt and seed, so the same evaluation scores the same on every run. The /v1
+endpoints can require an API key and enforce a requests-per-minute limit,
+answering 429 with Retry-After headers past it like hosted APIs.
+
+Register it as a model endpoint (run_simulator.py) or start it in-process with
+SimulatorServer from tests and benchmarks.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Union
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from .question_bank import load_question_bank
+from .rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+DEFAULT_MODELS = ["sim-llama:latest"]
+UNKNOWN_ANSWER = "I am not sure about that one, it is outside what I know."
+DEFAULT_KEEP_ALIVE = "5m"
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_keep_alive(value: Union[str, int, float, None]) -> Optional[float]:
+    """
+    Seconds a model stays loaded for an Ollama keep_alive value.
+
+    Args:
+        value: Seconds as a number, or a duration such as "30s", "5m" or "1h30m"
+
+    Returns:
+        Seconds, 0 to unload immediately, or None to keep the model loaded indefinitely (negative values)
+    """
+    if value is None or value == "":
+        value = DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        text = value.strip()
+        try:
+            seconds = float(text)
+        except ValueError:
+            negative = text.startswith("-")
+            text = text.lstrip("-")
+            parts = _DURATION_PART.findall(text)
+            if not parts or "".join(number + unit for number, unit in parts) != text:
+                raise ValueError(f"Invalid keep_alive duration '{value}'")
+            seconds = sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+            seconds = -seconds if negative else seconds
+    return None if seconds < 0 else seconds
+
+
+class SimulatorConfig:
+    """How the simulated Ollama behaves."""
+
+    def __init__(self, models: Optional[List[str]] = None, latency: str = "fixed", latency_ms: float = 50.0,
+                 latency_spread_ms: float = 0.0, tokens_per_second: float = 0.0, slots: int = 4,
+                 max_queue: int = 0, error_rate: float = 0.0, timeout_rate: float = 0.0, timeout_s: float = 120.0,
+                 accuracy: float = 0.8, seed: int = 0, load_ms: float = 0.0, max_loaded_models: int = 0,
+                 requests_per_minute: float = 0.0, api_key: Optional[str] = None):
+        """
+        Args:
+            models: Model names listed by /api/tags and accepted by /api/generate
+            latency: Time-to-first-token distribution: fixed, uniform, normal or lognormal
+            latency_ms: Mean time to first token
+            latency_spread_ms: Half-width (uniform) or standard deviation (normal, lognormal)
+            tokens_per_second: Generation speed after the first token; 0 generates instantly
+            slots: Requests generated in parallel, like OLLAMA_NUM_PARALLEL; others wait
+            max_queue: Waiting requests before new ones get 503, like OLLAMA_MAX_QUEUE (0 = unbounded)
+            error_rate: Fraction of requests answered with a 500
+            timeout_rate: Fraction of requests that hang for timeout_s before failing
+            timeout_s: How long a hanging request holds its slot
+            accuracy: Fraction of question bank questions answered correctly
+            seed: Seed for latencies, injected failures and answers
+            load_ms: Time to load a model that is not in memory
+            max_loaded_models: Models kept in memory at once, like OLLAMA_MAX_LOADED_MODELS (0 = unlimited)
+            requests_per_minute: Rate limit of the /v1 endpoints, answered with 429 past it (0 = unlimited)
+            api_key: Bearer token the /v1 endpoints require (None = no authentication)
+        """
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{latency}', expected one of {LATENCY_DISTRIBUTIONS}")
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+        for name, rate in (("error_rate", error_rate), ("timeout_rate", timeout_rate), ("accuracy", accuracy)):
+            if not 0 <= rate <= 1:
+                raise ValueError(f"{name} must be between 0 and 1")
+
+        self.models = list(models or DEFAULT_MODELS)
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_spread_ms = latency_spread_ms
+        self.tokens_per_second = tokens_per_second
+        self.slots = slots
+        self.max_queue = max_queue
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_s = timeout_s
+        self.accuracy = accuracy
+        self.seed = seed
+        self.load_ms = load_ms
+        self.max_loaded_models = max_loaded_models
+        self.requests_per_minute = requests_per_minute
+        self.api_key = api_key
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class OllamaSimulator:
+    """Request handling state: the question bank, concurrency slots and counters."""
+
+    def __init__(self, config: SimulatorConfig, questions: Optional[List[Dict[str, str]]] = None):
+        self.config = config
+        questions = load_question_bank() if questions is None else questions
+        self._answers = {_normalize(q["question"]): q["answer"] for q in questions}
+        self._all_answers = sorted(set(self._answers.values()))
+        self._rng = random.Random(config.seed)
+        self._slots = asyncio.Semaphore(config.slots)
+        self.active = 0
+        self.waiting = 0
+        self.peak_active = 0
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self._rate_bucket = TokenBucket(config.requests_per_minute) if config.requests_per_minute else None
+        # Loaded models in least recently used order, with when they unload (None = never)
+        self._loaded: "OrderedDict[str, Optional[float]]" = OrderedDict()
+        self._load_lock = asyncio.Lock()
+        self.loads = 0
+        self.unloads = 0
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "active": self.active,
+            "waiting": self.waiting,
+            "peak_active": self.peak_active,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "rate_limited": self.rate_limited,
+            "loads": self.loads,
+            "unloads": self.unloads,
+            "loaded": self.loaded_models()
+        }
+
+    def loaded_models(self) -> List[str]:
+        self._expire()
+        return list(self._loaded)
+
+    def _expire(self):
+        now = time.monotonic()
+        for model, expires_at in list(self._loaded.items()):
+            if expires_at is not None and expires_at <= now:
+                self.unload(model)
+
+    def _keep(self, model: str, keep_alive: Optional[float]):
+        self._loaded[model] = None if keep_alive is None else time.monotonic() + keep_alive
+        self._loaded.move_to_end(model)
+
+    async def ensure_loaded(self, model: str, keep_alive: Optional[float]) -> float:
+        """Load a model if it is not in memory, evicting others past max_loaded_models. Returns the load time."""
+        async with self._load_lock:
+            self._expire()
+            if model in self._loaded:
+                self._keep(model, keep_alive)
+                return 0.0
+            while self.config.max_loaded_models and len(self._loaded) >= self.config.max_loaded_models:
+                self.unload(next(iter(self._loaded)))
+            start_time = time.perf_counter()
+            await asyncio.sleep(self.config.load_ms / 1000)
+            self.loads += 1
+            self._keep(model, keep_alive)
+            return time.perf_counter() - start_time
+
+    def finished(self, model: str, keep_alive: Optional[float]):
+        """Restart a model's keep_alive countdown after a request, as Ollama does."""
+        if model in self._loaded:
+            self._keep(model, keep_alive)
+
+    def unload(self, model: str):
+        if self._loaded.pop(model, "missing") != "missing":
+            self.unloads += 1
+
+    def first_token_delay(self) -> float:
+        """Seconds before the first token, drawn from the configured distribution."""
+        mean, spread = self.config.latency_ms, self.config.latency_spread_ms
+        if self.config.latency == "uniform":
+            delay_ms = self._rng.uniform(mean - spread, mean + spread)
+        elif self.config.latency == "normal":
+            delay_ms = self._rng.gauss(mean, spread)
+        elif self.config.latency == "lognormal":
+            # Parameters chosen so the samples have the configured mean and standard deviation
+            sigma = math.sqrt(math.log(1 + (spread / mean) ** 2)) if mean > 0 else 0.0
+            delay_ms = self._rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma) if mean > 0 else 0.0
+        else:
+            delay_ms = mean
+        return max(delay_ms, 0.0) / 1000
+
+    def answer(self, model: str, prompt: str) -> str:
+        """The deterministic response to a prompt."""
+        expected = self._answers.get(_normalize(prompt))
+        if expected is None:
+            return UNKNOWN_ANSWER
+
+        digest = _digest(str(self.config.seed), model, prompt)
+        if int(digest[:8], 16) / 0xFFFFFFFF < self.config.accuracy:
+            return f"The answer is {expected}."
+        # A wrong answer from elsewhere in the bank, one the contains-check cannot mistake for right
+        wrong = [answer for answer in self._all_answers if expected.lower() not in answer.lower()]
+        if not wrong:
+            return UNKNOWN_ANSWER
+        return f"The answer is {wrong[int(digest[8:16], 16) % len(wrong)]}."
+
+    def failure(self) -> Optional[str]:
+        """Which failure to inject into the next request: "error", "timeout" or None."""
+        roll = self._rng.random()
+        if roll < self.config.error_rate:
+            return "error"
+        if roll < self.config.error_rate + self.config.timeout_rate:
+            return "timeout"
+        return None
+
+    async def acquire(self) -> bool:
+        """Take a generation slot, or return False when the queue is full."""
+        if self.config.max_queue and self._slots.locked() and self.waiting >= self.config.max_queue:
+            self.rejected += 1
+            return False
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._slots.release()
+
+    def rate_limit_wait(self) -> float:
+        """Seconds until the rate limit admits another request; 0 takes one now."""
+        if not self._rate_bucket:
+            return 0.0
+        now = time.monotonic()
+        wait = self._rate_bucket.wait_time(1, now)
+        if wait > 0:
+            self.rate_limited += 1
+            return wait
+        self._rate_bucket.take(1, now)
+        return 0.0
+
+
+def _tokens(text: str, limit: Optional[int]) -> List[str]:
+    """Split a response into word tokens (with their leading space), at most limit of them."""
+    words = text.split(" ")
+    tokens = [word if index == 0 else f" {word}" for index, word in enumerate(words)]
+    if limit is not None and limit > 0:
+        tokens = tokens[:limit]
+    return tokens
+
+
+def _timestamp() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _openai_error(message: str, status_code: int, code: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse({"error": {"message": message, "type": "invalid_request_error", "code": code}},
+                        status_code=status_code, headers=headers)
+
+
+def create_simulator_app(config: Optional[SimulatorConfig] = None,
+                         questions: Optional[List[Dict[str, str]]] = None) -> FastAPI:
+    """
+    Build the simulator's ASGI app.
+
+    Args:
+        config: Simulator behaviour; defaults to SimulatorConfig()
+        questions: Question/answer pairs to answer from; the bundled question bank by default
+
+    Returns:
+        A FastAPI app; its OllamaSimulator is app.state.simulator
+    """
+    config = config or SimulatorConfig()
+    simulator = OllamaSimulator(config, questions)
+    app = FastAPI(title="Ollama Simulator")
+    app.state.simulator = simulator
+
+    @app.get("/")
+    async def root():
+        return PlainTextResponse("Ollama is running")
+
+    @app.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-simulator"}
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [
+            {
+                "name": name,
+                "model": name,
+                "modified_at": _timestamp(),
+                "size": 4_000_000_000,
+                "digest": _digest(name),
+                "details": {"format": "gguf", "family": "simulator", "parameter_size": "7B",
+                            "quantization_level": "Q4_0"}
+            }
+            for name in config.models
+        ]}
+
+    @app.get("/api/ps")
+    async def running_models():
+        now = time.monotonic()
+        return {"models": [
+            {
+                "name": name,
+                "model": name,
+                "size": 4_000_000_000,
+                "digest": _digest(name),
+                "expires_at": (datetime.utcnow() + timedelta(seconds=expires_at - now)).isoformat() + "Z"
+                if expires_at is not None else None
+            }
+            for name, expires_at in ((name, simulator._loaded[name]) for name in simulator.loaded_models())
+        ]}
+
+    @app.get("/simulator/stats")
+    async def stats():
+        return simulator.stats()
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        try:
+            body = await request.json()
+        except ValueError:
+            return JSONResponse({"error": "invalid JSON body"}, status_code=400)
+        model = body.get("model")
+        prompt = body.get("prompt") or ""
+        if model not in config.models:
+            return JSONResponse({"error": f"model '{model}' not found, try pulling it first"}, status_code=404)
+        try:
+            keep_alive = parse_keep_alive(body.get("keep_alive"))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        if not prompt:
+            # An empty prompt only loads the model, or unloads it with keep_alive 0
+            if keep_alive == 0:
+                simulator.unload(model)
+                return {"model": model, "created_at": _timestamp(), "response": "", "done": True,
+                        "done_reason": "unload"}
+            load_seconds = await simulator.ensure_loaded(model, keep_alive)
+            return {"model": model, "created_at": _timestamp(), "response": "", "done": True,
+                    "done_reason": "load", "load_duration": int(load_seconds * 1e9)}
+
+        simulator.requests += 1
+        received = time.perf_counter()
+        if not await simulator.acquire():
+            return JSONResponse({"error": "server busy, please try again.  maximum pending requests exceeded"},
+                                status_code=503)
+
+        released = False
+        try:
+            failure = simulator.failure()
+            if failure == "timeout":
+                simulator.timeouts += 1
+                await asyncio.sleep(config.timeout_s)
+                return JSONResponse({"error": "simulated generation timeout"}, status_code=500)
+            if failure == "error":
+                simulator.errors += 1
+                return JSONResponse({"error": "simulated model failure"}, status_code=500)
+
+            load_seconds = await simulator.ensure_loaded(model, keep_alive)
+            num_predict = (body.get("options") or {}).get("num_predict")
+            tokens = _tokens(simulator.answer(model, prompt), num_predict)
+            token_delay = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+            prompt_tokens = len(prompt.split())
+            loaded = time.perf_counter()
+            await asyncio.sleep(simulator.first_token_delay())
+
+            def final_chunk(response: str, generation_start: float) -> Dict:
+                now = time.perf_counter()
+                return {
+                    "model": model,
+                    "created_at": _timestamp(),
+                    "response": response,
+                    "done": True,
+                    "done_reason": "stop" if num_predict is None or len(tokens) < num_predict else "length",
+                    "total_duration": int((now - received) * 1e9),
+                    "load_duration": int(load_seconds * 1e9),
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": int((generation_start - loaded) * 1e9),
+                    "eval_count": len(tokens),
+                    "eval_duration": int((now - generation_start) * 1e9)
+                }
+
+            if not body.get("stream", True):
+                generation_start = time.perf_counter()
+                await asyncio.sleep(token_delay * max(len(tokens) - 1, 0))
+                simulator.finished(model, keep_alive)
+                return final_chunk("".join(tokens), generation_start)
+
+            async def stream():
+                # The slot is held until the last chunk is sent
+                try:
+                    generation_start = time.perf_counter()
+                    for index, token in enumerate(tokens):
+                        if index and token_delay:
+                            await asyncio.sleep(token_delay)
+                        yield json.dumps({"model": model, "created_at": _timestamp(), "response": token,
+                                          "done": False}) + "\n"
+                    simulator.finished(model, keep_alive)
+                    yield json.dumps(final_chunk("", generation_start)) + "\n"
+                finally:
+                    simulator.release()
+
+            released = True
+            return StreamingResponse(stream(), media_type="application/x-ndjson")
+        finally:
+            if not released:
+                simulator.release()
+
+    async def openai_generate(request: Request, body: Dict, prompts: List[str]):
+        """
+        Answer prompts for the /v1 endpoints in one slot.
+
+        Returns:
+            An error response, or (model, [(tokens, prompt token count, finish reason)]) per prompt
+        """
+        if config.api_key and request.headers.get("authorization") != f"Bearer {config.api_key}":
+            return _openai_error("Incorrect API key provided", 401, "invalid_api_key")
+        model = body.get("model")
+        if model not in config.models:
+            return _openai_error(f"The model '{model}' does not exist", 404, "model_not_found")
+        if not prompts or not all(isinstance(prompt, str) and prompt for prompt in prompts):
+            return _openai_error("prompt must be a non-empty string or list of strings", 400, "invalid_prompt")
+
+        simulator.requests += 1
+        wait = simulator.rate_limit_wait()
+        if wait > 0:
+            return _openai_error("Rate limit reached for requests", 429, "rate_limit_exceeded", headers={
+                "retry-after-ms": str(math.ceil(wait * 1000)),
+                "Retry-After": str(math.ceil(wait))
+            })
+        if not await simulator.acquire():
+            return _openai_error("Server busy, maximum pending requests exceeded", 503, "server_busy")
+
+        try:
+            failure = simulator.failure()
+            if failure == "timeout":
+                simulator.timeouts += 1
+                await asyncio.sleep(config.timeout_s)
+                return _openai_error("Simulated generation timeout", 500, "timeout")
+            if failure == "error":
+                simulator.errors += 1
+                return _openai_error("Simulated model failure", 500, "server_error")
+
+            # OpenAI-compatible servers keep their model loaded
+            await simulator.ensure_loaded(model, None)
+            max_tokens = body.get("max_tokens")
+            answers = [_tokens(simulator.answer(model, prompt), max_tokens) for prompt in prompts]
+            token_delay = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+            await asyncio.sleep(simulator.first_token_delay())
+            # A batch generates its answers side by side: the longest one sets the time
+            await asyncio.sleep(token_delay * max(len(tokens) - 1 for tokens in answers))
+            return model, [
+                (tokens, len(prompt.split()),
+                 "stop" if max_tokens is None or len(tokens) < max_tokens else "length")
+                for prompt, tokens in zip(prompts, answers)
+            ]
+        finally:
+            simulator.release()
+
+    def usage(answers) -> Dict:
+        prompt_tokens = sum(prompt_count for _, prompt_count, _ in answers)
+        completion_tokens = sum(len(tokens) for tokens, _, _ in answers)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    @app.get("/v1/models")
+    async def openai_models(request: Request):
+        if config.api_key and request.headers.get("authorization") != f"Bearer {config.api_key}":
+            return _openai_error("Incorrect API key provided", 401, "invalid_api_key")
+        return {"object": "list", "data": [
+            {"id": name, "object": "model", "created": 0, "owned_by": "simulator"}
+            for name in config.models
+        ]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        try:
+            body = await request.json()
+        except ValueError:
+            return _openai_error("Invalid JSON body", 400, "invalid_json")
+        if body.get("stream"):
+            return _openai_error("Streaming is not simulated", 400, "unsupported")
+        user_messages = [message.get("content") for message in body.get("messages") or []
+                         if isinstance(message, dict) and message.get("role") == "user"]
+        generated = await openai_generate(request, body, user_messages[-1:])
+        if isinstance(generated, JSONResponse):
+            return generated
+        model, answers = generated
+        tokens, _, finish_reason = answers[0]
+        return {
+            "id": f"chatcmpl-{simulator.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                         "finish_reason": finish_reason}],
+            "usage": usage(answers)
+        }
+
+    @app.post("/v1/completions")
+    async def completions(request: Request):
+        try:
+            body = await request.json()
+        except ValueError:
+            return _openai_error("Invalid JSON body", 400, "invalid_json")
+        if body.get("stream"):
+            return _openai_error("Streaming is not simulated", 400, "unsupported")
+        prompt = body.get("prompt")
+        generated = await openai_generate(request, body, prompt if isinstance(prompt, list) else [prompt])
+        if isinstance(generated, JSONResponse):
+            return generated
+        model, answers = generated
+        return {
+            "id": f"cmpl-{simulator.requests}",
+            "object": "text_completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": index, "text": "".join(tokens), "finish_reason": finish_reason}
+                        for index, (tokens, _, finish_reason) in enumerate(answers)],
+            "usage": usage(answers)
+        }
+
+    return app
+
+
+class SimulatorServer:
+    """Run the simulator on a local port in a background thread, for tests and benchmarks."""
+
+    def __init__(self, config: Optional[SimulatorConfig] = None, port: int = 0, **app_options):
+        """
+        Args:
+            config: Simulator behaviour
+            port: Port on 127.0.0.1; a free one when 0
+        """
+        import uvicorn
+
+        self.app = create_simulator_app(config, **app_options)
+        self.port = port or _free_port()
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=self.port,
+                                                     log_level="warning", lifespan="off"))
+        self._thread = threading.Thread(target=self._server.run, name="ollama-simulator", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def simulator(self) -> OllamaSimulator:
+        return self.app.state.simulator
+
+    def start(self, timeout: float = 10.0) -> "SimulatorServer":
+        self._thread.start()
+        deadline = time.time() + timeout
+        while not self._server.started:
+            if not self._thread.is_alive() or time.time() > deadline:
+                raise RuntimeError(f"Ollama simulator did not start on port {self.port}")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+    def __enter__(self) -> "SimulatorServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
@@ -0,0 +1,357 @@
+"""
+Opt-in profiling: span timing for requests and evaluations, a slow-query log,
+and on-demand CPU and memory profiles captured from the running process.
+
+Span timing is enabled with EVAL_FORGE_PROFILING=1. Requests then carry a
+Server-Timing header (visible in the browser's network panel) with the time
+spent in SQL, and evaluations store how long generation, scoring and result
+writes took. With profiling off, spans are shared no-op context managers.
+
+Statements slower than EVAL_FORGE_SLOW_QUERY_MS are logged and kept for
+/api/admin/slow-queries. Profiles are captured on a background thread for a
+fixed duration and written to EVAL_FORGE_PROFILE_DIR:
+
+- cpu: a sampling profiler over every thread's stack, saved as folded stacks
+  (one "frame;frame;frame count" line per stack) for flamegraph.pl or speedscope
+- memory: a tracemalloc snapshot, loadable with tracemalloc.Snapshot.load(),
+  plus the allocations that grew most during the capture
+"""
+
+import contextlib
+import contextvars
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.environ.get("EVAL_FORGE_PROFILING", "0") == "1"
+SLOW_QUERY_MS = float(os.environ.get("EVAL_FORGE_SLOW_QUERY_MS", "0"))  # 0 disables the slow-query log
+SLOW_REQUEST_MS = float(os.environ.get("EVAL_FORGE_SLOW_REQUEST_MS", "1000"))
+PROFILE_DIR = os.environ.get("EVAL_FORGE_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "eval-forge-profiles"))
+
+MAX_PROFILE_SECONDS = 300
+MAX_PROFILES = 20  # Older profiles and their files are dropped
+SLOW_QUERY_HISTORY = 100
+SUMMARY_ROWS = 25
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+class SpanTimings:
+    """Calls and time spent in each named phase of a request or evaluation."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._spans: Dict[str, Dict[str, float]] = {}
+
+    def span(self, name: str):
+        """Context manager timing one call of a phase."""
+        if not self.enabled:
+            return _NO_SPAN
+        return self._timed(name)
+
+    @contextlib.contextmanager
+    def _timed(self, name: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start_time) * 1000)
+
+    def record(self, name: str, elapsed_ms: float, calls: int = 1):
+        if not self.enabled:
+            return
+        entry = self._spans.setdefault(name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+        entry["calls"] += calls
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms / calls if calls else elapsed_ms)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "calls": entry["calls"],
+                "total_ms": round(entry["total_ms"], 3),
+                "avg_ms": round(entry["total_ms"] / entry["calls"], 3) if entry["calls"] else None,
+                "max_ms": round(entry["max_ms"], 3)
+            }
+            for name, entry in self._spans.items()
+        }
+
+    def server_timing(self) -> str:
+        """Spans as a Server-Timing header value."""
+        return ", ".join(
+            f'{name};dur={entry["total_ms"]:.1f};desc="{entry["calls"]} calls"'
+            for name, entry in self._spans.items()
+        )
+
+
+# Spans of the request being handled; run_db carries it onto the database threads
+current_spans: contextvars.ContextVar[Optional[SpanTimings]] = contextvars.ContextVar("current_spans", default=None)
+
+# Recent statements over SLOW_QUERY_MS, newest last
+slow_queries: deque = deque(maxlen=SLOW_QUERY_HISTORY)
+
+
+def trace_queries(engine):
+    """Attribute SQL time to the current request's spans and log slow statements."""
+    if not PROFILING_ENABLED and SLOW_QUERY_MS <= 0:
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profile_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["profile_start_time"].pop()) * 1000
+        spans = current_spans.get()
+        if spans is not None:
+            spans.record("db", elapsed_ms)
+        if 0 < SLOW_QUERY_MS <= elapsed_ms:
+            _log_slow_query(statement, parameters, executemany, elapsed_ms)
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("profile_start_time"):
+            connection.info["profile_start_time"].pop()
+
+
+def _log_slow_query(statement: str, parameters, executemany: bool, elapsed_ms: float):
+    rows = len(parameters) if executemany and parameters else 1
+    statement = " ".join(statement.split())
+    logger.warning(f"Slow query ({elapsed_ms:.1f}ms, {rows} rows, {threading.current_thread().name}): "
+                   f"{statement[:500]}")
+    slow_queries.append({
+        "statement": statement,
+        "duration_ms": round(elapsed_ms, 3),
+        "rows": rows,
+        "thread": threading.current_thread().name,
+        "at": datetime.utcnow().isoformat()
+    })
+
+
+class Profile:
+    """One CPU or memory capture and where its output was written."""
+
+    def __init__(self, profile_id: int, kind: str, duration_s: float, interval_ms: float):
+        self.id = profile_id
+        self.kind = kind
+        self.duration_s = duration_s
+        self.interval_ms = interval_ms
+        self.status = "running"
+        self.started_at = datetime.utcnow()
+        self.completed_at: Optional[datetime] = None
+        self.path: Optional[str] = None
+        self.summary: Optional[Dict] = None
+        self.error: Optional[str] = None
+
+    @property
+    def filename(self) -> str:
+        extension = "folded.txt" if self.kind == "cpu" else "tracemalloc"
+        return f"eval-forge-{self.kind}-{self.started_at:%Y%m%d-%H%M%S}-{self.id}.{extension}"
+
+    def to_dict(self, include_summary: bool = True) -> Dict:
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "duration_s": self.duration_s,
+            "interval_ms": self.interval_ms if self.kind == "cpu" else None,
+            "started_at": self.started_at.isoformat(),
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "filename": self.filename if self.path else None,
+            "error": self.error
+        }
+        if include_summary:
+            data["summary"] = self.summary
+        return data
+
+
+class ProfileManager:
+    """Capture profiles of this process on demand, one of each kind at a time."""
+
+    def __init__(self, directory: str = PROFILE_DIR):
+        self.directory = directory
+        self._profiles: "Dict[int, Profile]" = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def start(self, kind: str, duration_s: float, interval_ms: float = 10.0) -> Profile:
+        """
+        Start a capture on a background thread.
+
+        Args:
+            kind: "cpu" or "memory"
+            duration_s: How long to capture, at most MAX_PROFILE_SECONDS
+            interval_ms: Time between CPU samples
+
+        Returns:
+            The running Profile
+
+        Raises:
+            ValueError: If the arguments are invalid or a capture of the same kind is running
+        """
+        if kind not in ("cpu", "memory"):
+            raise ValueError(f"Unknown profile kind '{kind}'; use cpu or memory")
+        if not 0 < duration_s <= MAX_PROFILE_SECONDS:
+            raise ValueError(f"duration_s must be between 0 and {MAX_PROFILE_SECONDS}")
+        if not 1 <= interval_ms <= 1000:
+            raise ValueError("interval_ms must be between 1 and 1000")
+
+        with self._lock:
+            if any(p.kind == kind and p.status == "running" for p in self._profiles.values()):
+                raise ValueError(f"A {kind} profile is already being captured")
+            profile = Profile(self._next_id, kind, duration_s, interval_ms)
+            self._next_id += 1
+            self._profiles[profile.id] = profile
+            self._prune()
+
+        capture = self._capture_cpu if kind == "cpu" else self._capture_memory
+        threading.Thread(target=self._run, args=(profile, capture), name=f"eval-forge-profile-{profile.id}",
+                         daemon=True).start()
+        logger.info(f"Started {kind} profile {profile.id} for {duration_s}s")
+        return profile
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Profile]:
+        return sorted(self._profiles.values(), key=lambda p: p.id, reverse=True)
+
+    def _prune(self):
+        finished = sorted((p for p in self._profiles.values() if p.status != "running"), key=lambda p: p.id)
+        for profile in finished[:max(0, len(self._profiles) - MAX_PROFILES)]:
+            del self._profiles[profile.id]
+            if profile.path:
+                with contextlib.suppress(OSError):
+                    os.remove(profile.path)
+
+    def _run(self, profile: Profile, capture):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, profile.filename)
+            profile.summary = capture(profile, path)
+            profile.path = path
+            profile.status = "completed"
+        except Exception as e:
+            logger.error(f"{profile.kind} profile {profile.id} failed: {e}")
+            profile.error = str(e)
+            profile.status = "failed"
+        profile.completed_at = datetime.utcnow()
+
+    def _capture_cpu(self, profile: Profile, path: str) -> Dict:
+        stacks = sample_stacks(profile.duration_s, profile.interval_ms / 1000)
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return cpu_summary(stacks)
+
+    def _capture_memory(self, profile: Profile, path: str) -> Dict:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(25)
+        try:
+            before = _filtered(tracemalloc.take_snapshot())
+            time.sleep(profile.duration_s)
+            after = _filtered(tracemalloc.take_snapshot())
+        finally:
+            if started:
+                tracemalloc.stop()
+        after.dump(path)
+        return memory_summary(before, after)
+
+
+def sample_stacks(duration_s: float, interval_s: float) -> Counter:
+    """
+    Sample the stack of every other thread until duration_s has passed.
+
+    Returns:
+        Counter of folded stacks ("thread;outermost frame;...;innermost frame") to sample counts
+    """
+    own = threading.get_ident()
+    stacks: Counter = Counter()
+    deadline = time.perf_counter() + duration_s
+    while time.perf_counter() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            thread = names.get(thread_id, str(thread_id)).replace(";", ":")
+            stacks[";".join([thread] + [f.replace(";", ":") for f in reversed(frames)])] += 1
+        time.sleep(interval_s)
+    return stacks
+
+
+def cpu_summary(stacks: Counter) -> Dict:
+    """Sample totals and the functions most often on top of a stack (self) or anywhere in it (total)."""
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    threads: Counter = Counter()
+    for stack, count in stacks.items():
+        thread, *frames = stack.split(";")
+        threads[thread] += count
+        if frames:
+            self_counts[frames[-1]] += count
+        for frame in set(frames):
+            total_counts[frame] += count
+    return {
+        "samples": sum(stacks.values()),
+        "threads": dict(threads.most_common()),
+        "top_self": [{"function": f, "samples": n} for f, n in self_counts.most_common(SUMMARY_ROWS)],
+        "top_total": [{"function": f, "samples": n} for f, n in total_counts.most_common(SUMMARY_ROWS)]
+    }
+
+
+def memory_summary(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> Dict:
+    """Traced memory at the end of the capture, and where it grew most during it."""
+    current = after.statistics("lineno")
+    growth = after.compare_to(before, "lineno")
+    return {
+        "traced_bytes": sum(stat.size for stat in current),
+        "top_allocations": [
+            {"location": _location(stat.traceback), "size_bytes": stat.size, "blocks": stat.count}
+            for stat in current[:SUMMARY_ROWS]
+        ],
+        "top_growth": [
+            {"location": _location(stat.traceback), "size_diff_bytes": stat.size_diff, "blocks_diff": stat.count_diff}
+            for stat in growth[:SUMMARY_ROWS] if stat.size_diff > 0
+        ]
+    }
+
+
+def _filtered(snapshot: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+    return snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>")
+    ])
+
+
+def _location(traceback: tracemalloc.Traceback) -> str:
+    frame = traceback[0]
+    return f"{_short_path(frame.filename)}:{frame.lineno}"
+
+
+def _short_path(filename: str) -> str:
+    """The last two path components, enough to tell app/main.py from fastapi/routing.py."""
+    parts = filename.replace("\\", "/").rsplit("/", 2)
+    return "/".join(parts[-2:])
+
+
+# Global profile manager instance
+profile_manager = ProfileManager()
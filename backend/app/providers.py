@@ -0,0 +1,228 @@
+"""
+Model providers: how to ask a model's server a question.
+
+A model's type selects its provider. "ollama" speaks Ollama's /api/generate;
+"openai" speaks the OpenAI chat completions API, which vLLM, llama.cpp's
+server, LM Studio and hosted APIs all offer. Providers build request bodies
+and parse responses; sending, retries, concurrency and rate limits are the
+model pool's and the evaluation runner's job.
+
+Providers that accept several prompts in one request (the OpenAI legacy
+completions API, which vLLM and llama.cpp batch on the server) can answer a
+batch of questions at once when the model's batch_size is above 1.
+"""
+
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+# How long Ollama keeps the model loaded after each question; long enough to survive
+# scoring pauses, while the evaluation queue unloads it explicitly when switching models
+OLLAMA_KEEP_ALIVE = os.environ.get("EVAL_FORGE_OLLAMA_KEEP_ALIVE", "30m")
+
+
+class Generation:
+    """One answer from a provider, with the usage it reported."""
+
+    def __init__(self, text: str, prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None,
+                 load_duration_ns: Optional[int] = None):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.load_duration_ns = load_duration_ns
+
+    @property
+    def total_tokens(self) -> Optional[int]:
+        if self.prompt_tokens is None and self.completion_tokens is None:
+            return None
+        return (self.prompt_tokens or 0) + (self.completion_tokens or 0)
+
+
+def estimate_tokens(prompts: List[str], max_tokens: Optional[int]) -> int:
+    """Tokens a request may use, for rate limiting: about 4 characters per prompt token plus the completion limit."""
+    return sum(len(prompt) // 4 + 1 + (max_tokens or 0) for prompt in prompts)
+
+
+class Provider(ABC):
+    """Request bodies and response parsing for one model server API."""
+
+    name = ""
+    # Models stay loaded on the server between requests, so the evaluation queue groups them per endpoint
+    manages_residency = False
+    supports_batches = False
+
+    def headers(self, api_key: Optional[str]) -> Dict[str, str]:
+        return {}
+
+    def url(self, endpoint: str, path: str) -> str:
+        return f"{endpoint}{path}"
+
+    @abstractmethod
+    def generate_request(self, model_name: str, prompt: str, settings: Dict) -> Tuple[str, Dict]:
+        """
+        The path and JSON body asking one prompt.
+
+        Args:
+            model_name: Model to ask
+            prompt: The question
+            settings: Sampling settings: temperature, max_tokens and top_p, each optional
+        """
+
+    @abstractmethod
+    def parse_generation(self, body: Dict) -> Generation:
+        """The answer in a generate response's JSON body."""
+
+    def batch_request(self, model_name: str, prompts: List[str], settings: Dict) -> Tuple[str, Dict]:
+        raise NotImplementedError(f"The {self.name} provider does not support batches")
+
+    def parse_batch(self, body: Dict, count: int) -> List[Generation]:
+        raise NotImplementedError(f"The {self.name} provider does not support batches")
+
+    @abstractmethod
+    async def probe(self, endpoint: str, model_name: str, api_key: Optional[str] = None,
+                    timeout: float = 10.0) -> Tuple[bool, Optional[str]]:
+        """
+        Check that an endpoint answers and serves the model.
+
+        Returns:
+            (True, None) when the model is available, otherwise (False, reason)
+        """
+
+
+def _drop_none(values: Dict) -> Dict:
+    return {key: value for key, value in values.items() if value is not None}
+
+
+class OllamaProvider(Provider):
+    name = "ollama"
+    manages_residency = True
+
+    def generate_request(self, model_name: str, prompt: str, settings: Dict) -> Tuple[str, Dict]:
+        return "/api/generate", {
+            "model": model_name,
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": _drop_none({
+                "temperature": settings.get("temperature"),
+                "num_predict": settings.get("max_tokens"),
+                "top_p": settings.get("top_p")
+            })
+        }
+
+    def parse_generation(self, body: Dict) -> Generation:
+        return Generation(
+            (body.get("response") or "").strip(),
+            prompt_tokens=body.get("prompt_eval_count"),
+            completion_tokens=body.get("eval_count"),
+            load_duration_ns=body.get("load_duration")
+        )
+
+    async def probe(self, endpoint: str, model_name: str, api_key: Optional[str] = None,
+                    timeout: float = 10.0) -> Tuple[bool, Optional[str]]:
+        """A name without a tag matches any tag of it ("llama3.2" matches "llama3.2:latest")."""
+        try:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                response = await client.get(f"{endpoint}/api/tags")
+        except httpx.HTTPError as e:
+            return False, f"{type(e).__name__}: {e}"
+        if response.status_code != 200:
+            return False, f"/api/tags returned {response.status_code}"
+
+        try:
+            model_names = [model["name"] for model in response.json().get("models", [])]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return False, "/api/tags returned an unexpected body"
+        if any(name == model_name or name.startswith(model_name + ":") for name in model_names):
+            return True, None
+        return False, f"{model_name} is not available"
+
+
+class OpenAIProvider(Provider):
+    """OpenAI-compatible servers; the endpoint may be given with or without its /v1 suffix."""
+
+    name = "openai"
+    supports_batches = True
+
+    def headers(self, api_key: Optional[str]) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+    def url(self, endpoint: str, path: str) -> str:
+        return f"{endpoint}{path}" if endpoint.endswith("/v1") else f"{endpoint}/v1{path}"
+
+    def generate_request(self, model_name: str, prompt: str, settings: Dict) -> Tuple[str, Dict]:
+        return "/chat/completions", _drop_none({
+            "model": model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": settings.get("temperature"),
+            "max_tokens": settings.get("max_tokens"),
+            "top_p": settings.get("top_p")
+        })
+
+    def parse_generation(self, body: Dict) -> Generation:
+        usage = body.get("usage") or {}
+        message = body["choices"][0].get("message") or {}
+        return Generation((message.get("content") or "").strip(), prompt_tokens=usage.get("prompt_tokens"),
+                          completion_tokens=usage.get("completion_tokens"))
+
+    def batch_request(self, model_name: str, prompts: List[str], settings: Dict) -> Tuple[str, Dict]:
+        # The legacy completions API takes a list of prompts and answers them in one response
+        return "/completions", _drop_none({
+            "model": model_name,
+            "prompt": prompts,
+            "temperature": settings.get("temperature"),
+            "max_tokens": settings.get("max_tokens"),
+            "top_p": settings.get("top_p")
+        })
+
+    def parse_batch(self, body: Dict, count: int) -> List[Generation]:
+        choices = sorted(body.get("choices") or [], key=lambda choice: choice.get("index", 0))
+        if len(choices) != count:
+            raise ValueError(f"Expected {count} completions, got {len(choices)}")
+        usage = body.get("usage") or {}
+        # Usage covers the whole batch; each answer gets an even share
+        share = lambda key: usage[key] // count if usage.get(key) is not None else None
+        return [Generation((choice.get("text") or "").strip(), prompt_tokens=share("prompt_tokens"),
+                           completion_tokens=share("completion_tokens"))
+                for choice in choices]
+
+    async def probe(self, endpoint: str, model_name: str, api_key: Optional[str] = None,
+                    timeout: float = 10.0) -> Tuple[bool, Optional[str]]:
+        try:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                response = await client.get(self.url(endpoint, "/models"), headers=self.headers(api_key))
+        except httpx.HTTPError as e:
+            return False, f"{type(e).__name__}: {e}"
+        if response.status_code != 200:
+            return False, f"/v1/models returned {response.status_code}"
+
+        try:
+            model_ids = [model["id"] for model in response.json().get("data", [])]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return False, "/v1/models returned an unexpected body"
+        if model_name in model_ids:
+            return True, None
+        return False, f"{model_name} is not available"
+
+
+PROVIDERS: Dict[str, Provider] = {provider.name: provider for provider in (OllamaProvider(), OpenAIProvider())}
+
+
+def get_provider(model_type: str) -> Provider:
+    """
+    The provider for a model type.
+
+    Raises:
+        ValueError: The type has no provider
+    """
+    provider = PROVIDERS.get(model_type)
+    if not provider:
+        raise ValueError(f"Unknown model type '{model_type}', expected one of {sorted(PROVIDERS)}")
+    return provider
+
+
+def api_key_for(api_key_env: Optional[str]) -> Optional[str]:
+    """The API key a model names by environment variable; keys themselves are never stored."""
+    return os.environ.get(api_key_env) if api_key_env else None
@@ -0,0 +1,127 @@
+"""
+Client-side rate limits for model providers.
+
+Hosted OpenAI-compatible APIs limit requests and tokens per minute and answer
+429 with a Retry-After header past them. A RateLimiter keeps an evaluation
+under both limits with token buckets, so a large evaluation runs at the
+allowed rate instead of bursting into 429s, and pauses every request to the
+model when the server asks for it.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import httpx
+
+from .telemetry import rate_limit_wait_seconds
+
+# Seconds of the per-minute rate a bucket may spend at once
+BURST_S = 1.0
+
+
+class TokenBucket:
+    """Refill continuously at a per-minute rate, up to BURST_S worth of capacity."""
+
+    def __init__(self, rate_per_minute: float, burst_s: float = BURST_S):
+        self.rate_per_s = rate_per_minute / 60
+        self.capacity = max(self.rate_per_s * burst_s, 1.0)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate_per_s)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken; amounts above the capacity only need a full bucket."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.tokens
+        return max(missing / self.rate_per_s, 0.0)
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= amount
+
+    def adjust(self, amount: float):
+        """Give back (positive) or charge (negative) tokens once the real usage is known."""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one model, plus server-requested pauses."""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.paused_until = 0.0
+        self.waited_s = 0.0
+        self.pauses = 0
+
+    async def acquire(self, tokens: int = 0):
+        """
+        Wait until a request estimated to use `tokens` tokens may be sent, and charge it.
+
+        Args:
+            tokens: Prompt plus maximum completion tokens of the request
+        """
+        while True:
+            now = time.monotonic()
+            wait = max(self.paused_until - now,
+                       self.requests.wait_time(1, now) if self.requests else 0.0,
+                       self.tokens.wait_time(tokens, now) if self.tokens and tokens else 0.0)
+            if wait <= 0:
+                if self.requests:
+                    self.requests.take(1, now)
+                if self.tokens and tokens:
+                    self.tokens.take(tokens, now)
+                return
+            self.waited_s += wait
+            rate_limit_wait_seconds.inc(wait)
+            await asyncio.sleep(wait)
+
+    def settle(self, estimated: int, used: Optional[int]):
+        """Correct the token bucket with the usage a response reported."""
+        if self.tokens and used is not None:
+            self.tokens.adjust(estimated - used)
+
+    def pause(self, seconds: float):
+        """Hold every request until the server's Retry-After has passed."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.pauses += 1
+
+    def stats(self) -> Dict:
+        return {
+            "requests_per_minute": round(self.requests.rate_per_s * 60, 2) if self.requests else None,
+            "tokens_per_minute": round(self.tokens.rate_per_s * 60, 2) if self.tokens else None,
+            "waited_s": round(self.waited_s, 3),
+            "pauses": self.pauses
+        }
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """
+    How long a response asks the client to wait: retry-after-ms, or Retry-After in seconds or as an HTTP date.
+
+    Returns:
+        Seconds, or None when the response carries no usable header
+    """
+    milliseconds = response.headers.get("retry-after-ms")
+    if milliseconds:
+        try:
+            return max(float(milliseconds) / 1000, 0.0)
+        except ValueError:
+            pass
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
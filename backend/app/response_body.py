@@ -0,0 +1,117 @@
+"""
+Bounded reading of monitored responses. Bodies are streamed in chunks and
+checked as they arrive, and reading stops as soon as the check is decided and a
+preview has been kept, or when the byte cap is reached. Memory and bandwidth per
+check stay bounded however large the monitored payload is.
+"""
+
+import re
+from typing import NamedTuple, Optional, Sequence
+
+import httpx
+
+# Most of a body any single check reads
+RESPONSE_BODY_MAX_BYTES = 1024 * 1024
+
+# Characters of the body stored with each execution
+RESPONSE_BODY_PREVIEW_CHARS = 1000
+
+# UTF-8 takes up to 4 bytes per character
+_PREVIEW_BYTES = RESPONSE_BODY_PREVIEW_CHARS * 4
+
+# Bytes of each chunk kept for regex matches that straddle chunk boundaries
+REGEX_OVERLAP_BYTES = 1024
+
+
+class StreamingBodyCheck:
+    """Incremental substring or regex search over a body fed in chunks."""
+
+    def __init__(self, substring: Optional[bytes] = None, pattern: Optional[re.Pattern] = None,
+                 overlap: int = REGEX_OVERLAP_BYTES):
+        """
+        Args:
+            substring: Bytes the body must contain
+            pattern: Compiled bytes regex the body must match, used when substring is None.
+                A match longer than overlap that straddles chunks is not found.
+            overlap: Bytes carried over between chunks for regex searches
+        """
+        self.substring = substring
+        self.pattern = pattern
+        # A substring split across two chunks is at most one byte short in either
+        self._overlap = len(substring) - 1 if substring is not None else overlap
+        self._tail = b""
+        self.matched = False
+
+    @classmethod
+    def for_text(cls, text: str, encoding: Optional[str]) -> "StreamingBodyCheck":
+        """Substring check for text, encoded the way the response body is."""
+        try:
+            return cls(substring=text.encode(encoding or "utf-8"))
+        except (LookupError, UnicodeEncodeError):
+            return cls(substring=text.encode("utf-8"))
+
+    def feed(self, chunk: bytes) -> bool:
+        """Search the next chunk. Returns whether the body has matched so far."""
+        if self.matched:
+            return True
+        window = self._tail + chunk
+        if self.substring is not None:
+            self.matched = self.substring in window
+        else:
+            self.matched = self.pattern.search(window) is not None
+        self._tail = window[-self._overlap:] if self._overlap else b""
+        return self.matched
+
+
+class BodyRead(NamedTuple):
+    preview: str  # First RESPONSE_BODY_PREVIEW_CHARS characters
+    body: Optional[bytes]  # Everything read, when asked to keep the body
+    bytes_read: int  # Decoded body bytes read before stopping
+    complete: bool  # Whether the whole body was read
+    truncated: bool  # Whether reading stopped at the byte cap
+
+
+async def read_response_body(response: httpx.Response, checks: Sequence[StreamingBodyCheck] = (),
+                             max_bytes: int = RESPONSE_BODY_MAX_BYTES, keep_body: bool = False) -> BodyRead:
+    """
+    Read a streamed response only as far as needed.
+
+    Args:
+        response: Response opened with client.stream(), body not yet read
+        checks: Content checks to feed; reading can stop once all have matched
+        max_bytes: Stop reading after this many body bytes
+        keep_body: Keep and return everything read, for checks that need the whole body
+
+    Returns:
+        BodyRead with the decoded preview and how much of the body was read
+    """
+    preview = bytearray()
+    body = bytearray() if keep_body else None
+    bytes_read = 0
+    complete = True
+    truncated = False
+
+    async for chunk in response.aiter_bytes():
+        if bytes_read + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - bytes_read]
+            truncated = True
+        bytes_read += len(chunk)
+        if len(preview) < _PREVIEW_BYTES:
+            preview += chunk[:_PREVIEW_BYTES - len(preview)]
+        if keep_body:
+            body += chunk
+        decided = True
+        for check in checks:
+            decided = check.feed(chunk) and decided
+
+        if truncated:
+            complete = False
+            break
+        if decided and not keep_body and len(preview) >= _PREVIEW_BYTES:
+            # Decided, and the preview is full: the rest of the body can't change the result
+            complete = False
+            break
+
+    text = bytes(preview).decode(response.encoding or "utf-8", errors="replace")
+    return BodyRead(text[:RESPONSE_BODY_PREVIEW_CHARS], bytes(body) if keep_body else None,
+                    bytes_read, complete, truncated)
@@ -0,0 +1,127 @@
+"""
+Batched result writer for evaluation runs.
+Buffers result rows and flushes them with bulk inserts every N rows or T
+milliseconds on a dedicated writer task, so long runs commit progressively
+without paying an fsync per row.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from . import models
+from .database import SessionLocal, run_db
+from .profiling import SpanTimings
+
+logger = logging.getLogger(__name__)
+
+FLUSH_ROWS = 100
+FLUSH_INTERVAL_MS = 500
+MAX_PENDING_ROWS = 1000
+
+# Writers of evaluations currently running, so progress endpoints can report flush stats
+active_writers: Dict[int, "ResultWriter"] = {}
+
+
+class ResultWriter:
+    """Queue result rows and bulk insert them from a background task."""
+
+    def __init__(self, flush_rows: int = FLUSH_ROWS, flush_interval_ms: int = FLUSH_INTERVAL_MS,
+                 max_pending: int = MAX_PENDING_ROWS, session_factory: Callable = SessionLocal,
+                 spans: Optional[SpanTimings] = None):
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.session_factory = session_factory
+        self.spans = spans
+        # Bounded queue: producers wait when the writer falls behind, keeping memory flat
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[Exception] = None
+
+        self.rows_written = 0
+        self.flush_count = 0
+        self.total_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.last_flush_ms = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def add(self, row: Dict):
+        """Queue a result row, waiting if the buffer is full."""
+        if self._error:
+            raise self._error
+        await self._queue.put(row)
+
+    async def close(self):
+        """Flush everything still queued and stop the writer task."""
+        await self._queue.put(None)
+        if self._task:
+            await self._task
+        if self._error:
+            raise self._error
+
+    def stats(self) -> Dict:
+        return {
+            "rows_written": self.rows_written,
+            "rows_pending": self._queue.qsize(),
+            "flush_count": self.flush_count,
+            "avg_flush_ms": self.total_flush_ms / self.flush_count if self.flush_count else None,
+            "max_flush_ms": self.max_flush_ms if self.flush_count else None,
+            "last_flush_ms": self.last_flush_ms
+        }
+
+    async def _run(self):
+        batch: List[Dict] = []
+        deadline = None
+        done = False
+
+        while not done:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                row = await asyncio.wait_for(self._queue.get(), timeout)
+                if row is None:
+                    done = True
+                else:
+                    batch.append(row)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+            except asyncio.TimeoutError:
+                pass
+
+            due = deadline is not None and time.monotonic() >= deadline
+            if batch and (done or due or len(batch) >= self.flush_rows):
+                await self._flush(batch)
+                batch = []
+                deadline = None
+
+    async def _flush(self, batch: List[Dict]):
+        if self._error:
+            return
+        start_time = time.perf_counter()
+        try:
+            await run_db(self._write_batch, batch)
+        except Exception as e:
+            logger.error(f"Result flush of {len(batch)} rows failed: {e}")
+            self._error = e
+            return
+
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        self.rows_written += len(batch)
+        self.flush_count += 1
+        self.total_flush_ms += elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self.last_flush_ms = elapsed_ms
+        if self.spans:
+            self.spans.record("db_write", elapsed_ms)
+
+    def _write_batch(self, batch: List[Dict]):
+        db = self.session_factory()
+        try:
+            db.execute(insert(models.Result), batch)
+            db.commit()
+        finally:
+            db.close()
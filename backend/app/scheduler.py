@@ -1,148 +1,367 @@
 import asyncio
 import logging
+import os
+import socket
+import uuid
 from datetime import datetime, timedelta
-from typing import List
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.interval import IntervalTrigger
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import case, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from .database import SessionLocal
-from .models import SyntheticTest
+from .database import SessionLocal, fetch_first, run_db
+from .models import Lease, SyntheticTest, SyntheticTestRun
 from .synthetic_monitoring import synthetic_service
+from .telemetry import registry, scheduler_queue_wait, scheduler_runs
 
 logger = logging.getLogger(__name__)
 
+# Identifies this process in leases and run claims
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+LEASE_NAME = "synthetic_scheduler"
+LEASE_TTL_S = 30  # A leader that stops renewing is replaced after this long
+LEASE_RENEW_S = 10
+
+RECONCILE_INTERVAL_S = 60  # How quickly the leader picks up tests changed through other workers
+RUN_POLL_INTERVAL_S = 1.0
+RUN_CLAIM_TIMEOUT_S = 600  # Claims older than this belong to a dead worker and are retried
+WORKER_CONCURRENCY = 10  # Scheduled runs executing at once in one process
+
+
+class LeaderLease:
+    """Leadership lease stored in a database row, renewed by its holder until it stops."""
+
+    def __init__(self, name: str, holder: str, ttl_s: int = LEASE_TTL_S, session_factory=SessionLocal):
+        self.name = name
+        self.holder = holder
+        self.ttl = timedelta(seconds=ttl_s)
+        self.session_factory = session_factory
+
+    def try_acquire(self) -> bool:
+        """Take the lease if it is free or expired, or renew it if already held. Returns whether it is held."""
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            # A single upsert so two processes can't both take an expired lease
+            stmt = sqlite_insert(Lease).values(name=self.name, holder=self.holder, acquired_at=now,
+                                               expires_at=now + self.ttl)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Lease.name],
+                set_={
+                    "holder": stmt.excluded.holder,
+                    "expires_at": stmt.excluded.expires_at,
+                    "acquired_at": case((Lease.holder == self.holder, Lease.acquired_at),
+                                        else_=stmt.excluded.acquired_at)
+                },
+                where=or_(Lease.holder == self.holder, Lease.expires_at < now)
+            )
+            db.execute(stmt)
+            db.commit()
+            return db.query(Lease.holder).filter(Lease.name == self.name).scalar() == self.holder
+        finally:
+            db.close()
+
+    def release(self):
+        """Expire the lease now so another process can take over without waiting for the TTL."""
+        db = self.session_factory()
+        try:
+            db.query(Lease).filter(Lease.name == self.name, Lease.holder == self.holder).update(
+                {Lease.expires_at: datetime.utcnow()}
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def current(self) -> Optional[Lease]:
+        db = self.session_factory()
+        try:
+            return db.query(Lease).filter(Lease.name == self.name).first()
+        finally:
+            db.close()
+
+
 class SyntheticTestScheduler:
-    def __init__(self):
-        self.scheduler = AsyncIOScheduler()
+    """
+    Runs synthetic tests on their intervals across any number of API processes.
+
+    One process holds the scheduler lease and enqueues due runs into
+    synthetic_test_runs; every process, the leader included, claims runs from
+    that queue and executes them. Each due run is executed exactly once no
+    matter how many workers or replicas are started.
+    """
+
+    def __init__(self, worker_id: str = WORKER_ID):
+        # APScheduler is imported when this process becomes leader, keeping it off the import path
+        self.scheduler = None
         self.running = False
-    
+        self.is_leader = False
+        self.worker_id = worker_id
+        self.lease = LeaderLease(LEASE_NAME, worker_id)
+        self._lease_expires: Optional[datetime] = None
+        self._tasks: List[asyncio.Task] = []
+        self._active_runs = 0
+
     async def start(self):
-        """Start the scheduler and schedule all active tests"""
+        """Start competing for leadership and executing queued runs"""
         if self.running:
             return
-        
-        self.scheduler.start()
+
         self.running = True
-        
+        # Contend once before returning so a lone process schedules its tests right away
+        await self._renew_lease()
+        self._tasks = [asyncio.create_task(self._hold_lease()), asyncio.create_task(self._process_runs())]
+        logger.info(f"Synthetic test scheduler started (worker {self.worker_id})")
+
+    def stop(self):
+        """Stop the scheduler and hand leadership over"""
+        if not self.running:
+            return
+
+        self.running = False
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+        if self.is_leader:
+            self._stop_leading()
+            try:
+                self.lease.release()
+            except Exception as e:
+                logger.error(f"Error releasing scheduler lease: {e}")
+        logger.info("Synthetic test scheduler stopped")
+
+    async def _hold_lease(self):
+        """Renew or contend for the lease for as long as the scheduler runs"""
+        while self.running:
+            await asyncio.sleep(LEASE_RENEW_S)
+            await self._renew_lease()
+
+    async def _renew_lease(self):
+        """Acquire or renew the lease, starting or stopping the schedule as leadership changes"""
+        try:
+            held = await run_db(self.lease.try_acquire)
+            if held:
+                self._lease_expires = datetime.utcnow() + self.lease.ttl
+        except Exception as e:
+            logger.error(f"Error renewing scheduler lease: {e}")
+            # Keep leading only while the last successful renewal is still valid
+            held = self.is_leader and self._lease_expires is not None and datetime.utcnow() < self._lease_expires
+
+        if held and not self.is_leader:
+            await self._start_leading()
+        elif not held and self.is_leader:
+            self._stop_leading()
+
+    async def _start_leading(self):
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+        from apscheduler.triggers.interval import IntervalTrigger
+
+        self.scheduler = AsyncIOScheduler()
+        self.scheduler.start()
+        self.is_leader = True
+        logger.info(f"Worker {self.worker_id} is now the synthetic test scheduler leader")
+
         # Schedule all active tests
         await self.schedule_all_active_tests()
-        
-        # Schedule periodic rescheduling (every 5 minutes)
+
+        # Periodically pick up tests changed through other workers and retry abandoned runs
         self.scheduler.add_job(
             self.reschedule_tests,
-            IntervalTrigger(minutes=5),
+            IntervalTrigger(seconds=RECONCILE_INTERVAL_S),
             id="reschedule_tests",
             replace_existing=True
         )
-        
-        logger.info("Synthetic test scheduler started")
-    
-    def stop(self):
-        """Stop the scheduler"""
-        if not self.running:
-            return
-        
-        self.scheduler.shutdown()
-        self.running = False
-        logger.info("Synthetic test scheduler stopped")
-    
+
+    def _stop_leading(self):
+        if self.scheduler:
+            self.scheduler.shutdown(wait=False)
+        self.scheduler = None
+        self.is_leader = False
+        logger.info(f"Worker {self.worker_id} is no longer the synthetic test scheduler leader")
+
     async def schedule_all_active_tests(self):
         """Schedule all active synthetic tests"""
-        db = SessionLocal()
         try:
-            active_tests = db.query(SyntheticTest).filter(SyntheticTest.is_active == True).all()
-            
+            active_tests = await run_db(_active_tests)
+
             for test in active_tests:
                 self.schedule_test(test)
-                
+
             logger.info(f"Scheduled {len(active_tests)} active tests")
         except Exception as e:
             logger.error(f"Error scheduling tests: {e}")
-        finally:
-            db.close()
-    
+
     def schedule_test(self, test: SyntheticTest):
-        """Schedule a single test for periodic execution"""
+        """Schedule a single test for periodic execution; followers leave this to the leader's reconciliation"""
+        if not self.is_leader:
+            return
+
+        from apscheduler.triggers.interval import IntervalTrigger
         job_id = f"test_{test.id}"
-        
+
         # Remove existing job if it exists
         if self.scheduler.get_job(job_id):
             self.scheduler.remove_job(job_id)
-        
+
         # Only schedule if test is active and has valid interval
         if not test.is_active or test.interval <= 0:
             return
-        
+
         # Add new job
         self.scheduler.add_job(
-            self.execute_scheduled_test,
+            self.enqueue_test,
             IntervalTrigger(seconds=test.interval),
             args=[test.id],
             id=job_id,
             replace_existing=True,
             next_run_time=datetime.now() + timedelta(seconds=10)  # Start in 10 seconds
         )
-        
+
         logger.info(f"Scheduled test '{test.name}' (ID: {test.id}) to run every {test.interval} seconds")
-    
+
     def unschedule_test(self, test_id: int):
         """Remove a test from the schedule"""
+        if not self.is_leader:
+            return
+
         job_id = f"test_{test_id}"
-        
+
         if self.scheduler.get_job(job_id):
             self.scheduler.remove_job(job_id)
             logger.info(f"Unscheduled test ID: {test_id}")
-    
+
+    async def enqueue_test(self, test_id: int):
+        """Queue a due run for whichever worker claims it first"""
+        await run_db(self._enqueue, test_id)
+
+    def _enqueue(self, test_id: int):
+        db = SessionLocal()
+        try:
+            # A test still waiting or running from its last interval isn't queued twice
+            if db.query(SyntheticTestRun).filter(SyntheticTestRun.test_id == test_id).first():
+                logger.warning(f"Test ID {test_id} is still queued or running, skipping this interval")
+                return
+            db.add(SyntheticTestRun(test_id=test_id, enqueued_at=datetime.utcnow()))
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error queueing test {test_id}: {e}")
+        finally:
+            db.close()
+
+    def _claim_run(self) -> Optional[Tuple[int, int]]:
+        """Claim the oldest waiting run. Returns (run id, test id), or None if the queue is empty."""
+        db = SessionLocal()
+        try:
+            waiting = db.query(SyntheticTestRun.id, SyntheticTestRun.test_id, SyntheticTestRun.enqueued_at).filter(
+                SyntheticTestRun.claimed_by == None
+            ).order_by(SyntheticTestRun.id).limit(WORKER_CONCURRENCY).all()
+
+            for run_id, test_id, enqueued_at in waiting:
+                # Conditional update: only one worker's claim on a run succeeds
+                claimed_at = datetime.utcnow()
+                claimed = db.query(SyntheticTestRun).filter(
+                    SyntheticTestRun.id == run_id, SyntheticTestRun.claimed_by == None
+                ).update({SyntheticTestRun.claimed_by: self.worker_id, SyntheticTestRun.claimed_at: claimed_at})
+                db.commit()
+                if claimed:
+                    # How far behind schedule runs start
+                    scheduler_queue_wait.observe(max(0.0, (claimed_at - enqueued_at).total_seconds()))
+                    return run_id, test_id
+            return None
+        finally:
+            db.close()
+
+    def _finish_run(self, run_id: int):
+        db = SessionLocal()
+        try:
+            db.query(SyntheticTestRun).filter(SyntheticTestRun.id == run_id).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    async def _process_runs(self):
+        """Claim and execute queued runs, up to WORKER_CONCURRENCY at a time"""
+        slots = asyncio.Semaphore(WORKER_CONCURRENCY)
+        while self.running:
+            await slots.acquire()
+            try:
+                run = await run_db(self._claim_run)
+            except Exception as e:
+                logger.error(f"Error claiming synthetic test run: {e}")
+                run = None
+
+            if run is None:
+                slots.release()
+                await asyncio.sleep(RUN_POLL_INTERVAL_S)
+                continue
+
+            task = asyncio.create_task(self._execute_run(*run))
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _execute_run(self, run_id: int, test_id: int):
+        self._active_runs += 1
+        try:
+            await self.execute_scheduled_test(test_id)
+        finally:
+            self._active_runs -= 1
+            try:
+                await run_db(self._finish_run, run_id)
+            except Exception as e:
+                logger.error(f"Error finishing synthetic test run {run_id}: {e}")
+
     async def execute_scheduled_test(self, test_id: int):
         """Execute a scheduled test"""
         db = SessionLocal()
         try:
-            test = db.query(SyntheticTest).filter(SyntheticTest.id == test_id).first()
-            
+            test = await run_db(fetch_first, db.query(SyntheticTest).filter(SyntheticTest.id == test_id))
+
             if not test:
                 logger.warning(f"Test ID {test_id} not found, removing from schedule")
-                await self.unschedule_test(test_id)
+                self.unschedule_test(test_id)
                 return
-            
+
             if not test.is_active:
                 logger.info(f"Test '{test.name}' is inactive, removing from schedule")
-                await self.unschedule_test(test_id)
+                self.unschedule_test(test_id)
                 return
-            
+
             # Execute the test
             logger.info(f"Executing scheduled test: {test.name}")
             execution = await synthetic_service.execute_test(test, db)
+            scheduler_runs.labels(execution.status).inc()
             logger.info(f"Test '{test.name}' completed with status: {execution.status}")
-            
+
         except Exception as e:
+            scheduler_runs.labels("exception").inc()
             logger.error(f"Error executing scheduled test {test_id}: {e}")
         finally:
-            db.close()
-    
+            await run_db(db.close)
+
     async def reschedule_tests(self):
         """Periodically check for new/updated tests and reschedule as needed"""
+        if not self.is_leader:
+            return
+
         try:
-            db = SessionLocal()
-            active_tests = db.query(SyntheticTest).filter(SyntheticTest.is_active == True).all()
-            
+            active_tests = await run_db(_active_tests)
+
             # Get currently scheduled job IDs
             scheduled_job_ids = {job.id for job in self.scheduler.get_jobs() if job.id.startswith("test_")}
             active_test_ids = {f"test_{test.id}" for test in active_tests}
-            
+
             # Remove jobs for tests that are no longer active
             for job_id in scheduled_job_ids - active_test_ids:
-                if job_id != "reschedule_tests":  # Don't remove the reschedule job
-                    self.scheduler.remove_job(job_id)
-                    logger.info(f"Removed job for inactive test: {job_id}")
-            
+                self.scheduler.remove_job(job_id)
+                logger.info(f"Removed job for inactive test: {job_id}")
+
             # Add/update jobs for active tests
             for test in active_tests:
                 job_id = f"test_{test.id}"
                 existing_job = self.scheduler.get_job(job_id)
-                
+
                 if not existing_job:
                     # New test, schedule it
-                    await self.schedule_test(test)
+                    self.schedule_test(test)
                 else:
                     # Check if interval has changed
                     current_interval = existing_job.trigger.interval.total_seconds()
@@ -150,11 +369,63 @@ class SyntheticTestScheduler:
                         # Reschedule with new interval
                         self.schedule_test(test)
                         logger.info(f"Rescheduled test '{test.name}' with new interval: {test.interval}s")
-            
-            db.close()
-            
+
+            # Return runs claimed by workers that died mid-run to the queue
+            released = await run_db(_requeue_abandoned_runs)
+            if released:
+                logger.warning(f"Requeued {released} abandoned synthetic test runs")
+
         except Exception as e:
             logger.error(f"Error in reschedule_tests: {e}")
 
+    def status(self) -> Dict:
+        """Leadership and queue state as seen from this process"""
+        lease = self.lease.current()
+        db = SessionLocal()
+        try:
+            queued = db.query(SyntheticTestRun).filter(SyntheticTestRun.claimed_by == None).count()
+            running = db.query(SyntheticTestRun).filter(SyntheticTestRun.claimed_by != None).count()
+        finally:
+            db.close()
+
+        return {
+            "worker_id": self.worker_id,
+            "is_leader": self.is_leader,
+            "leader": lease.holder if lease and lease.expires_at > datetime.utcnow() else None,
+            "lease_expires_at": lease.expires_at.isoformat() if lease else None,
+            "scheduled_tests": len([job for job in self.scheduler.get_jobs() if job.id.startswith("test_")])
+                if self.scheduler else None,
+            "active_runs_here": self._active_runs,
+            "queued_runs": queued,
+            "running_runs": running
+        }
+
+def _active_tests() -> List[SyntheticTest]:
+    db = SessionLocal()
+    try:
+        return db.query(SyntheticTest).filter(SyntheticTest.is_active == True).all()
+    finally:
+        db.close()
+
+def _requeue_abandoned_runs() -> int:
+    stale_before = datetime.utcnow() - timedelta(seconds=RUN_CLAIM_TIMEOUT_S)
+    db = SessionLocal()
+    try:
+        released = db.query(SyntheticTestRun).filter(
+            SyntheticTestRun.claimed_by != None, SyntheticTestRun.claimed_at < stale_before
+        ).update({SyntheticTestRun.claimed_by: None, SyntheticTestRun.claimed_at: None})
+        db.commit()
+        return released
+    finally:
+        db.close()
+
 # Global scheduler instance
 scheduler = SyntheticTestScheduler()
+
+registry.gauge("eval_forge_scheduler_is_leader", "Whether this process holds the scheduler lease",
+               function=lambda: 1 if scheduler.is_leader else 0)
+registry.gauge("eval_forge_scheduler_active_runs", "Scheduled runs executing in this process",
+               function=lambda: scheduler._active_runs)
+registry.gauge("eval_forge_scheduler_scheduled_tests", "Tests on the leader's schedule",
+               function=lambda: len([job for job in scheduler.scheduler.get_jobs() if job.id.startswith("test_")])
+               if scheduler.scheduler else None)
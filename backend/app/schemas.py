@@ -7,6 +7,12 @@ class ModelBase(BaseModel):
     type: str
     endpoint: str
     model_name: str
+    replica_endpoints: Optional[str] = None  # JSON list of more endpoints serving the same model
+    parallel_requests: int = 1
+    api_key_env: Optional[str] = None  # Name of the environment variable holding the API key
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+    batch_size: int = 1
 
 class ModelCreate(ModelBase):
     pass
@@ -24,12 +30,43 @@ class EvaluationBase(BaseModel):
     temperature: float = 0.7
     max_tokens: int = 512
     top_p: float = 0.9
+    mode: str = "full"  # full, adaptive
+    target_ci_width: Optional[float] = None
+    confidence_level: float = 0.95
+    min_questions: int = 30
+    baseline_evaluation_id: Optional[int] = None
+    metrics: Optional[str] = None  # JSON list of scorer names
 
 class EvaluationCreate(EvaluationBase):
     pass
 
+class EvaluationQueueRequest(BaseModel):
+    evaluation_ids: List[int]
+    resume: bool = False
+
+class DatasetItem(BaseModel):
+    id: int
+    question: str
+    expected_answer: str
+    
+    class Config:
+        from_attributes = True
+
+class Dataset(BaseModel):
+    id: int
+    name: str
+    version: int
+    content_hash: str
+    content_dataset_id: Optional[int] = None
+    item_count: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
 class Evaluation(EvaluationBase):
     id: int
+    dataset_id: Optional[int] = None
     status: str
     total_questions: int
     accuracy: Optional[float] = None
@@ -48,6 +85,17 @@ class Evaluation(EvaluationBase):
     avg_semantic_similarity: Optional[float] = None
     avg_response_time: Optional[float] = None
     
+    # Sequential sampling statistics
+    accuracy_ci_lower: Optional[float] = None
+    accuracy_ci_upper: Optional[float] = None
+    metric_intervals: Optional[str] = None
+    stop_reason: Optional[str] = None
+    scorer_timings: Optional[str] = None
+    phase_timings: Optional[str] = None
+    model_load_ms: Optional[float] = None
+    model_loads: Optional[int] = None
+    infrastructure_errors: Optional[int] = None
+    
     class Config:
         from_attributes = True
 
@@ -72,6 +120,8 @@ class ResultBase(BaseModel):
 class Result(ResultBase):
     id: int
     evaluation_id: int
+    dataset_item_id: Optional[int] = None
+    infrastructure_error: Optional[bool] = None
     
     # Advanced metrics
     bleu_score: Optional[float] = None
@@ -79,6 +129,52 @@ class Result(ResultBase):
     rouge_2_score: Optional[float] = None
     rouge_l_score: Optional[float] = None
     semantic_similarity: Optional[float] = None
+    extra_metrics: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+# Benchmark Schemas
+class BenchmarkBase(BaseModel):
+    name: str
+    model_id: int
+    mode: str = "concurrency"  # concurrency, rate
+    levels: str = "[1, 2, 4, 8]"  # JSON list
+    requests_per_step: int = 20
+    max_tokens: int = 128
+
+class BenchmarkCreate(BenchmarkBase):
+    pass
+
+class BenchmarkStep(BaseModel):
+    id: int
+    level: float
+    total_requests: int
+    successful_requests: int
+    failed_requests: int
+    error_rate: float
+    throughput: float
+    tokens_per_second: float
+    avg_latency: Optional[float] = None
+    p50_latency: Optional[float] = None
+    p90_latency: Optional[float] = None
+    p95_latency: Optional[float] = None
+    p99_latency: Optional[float] = None
+    duration: float
+    
+    class Config:
+        from_attributes = True
+
+class Benchmark(BenchmarkBase):
+    id: int
+    status: str
+    saturation_level: Optional[float] = None
+    peak_throughput: Optional[float] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    model_name: Optional[str] = None
+    steps: List[BenchmarkStep] = []
     
     class Config:
         from_attributes = True
@@ -101,6 +197,7 @@ class SyntheticTestBase(BaseModel):
     auth_credentials: Optional[str] = None
     ssl_check_enabled: bool = False
     alert_thresholds: Optional[str] = None
+    assertions: Optional[str] = None  # JSON list, see assertions.py
     browser_steps: Optional[str] = None
 
 class SyntheticTestCreate(SyntheticTestBase):
@@ -113,6 +210,21 @@ class SyntheticTest(SyntheticTestBase):
     class Config:
         from_attributes = True
 
+class Alert(BaseModel):
+    id: int
+    test_id: int
+    rule: str
+    status: str
+    value: Optional[float] = None
+    threshold: Optional[float] = None
+    message: Optional[str] = None
+    flapping: bool = False
+    started_at: datetime
+    resolved_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
 class SyntheticExecutionBase(BaseModel):
     status: str
     response_time: float
@@ -200,3 +312,40 @@ class ExternalApp(ExternalAppBase):
 
     class Config:
         from_attributes = True
+
+class EndpointCheck(BaseModel):
+    id: int
+    sweep_id: int
+    endpoint_id: int
+    status: str
+    status_code: Optional[int] = None
+    response_time: float
+    error_message: Optional[str] = None
+    executed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class EndpointSweep(BaseModel):
+    id: int
+    external_app_id: int
+    total: int
+    succeeded: int
+    failed: int
+    duration_ms: float
+    started_at: datetime
+    completed_at: datetime
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class EndpointSweepDetail(EndpointSweep):
+    checks: List[EndpointCheck] = []
+
+# Admin profiling schemas
+class ProfileCreate(BaseModel):
+    kind: str = "cpu"  # cpu, memory
+    duration_s: float = 10.0
+    interval_ms: float = 10.0  # Between CPU samples
+
@@ -0,0 +1,298 @@
+"""
+Pluggable scorer registry for evaluation metrics.
+Each evaluation picks the scorers it wants; scorers declare whether they can
+score in batches, what hardware they are bound by and whether their results
+may be cached, and the pipeline records the time spent in each one.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from .lexical import lexical_scorer
+from .metrics import metrics_calculator
+from .telemetry import scorer_cache_hits, scorer_errors, scorer_pairs, scorer_seconds
+
+logger = logging.getLogger(__name__)
+
+# Scorer outputs stored in dedicated Result columns; anything else goes to Result.extra_metrics
+RESULT_COLUMNS = {
+    'bleu_score': 'bleu_score',
+    'rouge1': 'rouge_1_score',
+    'rouge2': 'rouge_2_score',
+    'rougeL': 'rouge_l_score',
+    'semantic_similarity': 'semantic_similarity'
+}
+
+DEFAULT_SCORERS = ['bleu', 'rouge', 'semantic_similarity']
+
+CACHE_SIZE = 10000
+
+
+class Scorer:
+    """A metric that scores a (reference, candidate) pair."""
+
+    def __init__(self, name: str, score_fn: Callable[[str, str], Dict[str, Optional[float]]], outputs: List[str],
+                 batch_fn: Optional[Callable[[List[str], List[str]], List[Dict[str, Optional[float]]]]] = None,
+                 device: Union[str, Callable[[], Optional[str]]] = "cpu", cacheable: bool = True,
+                 description: str = ""):
+        """
+        Args:
+            name: Registry name used in an evaluation's metric selection
+            score_fn: Scores one pair and returns {output_name: value}
+            outputs: Output names this scorer produces
+            batch_fn: Optional function scoring aligned lists of pairs in one call
+            device: "cpu" or "gpu", whichever bounds the scorer's cost, or a function returning it once known
+            cacheable: Whether results are deterministic and may be cached per pair
+            description: Short human readable description
+        """
+        self.name = name
+        self.score_fn = score_fn
+        self.outputs = outputs
+        self.batch_fn = batch_fn
+        self._device = device
+        self.cacheable = cacheable
+        self.description = description
+
+    @property
+    def device(self) -> Optional[str]:
+        return self._device() if callable(self._device) else self._device
+
+    @property
+    def batchable(self) -> bool:
+        return self.batch_fn is not None
+
+    def describe(self) -> Dict:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "outputs": self.outputs,
+            "batchable": self.batchable,
+            "device": self.device,
+            "cacheable": self.cacheable
+        }
+
+
+class ScorerTimings:
+    """Time and call counts spent in each scorer during one evaluation."""
+
+    def __init__(self):
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def record(self, scorer: str, elapsed_ms: float, calls: int = 1, cache_hits: int = 0):
+        entry = self._timings.setdefault(scorer, {"calls": 0, "cache_hits": 0, "total_ms": 0.0})
+        entry["calls"] += calls
+        entry["cache_hits"] += cache_hits
+        entry["total_ms"] += elapsed_ms
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                **entry,
+                "total_ms": round(entry["total_ms"], 3),
+                "avg_ms": round(entry["total_ms"] / entry["calls"], 3) if entry["calls"] else None
+            }
+            for name, entry in self._timings.items()
+        }
+
+
+class ScorerRegistry:
+    """Registered scorers plus the pipeline that runs a selection of them."""
+
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        self._scorers: Dict[str, Scorer] = {}
+        self._cache: "OrderedDict[Tuple[str, str, str], Dict]" = OrderedDict()
+        self.cache_size = cache_size
+
+    def register(self, scorer: Scorer):
+        self._scorers[scorer.name] = scorer
+
+    def get(self, name: str) -> Optional[Scorer]:
+        return self._scorers.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._scorers)
+
+    def describe(self) -> List[Dict]:
+        return [scorer.describe() for scorer in self._scorers.values()]
+
+    def resolve(self, names: Optional[List[str]]) -> List[Scorer]:
+        """Scorers for a selection; None selects the defaults. Raises ValueError for anything but a list of known names."""
+        names = DEFAULT_SCORERS if names is None else names
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            raise ValueError("Expected a list of scorer names")
+        unknown = [name for name in names if name not in self._scorers]
+        if unknown:
+            raise ValueError(f"Unknown scorers: {', '.join(unknown)}")
+        return [self._scorers[name] for name in names]
+
+    def _cache_get(self, key):
+        value = self._cache.get(key)
+        if value is not None:
+            self._cache.move_to_end(key)
+        return value
+
+    def _cache_put(self, key, value: Dict):
+        self._cache[key] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _prepare(self, reference: str, candidate: str) -> Optional[Tuple[str, str]]:
+        """Clean a pair once for all scorers; None when there is nothing to score."""
+        if not reference or not candidate:
+            return None
+        reference = metrics_calculator._clean_text(reference)
+        candidate = metrics_calculator._clean_text(candidate)
+        if not reference or not candidate:
+            return None
+        return reference, candidate
+
+    def _empty(self, scorers: List[Scorer]) -> Dict[str, Optional[float]]:
+        return {output: None for scorer in scorers for output in scorer.outputs}
+
+    def empty_metrics(self, names: Optional[List[str]] = None) -> Dict[str, Optional[float]]:
+        """Every output of a selection set to None, for answers that couldn't be scored."""
+        return self._empty(self.resolve(names))
+
+    def score(self, reference: str, candidate: str, names: Optional[List[str]] = None,
+              timings: Optional[ScorerTimings] = None) -> Dict[str, Optional[float]]:
+        """
+        Run the selected scorers on one pair.
+
+        Args:
+            reference: Expected/reference text
+            candidate: Model-generated text
+            names: Scorers to run (None for the defaults)
+            timings: Optional accumulator for per-scorer time
+
+        Returns:
+            Dictionary with every output of the selected scorers
+        """
+        scorers = self.resolve(names)
+        pair = self._prepare(reference, candidate)
+        if pair is None:
+            return self._empty(scorers)
+
+        metrics = {}
+        for scorer in scorers:
+            start_time = time.perf_counter()
+            key = (scorer.name, pair[0], pair[1])
+            cached = self._cache_get(key) if scorer.cacheable else None
+            if cached is not None:
+                metrics.update(cached)
+            else:
+                try:
+                    values = scorer.score_fn(*pair)
+                except Exception as e:
+                    # One failing scorer leaves only its own outputs empty
+                    logger.error(f"Scorer {scorer.name} failed: {e}")
+                    scorer_errors.labels(scorer.name).inc()
+                    values = self._empty([scorer])
+                metrics.update(values)
+                if scorer.cacheable and None not in values.values():
+                    self._cache_put(key, values)
+            elapsed = time.perf_counter() - start_time
+            _record_scorer(scorer.name, elapsed, 1, 1 if cached is not None else 0)
+            if timings:
+                timings.record(scorer.name, elapsed * 1000, cache_hits=1 if cached is not None else 0)
+        return metrics
+
+    def score_batch(self, pairs: List[Tuple[str, str]], names: Optional[List[str]] = None,
+                    timings: Optional[ScorerTimings] = None) -> List[Dict[str, Optional[float]]]:
+        """Run the selected scorers on many pairs, using batch functions where scorers have them."""
+        scorers = self.resolve(names)
+        prepared = [self._prepare(reference, candidate) for reference, candidate in pairs]
+        results = [self._empty(scorers) for _ in pairs]
+        indices = [i for i, pair in enumerate(prepared) if pair is not None]
+
+        for scorer in scorers:
+            start_time = time.perf_counter()
+            pending = []
+            cache_hits = 0
+            for i in indices:
+                cached = self._cache_get((scorer.name, *prepared[i])) if scorer.cacheable else None
+                if cached is not None:
+                    results[i].update(cached)
+                    cache_hits += 1
+                else:
+                    pending.append(i)
+
+            try:
+                if pending and scorer.batchable:
+                    batch_values = scorer.batch_fn([prepared[i][0] for i in pending],
+                                                   [prepared[i][1] for i in pending])
+                else:
+                    batch_values = [scorer.score_fn(*prepared[i]) for i in pending]
+            except Exception as e:
+                logger.error(f"Scorer {scorer.name} failed on a batch of {len(pending)} pairs: {e}")
+                scorer_errors.labels(scorer.name).inc(len(pending))
+                batch_values = [self._empty([scorer]) for _ in pending]
+
+            for i, values in zip(pending, batch_values):
+                results[i].update(values)
+                if scorer.cacheable and None not in values.values():
+                    self._cache_put((scorer.name, *prepared[i]), values)
+
+            elapsed = time.perf_counter() - start_time
+            _record_scorer(scorer.name, elapsed, len(indices), cache_hits)
+            if timings:
+                timings.record(scorer.name, elapsed * 1000, calls=len(indices), cache_hits=cache_hits)
+        return results
+
+
+def _record_scorer(name: str, elapsed_s: float, pairs: int, cache_hits: int):
+    """Process-wide scorer totals for /metrics, alongside the per-evaluation ScorerTimings."""
+    scorer_seconds.labels(name).inc(elapsed_s)
+    scorer_pairs.labels(name).inc(pairs)
+    if cache_hits:
+        scorer_cache_hits.labels(name).inc(cache_hits)
+
+
+def metrics_to_result_fields(metrics: Dict[str, Optional[float]]) -> Dict:
+    """Map scorer outputs onto Result columns, putting outputs without a column into extra_metrics."""
+    fields = {column: None for column in RESULT_COLUMNS.values()}
+    extras = {}
+    for name, value in metrics.items():
+        if name in RESULT_COLUMNS:
+            fields[RESULT_COLUMNS[name]] = value
+        else:
+            extras[name] = value
+    fields["extra_metrics"] = json.dumps(extras) if extras else None
+    return fields
+
+
+def _exact_match(reference: str, candidate: str) -> Dict[str, Optional[float]]:
+    return {"exact_match": 1.0 if reference.strip().lower() == candidate.strip().lower() else 0.0}
+
+
+def _bleu_batch(references: List[str], candidates: List[str]) -> List[Dict[str, Optional[float]]]:
+    return [{"bleu_score": score} for score in lexical_scorer.bleu_batch(references, candidates)]
+
+
+def _semantic_batch(references: List[str], candidates: List[str]) -> List[Dict[str, Optional[float]]]:
+    scores = metrics_calculator.calculate_semantic_similarity_batch(references, candidates)
+    return [{"semantic_similarity": score} for score in scores]
+
+
+# Global registry with the built-in scorers
+scorer_registry = ScorerRegistry()
+scorer_registry.register(Scorer(
+    "exact_match", _exact_match, ["exact_match"],
+    description="Case-insensitive exact match of the whole answer"
+))
+scorer_registry.register(Scorer(
+    "bleu", lambda reference, candidate: {"bleu_score": lexical_scorer.bleu(reference, candidate)},
+    ["bleu_score"], batch_fn=_bleu_batch, description="Smoothed sentence BLEU"
+))
+scorer_registry.register(Scorer(
+    "rouge", lexical_scorer.rouge, ["rouge1", "rouge2", "rougeL"], batch_fn=lexical_scorer.rouge_batch,
+    description="ROUGE-1, ROUGE-2 and ROUGE-L F-measure"
+))
+scorer_registry.register(Scorer(
+    "semantic_similarity",
+    lambda reference, candidate: {"semantic_similarity": metrics_calculator.calculate_semantic_similarity(reference, candidate)},
+    ["semantic_similarity"], batch_fn=_semantic_batch, device=metrics_calculator.embedding_device,
+    description="Cosine similarity of sentence embeddings"
+))
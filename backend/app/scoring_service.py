@@ -0,0 +1,347 @@
+"""
+Scoring sidecar: one local process holds the scorer models and serves scoring
+requests from every API worker over a Unix socket. Requests that arrive within
+a short coalescing window are scored together as one batch, so workers scale
+horizontally without each loading its own copy of the models.
+
+Start it with `python run_scorer.py` and point the API at it by setting
+EVAL_FORGE_SCORER_SOCKET to the same socket path.
+"""
+
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import metrics_calculator
+from .scorers import ScorerRegistry, ScorerTimings, scorer_registry
+
+logger = logging.getLogger(__name__)
+
+# Socket shared by the sidecar and API workers; unset means score in-process
+SCORER_SOCKET = os.environ.get("EVAL_FORGE_SCORER_SOCKET")
+
+COALESCE_WINDOW_MS = 10
+MAX_BATCH_PAIRS = 256
+REQUEST_TIMEOUT_S = 60.0
+
+# Scoring is CPU/GPU bound, so it runs on its own threads instead of the event loop. One thread by
+# default: scorers share the registry's cache and models, and batch encodes parallelize internally.
+SCORER_THREADS = int(os.environ.get("EVAL_FORGE_SCORER_THREADS", "1"))
+scoring_executor = ThreadPoolExecutor(max_workers=SCORER_THREADS, thread_name_prefix="eval-forge-scorer")
+
+_HEADER = struct.Struct("!I")
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[Dict]:
+    """Read one length-prefixed JSON message, or None when the peer closed the connection."""
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    return json.loads(await reader.readexactly(length))
+
+
+def encode_frame(message: Dict) -> bytes:
+    payload = json.dumps(message).encode()
+    return _HEADER.pack(len(payload)) + payload
+
+
+class _PendingRequest:
+    """A score request waiting for its coalesced batch."""
+
+    def __init__(self, pairs: List[Tuple[str, str]], names: Optional[List[str]]):
+        self.pairs = pairs
+        self.names = names
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class ScoringServer:
+    """Unix socket server that coalesces score requests into batches."""
+
+    def __init__(self, socket_path: str, window_ms: int = COALESCE_WINDOW_MS, max_batch_pairs: int = MAX_BATCH_PAIRS,
+                 registry: ScorerRegistry = scorer_registry):
+        self.socket_path = socket_path
+        self.window = window_ms / 1000.0
+        self.max_batch_pairs = max_batch_pairs
+        self.registry = registry
+        self._queue: Optional[asyncio.Queue] = None
+        self._server = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._connections = set()
+
+        self.requests = 0
+        self.batches = 0
+        self.pairs_scored = 0
+        self.max_batch_seen = 0
+
+    async def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._run_batches())
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        logger.info(f"Scoring sidecar listening on {self.socket_path}")
+
+    async def serve_forever(self):
+        await self.start()
+        metrics_calculator.start_warm_up()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            # Ending the reads lets each connection handler return on its own
+            for reader, writer in list(self._connections):
+                reader.feed_eof()
+                writer.close()
+            await self._server.wait_closed()
+        if self._batcher:
+            self._batcher.cancel()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "pairs_scored": self.pairs_scored,
+            "avg_batch_pairs": self.pairs_scored / self.batches if self.batches else None,
+            "max_batch_pairs": self.max_batch_seen,
+            "queued_requests": self._queue.qsize() if self._queue else 0
+        }
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Requests on one connection are answered as they finish, not in order
+        write_lock = asyncio.Lock()
+        tasks = set()
+        self._connections.add((reader, writer))
+        try:
+            while True:
+                message = await read_frame(reader)
+                if message is None:
+                    break
+                task = asyncio.create_task(self._answer(message, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except Exception as e:
+            logger.error(f"Scoring connection failed: {e}")
+        finally:
+            self._connections.discard((reader, writer))
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _answer(self, message: Dict, writer: asyncio.StreamWriter, write_lock: asyncio.Lock):
+        response = {"id": message.get("id")}
+        try:
+            response.update(await self._dispatch(message))
+        except Exception as e:
+            response["error"] = str(e)
+        async with write_lock:
+            writer.write(encode_frame(response))
+            await writer.drain()
+
+    async def _dispatch(self, message: Dict) -> Dict:
+        op = message.get("op")
+        if op == "ready":
+            return {"readiness": metrics_calculator.readiness()}
+        if op == "stats":
+            return {"stats": self.stats()}
+        if op != "score":
+            raise ValueError(f"Unknown op '{op}'")
+
+        names = message.get("metrics")
+        self.registry.resolve(names)
+        request = _PendingRequest([tuple(pair) for pair in message["pairs"]], names)
+        self.requests += 1
+        await self._queue.put(request)
+        return await request.future
+
+    async def _run_batches(self):
+        while True:
+            batch = [await self._queue.get()]
+            total_pairs = len(batch[0].pairs)
+            deadline = time.monotonic() + self.window
+
+            # Coalesce whatever arrives within the window, up to the batch size
+            while total_pairs < self.max_batch_pairs:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(request)
+                total_pairs += len(request.pairs)
+
+            groups: Dict[Tuple, List[_PendingRequest]] = {}
+            for request in batch:
+                key = tuple(request.names) if request.names is not None else None
+                groups.setdefault(key, []).append(request)
+            for requests in groups.values():
+                await self._score_group(requests)
+
+    async def _score_group(self, requests: List[_PendingRequest]):
+        pairs = [pair for request in requests for pair in request.pairs]
+        timings = ScorerTimings()
+        try:
+            # Keep the loop free to accept the next window's requests
+            results = await run_scoring(self.registry.score_batch, pairs, requests[0].names, timings)
+        except Exception as e:
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.pairs_scored += len(pairs)
+        self.max_batch_seen = max(self.max_batch_seen, len(pairs))
+
+        summary = timings.summary()
+        offset = 0
+        for request in requests:
+            count = len(request.pairs)
+            if not request.future.done():
+                request.future.set_result({
+                    "results": results[offset:offset + count],
+                    "timings": summary,
+                    "batch_pairs": len(pairs)
+                })
+            offset += count
+
+
+class ScoringClient:
+    """Connection from an API worker to the scoring sidecar, multiplexing concurrent requests."""
+
+    def __init__(self, socket_path: str, timeout: float = REQUEST_TIMEOUT_S):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._loop = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+
+    async def _ensure_connected(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Connections belong to one event loop; start over on a new one
+            self._writer = None
+            self._loop = loop
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is None or self._writer.is_closing():
+                self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+                self._reader_task = asyncio.create_task(self._read_responses(self._reader))
+
+    async def _read_responses(self, reader: asyncio.StreamReader):
+        error = ConnectionError("Scoring sidecar closed the connection")
+        try:
+            while True:
+                message = await read_frame(reader)
+                if message is None:
+                    break
+                future = self._pending.pop(message.get("id"), None)
+                if future and not future.done():
+                    future.set_result(message)
+        except Exception as e:
+            error = e
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+            if self._writer:
+                self._writer.close()
+                self._writer = None
+
+    async def request(self, message: Dict) -> Dict:
+        await self._ensure_connected()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._writer.write(encode_frame({**message, "id": request_id}))
+        await self._writer.drain()
+        try:
+            response = await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+        if "error" in response:
+            raise RuntimeError(f"Scoring sidecar error: {response['error']}")
+        return response
+
+    async def score_batch(self, pairs: List[Tuple[str, str]], names: Optional[List[str]] = None,
+                          timings: Optional[ScorerTimings] = None) -> List[Dict[str, Optional[float]]]:
+        """Score pairs on the sidecar; same contract as ScorerRegistry.score_batch."""
+        response = await self.request({"op": "score", "pairs": [list(pair) for pair in pairs], "metrics": names})
+        if timings:
+            # Attribute this request's share of each coalesced batch's time to it
+            share = len(pairs) / response["batch_pairs"] if response["batch_pairs"] else 0
+            for scorer, entry in response["timings"].items():
+                timings.record(scorer, entry["total_ms"] * share, calls=len(pairs))
+        return response["results"]
+
+    async def score(self, reference: str, candidate: str, names: Optional[List[str]] = None,
+                    timings: Optional[ScorerTimings] = None) -> Dict[str, Optional[float]]:
+        return (await self.score_batch([(reference, candidate)], names, timings))[0]
+
+    async def close(self):
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    async def readiness(self) -> Dict:
+        return (await self.request({"op": "ready"}))["readiness"]
+
+    async def stats(self) -> Dict:
+        return (await self.request({"op": "stats"}))["stats"]
+
+
+# Client used by API workers when a sidecar is configured
+scoring_client = ScoringClient(SCORER_SOCKET) if SCORER_SOCKET else None
+
+
+async def run_scoring(fn, *args, **kwargs):
+    """Run blocking scoring work on the scoring threads and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(scoring_executor, functools.partial(fn, *args, **kwargs))
+
+
+async def score_pairs(pairs: List[Tuple[str, str]], names: Optional[List[str]] = None,
+                      timings: Optional[ScorerTimings] = None) -> List[Dict[str, Optional[float]]]:
+    """
+    Score pairs as one batch on the sidecar when configured, falling back to in-process scoring if it is unreachable.
+
+    In-process scoring, including loading models the first time, runs on the scoring threads.
+
+    Raises:
+        RuntimeError: The sidecar failed to score the pairs
+    """
+    if scoring_client:
+        try:
+            return await scoring_client.score_batch(pairs, names, timings)
+        except (OSError, ConnectionError, asyncio.TimeoutError) as e:
+            logger.error(f"Scoring sidecar unavailable, scoring in-process: {e}")
+    return await run_scoring(scorer_registry.score_batch, pairs, names, timings)
+
+
+async def score_pair(reference: str, candidate: str, names: Optional[List[str]] = None,
+                     timings: Optional[ScorerTimings] = None) -> Dict[str, Optional[float]]:
+    """Score one pair, like score_pairs."""
+    return (await score_pairs([(reference, candidate)], names, timings))[0]
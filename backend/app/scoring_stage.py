@@ -0,0 +1,126 @@
+"""
+Batched scoring stage for evaluation runs.
+Workers hand answered questions to a background task and go straight back to
+asking, so generation concurrency isn't held up by scoring. The task scores
+whatever has queued up as one batch, letting batch scorers (embeddings) see
+many pairs at once, then passes each row on in the order it arrived.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .profiling import SpanTimings
+from .scorers import ScorerTimings, scorer_registry
+from .scoring_service import score_pairs
+
+logger = logging.getLogger(__name__)
+
+# Most answers scored in one batch
+SCORING_BATCH_PAIRS = int(os.environ.get("EVAL_FORGE_SCORING_BATCH_PAIRS", "64"))
+MAX_PENDING_ROWS = 1000
+
+
+class ScoringStage:
+    """Queue answered result rows and score them in batches from a background task."""
+
+    def __init__(self, names: Optional[List[str]], on_scored: Callable[[Dict, Optional[Dict]], Awaitable[None]],
+                 timings: Optional[ScorerTimings] = None, spans: Optional[SpanTimings] = None,
+                 batch_pairs: int = SCORING_BATCH_PAIRS, max_pending: int = MAX_PENDING_ROWS):
+        """
+        Args:
+            names: Scorers to run (None for the defaults)
+            on_scored: Called with each row and its metrics (None for rows without an answer), in queue order
+            timings: Optional accumulator for per-scorer time
+            spans: Optional phase timings, recording each batch as a scoring span
+            batch_pairs: Most answers scored in one batch
+            max_pending: Rows queued before workers wait for scoring to catch up
+        """
+        self.names = names
+        self.on_scored = on_scored
+        self.timings = timings
+        self.spans = spans
+        self.batch_pairs = batch_pairs
+        # Bounded queue: workers wait when scoring falls behind, keeping memory flat
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[Exception] = None
+
+        self.batches = 0
+        self.pairs_scored = 0
+        self.max_batch_seen = 0
+        self.total_scoring_ms = 0.0
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def add(self, row: Dict, pair: Optional[Tuple[str, str]]):
+        """Queue a row with its (reference, answer) pair to score, or None to pass it on unscored."""
+        if self._error:
+            raise self._error
+        await self._queue.put((row, pair))
+
+    async def close(self):
+        """Score everything still queued and stop the scoring task."""
+        await self._queue.put(None)
+        if self._task:
+            await self._task
+        if self._error:
+            raise self._error
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "pairs_scored": self.pairs_scored,
+            "rows_pending": self._queue.qsize(),
+            "avg_batch_pairs": self.pairs_scored / self.batches if self.batches else None,
+            "max_batch_pairs": self.max_batch_seen,
+            "total_scoring_ms": self.total_scoring_ms
+        }
+
+    async def _run(self):
+        done = False
+        while not done:
+            items = []
+            # Wait for one row, then take whatever else is already queued
+            item = await self._queue.get()
+            while item is not None:
+                items.append(item)
+                if len(items) >= self.batch_pairs or self._queue.empty():
+                    break
+                item = self._queue.get_nowait()
+            done = item is None
+            if items:
+                await self._score(items)
+
+    async def _score(self, items: List[Tuple[Dict, Optional[Tuple[str, str]]]]):
+        # After a failure rows are only drained, so workers never wait on a stopped stage
+        if self._error:
+            return
+        pairs = [pair for _, pair in items if pair is not None]
+        metrics = []
+        if pairs:
+            start_time = time.perf_counter()
+            try:
+                metrics = await score_pairs(pairs, self.names, self.timings)
+            except Exception as e:
+                # The answers are the model's either way, so a scoring failure only leaves their metrics empty
+                logger.error(f"Scoring {len(pairs)} answers failed, keeping them without metrics: {e}")
+                metrics = [scorer_registry.empty_metrics(self.names) for _ in pairs]
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            self.batches += 1
+            self.pairs_scored += len(pairs)
+            self.max_batch_seen = max(self.max_batch_seen, len(pairs))
+            self.total_scoring_ms += elapsed_ms
+            if self.spans:
+                self.spans.record("scoring", elapsed_ms, calls=len(pairs))
+
+        scored = iter(metrics)
+        try:
+            for row, pair in items:
+                await self.on_scored(row, next(scored) if pair is not None else None)
+        except Exception as e:
+            logger.error(f"Passing on scored rows failed: {e}")
+            self._error = e
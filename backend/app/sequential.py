@@ -0,0 +1,172 @@
+"""
+Sequential sampling statistics for adaptive evaluations.
+Maintains running confidence intervals for accuracy and metric means so an
+evaluation can stop once its estimates are precise enough or a comparison
+against a baseline evaluation is decided.
+
+The baseline comparison is checked after every answer, so it uses an
+anytime-valid confidence sequence for the evaluation's accuracy (a normal
+mixture boundary for the 1/2-sub-Gaussian answers) rather than a fixed-level
+interval, which would be crossed by chance far more often than 1 - confidence
+when looked at repeatedly. The error budget is split between that sequence
+and the baseline's fixed Wilson interval, so the chance of declaring two
+equally accurate models different stays below 1 - confidence_level however
+long the evaluation runs.
+"""
+
+import math
+from statistics import NormalDist
+from typing import Dict, Optional, Tuple
+
+
+# Samples the confidence sequence is tuned for when the evaluation's size is unknown
+DEFAULT_HORIZON = 200
+
+
+def mixture_radius(total: int, alpha: float, rho: float) -> float:
+    """
+    Radius of a two-sided normal mixture confidence sequence for a mean of values in [0, 1].
+
+    With V = total / 4 (the variance bound of values in [0, 1]), the running sum stays within
+    sqrt((V + rho) * (log((V + rho) / rho) + 2 log(1 / alpha))) of its expectation at every
+    sample size at once with probability at least 1 - alpha (Howard et al., 2021).
+
+    Args:
+        total: Samples so far
+        alpha: Error probability over the whole sequence
+        rho: Mixture precision, in units of V; the boundary is tightest around V = rho times a few
+
+    Returns:
+        Radius for the mean after `total` samples
+    """
+    if total == 0:
+        return 1.0
+    v = total / 4
+    return math.sqrt((v + rho) * (math.log((v + rho) / rho) + 2 * math.log(1 / alpha))) / total
+
+
+def mixture_rho(horizon: int, alpha: float) -> float:
+    """Mixture precision that makes the confidence sequence tightest after `horizon` samples."""
+    log_term = -2 * math.log(alpha)
+    return (max(horizon, 1) / 4) / (log_term + math.log(log_term + 1))
+
+
+def wilson_interval(successes: int, total: int, z: float) -> Tuple[float, float]:
+    """Wilson score interval for a binomial proportion."""
+    if total == 0:
+        return 0.0, 1.0
+
+    p = successes / total
+    denominator = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class RunningMean:
+    """Welford's online mean/variance for a single metric."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def interval(self, z: float) -> Optional[Tuple[float, float]]:
+        """Normal-approximation interval for the mean, or None with fewer than two samples."""
+        if self.count < 2:
+            return None
+        std_error = math.sqrt(self._m2 / (self.count - 1) / self.count)
+        return self.mean - z * std_error, self.mean + z * std_error
+
+
+class SequentialEstimator:
+    """Track accuracy and metric intervals as results arrive and decide when to stop."""
+
+    def __init__(self, confidence_level: float = 0.95, target_width: Optional[float] = None,
+                 baseline: Optional[Tuple[int, int]] = None, min_samples: int = 30,
+                 horizon: Optional[int] = None):
+        """
+        Args:
+            confidence_level: Two-sided confidence level of every interval
+            target_width: Stop once the accuracy interval is at most this wide
+            baseline: (correct, total) of a baseline evaluation to compare against
+            min_samples: Never stop before this many questions have been answered
+            horizon: Questions the evaluation may ask in total; the baseline comparison is tightest there
+        """
+        self.z = NormalDist().inv_cdf((1 + confidence_level) / 2)
+        # Half of the comparison's error budget for each side: this evaluation's sequence and the baseline
+        self.comparison_alpha = (1 - confidence_level) / 2
+        self.comparison_z = NormalDist().inv_cdf(1 - self.comparison_alpha / 2)
+        self.rho = mixture_rho(horizon or max(min_samples, DEFAULT_HORIZON), self.comparison_alpha)
+        self.target_width = target_width
+        self.baseline = baseline
+        self.min_samples = min_samples
+        self.correct = 0
+        self.total = 0
+        self.metrics: Dict[str, RunningMean] = {}
+
+    def add(self, is_correct: bool, metrics: Optional[Dict[str, Optional[float]]] = None):
+        self.total += 1
+        if is_correct:
+            self.correct += 1
+        for name, value in (metrics or {}).items():
+            if value is not None:
+                self.metrics.setdefault(name, RunningMean()).add(value)
+
+    def accuracy_interval(self) -> Tuple[float, float]:
+        return wilson_interval(self.correct, self.total, self.z)
+
+    def metric_intervals(self) -> Dict[str, Dict[str, float]]:
+        """Mean and interval bounds for every metric that has enough samples."""
+        intervals = {}
+        for name, running in self.metrics.items():
+            bounds = running.interval(self.z)
+            if bounds:
+                intervals[name] = {"mean": running.mean, "lower": bounds[0], "upper": bounds[1]}
+        return intervals
+
+    def accuracy_sequence_interval(self) -> Tuple[float, float]:
+        """Anytime-valid interval for accuracy at level 1 - comparison_alpha, safe to check after every answer."""
+        p = self.correct / self.total if self.total else 0.5
+        radius = mixture_radius(self.total, self.comparison_alpha, self.rho)
+        return max(0.0, p - radius), min(1.0, p + radius)
+
+    def baseline_difference_interval(self) -> Optional[Tuple[float, float]]:
+        """
+        Interval for (accuracy - baseline accuracy) that holds at every sample size at once.
+
+        Combines this evaluation's confidence sequence with the baseline's Wilson interval,
+        each at half the error budget, so their difference covers with probability at least
+        confidence_level (a union bound).
+        """
+        if not self.baseline or self.baseline[1] == 0 or self.total == 0:
+            return None
+
+        l1, u1 = self.accuracy_sequence_interval()
+        l2, u2 = wilson_interval(self.baseline[0], self.baseline[1], self.comparison_z)
+        return l1 - u2, u1 - l2
+
+    def stop_reason(self) -> Optional[str]:
+        """Return why sampling can stop, or None to keep going."""
+        if self.total < self.min_samples:
+            return None
+
+        difference = self.baseline_difference_interval()
+        if difference:
+            if difference[0] > 0:
+                return "better_than_baseline"
+            if difference[1] < 0:
+                return "worse_than_baseline"
+
+        if self.target_width is not None:
+            lower, upper = self.accuracy_interval()
+            if upper - lower <= self.target_width:
+                return "target_width_reached"
+
+        return None
@@ -1,16 +1,48 @@
+import asyncio
 import httpx
+import logging
 import time
 import json
 import ssl
 import socket
 from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
 from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from . import models, schemas
+from .alerting import alert_engine
+from .assertions import assertion_cache
+from .database import run_db
+from .response_body import StreamingBodyCheck, read_response_body
+from .telemetry import InstrumentedTransport, synthetic_check_duration
+
+logger = logging.getLogger(__name__)
+
+def auth_headers(auth_type: Optional[str], auth_credentials: Optional[str]) -> Dict[str, str]:
+    """Request headers for a test's or external app's stored authentication"""
+    if auth_type == "api_key" and auth_credentials:
+        auth_data = json.loads(auth_credentials)
+        return {auth_data.get("header_name", "X-API-Key"): auth_data.get("key")}
+    if auth_type == "bearer_token" and auth_credentials:
+        auth_data = json.loads(auth_credentials)
+        return {"Authorization": f"Bearer {auth_data.get('token')}"}
+    return {}
 
 class SyntheticMonitoringService:
     
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        # Shared connection pool, e.g. one per monitoring worker; None opens a client per check
+        self.client = client
+    
+    @asynccontextmanager
+    async def _http_client(self, timeout: int):
+        if self.client:
+            yield self.client
+        else:
+            async with httpx.AsyncClient(timeout=timeout, transport=InstrumentedTransport("synthetic")) as client:
+                yield client
+    
     async def execute_api_test(self, test: models.SyntheticTest) -> Dict:
         """Execute API/HTTP test with authentication and enhanced validation"""
         start_time = time.time()
@@ -20,43 +52,82 @@ class SyntheticMonitoringService:
             body = json.loads(test.body) if test.body else None
             
             # Add authentication headers
-            if test.auth_type == "api_key" and test.auth_credentials:
-                auth_data = json.loads(test.auth_credentials)
-                headers[auth_data.get("header_name", "X-API-Key")] = auth_data.get("key")
-            elif test.auth_type == "bearer_token" and test.auth_credentials:
-                auth_data = json.loads(test.auth_credentials)
-                headers["Authorization"] = f"Bearer {auth_data.get('token')}"
+            headers.update(auth_headers(test.auth_type, test.auth_credentials))
             
-            async with httpx.AsyncClient(timeout=test.timeout) as client:
-                response = await client.request(
+            # Compiled once per test definition, not per execution
+            assertions = assertion_cache.get(test)
+            
+            async with self._http_client(test.timeout) as client:
+                request = client.build_request(
                     method=test.method,
                     url=test.url,
                     headers=headers,
-                    json=body if body else None
+                    json=body if body else None,
+                    timeout=test.timeout
                 )
+                # Stream the body so large payloads are never held in memory whole
+                response = await client.send(request, stream=True)
+                try:
+                    first_byte_time = (time.time() - start_time) * 1000
+                    
+                    check = None
+                    if test.expected_response_contains:
+                        check = StreamingBodyCheck.for_text(test.expected_response_contains, response.encoding)
+                    pattern_checks = assertions.body_checks() if assertions else []
+                    body_read = await read_response_body(
+                        response, ([check] if check else []) + pattern_checks,
+                        keep_body=bool(assertions and assertions.needs_body)
+                    )
+                    bytes_downloaded = response.num_bytes_downloaded
+                finally:
+                    await response.aclose()
                 
                 end_time = time.time()
                 response_time = (end_time - start_time) * 1000  # Convert to milliseconds
                 
                 # Check if response meets expectations
                 status_ok = response.status_code == test.expected_status
-                content_ok = True
+                content_ok = check.matched if check else True
                 
-                if test.expected_response_contains:
-                    content_ok = test.expected_response_contains in response.text
+                assertion_results = []
+                if assertions:
+                    assertion_results = assertions.evaluate(
+                        response.headers, body_read.body, body_read.truncated, pattern_checks,
+                        {"response_time": response_time, "first_byte_time": first_byte_time}
+                    )
+                failed_assertions = [result["assertion"] for result in assertion_results if not result["passed"]]
                 
-                success = status_ok and content_ok
+                success = status_ok and content_ok and not failed_assertions
+                
+                error_message = None
+                if not success:
+                    error_message = f"Status: {response.status_code}, Content check: {content_ok}"
+                    if not content_ok and body_read.truncated:
+                        error_message += f" (searched the first {body_read.bytes_read} bytes)"
+                    if failed_assertions:
+                        error_message += f", Failed assertions: {'; '.join(failed_assertions)}"
                 
+                content_length = response.headers.get("content-length")
                 return {
                     "status": "success" if success else "failure",
                     "response_time": response_time,
                     "status_code": response.status_code,
-                    "response_body": response.text[:1000],  # Limit response body size
-                    "error_message": None if success else f"Status: {response.status_code}, Content check: {content_ok}",
+                    "response_body": body_read.preview,
+                    "error_message": error_message,
                     "dns_time": None,  # Could be enhanced with detailed timing
                     "connect_time": None,
                     "ssl_time": None,
-                    "first_byte_time": None
+                    "first_byte_time": first_byte_time,
+                    "details": {
+                        # Declared size, or the measured size when the whole body was read
+                        "body_size": int(content_length) if content_length and content_length.isdigit()
+                            else (body_read.bytes_read if body_read.complete else None),
+                        "body_bytes_read": body_read.bytes_read,
+                        "bytes_downloaded": bytes_downloaded,
+                        "body_complete": body_read.complete,
+                        "body_truncated": body_read.truncated,
+                        "assertions": assertion_results
+                    }
                 }
                 
         except httpx.TimeoutException:
@@ -110,10 +181,11 @@ class SyntheticMonitoringService:
             # SSL certificate check if enabled
             ssl_info = None
             if test.ssl_check_enabled and test.url.startswith('https://'):
-                ssl_info = self._check_ssl_certificate(test.url)
+                # Blocking socket handshake; keep it off the event loop
+                ssl_info = await asyncio.to_thread(self._check_ssl_certificate, test.url)
             
-            async with httpx.AsyncClient(timeout=test.timeout) as client:
-                response = await client.get(test.url)
+            async with self._http_client(test.timeout) as client:
+                response = await client.get(test.url, timeout=test.timeout)
                 
                 end_time = time.time()
                 response_time = (end_time - start_time) * 1000
@@ -174,6 +246,7 @@ class SyntheticMonitoringService:
     
     async def execute_test(self, test: models.SyntheticTest, db: Session) -> models.SyntheticExecution:
         """Execute a synthetic test and save results"""
+        start_time = time.perf_counter()
         
         # Execute the appropriate test type
         if test.test_type == "api":
@@ -195,7 +268,20 @@ class SyntheticMonitoringService:
                 "first_byte_time": None
             }
         
+        synthetic_check_duration.labels(test.test_type, result["status"]).observe(time.perf_counter() - start_time)
+        
         # Save execution result to database
+        execution = await run_db(self._save_execution, test, result, db)
+        
+        try:
+            await alert_engine.observe(test, execution, db)
+        except Exception as e:
+            await run_db(db.rollback)
+            logger.error(f"Error evaluating alerts for test {test.id}: {e}")
+        
+        return execution
+    
+    def _save_execution(self, test: models.SyntheticTest, result: Dict, db: Session) -> models.SyntheticExecution:
         execution = models.SyntheticExecution(
             test_id=test.id,
             status=result["status"],
@@ -207,13 +293,12 @@ class SyntheticMonitoringService:
             connect_time=result["connect_time"],
             ssl_time=result["ssl_time"],
             first_byte_time=result["first_byte_time"],
+            details=json.dumps(result["details"]) if result.get("details") else None,
             executed_at=datetime.now()
         )
         
         db.add(execution)
         db.commit()
-        db.refresh(execution)
-        
         return execution
     
     def _check_ssl_certificate(self, url: str) -> Dict:
@@ -0,0 +1,421 @@
+"""
+In-process counters, gauges and histograms for Eval Forge's own performance,
+rendered in the Prometheus text format at /metrics.
+
+Updating a metric costs a dictionary lookup and a short lock, so hot paths
+(every request, every query) can record without measurable overhead. Values
+that already live elsewhere (scheduler state, event loop lag) are read through
+callbacks when scraped instead of being copied on every change. Each process
+keeps its own registry, so with several API workers every worker is a target.
+"""
+
+import bisect
+import math
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; request, query and check latencies
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds; model calls and queue waits, which run much longer
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_NAME_RE = re.compile(r"^[a-zA-Z_:][a-zA-Z0-9_:]*$")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable] = None):
+        """
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Label names; values are given with labels()
+            function: Called at scrape time for the current value instead of recording
+                updates (a number, or for labelled metrics a dict of label tuples to numbers)
+        """
+        if not _NAME_RE.match(name):
+            raise ValueError(f"Invalid metric name '{name}'")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values) -> object:
+        """The child for one combination of label values, created on first use."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use labels()")
+        return self.labels()
+
+    def _collected(self) -> List[Tuple[Tuple[str, ...], float]]:
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception:
+                return []
+            if not self.labelnames:
+                return [] if value is None else [((), float(value))]
+            return [(tuple(str(v) for v in key), float(number)) for key, number in value.items() if number is not None]
+        return [(key, child.value) for key, child in list(self._children.items())]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self._collected():
+            lines.append(f"{self.name}{_label_text(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+
+class Counter(_Metric):
+    """A total that only goes up. Names end in _total."""
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """A value that goes up and down."""
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set(self, value: float):
+        self._default().set(value)
+
+
+class _HistogramValues:
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last bucket is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    """Context manager observing the seconds its block took."""
+
+    def __init__(self, target):
+        self.target = target
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.target.observe(time.perf_counter() - self.start)
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(float(bound) for bound in buckets))
+
+    def _new_child(self):
+        return _HistogramValues(self.bounds)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self) -> _Timer:
+        return self._default().time()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), counts):
+                cumulative += count
+                labels = _label_text(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Every metric of this process, rendered together for a scrape."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                function: Optional[Callable] = None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, function))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              function: Optional[Callable] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry for this process
+registry = MetricsRegistry()
+
+# HTTP API
+http_requests = registry.counter(
+    "eval_forge_http_requests_total", "API requests handled", ("method", "route", "status"))
+http_request_duration = registry.histogram(
+    "eval_forge_http_request_duration_seconds", "API request latency", ("method", "route"))
+http_requests_in_progress = registry.gauge(
+    "eval_forge_http_requests_in_progress", "API requests being handled")
+
+# Evaluations
+evaluations_finished = registry.counter(
+    "eval_forge_evaluations_total", "Evaluation runs finished", ("status",))
+evaluations_running = registry.gauge(
+    "eval_forge_evaluations_running", "Evaluation runs in progress")
+evaluation_questions = registry.counter(
+    "eval_forge_evaluation_questions_total", "Questions asked by evaluation runs", ("outcome",))
+evaluation_question_duration = registry.histogram(
+    "eval_forge_evaluation_question_duration_seconds", "Time to ask and score one question", buckets=SLOW_BUCKETS)
+evaluation_model_load_seconds = registry.counter(
+    "eval_forge_evaluation_model_load_seconds_total", "Time Ollama reported loading models for evaluation requests")
+evaluations_queued = registry.gauge(
+    "eval_forge_evaluations_queued", "Evaluations waiting in the residency-aware queue")
+model_swaps = registry.counter(
+    "eval_forge_model_swaps_total", "Model changes made by the evaluation queue on an endpoint")
+replica_requests = registry.counter(
+    "eval_forge_replica_requests_total", "Evaluation requests per model replica", ("endpoint", "outcome"))
+replica_outstanding = registry.gauge(
+    "eval_forge_replica_outstanding_requests", "Requests in flight per model replica", ("endpoint",))
+replica_healthy = registry.gauge(
+    "eval_forge_replica_healthy", "1 while a model replica's circuit is closed, 0 while open or probing",
+    ("endpoint",))
+replica_concurrency_limit = registry.gauge(
+    "eval_forge_replica_concurrency_limit", "Adaptive concurrency limit per model replica", ("endpoint",))
+circuit_trips = registry.counter(
+    "eval_forge_circuit_trips_total", "Times a model replica's circuit breaker opened", ("endpoint",))
+model_request_retries = registry.counter(
+    "eval_forge_model_request_retries_total", "Evaluation requests retried after an overload failure")
+rate_limit_wait_seconds = registry.counter(
+    "eval_forge_rate_limit_wait_seconds_total", "Time evaluation requests waited for provider rate limits")
+
+# Scorers
+scorer_seconds = registry.counter(
+    "eval_forge_scorer_seconds_total", "Time spent in each scorer", ("scorer",))
+scorer_pairs = registry.counter(
+    "eval_forge_scorer_pairs_total", "Pairs scored by each scorer, cache hits included", ("scorer",))
+scorer_cache_hits = registry.counter(
+    "eval_forge_scorer_cache_hits_total", "Pairs answered from the scorer cache", ("scorer",))
+scorer_errors = registry.counter(
+    "eval_forge_scorer_errors_total", "Pairs a scorer failed on, left without its metrics", ("scorer",))
+scorer_warm_up_seconds = registry.gauge(
+    "eval_forge_scorer_warm_up_seconds", "How long loading and warming up the scorers took")
+
+# Synthetic test scheduling
+scheduler_queue_wait = registry.histogram(
+    "eval_forge_scheduler_queue_wait_seconds", "Time from a run being queued to being claimed", buckets=SLOW_BUCKETS)
+scheduler_runs = registry.counter(
+    "eval_forge_scheduler_runs_total", "Scheduled synthetic test runs executed here", ("status",))
+synthetic_check_duration = registry.histogram(
+    "eval_forge_synthetic_check_duration_seconds", "Synthetic test execution time", ("test_type", "status"))
+
+# Outbound HTTP
+outbound_requests_in_flight = registry.gauge(
+    "eval_forge_outbound_requests_in_flight", "Outbound requests holding a pooled connection", ("pool",))
+outbound_request_duration = registry.histogram(
+    "eval_forge_outbound_request_duration_seconds", "Outbound request time, body included", ("pool",))
+outbound_request_errors = registry.counter(
+    "eval_forge_outbound_request_errors_total", "Outbound requests that failed before a response", ("pool",))
+
+# Database
+db_query_duration = registry.histogram(
+    "eval_forge_db_query_duration_seconds", "SQL statement execution time", ("operation",))
+db_executor_wait = registry.histogram(
+    "eval_forge_db_executor_wait_seconds", "Time database work waited for a database thread")
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper that tracks in-flight requests and latency for one connection pool."""
+
+    def __init__(self, pool: str, transport: Optional[httpx.AsyncBaseTransport] = None, **transport_options):
+        """
+        Args:
+            pool: Pool name for the metrics' pool label
+            transport: Transport to wrap; a new AsyncHTTPTransport(**transport_options) by default
+        """
+        self._transport = transport or httpx.AsyncHTTPTransport(**transport_options)
+        self._in_flight = outbound_requests_in_flight.labels(pool)
+        self._duration = outbound_request_duration.labels(pool)
+        self._errors = outbound_request_errors.labels(pool)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start_time = time.perf_counter()
+        self._in_flight.inc()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._in_flight.dec()
+            self._errors.inc()
+            raise
+        if response.is_closed:
+            # Already buffered (mock transports); no connection is held
+            self._finished(start_time)
+        else:
+            # The connection stays in use until the body is read or the response closed
+            response.stream = _ClosingStream(response.stream, self._finished, start_time)
+        return response
+
+    def _finished(self, start_time: float):
+        self._in_flight.dec()
+        self._duration.observe(time.perf_counter() - start_time)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class _ClosingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, on_close: Callable[[float], None], start_time: float):
+        self._stream = stream
+        self._on_close = on_close
+        self._start_time = start_time
+        self._closed = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        if not self._closed:
+            self._closed = True
+            self._on_close(self._start_time)
+        await self._stream.aclose()
+
+
+def statement_operation(statement: str) -> str:
+    """select, insert, update, delete or other, for the db_query_duration label."""
+    verb = statement.lstrip()[:6].lower()
+    return verb if verb in ("select", "insert", "update", "delete") else "other"
+
+
+def instrument_engine(engine):
+    """Time every statement run through a SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start_time"].pop()
+        db_query_duration.labels(statement_operation(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(exception_context):
+        # Failed statements never reach after_cursor_execute
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start_time"):
+            connection.info["query_start_time"].pop()
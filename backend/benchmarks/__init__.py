@@ -0,0 +1,3 @@
+"""
+Offline performance benchmarks for the backend. Run them with run_benchmarks.py.
+"""
@@ -0,0 +1,479 @@
+"""
+The backend's benchmarks. Each one seeds its own temporary SQLite database and
+drives the same functions and endpoints the API uses, with generated text and
+a mock HTTP transport, so the suite needs no network, model server or
+existing eval_forge.db. Evaluation runs talk to the bundled Ollama simulator on
+a local port.
+"""
+
+import asyncio
+import functools
+import io
+import random
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import evaluation_runner as evaluation_runner_module
+from app import models
+from app import scheduler as scheduler_module
+from app.database import run_db
+from app.datasets import get_or_create_dataset, item_hash
+from app.evaluation_queue import EvaluationQueue
+from app.metrics import calculate_metrics
+from app.ollama_simulator import SimulatorConfig, SimulatorServer
+from app.question_bank import load_question_bank
+from app.result_writer import ResultWriter
+from app.scorers import ScorerRegistry, scorer_registry
+from app.synthetic_monitoring import SyntheticMonitoringService
+
+from .harness import Trial, benchmark
+
+SEED = 1234
+INSERT_CHUNK_ROWS = 50_000
+
+# Two-syllable words give a vocabulary large enough for realistic n-gram overlap
+_SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pa", "do", "gi", "be", "fu", "ho", "ja",
+              "qu", "wi", "xe", "ya"]
+_WORDS = [a + b for a in _SYLLABLES for b in _SYLLABLES]
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _pairs(count: int, seed: int = SEED) -> List[Tuple[str, str]]:
+    """Reference/candidate pairs where the candidate shares about half its words with the reference."""
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        reference = _sentence(rng, rng.randint(8, 40)).split()
+        candidate = [word if rng.random() < 0.5 else rng.choice(_WORDS) for word in reference]
+        pairs.append((" ".join(reference), " ".join(candidate)))
+    return pairs
+
+
+class _Database:
+    """A temporary SQLite database with the app's schema."""
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix="eval-forge-bench-")
+        self.engine = create_engine(f"sqlite:///{self.directory}/bench.db", connect_args={"check_same_thread": False})
+        models.Base.metadata.create_all(bind=self.engine)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False,
+                                            bind=self.engine)
+
+    def insert(self, model, rows: List[Dict]):
+        """Bulk insert rows in chunks, for seeding."""
+        with self.engine.begin() as connection:
+            for start in range(0, len(rows), INSERT_CHUNK_ROWS):
+                connection.execute(insert(model), rows[start:start + INSERT_CHUNK_ROWS])
+
+    def close(self):
+        self.engine.dispose()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class _ApiClient:
+    """A TestClient for the API with get_db pointed at a benchmark database."""
+
+    def __init__(self, database: _Database):
+        from fastapi.testclient import TestClient
+        from app.database import get_db
+        from app.main import app
+
+        def benchmark_db():
+            db = database.session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        self._app = app
+        self._get_db = get_db
+        app.dependency_overrides[get_db] = benchmark_db
+        self.client = TestClient(app)
+
+    def get(self, path: str) -> httpx.Response:
+        response = self.client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {path} returned {response.status_code}: {response.text[:200]}")
+        return response
+
+    def close(self):
+        self._app.dependency_overrides.pop(self._get_db, None)
+        self.client.close()
+
+
+def _patch(module, **values) -> Callable[[], None]:
+    """Replace module attributes; returns a function restoring them."""
+    originals = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    return lambda: [setattr(module, name, value) for name, value in originals.items()]
+
+
+@benchmark("calculate_metrics", params={"pairs": [200]}, quick={"pairs": [10]}, repeat=5)
+def calculate_metrics_pairs(pairs: int) -> Trial:
+    """calculate_metrics() one pair at a time, as the legacy scoring path does"""
+    data = _pairs(pairs)
+
+    def run():
+        for reference, candidate in data:
+            calculate_metrics(reference, candidate)
+
+    return Trial(run, items=pairs, item_unit="pairs")
+
+
+@benchmark("score_batch", params={"pairs": [1_000, 10_000]}, quick={"pairs": [50]}, repeat=5)
+def score_batch_pairs(pairs: int) -> Trial:
+    """Batch BLEU and ROUGE through the scorer registry, with a cold result cache each run"""
+    data = _pairs(pairs)
+    names = ["bleu", "rouge"]
+    state = {}
+
+    def fresh_registry():
+        # The result cache would turn every repetition after the first into lookups
+        registry = ScorerRegistry()
+        for name in names:
+            registry.register(scorer_registry.get(name))
+        state["registry"] = registry
+
+    def run():
+        state["registry"].score_batch(data, names)
+
+    return Trial(run, items=pairs, item_unit="pairs", before_each=fresh_registry)
+
+
+@benchmark("csv_ingest", params={"rows": [10_000, 100_000, 1_000_000]}, quick={"rows": [500]}, repeat=3, warmup=0)
+def csv_ingest(rows: int) -> Trial:
+    """Parse an uploaded CSV and store it as a dataset in an empty database"""
+    from starlette.datastructures import UploadFile
+    from app.main import read_csv_dataset
+
+    rng = random.Random(SEED)
+    lines = ["question,answer"]
+    lines.extend(f"{_sentence(rng, 12)} {index}?,{_sentence(rng, 3)}" for index in range(rows))
+    content = ("\n".join(lines) + "\n").encode("utf-8")
+    state = {}
+
+    def fresh_database():
+        if "database" in state:
+            state["database"].close()
+        state["database"] = _Database()
+
+    def run():
+        upload = UploadFile(io.BytesIO(content), filename="bench.csv")
+        parsed = asyncio.run(read_csv_dataset(upload))
+        db = state["database"].session_factory()
+        try:
+            dataset = get_or_create_dataset(db, "bench", parsed)
+            assert dataset.item_count == rows
+        finally:
+            db.close()
+
+    def cleanup():
+        if "database" in state:
+            state["database"].close()
+
+    return Trial(run, items=rows, item_unit="rows", before_each=fresh_database, cleanup=cleanup)
+
+
+def _seed_evaluation(database: _Database, results: int, rng: random.Random) -> int:
+    """A completed, dataset-backed evaluation with one result per item. Returns its id."""
+    db = database.session_factory()
+    try:
+        model = models.Model(name="bench", type="ollama", endpoint="http://model.test", model_name="bench")
+        dataset = models.Dataset(name=f"bench {results}", content_hash=f"bench-{results}-{rng.random()}",
+                                 item_count=results, created_at=datetime.utcnow())
+        db.add_all([model, dataset])
+        db.flush()
+        evaluation = models.Evaluation(name=f"bench {results}", model_id=model.id, dataset_id=dataset.id,
+                                       status="completed", total_questions=results, accuracy=0.5,
+                                       correct_answers=results // 2, incorrect_answers=results - results // 2,
+                                       created_at=datetime.utcnow(), completed_at=datetime.utcnow())
+        db.add(evaluation)
+        db.commit()
+        dataset_id, evaluation_id = dataset.id, evaluation.id
+    finally:
+        db.close()
+
+    items = []
+    for index in range(results):
+        question = f"{_sentence(rng, 12)} {dataset_id}-{index}?"
+        answer = _sentence(rng, 3)
+        items.append({"content_hash": item_hash(question, answer), "question": question, "expected_answer": answer})
+    database.insert(models.DatasetItem, items)
+
+    with database.engine.connect() as connection:
+        item_ids = [row[0] for row in connection.exec_driver_sql(
+            "SELECT id FROM dataset_items ORDER BY id DESC LIMIT ?", (results,))]
+    item_ids.reverse()
+    database.insert(models.DatasetMember, [
+        {"dataset_id": dataset_id, "item_id": item_id, "position": position}
+        for position, item_id in enumerate(item_ids)
+    ])
+    database.insert(models.Result, [
+        {"evaluation_id": evaluation_id, "dataset_item_id": item_id, "model_response": _sentence(rng, 20),
+         "is_correct": rng.random() < 0.5, "response_time": rng.randint(50, 2000),
+         "bleu_score": rng.random(), "rouge_1_score": rng.random(), "rouge_2_score": rng.random(),
+         "rouge_l_score": rng.random()}
+        for item_id in item_ids
+    ])
+    return evaluation_id
+
+
+@benchmark("results_detail", params={"results": [1_000, 10_000, 100_000]}, quick={"results": [100]}, repeat=5)
+def results_detail(results: int) -> Trial:
+    """GET /api/results/{id} for a dataset-backed evaluation"""
+    database = _Database()
+    evaluation_id = _seed_evaluation(database, results, random.Random(SEED))
+    api = _ApiClient(database)
+
+    def run():
+        assert len(api.get(f"/api/results/{evaluation_id}").json()["questions"]) == results
+
+    def cleanup():
+        api.close()
+        database.close()
+
+    return Trial(run, items=results, item_unit="results", cleanup=cleanup)
+
+
+@benchmark("results_index", params={"evaluations": [100, 1_000]}, quick={"evaluations": [10]}, repeat=5)
+def results_index(evaluations: int) -> Trial:
+    """GET /api/results, listing completed evaluations"""
+    database = _Database()
+    database.insert(models.Model, [{"name": "bench", "type": "ollama", "endpoint": "http://model.test",
+                                    "model_name": "bench"}])
+    now = datetime.utcnow()
+    database.insert(models.Evaluation, [
+        {"name": f"evaluation {index}", "model_id": 1, "status": "completed" if index % 10 else "failed",
+         "total_questions": 100, "accuracy": 0.5, "correct_answers": 50, "incorrect_answers": 50,
+         "created_at": now, "completed_at": now}
+        for index in range(evaluations)
+    ])
+    api = _ApiClient(database)
+
+    def run():
+        api.get("/api/results")
+
+    def cleanup():
+        api.close()
+        database.close()
+
+    return Trial(run, items=evaluations, item_unit="evaluations", cleanup=cleanup)
+
+
+@benchmark("monitoring_metrics", params={"executions": [100_000, 1_000_000]}, quick={"executions": [1_000]},
+           repeat=3)
+def monitoring_metrics(executions: int) -> Trial:
+    """GET /api/synthetic-monitoring/metrics over a day of executions"""
+    rng = random.Random(SEED)
+    database = _Database()
+    test_types = ["uptime", "api", "browser"]
+    database.insert(models.SyntheticTest, [
+        {"name": f"test {index}", "service_name": "bench", "test_type": test_types[index % 3],
+         "url": f"http://svc.test/{index}", "interval": 60, "is_active": True, "created_at": datetime.now()}
+        for index in range(30)
+    ])
+    now = datetime.now()
+    statuses = ["success"] * 18 + ["failure", "timeout"]
+    rows = []
+    for _ in range(executions):
+        status = rng.choice(statuses)
+        rows.append({"test_id": rng.randint(1, 30), "status": status,
+                     "response_time": rng.uniform(20, 800) if status != "timeout" else 5000.0,
+                     "status_code": 200 if status == "success" else 500,
+                     "executed_at": now - timedelta(seconds=rng.randint(0, 20 * 3600))})
+        if len(rows) >= INSERT_CHUNK_ROWS:
+            database.insert(models.SyntheticExecution, rows)
+            rows = []
+    database.insert(models.SyntheticExecution, rows)
+    api = _ApiClient(database)
+
+    def run():
+        metrics = api.get("/api/synthetic-monitoring/metrics").json()
+        assert sum(metrics[test_type]["total_tests"] for test_type in test_types) == executions
+
+    def cleanup():
+        api.close()
+        database.close()
+
+    return Trial(run, items=executions, item_unit="executions", cleanup=cleanup)
+
+
+def _seed_tests(database: _Database, tests: int) -> List[int]:
+    database.insert(models.SyntheticTest, [
+        {"name": f"check {index}", "service_name": "bench", "test_type": "api", "url": f"http://svc.test/{index}",
+         "interval": 60, "timeout": 5, "expected_status": 200, "is_active": True, "created_at": datetime.now()}
+        for index in range(tests)
+    ])
+    return list(range(1, tests + 1))
+
+
+@benchmark("scheduler_schedule", params={"tests": [1_000]}, quick={"tests": [20]}, repeat=5)
+def scheduler_schedule(tests: int) -> Trial:
+    """Leader start-up: load active tests and register an interval job for each"""
+    database = _Database()
+    _seed_tests(database, tests)
+    restore = _patch(scheduler_module, SessionLocal=database.session_factory)
+
+    async def schedule():
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+        scheduler = scheduler_module.SyntheticTestScheduler(worker_id="bench")
+        scheduler.scheduler = AsyncIOScheduler()
+        scheduler.scheduler.start()
+        scheduler.is_leader = True
+        try:
+            await scheduler.schedule_all_active_tests()
+            assert len(scheduler.scheduler.get_jobs()) == tests
+        finally:
+            scheduler.scheduler.shutdown(wait=False)
+
+    def cleanup():
+        restore()
+        database.close()
+
+    return Trial(lambda: asyncio.run(schedule()), items=tests, item_unit="tests", cleanup=cleanup)
+
+
+@benchmark("scheduler_fanout", params={"tests": [1_000]}, quick={"tests": [20]}, repeat=3)
+def scheduler_fanout(tests: int) -> Trial:
+    """One interval of every test: enqueue, claim, execute against a mock endpoint and record"""
+    database = _Database()
+    test_ids = _seed_tests(database, tests)
+
+    async def handler(request):
+        return httpx.Response(200, text='{"status": "ok"}')
+
+    async def fan_out():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        restore = _patch(scheduler_module, SessionLocal=database.session_factory,
+                         synthetic_service=SyntheticMonitoringService(client=client))
+        scheduler = scheduler_module.SyntheticTestScheduler(worker_id="bench")
+        try:
+            # The leader's interval jobs fire together for tests sharing an interval
+            await asyncio.gather(*(scheduler.enqueue_test(test_id) for test_id in test_ids))
+            scheduler.running = True
+            worker = asyncio.create_task(scheduler._process_runs())
+            while await run_db(_execution_count, database) < tests:
+                await asyncio.sleep(0.01)
+            scheduler.running = False
+            worker.cancel()
+        finally:
+            restore()
+            await client.aclose()
+
+    def reset():
+        with database.engine.begin() as connection:
+            connection.exec_driver_sql("DELETE FROM synthetic_executions")
+            connection.exec_driver_sql("DELETE FROM synthetic_test_runs")
+
+    return Trial(lambda: asyncio.run(fan_out()), items=tests, item_unit="runs", before_each=reset,
+                 cleanup=database.close)
+
+
+def _execution_count(database: _Database) -> int:
+    with database.engine.connect() as connection:
+        return connection.exec_driver_sql("SELECT count(*) FROM synthetic_executions").scalar()
+
+
+@benchmark("evaluation_run", params={"questions": [500]}, quick={"questions": [20]}, repeat=3)
+def evaluation_run(questions: int) -> Trial:
+    """A full evaluation against the Ollama simulator answering instantly: per-question overhead"""
+    database = _Database()
+    bank = load_question_bank()
+    # Repeats of the bank get trailing spaces to stay distinct items; the simulator ignores them
+    items = [{"question": bank[index % len(bank)]["question"] + " " * (index // len(bank)),
+              "answer": bank[index % len(bank)]["answer"]} for index in range(questions)]
+    server = SimulatorServer(SimulatorConfig(latency_ms=0.0, seed=SEED)).start()
+
+    db = database.session_factory()
+    try:
+        model = models.Model(name="simulator", type="ollama", endpoint=server.url, model_name="sim-llama:latest")
+        dataset = get_or_create_dataset(db, "simulator", items)
+        db.add(model)
+        db.flush()
+        evaluation = models.Evaluation(name="simulator", model_id=model.id, dataset_id=dataset.id,
+                                       total_questions=questions, metrics='["bleu", "rouge"]',
+                                       created_at=datetime.utcnow())
+        db.add(evaluation)
+        db.commit()
+        evaluation_id = evaluation.id
+    finally:
+        db.close()
+
+    # Result rows go to the benchmark database rather than the app's
+    restore = _patch(evaluation_runner_module,
+                     ResultWriter=functools.partial(ResultWriter, session_factory=database.session_factory))
+
+    def run():
+        session = database.session_factory()
+        try:
+            db_evaluation = session.get(models.Evaluation, evaluation_id)
+            asyncio.run(evaluation_runner_module.evaluation_runner.run(db_evaluation, session))
+            assert db_evaluation.status == "completed"
+            assert db_evaluation.correct_answers + db_evaluation.incorrect_answers == questions
+        finally:
+            session.close()
+
+    def cleanup():
+        restore()
+        server.stop()
+        database.close()
+
+    return Trial(run, items=questions, item_unit="questions", cleanup=cleanup)
+
+
+@benchmark("evaluation_queue", params={"evaluations": [16]}, quick={"evaluations": [4]}, repeat=3)
+def evaluation_queue(evaluations: int) -> Trial:
+    """Interleaved evaluations of two models through the residency-aware queue, on a one-model simulator"""
+    database = _Database()
+    model_names = ["sim-a:latest", "sim-b:latest"]
+    config = SimulatorConfig(models=model_names, latency_ms=10.0, load_ms=500.0, max_loaded_models=1, seed=SEED)
+    server = SimulatorServer(config).start()
+
+    db = database.session_factory()
+    try:
+        dataset = get_or_create_dataset(db, "queue", load_question_bank()[:10])
+        db_models = [models.Model(name=name, type="ollama", endpoint=server.url, model_name=name)
+                     for name in model_names]
+        db.add_all(db_models)
+        db.flush()
+        db_evaluations = [
+            models.Evaluation(name=f"queue {index}", model_id=db_models[index % 2].id, dataset_id=dataset.id,
+                              total_questions=dataset.item_count, metrics='["bleu"]', created_at=datetime.utcnow())
+            for index in range(evaluations)
+        ]
+        db.add_all(db_evaluations)
+        db.commit()
+        jobs = [(evaluation.id, model_names[index % 2]) for index, evaluation in enumerate(db_evaluations)]
+    finally:
+        db.close()
+
+    restore = _patch(evaluation_runner_module,
+                     ResultWriter=functools.partial(ResultWriter, session_factory=database.session_factory))
+
+    async def run_all():
+        queue = EvaluationQueue(session_factory=database.session_factory)
+        await asyncio.gather(*(queue.run(evaluation_id, server.url, model_name) for evaluation_id, model_name in jobs))
+
+    def unload():
+        # Every repetition starts with no model in memory
+        for name in model_names:
+            server.simulator.unload(name)
+
+    def cleanup():
+        restore()
+        server.stop()
+        database.close()
+
+    return Trial(lambda: asyncio.run(run_all()), items=evaluations, item_unit="evaluations", before_each=unload,
+                 cleanup=cleanup)
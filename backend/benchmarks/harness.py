@@ -0,0 +1,251 @@
+"""
+Benchmark registry, timing and result files.
+
+A benchmark is a function registered with @benchmark that takes its parameters
+(for example rows=100_000) and returns a Trial: the timed work plus optional
+untimed setup before each repetition. Every parameter combination is timed
+separately, and results are written as JSON keyed by "name[param=value]" so
+runs from different commits can be compared with compare().
+"""
+
+import gc
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+SCHEMA_VERSION = 1
+DEFAULT_MAX_REGRESSION = 0.25  # A median more than 25% slower than the baseline fails a comparison
+
+
+class Trial:
+    """The work one benchmark repetition times."""
+
+    def __init__(self, run: Callable[[], object], items: int = 1, item_unit: str = "ops",
+                 before_each: Optional[Callable[[], None]] = None, cleanup: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            run: The timed work
+            items: Items processed per run, for throughput
+            item_unit: What an item is (rows, pairs, requests)
+            before_each: Untimed setup before every run, e.g. a fresh database
+            cleanup: Called once after the last run
+        """
+        self.run = run
+        self.items = items
+        self.item_unit = item_unit
+        self.before_each = before_each
+        self.cleanup = cleanup
+
+
+class Benchmark:
+    def __init__(self, name: str, fn: Callable[..., Trial], params: Dict[str, List], quick_params: Dict[str, List],
+                 repeat: int, warmup: int, description: str):
+        self.name = name
+        self.fn = fn
+        self.params = params
+        self.quick_params = quick_params
+        self.repeat = repeat
+        self.warmup = warmup
+        self.description = description
+
+    def combinations(self, quick: bool) -> List[Dict]:
+        params = self.quick_params if quick else self.params
+        names = list(params)
+        return [dict(zip(names, values)) for values in itertools.product(*(params[name] for name in names))]
+
+
+_benchmarks: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, params: Optional[Dict[str, List]] = None, quick: Optional[Dict[str, List]] = None,
+              repeat: int = 5, warmup: int = 1):
+    """
+    Register a benchmark function.
+
+    Args:
+        name: Benchmark name, the first part of each result key
+        params: Values of each parameter for full runs; every combination is timed
+        quick: Smaller parameter values for --quick runs (defaults to params)
+        repeat: Timed repetitions per combination
+        warmup: Untimed repetitions before timing
+    """
+    def register(fn: Callable[..., Trial]) -> Callable[..., Trial]:
+        _benchmarks[name] = Benchmark(name, fn, params or {}, quick or params or {}, repeat, warmup,
+                                      (fn.__doc__ or "").strip().split("\n")[0])
+        return fn
+    return register
+
+
+def registered() -> List[Benchmark]:
+    return list(_benchmarks.values())
+
+
+def result_key(name: str, params: Dict) -> str:
+    if not params:
+        return name
+    return f"{name}[{','.join(f'{key}={value}' for key, value in params.items())}]"
+
+
+def run_benchmark(bench: Benchmark, params: Dict, repeat: Optional[int] = None,
+                  log: Callable[[str], None] = print) -> Dict:
+    """Time one parameter combination of a benchmark and return its result entry."""
+    repeat = repeat or bench.repeat
+    setup_start = time.perf_counter()
+    trial = bench.fn(**params)
+    setup_s = time.perf_counter() - setup_start
+
+    samples = []
+    try:
+        for index in range(bench.warmup + repeat):
+            if trial.before_each:
+                trial.before_each()
+            gc.collect()
+            start_time = time.perf_counter()
+            trial.run()
+            elapsed = time.perf_counter() - start_time
+            if index >= bench.warmup:
+                samples.append(elapsed)
+    finally:
+        if trial.cleanup:
+            trial.cleanup()
+
+    median = statistics.median(samples)
+    ordered = sorted(samples)
+    result = {
+        "key": result_key(bench.name, params),
+        "name": bench.name,
+        "params": params,
+        "repeat": repeat,
+        "unit": "s",
+        "min": ordered[0],
+        "median": median,
+        "mean": statistics.fmean(samples),
+        "max": ordered[-1],
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "items": trial.items,
+        "throughput": trial.items / median if median > 0 else None,
+        "throughput_unit": f"{trial.item_unit}/s",
+        "setup_s": setup_s
+    }
+    log(f"  {result['key']:<60} median {_duration(median):>10}  "
+        f"{_rate(result['throughput'])} {result['throughput_unit']}")
+    return result
+
+
+def run_suite(names: Optional[List[str]] = None, quick: bool = False, repeat: Optional[int] = None,
+              log: Callable[[str], None] = print) -> Dict:
+    """
+    Run registered benchmarks.
+
+    Args:
+        names: Benchmark names to run; all of them by default
+        quick: Use the small parameter values (a smoke run, not for comparisons)
+        repeat: Override each benchmark's repetitions
+
+    Returns:
+        The results document written by write_results
+    """
+    unknown = set(names or []) - set(_benchmarks)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    started = time.perf_counter()
+    results = []
+    for bench in registered():
+        if names and bench.name not in names:
+            continue
+        log(f"{bench.name}: {bench.description}")
+        for params in bench.combinations(quick):
+            results.append(run_benchmark(bench, params, repeat, log))
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "suite": "eval-forge-backend",
+        "created_at": datetime.utcnow().isoformat(),
+        "quick": quick,
+        "duration_s": time.perf_counter() - started,
+        "environment": environment(),
+        "results": results
+    }
+
+
+def environment() -> Dict:
+    """Where the results came from, so comparisons across machines are recognizable."""
+    return {
+        "git_commit": _git("rev-parse", "HEAD"),
+        "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def _git(*args) -> Optional[str]:
+    try:
+        output = subprocess.run(["git", *args], capture_output=True, text=True, timeout=10,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() if output.returncode == 0 else None
+
+
+def write_results(document: Dict, path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+
+
+def load_results(path: str) -> Dict:
+    with open(path) as f:
+        document = json.load(f)
+    if document.get("schema_version") != SCHEMA_VERSION:
+        raise ValueError(f"{path} has schema version {document.get('schema_version')}, expected {SCHEMA_VERSION}")
+    return document
+
+
+def compare(baseline: Dict, current: Dict, max_regression: float = DEFAULT_MAX_REGRESSION) -> List[Dict]:
+    """
+    Compare the medians of results present in both documents.
+
+    Returns:
+        One entry per shared key with the baseline and current medians, their ratio,
+        and whether it regressed by more than max_regression
+    """
+    baseline_results = {result["key"]: result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before = baseline_results.get(result["key"])
+        if not before:
+            continue
+        ratio = result["median"] / before["median"] if before["median"] > 0 else None
+        rows.append({
+            "key": result["key"],
+            "baseline_median": before["median"],
+            "current_median": result["median"],
+            "ratio": ratio,
+            "regressed": ratio is not None and ratio > 1 + max_regression
+        })
+    return rows
+
+
+def _duration(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.3f}s"
+
+
+def _rate(value: Optional[float]) -> str:
+    return f"{value:>12,.1f}" if value is not None else f"{'-':>12}"
@@ -40,6 +40,7 @@ def migrate_database():
             ('auth_credentials', 'TEXT'),
             ('ssl_check_enabled', 'BOOLEAN DEFAULT 0'),
             ('alert_thresholds', 'TEXT'),
+            ('assertions', 'TEXT'),
             ('browser_steps', 'TEXT')
         ]
         
@@ -213,6 +214,118 @@ def migrate_database():
                     if "duplicate column name" not in str(e):
                         raise
         
+        # Adaptive evaluation columns
+        adaptive_eval_columns = [
+            ('mode', 'TEXT DEFAULT "full"'),
+            ('target_ci_width', 'REAL'),
+            ('confidence_level', 'REAL DEFAULT 0.95'),
+            ('min_questions', 'INTEGER DEFAULT 30'),
+            ('baseline_evaluation_id', 'INTEGER'),
+            ('accuracy_ci_lower', 'REAL'),
+            ('accuracy_ci_upper', 'REAL'),
+            ('metric_intervals', 'TEXT'),
+            ('stop_reason', 'TEXT'),
+            ('dataset_id', 'INTEGER'),
+            ('metrics', 'TEXT'),
+            ('scorer_timings', 'TEXT'),
+            ('phase_timings', 'TEXT'),
+            ('model_load_ms', 'REAL'),
+            ('model_loads', 'INTEGER'),
+            ('infrastructure_errors', 'INTEGER'),
+            ('owner_id', 'TEXT'),
+            ('lease_expires_at', 'DATETIME')
+        ]
+        
+        for col_name, col_def in adaptive_eval_columns:
+            if col_name not in columns:
+                try:
+                    cursor.execute(f"ALTER TABLE evaluations ADD COLUMN {col_name} {col_def}")
+                    migrations_applied.append(f"Added {col_name} to evaluations")
+                except sqlite3.OperationalError as e:
+                    if "duplicate column name" not in str(e):
+                        raise
+        
+        # Model pools (replica endpoints, per-replica parallelism) and provider settings
+        cursor.execute("PRAGMA table_info(models)")
+        columns = [column[1] for column in cursor.fetchall()]
+        model_columns = [
+            ('replica_endpoints', 'TEXT'),
+            ('parallel_requests', 'INTEGER DEFAULT 1'),
+            ('api_key_env', 'TEXT'),
+            ('requests_per_minute', 'INTEGER'),
+            ('tokens_per_minute', 'INTEGER'),
+            ('batch_size', 'INTEGER DEFAULT 1')
+        ]
+        for col_name, col_def in model_columns:
+            if col_name not in columns:
+                try:
+                    cursor.execute(f"ALTER TABLE models ADD COLUMN {col_name} {col_def}")
+                    migrations_applied.append(f"Added {col_name} to models")
+                except sqlite3.OperationalError as e:
+                    if "duplicate column name" not in str(e):
+                        raise
+        
+        # Dataset item references on results
+        cursor.execute("PRAGMA table_info(results)")
+        columns = [column[1] for column in cursor.fetchall()]
+        if 'dataset_item_id' not in columns:
+            try:
+                cursor.execute("ALTER TABLE results ADD COLUMN dataset_item_id INTEGER")
+                cursor.execute("CREATE INDEX IF NOT EXISTS ix_results_dataset_item_id ON results (dataset_item_id)")
+                migrations_applied.append("Added dataset_item_id to results")
+            except sqlite3.OperationalError as e:
+                if "duplicate column name" not in str(e):
+                    raise
+        
+        # Legacy question references on results, used to resume interrupted evaluations,
+        # outputs of scorers without a dedicated column, and infrastructure error flags
+        for col_name, col_def in [('question_id', 'INTEGER'), ('extra_metrics', 'TEXT'),
+                                  ('infrastructure_error', 'BOOLEAN DEFAULT 0')]:
+            if col_name not in columns:
+                try:
+                    cursor.execute(f"ALTER TABLE results ADD COLUMN {col_name} {col_def}")
+                    migrations_applied.append(f"Added {col_name} to results")
+                except sqlite3.OperationalError as e:
+                    if "duplicate column name" not in str(e):
+                        raise
+        
+        # Dataset names sharing stored content: the content hash is unique only among content owners
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='datasets'")
+        if cursor.fetchone():
+            cursor.execute("PRAGMA table_info(datasets)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'content_dataset_id' not in columns:
+                cursor.execute("ALTER TABLE datasets ADD COLUMN content_dataset_id INTEGER REFERENCES datasets (id)")
+                cursor.execute("DROP INDEX IF EXISTS ix_datasets_content_hash")
+                cursor.execute("CREATE INDEX ix_datasets_content_hash ON datasets (content_hash)")
+                cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_datasets_content_owner ON datasets (content_hash) "
+                               "WHERE content_dataset_id IS NULL")
+                cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_datasets_name_version ON datasets (name, version)")
+                migrations_applied.append("Added content_dataset_id to datasets")
+        
+        # Why an endpoint sweep couldn't check an app's endpoints
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='endpoint_sweeps'")
+        if cursor.fetchone():
+            cursor.execute("PRAGMA table_info(endpoint_sweeps)")
+            if 'error' not in [column[1] for column in cursor.fetchall()]:
+                cursor.execute("ALTER TABLE endpoint_sweeps ADD COLUMN error TEXT")
+                migrations_applied.append("Added error to endpoint_sweeps")
+        
+        # One open alert per test and rule; duplicates opened by racing processes are resolved first
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='alerts'")
+        if cursor.fetchone():
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='ux_alerts_firing_rule'")
+            if not cursor.fetchone():
+                cursor.execute("""
+                    UPDATE alerts SET status = 'resolved', resolved_at = started_at
+                    WHERE status = 'firing' AND id NOT IN (
+                        SELECT MIN(id) FROM alerts WHERE status = 'firing' GROUP BY test_id, rule
+                    )
+                """)
+                cursor.execute("CREATE UNIQUE INDEX ux_alerts_firing_rule ON alerts (test_id, rule) "
+                               "WHERE status = 'firing'")
+                migrations_applied.append("Added a unique index over open alerts")
+        
         conn.commit()
         conn.close()
         
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Provision scorer assets into the local model cache.
+Run this once at install/build time; the API only loads assets from the cache
+and never downloads them itself. Set EVAL_FORGE_MODEL_CACHE to use a different
+directory than backend/model-cache. Pass --onnx (or set EVAL_FORGE_EMBEDDING_BACKEND
+to onnx/onnx-int8) to also export the sentence model to ONNX with an int8-quantized copy.
+"""
+
+import os
+import sys
+
+from app.embeddings import (
+    EMBEDDING_BACKEND, EMBEDDING_MAX_LENGTH, ONNX_MODEL_FILE, ONNX_QUANTIZED_MODEL_FILE, ONNX_TOKENIZER_FILE
+)
+from app.metrics import MODEL_CACHE_DIR, NLTK_DATA_DIR, ONNX_MODEL_DIR, SENTENCE_MODEL_NAME
+
+def export_onnx_model(model_path: str):
+    """Export the sentence transformer's encoder to ONNX and quantize its weights to int8."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_path, device="cpu")
+    encoder = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    class Encoder(torch.nn.Module):
+        """Return only the token embeddings; pooling and normalization run in NumPy."""
+
+        def __init__(self, transformer):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.transformer(input_ids=input_ids, attention_mask=attention_mask,
+                                    token_type_ids=token_type_ids)[0]
+
+    os.makedirs(ONNX_MODEL_DIR, exist_ok=True)
+    sample = tokenizer(["provision the onnx export"], return_tensors="pt",
+                       truncation=True, max_length=EMBEDDING_MAX_LENGTH)
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    model_file = os.path.join(ONNX_MODEL_DIR, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            Encoder(encoder),
+            tuple(sample[name] for name in input_names),
+            model_file,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]},
+            opset_version=14
+        )
+    quantize_dynamic(model_file, os.path.join(ONNX_MODEL_DIR, ONNX_QUANTIZED_MODEL_FILE), weight_type=QuantType.QInt8)
+
+    # The fast tokenizer's tokenizer.json is all the ONNX backend needs to tokenize
+    tokenizer.backend_tokenizer.save(os.path.join(ONNX_MODEL_DIR, ONNX_TOKENIZER_FILE))
+
+def provision_models(export_onnx: bool = False):
+    """Download NLTK tokenizer data and the sentence transformer model."""
+    print(f"Provisioning scorer assets into {MODEL_CACHE_DIR}")
+    os.makedirs(NLTK_DATA_DIR, exist_ok=True)
+
+    try:
+        import nltk
+        for data_name in ['punkt', 'punkt_tab']:
+            if not nltk.download(data_name, download_dir=NLTK_DATA_DIR, quiet=True):
+                raise RuntimeError(f"NLTK download of {data_name} failed")
+            print(f"✅ NLTK {data_name}")
+    except Exception as e:
+        print(f"❌ NLTK data: {e}")
+        return False
+
+    try:
+        from sentence_transformers import SentenceTransformer
+        model_path = os.path.join(MODEL_CACHE_DIR, SENTENCE_MODEL_NAME)
+        if not os.path.isdir(model_path):
+            SentenceTransformer(SENTENCE_MODEL_NAME).save(model_path)
+        print(f"✅ Sentence transformer {SENTENCE_MODEL_NAME}")
+    except Exception as e:
+        print(f"❌ Sentence transformer: {e}")
+        return False
+
+    if export_onnx:
+        try:
+            export_onnx_model(model_path)
+            print(f"✅ ONNX export (fp32 and int8) in {ONNX_MODEL_DIR}")
+        except Exception as e:
+            print(f"❌ ONNX export: {e}")
+            return False
+
+    return True
+
+if __name__ == "__main__":
+    success = provision_models(export_onnx="--onnx" in sys.argv or EMBEDDING_BACKEND != "torch")
+    sys.exit(0 if success else 1)
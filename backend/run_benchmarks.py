@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Run the offline backend benchmarks and write machine-readable results.
+
+    python run_benchmarks.py --output bench/results.json
+    python run_benchmarks.py --only csv_ingest score_batch --compare bench/main.json
+
+Each benchmark seeds its own temporary database; nothing touches eval_forge.db
+or the network. --compare exits with status 1 when a median is more than
+--max-regression slower than in the baseline file, so it can gate a release.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Scorer assets come from the local cache only
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+from benchmarks import cases  # noqa: F401  (registers the benchmarks)
+from benchmarks.harness import (
+    DEFAULT_MAX_REGRESSION, compare, load_results, registered, run_suite, write_results
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the offline backend benchmarks")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="Benchmarks to run (default: all)")
+    parser.add_argument("--quick", action="store_true", help="Small sizes, to check the suite runs")
+    parser.add_argument("--repeat", type=int, help="Override each benchmark's timed repetitions")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare medians with an earlier results file")
+    parser.add_argument("--max-regression", type=float, default=DEFAULT_MAX_REGRESSION,
+                        help="Allowed slowdown against the baseline, as a fraction (default: %(default)s)")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for bench in registered():
+            print(f"{bench.name:<20} {bench.description}")
+        return 0
+
+    logging.basicConfig(level=logging.WARNING)
+    document = run_suite(args.only, quick=args.quick, repeat=args.repeat)
+    print(f"Finished in {document['duration_s']:.1f}s")
+
+    if args.output:
+        write_results(document, args.output)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        rows = compare(load_results(args.compare), document, args.max_regression)
+        print(f"\nCompared with {args.compare} (max regression {args.max_regression:.0%}):")
+        for row in rows:
+            flag = "REGRESSED" if row["regressed"] else ""
+            ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "-"
+            print(f"  {row['key']:<60} {row['baseline_median']:.4f}s -> {row['current_median']:.4f}s {ratio:>7} {flag}")
+        if any(row["regressed"] for row in rows):
+            print("❌ Performance regressions found")
+            return 1
+        print("✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+import argparse
+import logging
+import os
+
+from app.monitoring_runner import run_monitoring_workers
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run synthetic tests in dedicated worker processes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes to start")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    run_monitoring_workers(args.workers)
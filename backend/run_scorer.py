@@ -0,0 +1,10 @@
+import asyncio
+import logging
+import os
+
+from app.scoring_service import ScoringServer
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    socket_path = os.environ.get("EVAL_FORGE_SCORER_SOCKET", "/tmp/eval_forge_scorer.sock")
+    asyncio.run(ScoringServer(socket_path).serve_forever())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Run the Ollama-compatible simulator, for evaluations and load tests without a
+real model server.
+
+    python run_simulator.py --port 11435 --latency lognormal --latency-ms 300 --latency-spread-ms 150 \\
+        --tokens-per-second 40 --slots 4 --error-rate 0.02
+
+Then register a model with endpoint http://localhost:11435 and model name
+sim-llama:latest (or any name passed with --models). The same server answers
+the OpenAI-compatible API under /v1, for models of type openai; --requests-per-minute
+and --api-key make it behave like a rate-limited hosted API.
+"""
+
+import argparse
+import logging
+
+import uvicorn
+
+from app.ollama_simulator import LATENCY_DISTRIBUTIONS, SimulatorConfig, create_simulator_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an Ollama-compatible simulator")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--models", nargs="+", default=["sim-llama:latest"], help="Model names to serve")
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="fixed",
+                        help="Time-to-first-token distribution")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean time to first token")
+    parser.add_argument("--latency-spread-ms", type=float, default=0.0,
+                        help="Half-width (uniform) or standard deviation (normal, lognormal)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Generation speed (0 = instant)")
+    parser.add_argument("--slots", type=int, default=4, help="Requests generated in parallel")
+    parser.add_argument("--max-queue", type=int, default=0, help="Waiting requests before 503s (0 = unbounded)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests that hang")
+    parser.add_argument("--timeout-s", type=float, default=120.0, help="How long hanging requests hang")
+    parser.add_argument("--accuracy", type=float, default=0.8, help="Fraction of bank questions answered right")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--load-ms", type=float, default=0.0, help="Time to load a model not in memory")
+    parser.add_argument("--max-loaded-models", type=int, default=0,
+                        help="Models kept in memory at once (0 = unlimited)")
+    parser.add_argument("--requests-per-minute", type=float, default=0.0,
+                        help="Rate limit of the /v1 endpoints, 429 past it (0 = unlimited)")
+    parser.add_argument("--api-key", default=None, help="Bearer token the /v1 endpoints require")
+    args = parser.parse_args()
+
+    config = SimulatorConfig(
+        models=args.models, latency=args.latency, latency_ms=args.latency_ms,
+        latency_spread_ms=args.latency_spread_ms, tokens_per_second=args.tokens_per_second, slots=args.slots,
+        max_queue=args.max_queue, error_rate=args.error_rate, timeout_rate=args.timeout_rate,
+        timeout_s=args.timeout_s, accuracy=args.accuracy, seed=args.seed, load_ms=args.load_ms,
+        max_loaded_models=args.max_loaded_models, requests_per_minute=args.requests_per_minute,
+        api_key=args.api_key
+    )
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run(create_simulator_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
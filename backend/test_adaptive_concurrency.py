@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Test adaptive concurrency and circuit breaking: the AIMD limit and breaker
+state machines, an evaluation against a simulated Ollama that rejects
+requests past its queue, the limit settling under sustained load, an outage
+the circuit breaker rides out, and infrastructure errors kept out of accuracy
+and retried on resume.
+"""
+
+import asyncio
+import functools
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import evaluation_runner as evaluation_runner_module
+from app import model_pool, models
+from app.adaptive_concurrency import AIMDLimit, CircuitBreaker
+from app.datasets import get_or_create_dataset
+from app.model_pool import ModelPoolRegistry
+from app.ollama_simulator import SimulatorConfig, SimulatorServer
+from app.question_bank import load_question_bank
+from app.result_writer import ResultWriter
+
+MODEL_NAME = "sim-llama:latest"
+
+
+def test_aimd_limit():
+    print("Testing the AIMD limit...")
+    limit = AIMDLimit(initial=1, max_limit=8)
+    for _ in range(20):
+        limit.on_success(0.1, time.monotonic())
+    print(f"   After 20 fast requests: {limit.limit:.2f}")
+    assert 5 < limit.limit <= 8 and limit.baseline_s == 0.1
+    print("✅ The limit grows by about one per limit's worth of requests at unloaded latency")
+
+    before = limit.limit
+    for _ in range(10):
+        limit.on_success(0.3, time.monotonic())
+    assert limit.limit < before and limit.decreases > 0
+    print("✅ Latency well above the unloaded latency shrinks it")
+
+    limit = AIMDLimit(initial=8, max_limit=8)
+    sent = time.monotonic()
+    limit.on_overload(sent)
+    limit.on_overload(sent)
+    assert limit.limit == 4, "requests sent before a decrease don't cut the limit again"
+    limit.on_overload(time.monotonic())
+    assert limit.limit == 2 and limit.allowed == 2
+    for _ in range(5):
+        limit.on_overload(time.monotonic())
+    assert limit.allowed == 1
+    print("✅ Overload failures halve it, once per round of requests, down to one")
+
+
+def test_circuit_breaker():
+    print("Testing the circuit breaker...")
+    breaker = CircuitBreaker(failure_threshold=3, open_s=1.0, max_open_s=3.0)
+    now = 100.0
+    assert not breaker.record_failure(now) and not breaker.record_failure(now)
+    assert breaker.record_failure(now) and breaker.state == "open" and breaker.trips == 1
+    assert not breaker.available(now + 0.5)
+    print("✅ The circuit opens after consecutive failures and holds requests back")
+
+    assert breaker.available(now + 1.0)
+    breaker.admit(now + 1.0)
+    assert breaker.state == "half_open" and not breaker.available(now + 1.0), "one trial request at a time"
+    assert breaker.record_failure(now + 1.5) and breaker.cooldown_s == 2.0
+    breaker.admit(now + 3.5)
+    breaker.record_failure(now + 4.0)
+    assert breaker.cooldown_s == 3.0 and breaker.trips == 1
+    print("✅ Failed trial requests reopen it for twice as long, up to the maximum")
+
+    breaker.admit(now + 7.0)
+    breaker.abandon()
+    assert breaker.state == "open" and breaker.available(time.monotonic())
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.cooldown_s == 1.0 and breaker.down_since is None
+    print("✅ A cancelled trial lets the next request probe; success closes the circuit")
+
+
+class _Setup:
+    """A temporary database with one model on a simulator and one evaluation of it."""
+
+    def __init__(self, endpoint: str, questions):
+        engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'adaptive.db')}",
+                               connect_args={"check_same_thread": False})
+        models.Base.metadata.create_all(bind=engine)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = self.session_factory()
+        dataset = get_or_create_dataset(db, "adaptive", questions)
+        model = models.Model(name="adaptive", type="ollama", endpoint=endpoint, model_name=MODEL_NAME)
+        db.add(model)
+        db.flush()
+        evaluation = models.Evaluation(name="adaptive", model_id=model.id, dataset_id=dataset.id,
+                                       total_questions=len(questions), metrics='["bleu"]')
+        db.add(evaluation)
+        db.commit()
+        self.registry = ModelPoolRegistry()
+        self.pool = self.registry.get(model)
+        self.evaluation_id = evaluation.id
+        db.close()
+
+    def run(self, resume: bool = False):
+        original_writer, original_pools = evaluation_runner_module.ResultWriter, evaluation_runner_module.model_pools
+        evaluation_runner_module.ResultWriter = functools.partial(ResultWriter, session_factory=self.session_factory)
+        evaluation_runner_module.model_pools = self.registry
+        db = self.session_factory()
+        try:
+            evaluation = db.query(models.Evaluation).filter(models.Evaluation.id == self.evaluation_id).first()
+            start = time.perf_counter()
+            asyncio.run(evaluation_runner_module.evaluation_runner.run(evaluation, db, resume=resume))
+            elapsed = time.perf_counter() - start
+            db.refresh(evaluation)
+            return evaluation, elapsed
+        finally:
+            db.close()
+            evaluation_runner_module.ResultWriter = original_writer
+            evaluation_runner_module.model_pools = original_pools
+
+
+def _fixed_concurrency(pool, concurrency: int):
+    for replica in pool.replicas:
+        replica.limiter = AIMDLimit(initial=concurrency, max_limit=concurrency, min_limit=concurrency)
+
+
+def test_saturated_endpoint():
+    print("Testing an evaluation against an endpoint with 2 slots and a short queue...")
+    questions = load_question_bank()[:40]
+    config = SimulatorConfig(latency_ms=40.0, slots=2, max_queue=1)
+    original_retries = evaluation_runner_module.MODEL_RETRIES
+    with SimulatorServer(config) as server:
+        expected_correct = sum(q["answer"].lower() in server.simulator.answer(MODEL_NAME, q["question"]).lower()
+                               for q in questions)
+
+        # Eight requests at once without retries: everything past slots + queue is rejected
+        flooded = _Setup(server.url, questions)
+        _fixed_concurrency(flooded.pool, 8)
+        evaluation_runner_module.MODEL_RETRIES = 0
+        try:
+            flooded_evaluation, _ = flooded.run()
+        finally:
+            evaluation_runner_module.MODEL_RETRIES = original_retries
+
+        optimal = _Setup(server.url, questions)
+        _fixed_concurrency(optimal.pool, 2)
+        _, optimal_elapsed = optimal.run()
+
+        adaptive = _Setup(server.url, questions)
+        evaluation, elapsed = adaptive.run()
+        stats = adaptive.pool.stats()["replicas"][0]
+
+    print(f"   Flooded: {flooded_evaluation.infrastructure_errors} infrastructure errors, "
+          f"accuracy {flooded_evaluation.accuracy:.2f} over "
+          f"{flooded_evaluation.correct_answers + flooded_evaluation.incorrect_answers} answers")
+    print(f"   Adaptive: {elapsed:.2f}s (fixed at 2: {optimal_elapsed:.2f}s), "
+          f"{evaluation.infrastructure_errors} infrastructure errors, {stats}")
+    assert flooded_evaluation.infrastructure_errors > 0
+    assert flooded_evaluation.correct_answers + flooded_evaluation.incorrect_answers \
+        + flooded_evaluation.infrastructure_errors == len(questions)
+    print("✅ Rejected requests are infrastructure errors, not incorrect answers")
+
+    assert evaluation.status == "completed" and evaluation.infrastructure_errors == 0
+    assert evaluation.correct_answers == expected_correct
+    assert evaluation.correct_answers + evaluation.incorrect_answers == len(questions)
+    assert stats["concurrency_limit"] < 8 and stats["errors"] < flooded_evaluation.infrastructure_errors
+    assert elapsed < optimal_elapsed * 1.5
+    print("✅ The adaptive limit backs off from the rejections and answers every question "
+          "at close to the best fixed concurrency")
+
+
+def test_limit_converges():
+    print("Testing the limit under sustained load on an endpoint with 2 slots...")
+    questions = load_question_bank()[:90]
+    samples = []
+    with SimulatorServer(SimulatorConfig(latency_ms=40.0, slots=2)) as server:
+        setup = _Setup(server.url, questions)
+        limiter = setup.pool.replicas[0].limiter
+        running = threading.Event()
+        running.set()
+
+        def sample():
+            while running.is_set():
+                samples.append(limiter.limit)
+                time.sleep(0.02)
+
+        sampler = threading.Thread(target=sample)
+        sampler.start()
+        try:
+            evaluation, elapsed = setup.run()
+        finally:
+            running.clear()
+            sampler.join()
+        stats = setup.pool.stats()["replicas"][0]
+        peak = server.simulator.stats()["peak_active"]
+
+    settled = samples[len(samples) // 2:]
+    print(f"   {elapsed:.2f}s, limit over the second half {min(settled):.1f}-{max(settled):.1f}, "
+          f"peak {peak} in flight, {stats}")
+    assert evaluation.status == "completed" and evaluation.infrastructure_errors == 0 and stats["errors"] == 0
+    assert peak == 2 and max(samples) >= 3, "the limit grows from 1 past the endpoint's slots"
+    assert min(settled) >= 2, "the limit doesn't collapse below the endpoint's slots"
+    assert max(settled) < limiter.max_limit, "queueing latency keeps the limit off its maximum"
+    assert stats["unloaded_latency_ms"] < 60, "the unloaded latency estimate doesn't follow queueing latency up"
+    print("✅ The limit settles just above the endpoint's parallel slots and stays there under load")
+
+
+def test_outage_recovery():
+    print("Testing an endpoint outage during an evaluation...")
+    questions = load_question_bank()[:12]
+    with SimulatorServer(SimulatorConfig(latency_ms=20.0, error_rate=1.0)) as server:
+        setup = _Setup(server.url, questions)
+        setup.pool.replicas[0].breaker = CircuitBreaker(open_s=0.2, max_open_s=0.4)
+        recover = threading.Timer(1.0, lambda: setattr(server.simulator.config, "error_rate", 0.0))
+        recover.start()
+        evaluation, elapsed = setup.run()
+        recover.join()
+        stats = setup.pool.stats()["replicas"][0]
+        failed_requests = server.simulator.stats()["errors"]
+
+    print(f"   {elapsed:.2f}s, {failed_requests} failed requests, "
+          f"{evaluation.infrastructure_errors} infrastructure errors, {stats}")
+    assert evaluation.status == "completed" and stats["healthy"] and stats["trips"] >= 1
+    assert failed_requests < 30, "the open circuit stops requests instead of retrying them in a loop"
+    assert evaluation.correct_answers + evaluation.incorrect_answers + evaluation.infrastructure_errors \
+        == len(questions)
+    print("✅ The circuit opens during the outage, trial requests find the recovery, and the evaluation finishes")
+
+
+def test_infrastructure_errors_are_resumed():
+    print("Testing infrastructure errors on resume...")
+    questions = load_question_bank()[:10]
+    original_retries, original_wait = evaluation_runner_module.MODEL_RETRIES, model_pool.CIRCUIT_MAX_WAIT_S
+    evaluation_runner_module.MODEL_RETRIES = 0
+    model_pool.CIRCUIT_MAX_WAIT_S = 0.0
+    try:
+        with SimulatorServer(SimulatorConfig(latency_ms=5.0, error_rate=1.0)) as server:
+            setup = _Setup(server.url, questions)
+            down, _ = setup.run()
+            requests_while_down = server.simulator.stats()["requests"]
+
+            server.simulator.config.error_rate = 0.0
+            setup.pool.replicas[0].breaker.record_success()
+            resumed, _ = setup.run(resume=True)
+    finally:
+        evaluation_runner_module.MODEL_RETRIES = original_retries
+        model_pool.CIRCUIT_MAX_WAIT_S = original_wait
+
+    print(f"   Down: {requests_while_down} requests, {down.infrastructure_errors} infrastructure errors, "
+          f"accuracy {down.accuracy}; resumed: {resumed.correct_answers}/{len(questions)} correct, "
+          f"{resumed.infrastructure_errors} infrastructure errors")
+    assert down.infrastructure_errors == len(questions) and down.correct_answers == down.incorrect_answers == 0
+    assert requests_while_down < len(questions), "questions fail fast once the circuit has given up waiting"
+    print("✅ With the endpoint down, questions fail fast as infrastructure errors and accuracy is not dragged to 0")
+
+    assert resumed.infrastructure_errors == 0
+    assert resumed.correct_answers + resumed.incorrect_answers == len(questions)
+    print("✅ Resuming asks the questions that hit infrastructure errors again")
+
+
+if __name__ == "__main__":
+    test_aimd_limit()
+    test_circuit_breaker()
+    test_saturated_endpoint()
+    test_limit_converges()
+    test_outage_recovery()
+    test_infrastructure_errors_are_resumed()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Test the alerting engine against a local webhook stand-in: firing, deduplication,
+resolution, flap suppression, the sliding window, and one test's executions
+observed by several processes.
+"""
+
+import asyncio
+import json
+import sys
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.alerting import AlertEngine, LogNotifier, SlidingWindow
+
+
+class _WebhookStandIn(BaseHTTPRequestHandler):
+    received = []
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        _WebhookStandIn.received.append(json.loads(self.rfile.read(length)))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_webhook():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _WebhookStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/hook"
+
+
+def _session_factory():
+    path = os.path.join(tempfile.mkdtemp(), "alerting.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _session():
+    return _session_factory()()
+
+
+async def _run(statuses, thresholds, engine=None):
+    """Execute one test with the given statuses a minute apart; return the engine and database session."""
+    db = _session()
+    engine = engine or AlertEngine(notifier=LogNotifier())
+    test = models.SyntheticTest(name="checkout", service_name="shop", test_type="api", url="http://shop.test",
+                                interval=60, is_active=True, alert_thresholds=json.dumps(thresholds))
+    db.add(test)
+    db.commit()
+
+    start = datetime(2026, 1, 1, 12, 0)
+    for index, status in enumerate(statuses):
+        execution = models.SyntheticExecution(test_id=test.id, status=status, response_time=100.0,
+                                              executed_at=start + timedelta(minutes=index))
+        db.add(execution)
+        db.commit()
+        await engine.observe(test, execution, db)
+    await engine.drain()
+    return engine, db
+
+
+def test_fire_dedup_resolve():
+    print("Testing fire, dedup and resolve...")
+    server, url = _start_webhook()
+    _WebhookStandIn.received = []
+    statuses = ["success", "failure", "failure", "failure", "failure", "failure", "success", "success", "success"]
+    _, db = asyncio.run(_run(statuses, {"consecutive_failures": 3, "webhook_url": url}))
+    server.shutdown()
+
+    received = [(n["rule"], n["status"]) for n in _WebhookStandIn.received]
+    print(f"   Webhook received: {received}")
+    assert received == [("consecutive_failures", "firing"), ("consecutive_failures", "resolved")]
+    assert db.query(models.Alert).count() == 1
+    print("✅ One firing and one resolved notification for five failures")
+
+
+def test_flap_suppression():
+    print("Testing flap suppression...")
+    sent = []
+
+    class Collector(LogNotifier):
+        async def send(self, notification):
+            sent.append(notification["status"])
+
+    cycle = ["failure", "success", "success", "success"]
+    # Two fire/resolve cycles mark it flapping; it then settles after 30 quiet minutes
+    statuses = cycle * 4 + ["success"] * 35
+    asyncio.run(_run(statuses, {"consecutive_failures": 1}, AlertEngine(notifier=Collector())))
+    print(f"   Notifications: {sent}")
+    assert sent == ["firing", "resolved", "firing", "flapping", "resolved"]
+    print("✅ Flapping rule went quiet and reported once settled")
+
+
+def test_sliding_window():
+    print("Testing sliding window...")
+    window = SlidingWindow(600)
+    for second in range(0, 600, 10):
+        window.add(1000 + second, failed=second % 60 == 0, latency_ms=50 if second % 100 else 900)
+    assert window.total == 60
+    assert window.failures == 10
+    p95 = window.percentile(95)
+    assert 800 <= p95 <= 1050, p95
+    window.advance(1000 + 600 + 300)
+    # Half the window has passed; expiry is accurate to one bucket (20s, two executions)
+    assert 28 <= window.total <= 30, window.total
+    print(f"✅ Error rate and p95 ({p95}ms) over the window, old buckets expired")
+
+    start_time = time.perf_counter()
+    for index in range(100000):
+        window.add(2000 + index * 0.01, failed=index % 7 == 0, latency_ms=index % 500)
+    elapsed_us = (time.perf_counter() - start_time) * 1e6 / 100000
+    print(f"✅ {elapsed_us:.1f}µs per execution")
+
+
+class _Collector(LogNotifier):
+    def __init__(self, sent):
+        self.sent = sent
+
+    async def send(self, notification):
+        self.sent.append((notification["rule"], notification["status"]))
+
+
+def test_processes_share_alerts():
+    print("Testing executions observed by two processes...")
+    session_factory = _session_factory()
+    sent = []
+    # Two processes: their own engine state and database session
+    processes = [(AlertEngine(notifier=_Collector(sent)), session_factory()) for _ in range(2)]
+    db = session_factory()
+    test = models.SyntheticTest(name="checkout", service_name="shop", test_type="api", url="http://shop.test",
+                                interval=60, is_active=True, alert_thresholds=json.dumps({"consecutive_failures": 3}))
+    db.add(test)
+    db.commit()
+
+    async def run():
+        start = datetime(2026, 1, 1, 12, 0)
+        statuses = ["success", "failure", "failure", "failure", "failure", "failure", "success", "success", "success"]
+        for index, status in enumerate(statuses):
+            execution = models.SyntheticExecution(test_id=test.id, status=status, response_time=100.0,
+                                                  executed_at=start + timedelta(minutes=index))
+            db.add(execution)
+            db.commit()
+            # Runs alternate between the processes, as claims from the shared run queue do
+            engine, session = processes[index % 2]
+            await engine.observe(session.merge(test), session.merge(execution), session)
+        for engine, _ in processes:
+            await engine.drain()
+
+    asyncio.run(run())
+    alerts = db.query(models.Alert).all()
+    print(f"   Notifications: {sent}; alerts {[(a.rule, a.status) for a in alerts]}")
+    assert sent == [("consecutive_failures", "firing"), ("consecutive_failures", "resolved")]
+    assert len(alerts) == 1 and alerts[0].status == "resolved" and alerts[0].value == 3
+    print("✅ Streaks count every process's executions and each transition is notified once")
+
+
+def test_racing_insert_adopts_open_alert():
+    print("Testing two processes opening the same alert...")
+    session_factory = _session_factory()
+    sent = []
+    engine = AlertEngine(notifier=_Collector(sent))
+    db = session_factory()
+    test = models.SyntheticTest(name="checkout", service_name="shop", test_type="api", url="http://shop.test",
+                                interval=60, is_active=True,
+                                alert_thresholds=json.dumps({"consecutive_failures": 1, "p95_latency_ms": 50,
+                                                             "min_samples": 1}))
+    db.add(test)
+    db.commit()
+    execution = models.SyntheticExecution(test_id=test.id, status="failure", response_time=100.0,
+                                          executed_at=datetime(2026, 1, 1, 12, 0))
+    db.add(execution)
+    db.commit()
+
+    lookups = []
+    original_lookup = engine._firing_alert
+
+    def lookup_before_other_insert(test_id, rule, session):
+        # The other process commits its alert right after this one's lookup
+        lookups.append(rule)
+        if lookups.count(rule) == 1 and rule == "p95_latency":
+            other = session_factory()
+            other.add(models.Alert(test_id=test_id, rule=rule, status="firing", value=99.0, threshold=50,
+                                   message="opened elsewhere", started_at=datetime(2026, 1, 1, 12, 0)))
+            other.commit()
+            other.close()
+            return None
+        return original_lookup(test_id, rule, session)
+
+    engine._firing_alert = lookup_before_other_insert
+    other_db = session_factory()
+    asyncio.run(engine.observe(other_db.merge(test), other_db.merge(execution), other_db))
+    asyncio.run(engine.drain())
+
+    alerts = {a.rule: a for a in db.query(models.Alert).all()}
+    print(f"   Notifications: {sent}; alerts {[(rule, a.message) for rule, a in alerts.items()]}")
+    assert set(alerts) == {"consecutive_failures", "p95_latency"} and alerts["p95_latency"].message == "opened elsewhere"
+    assert sent == [("consecutive_failures", "firing")], "the losing insert adopts the alert without notifying"
+    print("✅ A unique violation on the open alert means it is already firing, and other changes are kept")
+
+
+def test_tests_apply_in_parallel():
+    print("Testing executions of different tests at once...")
+    session_factory = _session_factory()
+    engine = AlertEngine(notifier=LogNotifier())
+    db = session_factory()
+    tests = [models.SyntheticTest(name=f"test {index}", service_name="shop", test_type="api", url="http://shop.test",
+                                  interval=60, is_active=True, alert_thresholds=json.dumps({"consecutive_failures": 1}))
+             for index in range(2)]
+    db.add_all(tests)
+    db.commit()
+    executions = [models.SyntheticExecution(test_id=test.id, status="failure", response_time=100.0,
+                                            executed_at=datetime(2026, 1, 1, 12, 0)) for test in tests]
+    db.add_all(executions)
+    db.commit()
+
+    # Hold the first test's lock, as a thread applying one of its executions would
+    first_lock = engine._locks.setdefault(tests[0].id, threading.Lock())
+    with first_lock:
+        applied = []
+        worker = threading.Thread(target=lambda: applied.append(
+            engine._apply(tests[1], executions[1], session_factory())))
+        worker.start()
+        worker.join(5)
+        assert applied and len(applied[0]) == 1, "another test's execution doesn't wait for this test's lock"
+
+        blocked = threading.Thread(target=lambda: engine._apply(tests[0], executions[0], session_factory()),
+                                   daemon=True)
+        blocked.start()
+        blocked.join(0.2)
+        assert blocked.is_alive(), "executions of the same test are applied one at a time"
+    blocked.join(5)
+    assert not blocked.is_alive() and db.query(models.Alert).count() == 2
+    print("✅ Alert state is locked per test, so different tests don't serialize")
+
+
+if __name__ == "__main__":
+    test_fire_dedup_resolve()
+    test_flap_suppression()
+    test_sliding_window()
+    test_processes_share_alerts()
+    test_racing_insert_adopts_open_alert()
+    test_tests_apply_in_parallel()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test synthetic check assertions: compilation, evaluation against responses and
+the per-test compile cache.
+"""
+
+import asyncio
+import json
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+import httpx
+
+from app.assertions import AssertionCache, compile_assertions, compile_jsonpath, evaluate_jsonpath
+from app.models import SyntheticTest
+from app.synthetic_monitoring import SyntheticMonitoringService
+
+DOCUMENT = {"status": "ok", "data": {"items": [{"id": 1, "tags": ["a"]}, {"id": 2, "tags": []}]}, "count": 2}
+
+ASSERTIONS = [
+    {"type": "jsonpath", "path": "$.status", "op": "equals", "value": "ok"},
+    {"type": "jsonpath", "path": "$.data.items[*].id", "op": "equals", "value": 2},
+    {"type": "jsonpath", "path": "$['count']", "op": "greater_than", "value": 1},
+    {"type": "regex", "pattern": "\"tags\":\\s*\\[\"a\"\\]"},
+    {"type": "regex", "pattern": "error", "negate": True},
+    {"type": "header", "name": "Content-Type", "op": "contains", "value": "json"},
+    {"type": "latency", "metric": "response_time", "max_ms": 5000}
+]
+
+
+def _test(assertions):
+    return SyntheticTest(id=7, name="assert", test_type="api", url="http://monitored.test/", method="GET",
+                         expected_status=200, timeout=10, auth_type="none", assertions=json.dumps(assertions))
+
+
+def _service():
+    def handler(request):
+        return httpx.Response(200, json=DOCUMENT)
+    return SyntheticMonitoringService(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+def test_jsonpath():
+    print("Testing JSONPath subset...")
+    assert evaluate_jsonpath(compile_jsonpath("$.data.items[*].id"), DOCUMENT) == [1, 2]
+    assert evaluate_jsonpath(compile_jsonpath("$.data.items[-1].tags"), DOCUMENT) == [[]]
+    assert evaluate_jsonpath(compile_jsonpath("$.missing.key"), DOCUMENT) == []
+    print("✅ Paths resolve")
+
+
+def test_invalid_assertions():
+    print("Testing invalid assertions are rejected...")
+    for source in ['{"type": "regex"}', '[{"type": "nope"}]', '[{"type": "regex", "pattern": "("}]',
+                   '[{"type": "jsonpath", "path": "$..deep"}]', '[{"type": "latency"}]',
+                   '[{"type": "jsonpath", "path": "$.status", "op": "contains", "value": 5}]',
+                   '[{"type": "jsonpath", "path": "$.status", "op": "matches", "value": ["o"]}]',
+                   '[{"type": "header", "name": "server", "op": "contains", "value": {"x": 1}}]',
+                   '[{"type": "header", "name": 7}]', '[{"type": "regex", "pattern": 5}]',
+                   '[{"type": "jsonpath", "path": 3}]']:
+        try:
+            compile_assertions(source)
+            raise AssertionError(f"accepted {source}")
+        except ValueError as e:
+            print(f"✅ {source}: {e}")
+
+
+def test_assertions_evaluated():
+    print("Testing assertions against a response...")
+    result = asyncio.run(_service().execute_api_test(_test(ASSERTIONS)))
+    results = result["details"]["assertions"]
+    for item in results:
+        print(f"{'✅' if item['passed'] else '❌'} {item['assertion']}")
+    assert result["status"] == "success"
+    assert len(results) == len(ASSERTIONS)
+
+    failing = ASSERTIONS + [{"type": "jsonpath", "path": "$.status", "op": "equals", "value": "down"}]
+    result = asyncio.run(_service().execute_api_test(_test(failing)))
+    assert result["status"] == "failure"
+    assert "$.status equals 'down'" in result["error_message"]
+    print("✅ Failed assertion fails the check")
+
+
+def test_assertion_cache():
+    print("Testing compiled assertion cache...")
+    cache = AssertionCache()
+    test = _test(ASSERTIONS)
+    compiled = cache.get(test)
+    assert cache.get(test) is compiled
+
+    test.assertions = json.dumps(ASSERTIONS[:1])
+    assert cache.get(test) is not compiled
+    assert len(cache.get(test).json_paths) == 1
+    print("✅ Reused until the definition changes")
+
+    start_time = time.perf_counter()
+    for _ in range(10000):
+        cache.get(test)
+    print(f"✅ 10000 cached lookups in {(time.perf_counter() - start_time) * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    test_jsonpath()
+    test_invalid_assertions()
+    test_assertions_evaluated()
+    test_assertion_cache()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test the offline benchmark suite: every benchmark runs at its quick sizes,
+results are machine-readable, and comparisons flag regressions.
+"""
+
+import copy
+import json
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from benchmarks import cases  # noqa: F401  (registers the benchmarks)
+from benchmarks.harness import compare, load_results, registered, run_suite, write_results
+
+
+def test_quick_suite():
+    print("Testing a quick run of every benchmark...")
+    document = run_suite(quick=True, repeat=1)
+
+    names = {result["name"] for result in document["results"]}
+    assert names == {bench.name for bench in registered()}
+    for expected in ("calculate_metrics", "score_batch", "csv_ingest", "results_detail", "monitoring_metrics",
+                     "scheduler_fanout"):
+        assert expected in names, expected
+    for result in document["results"]:
+        assert result["median"] > 0 and result["throughput"] > 0, result
+        assert result["key"].startswith(result["name"])
+    assert document["quick"] is True
+    assert document["environment"]["python"]
+    print("✅ All benchmarks ran offline")
+
+    path = os.path.join(tempfile.mkdtemp(), "results", "quick.json")
+    write_results(document, path)
+    with open(path) as f:
+        assert json.load(f)["results"][0]["key"] == document["results"][0]["key"]
+    assert load_results(path)["suite"] == "eval-forge-backend"
+    print("✅ Results round-trip through JSON")
+
+
+def test_compare():
+    print("Testing regression detection...")
+    baseline = {"schema_version": 1, "results": [
+        {"key": "csv_ingest[rows=10000]", "median": 1.0},
+        {"key": "score_batch[pairs=1000]", "median": 0.2},
+        {"key": "removed", "median": 0.1}
+    ]}
+    current = copy.deepcopy(baseline)
+    current["results"][0]["median"] = 1.2
+    current["results"][1]["median"] = 0.3
+    current["results"][2]["key"] = "added"
+
+    rows = {row["key"]: row for row in compare(baseline, current, max_regression=0.25)}
+    assert set(rows) == {"csv_ingest[rows=10000]", "score_batch[pairs=1000]"}
+    assert not rows["csv_ingest[rows=10000]"]["regressed"]
+    assert rows["score_batch[pairs=1000]"]["regressed"]
+    assert abs(rows["score_batch[pairs=1000]"]["ratio"] - 1.5) < 1e-9
+    print("✅ Only medians beyond the allowed slowdown count as regressions")
+
+
+if __name__ == "__main__":
+    test_quick_suite()
+    test_compare()
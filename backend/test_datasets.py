@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test the content-addressed dataset store: content hashes, items shared
+across datasets, versions per name, names kept when content is reused, and
+uploads racing on the same content.
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.datasets import dataset_hash, get_dataset_items, get_or_create_dataset, item_hash
+
+QUESTIONS = [
+    {"question": "What is the capital of France?", "answer": "Paris"},
+    {"question": "What is 2 + 2?", "answer": "4"},
+    {"question": "Which planet is known as the Red Planet?", "answer": "Mars"},
+]
+
+
+def _session_factory():
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'datasets.db')}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def test_hashes():
+    print("Testing content hashes...")
+    assert item_hash("q", "a") == item_hash("q", "a") != item_hash("q", "b")
+    assert item_hash("ab", "c") != item_hash("a", "bc"), "question and answer are separated"
+    hashes = [item_hash(q["question"], q["answer"]) for q in QUESTIONS]
+    assert dataset_hash(hashes) != dataset_hash(list(reversed(hashes))), "order is part of a dataset's content"
+    print("✅ Items hash by question and answer, datasets by their ordered items")
+
+
+def test_dedup_and_versions():
+    print("Testing dedup and versions...")
+    db = _session_factory()()
+    first = get_or_create_dataset(db, "capitals", QUESTIONS)
+    assert first.version == 1 and first.item_count == 3 and first.content_dataset_id is None
+    assert get_or_create_dataset(db, "capitals", QUESTIONS).id == first.id
+    print("✅ Uploading the same content under the same name reuses the dataset")
+
+    changed = get_or_create_dataset(db, "capitals", QUESTIONS[:2] + [{"question": "Largest ocean?",
+                                                                         "answer": "Pacific"}])
+    assert changed.id != first.id and changed.version == 2
+    assert db.query(models.DatasetItem).count() == 4, "unchanged items are shared between versions"
+    print("✅ Changed content under a name becomes its next version, sharing unchanged items")
+
+    renamed = get_or_create_dataset(db, "geography quiz", QUESTIONS)
+    assert renamed.id != first.id and renamed.name == "geography quiz" and renamed.version == 1
+    assert renamed.content_dataset_id == first.id and renamed.content_hash == first.content_hash
+    assert [item.id for item in get_dataset_items(db, renamed.id)] == [item.id for item in get_dataset_items(db, first.id)]
+    assert db.query(models.DatasetMember).count() == 6, "reused content stores no new members"
+    assert get_or_create_dataset(db, "geography quiz", QUESTIONS).id == renamed.id
+    print("✅ Another name for stored content keeps its name and points at the stored items")
+    db.close()
+
+
+def _race(name_a: str, name_b: str):
+    """Have session A store the dataset after session B found no stored content but before B writes."""
+    session_factory = _session_factory()
+    db_a, db_b = session_factory(), session_factory()
+    stored = {}
+    queries = []
+
+    def store_first(orm_execute_state):
+        # B's third query (the next version number) comes after its lookups for existing datasets
+        queries.append(orm_execute_state.statement)
+        if len(queries) == 3:
+            stored["a"] = get_or_create_dataset(db_a, name_a, QUESTIONS)
+
+    event.listen(db_b, "do_orm_execute", store_first)
+    result = get_or_create_dataset(db_b, name_b, QUESTIONS)
+    owners = db_b.query(models.Dataset).filter(models.Dataset.content_dataset_id.is_(None)).count()
+    members = db_b.query(models.DatasetMember).count()
+    a_id = stored["a"].id
+    db_a.close()
+    db_b.close()
+    return a_id, result, owners, members
+
+
+def test_concurrent_uploads():
+    print("Testing uploads racing on the same content...")
+    a_id, result, owners, members = _race("upload", "upload")
+    assert result.id == a_id and owners == 1 and members == len(QUESTIONS)
+    print("✅ The losing upload of the same name gets the winner's dataset instead of an IntegrityError")
+
+    a_id, result, owners, members = _race("upload", "copy")
+    assert result.id != a_id and result.name == "copy" and result.content_dataset_id == a_id
+    assert owners == 1 and members == len(QUESTIONS)
+    print("✅ The losing upload under another name becomes a name for the winner's content")
+
+
+if __name__ == "__main__":
+    test_hashes()
+    test_dedup_and_versions()
+    test_concurrent_uploads()
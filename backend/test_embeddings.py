@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Parity test and benchmark for the semantic similarity embedding backends.
+
+    python test_embeddings.py                  # parity against the torch backend, then benchmark
+    python test_embeddings.py benchmark onnx   # benchmark one backend in this process
+"""
+
+import json
+import resource
+import subprocess
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from app.embeddings import BACKENDS
+from app.metrics import MetricsCalculator
+
+PAIRS = [
+    ("The capital of France is Paris.", "Paris is the capital of France."),
+    ("Water boils at 100 degrees Celsius at sea level.", "At sea level water boils at 100 C."),
+    ("Photosynthesis converts light energy into chemical energy.", "Plants use sunlight to make food."),
+    ("The Battle of Hastings was fought in 1066.", "It happened in 1066."),
+    ("Shakespeare wrote Hamlet.", "The author of Hamlet is William Shakespeare."),
+    ("The square root of 144 is 12.", "12"),
+    ("Mount Everest is the tallest mountain above sea level.", "I am not sure, maybe K2?"),
+    ("DNA has a double helix structure.", "The stock market closed higher today."),
+]
+
+# Maximum absolute difference from the torch backend's 4-decimal scores
+TOLERANCES = {"onnx": 0.001, "onnx-int8": 0.03}
+
+BENCHMARK_PAIRS = 512
+
+
+def _scores(backend: str):
+    calculator = MetricsCalculator(embedding_backend=backend)
+    if not calculator._init_sentence_model():
+        return None
+    references = [reference for reference, _ in PAIRS]
+    candidates = [candidate for _, candidate in PAIRS]
+    return calculator.calculate_semantic_similarity_batch(references, candidates)
+
+
+def test_embedding_parity():
+    """ONNX backends must score within tolerance of the sentence-transformers backend."""
+    print("Testing embedding backend parity...")
+    expected = _scores("torch")
+    if expected is None:
+        print("⚠️  torch backend unavailable (sentence-transformers not installed), skipping parity")
+        return
+
+    for backend, tolerance in TOLERANCES.items():
+        scores = _scores(backend)
+        if scores is None:
+            print(f"⚠️  {backend} backend unavailable (run provision_models.py --onnx), skipping")
+            continue
+        max_diff = max(abs(a - b) for a, b in zip(scores, expected))
+        status = "✅" if max_diff <= tolerance else "❌"
+        print(f"{status} {backend}: max difference {max_diff:.4f} (tolerance {tolerance})")
+        assert max_diff <= tolerance
+
+
+def benchmark_backend(backend: str) -> dict:
+    """Load one backend and time batched similarity scoring; run in a fresh process for a clean RSS."""
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start_time = time.perf_counter()
+    calculator = MetricsCalculator(embedding_backend=backend)
+    if not calculator._init_sentence_model():
+        return {"backend": backend, "error": calculator.scorer_errors.get("semantic_similarity")}
+    load_s = time.perf_counter() - start_time
+
+    pairs = (PAIRS * (BENCHMARK_PAIRS // len(PAIRS) + 1))[:BENCHMARK_PAIRS]
+    references = [reference for reference, _ in pairs]
+    candidates = [candidate for _, candidate in pairs]
+    calculator.calculate_semantic_similarity_batch(references[:8], candidates[:8])
+
+    start_time = time.perf_counter()
+    calculator.calculate_semantic_similarity_batch(references, candidates)
+    batch_s = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for reference, candidate in pairs[:64]:
+        calculator.calculate_semantic_similarity(reference, candidate)
+    single_ms = (time.perf_counter() - start_time) / 64 * 1000
+
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "pairs_per_s": round(len(pairs) / batch_s, 1),
+        "single_pair_ms": round(single_ms, 2),
+        "max_rss_mb": round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, 1)
+    }
+
+
+def run_benchmarks():
+    print("\nBenchmarking embedding backends...")
+    for backend in BACKENDS:
+        output = subprocess.run(
+            [sys.executable, __file__, "benchmark", backend],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip().splitlines()
+        result = json.loads(output[-1]) if output else {"backend": backend, "error": "no output"}
+        if "error" in result:
+            print(f"⚠️  {backend}: {result['error']}")
+        else:
+            print(f"✅ {backend}: load {result['load_s']}s, {result['pairs_per_s']} pairs/s batched, "
+                  f"{result['single_pair_ms']} ms/pair single, +{result['max_rss_mb']} MB RSS")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "benchmark":
+        print(json.dumps(benchmark_backend(sys.argv[2])))
+    else:
+        test_embedding_parity()
+        run_benchmarks()
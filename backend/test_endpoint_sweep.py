@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test external app sweeps against a mock transport: inheritance of base_url, auth
+and timeout, bounded per-app concurrency, a 500-endpoint sweep recorded in
+one transaction, and an app with malformed credentials not stopping the others.
+"""
+
+import asyncio
+import json
+import sys
+import os
+import tempfile
+import time
+from datetime import datetime
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+import httpx
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.endpoint_sweep import EndpointSweepRunner
+
+
+def _session():
+    path = os.path.join(tempfile.mkdtemp(), "sweep.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def _app(db, endpoints, is_active=True, auth_credentials=json.dumps({"token": "secret"})):
+    app = models.ExternalApp(name="shop", service_name="shop", base_url="http://shop.test/api",
+                             auth_type="bearer_token", auth_credentials=auth_credentials,
+                             timeout=5, is_active=is_active, created_at=datetime.now())
+    db.add(app)
+    db.flush()
+    for endpoint in endpoints:
+        db.add(models.ExternalAppEndpoint(external_app_id=app.id, created_at=datetime.now(), **endpoint))
+    db.commit()
+    db.refresh(app)
+    return app
+
+
+def test_inheritance_and_results():
+    print("Testing endpoint inheritance and results...")
+    seen = []
+
+    async def handler(request):
+        seen.append((request.url.path, request.headers.get("authorization"), request.headers.get("x-env"),
+                     request.extensions["timeout"]["read"]))
+        if request.url.path.endswith("/slow"):
+            raise httpx.ReadTimeout("timed out", request=request)
+        if request.url.path.endswith("/missing"):
+            return httpx.Response(404)
+        return httpx.Response(200, text='{"status": "ok"}')
+
+    _, db = _session()
+    app = _app(db, [
+        {"name": "health", "endpoint_path": "/health", "expected_response_contains": "ok",
+         "headers": json.dumps({"X-Env": "prod"})},
+        {"name": "wrong text", "endpoint_path": "/health", "expected_response_contains": "degraded"},
+        {"name": "missing", "endpoint_path": "/missing"},
+        {"name": "slow", "endpoint_path": "/slow", "timeout": 1},
+        {"name": "bad headers", "endpoint_path": "/health", "headers": "{not json"},
+        {"name": "disabled", "endpoint_path": "/health", "is_active": False},
+    ])
+
+    runner = EndpointSweepRunner(transport=httpx.MockTransport(handler))
+    sweep = asyncio.run(runner.sweep_app(app, db))
+    statuses = {check.endpoint_id: (check.status, check.error_message) for check in sweep.checks}
+    by_name = {endpoint.name: statuses.get(endpoint.id) for endpoint in app.endpoints}
+    print(f"   Results: {by_name}")
+
+    assert sweep.total == 5 and sweep.succeeded == 1 and sweep.failed == 4
+    assert by_name["health"][0] == "success"
+    assert by_name["wrong text"][0] == "failure"
+    assert by_name["missing"] == ("failure", "Expected status 200, got 404")
+    assert by_name["slow"] == ("timeout", "Request timeout after 1 seconds")
+    assert by_name["bad headers"][0] == "error"
+    assert by_name["disabled"] is None
+    print("✅ Statuses, timeouts and malformed endpoints recorded per endpoint")
+
+    assert all(path.startswith("/api/") for path, _, _, _ in seen)
+    assert all(auth == "Bearer secret" for _, auth, _, _ in seen)
+    assert ("/api/health", "Bearer secret", "prod", 5) in seen
+    assert ("/api/slow", "Bearer secret", None, 1) in seen
+    print("✅ Endpoints inherit base_url, auth and timeout from their app")
+
+
+def test_large_sweep():
+    print("Testing a 500-endpoint sweep...")
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return httpx.Response(200, text="ok")
+
+    engine, db = _session()
+    _app(db, [{"name": f"endpoint {index}", "endpoint_path": f"/items/{index}"} for index in range(500)])
+    _app(db, [{"name": "health", "endpoint_path": "/health"}], is_active=False)
+
+    # Count commits of transactions that wrote something; reads end with empty commits too
+    commits = []
+    writes = []
+
+    def before_execute(connection, cursor, statement, *args):
+        if statement.lstrip().split(None, 1)[0].upper() in ("INSERT", "UPDATE", "DELETE"):
+            writes.append(statement)
+
+    def on_commit(connection):
+        if writes:
+            commits.append(len(writes))
+            writes.clear()
+
+    event.listen(engine, "before_cursor_execute", before_execute)
+    event.listen(engine, "commit", on_commit)
+
+    runner = EndpointSweepRunner(transport=httpx.MockTransport(handler), app_concurrency=50)
+    start_time = time.perf_counter()
+    sweeps = asyncio.run(runner.sweep_all(db))
+    elapsed = time.perf_counter() - start_time
+
+    assert len(sweeps) == 1, "inactive apps are skipped"
+    assert sweeps[0].total == 500 and sweeps[0].succeeded == 500
+    assert db.query(models.EndpointCheck).count() == 500
+    assert peak <= 50, peak
+    assert len(commits) == 1, commits
+    # Serially this would take 25s; 10 waves of 50 take about half a second
+    assert elapsed < 5, elapsed
+    print(f"✅ 500 endpoints in {elapsed:.2f}s, at most {peak} in flight, {len(commits)} write commit")
+
+
+def test_malformed_credentials():
+    print("Testing an app with malformed credentials...")
+
+    async def handler(request):
+        return httpx.Response(200, text="ok")
+
+    _, db = _session()
+    broken = _app(db, [{"name": "health", "endpoint_path": "/health"}, {"name": "items", "endpoint_path": "/items"}],
+                  auth_credentials="{not json")
+    listed = _app(db, [{"name": "health", "endpoint_path": "/health"}], auth_credentials='["token"]')
+    healthy = _app(db, [{"name": "health", "endpoint_path": "/health"}])
+
+    runner = EndpointSweepRunner(transport=httpx.MockTransport(handler))
+    sweeps = {sweep.external_app_id: sweep for sweep in asyncio.run(runner.sweep_all(db))}
+    assert set(sweeps) == {broken.id, listed.id, healthy.id}
+    for app in (broken, listed):
+        sweep = sweeps[app.id]
+        assert sweep.error.startswith("Invalid auth_credentials") and sweep.failed == sweep.total == len(app.endpoints)
+        assert all(check.status == "error" and check.error_message == sweep.error for check in sweep.checks)
+    assert sweeps[healthy.id].error is None and sweeps[healthy.id].succeeded == 1
+    print(f"   {sweeps[broken.id].error}")
+    print("✅ The broken apps record their error and the other apps are still swept")
+
+
+if __name__ == "__main__":
+    test_inheritance_and_results()
+    test_large_sweep()
+    test_malformed_credentials()
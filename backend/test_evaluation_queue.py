@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test the residency-aware evaluation queue: model selection per endpoint,
+interleaved evaluations of two models against a simulated Ollama that holds
+one model at a time, compared with running them all at once, and lanes
+shared through a model pool's replicas.
+"""
+
+import asyncio
+import functools
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import evaluation_runner as evaluation_runner_module
+from app import models
+from app.datasets import get_or_create_dataset
+from app.evaluation_queue import EndpointLane, EvaluationQueue, QueuedEvaluation
+from app.ollama_simulator import SimulatorConfig, SimulatorServer
+from app.result_writer import ResultWriter
+
+QUESTIONS = [
+    {"question": "What is the capital of France?", "answer": "Paris"},
+    {"question": "How many continents are there?", "answer": "7"},
+    {"question": "Who wrote Hamlet?", "answer": "William Shakespeare"},
+    {"question": "What is the chemical symbol for gold?", "answer": "Au"}
+]
+MODELS = ["sim-a:latest", "sim-b:latest"]
+LOAD_MS = 300.0
+
+
+def test_next_model():
+    print("Testing which model an endpoint runs next...")
+
+    async def check():
+        lane = EndpointLane(EvaluationQueue(max_wait_s=60), "http://ollama.test")
+        assert lane.next_model(0) is None
+        lane.pending = [QueuedEvaluation(1, lane.endpoint, "b", False), QueuedEvaluation(2, lane.endpoint, "a", False)]
+        assert lane.next_model(lane.pending[0].enqueued_at) == "b", "oldest first with nothing loaded"
+
+        lane.resident = "a"
+        now = lane.pending[0].enqueued_at
+        assert lane.next_model(now + 1) == "a", "the loaded model keeps going"
+        assert lane.next_model(now + 61) == "b", "until another model has waited too long"
+
+        lane.pending = lane.pending[:1]
+        assert lane.next_model(now) == "b", "switch once the loaded model has no work"
+
+    asyncio.run(check())
+    print("✅ The resident model is preferred, the oldest other model wins once it has waited max_wait_s")
+
+
+def _setup(server, evaluations: int):
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'queue.db')}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = session_factory()
+    dataset = get_or_create_dataset(db, "queue", QUESTIONS)
+    db_models = [models.Model(name=name, type="ollama", endpoint=server.url, model_name=name) for name in MODELS]
+    db.add_all(db_models)
+    db.flush()
+    # Interleaved submissions: a, b, a, b, ...
+    db_evaluations = [
+        models.Evaluation(name=f"evaluation {index}", model_id=db_models[index % 2].id, dataset_id=dataset.id,
+                          total_questions=len(QUESTIONS), metrics='["bleu"]')
+        for index in range(evaluations)
+    ]
+    db.add_all(db_evaluations)
+    db.commit()
+    ids = [(evaluation.id, MODELS[index % 2]) for index, evaluation in enumerate(db_evaluations)]
+    db.close()
+    return session_factory, ids
+
+
+def _run_interleaved(use_queue: bool, evaluations: int = 6):
+    config = SimulatorConfig(models=MODELS, latency_ms=20.0, load_ms=LOAD_MS, max_loaded_models=1)
+    original_writer = evaluation_runner_module.ResultWriter
+    with SimulatorServer(config, questions=QUESTIONS) as server:
+        session_factory, ids = _setup(server, evaluations)
+        evaluation_runner_module.ResultWriter = functools.partial(ResultWriter, session_factory=session_factory)
+        queue = EvaluationQueue(session_factory=session_factory, evaluations_per_model=2)
+
+        async def run_all():
+            if use_queue:
+                await asyncio.gather(*(queue.run(evaluation_id, server.url, model_name)
+                                       for evaluation_id, model_name in ids))
+            else:
+                # Every evaluation at once, as when each run request started immediately
+                await asyncio.gather(*(queue.run_job(QueuedEvaluation(evaluation_id, server.url, model_name, False))
+                                       for evaluation_id, model_name in ids))
+
+        try:
+            asyncio.run(run_all())
+        finally:
+            evaluation_runner_module.ResultWriter = original_writer
+        stats = server.simulator.stats()
+
+    db = session_factory()
+    evaluations = db.query(models.Evaluation).order_by(models.Evaluation.id).all()
+    db.close()
+    return stats, evaluations, queue
+
+
+def test_interleaved_evaluations():
+    print("Testing interleaved evaluations of two models on one endpoint...")
+    naive_stats, naive_evaluations, _ = _run_interleaved(use_queue=False)
+    print(f"   All at once: {naive_stats['loads']} model loads")
+
+    stats, evaluations, queue = _run_interleaved(use_queue=True)
+    lane = queue.status()[0]
+    print(f"   Queued: {stats['loads']} model loads, {lane['swaps']} swaps, "
+          f"per evaluation: {[(e.model_loads, round(e.model_load_ms or 0)) for e in evaluations]}")
+
+    assert all(e.status == "completed" for e in naive_evaluations + evaluations)
+    assert stats["loads"] == 2 and lane["swaps"] == 1
+    assert naive_stats["loads"] > 2 * stats["loads"]
+    print("✅ Grouping by model loads each model once instead of swapping between questions")
+
+    assert sum(e.model_loads for e in evaluations) == 2
+    assert sum(e.model_load_ms for e in evaluations) >= 2 * LOAD_MS
+    assert sum(e.model_load_ms for e in naive_evaluations) > sum(e.model_load_ms for e in evaluations)
+    print("✅ Load time is reported per evaluation")
+
+    assert stats["unloads"] >= 1, "the first model is unloaded before the switch"
+    assert not lane["running"] and not lane["queued"] and lane["completed"] == 6
+    print("✅ The previous model is unloaded explicitly and the queue drains")
+
+
+def test_duplicate_submission():
+    print("Testing duplicate submissions...")
+
+    async def check():
+        queue = EvaluationQueue(session_factory=lambda: None)
+        queue.lanes["http://ollama.test"] = lane = EndpointLane(queue, "http://ollama.test")
+        lane.running.append(QueuedEvaluation(5, lane.endpoint, "a", False))
+        try:
+            queue.submit(5, "http://ollama.test", "a")
+            assert False, "already running"
+        except ValueError:
+            pass
+
+    asyncio.run(check())
+    print("✅ An evaluation can only be queued once")
+
+
+def test_replica_residency():
+    print("Testing evaluations that share endpoints through a model pool...")
+
+    class RecordingQueue(EvaluationQueue):
+        def __init__(self):
+            super().__init__(session_factory=lambda: None, evaluations_per_model=2)
+            self.events = []
+
+        async def run_job(self, job):
+            self.events.append(("start", job.model_name))
+            await asyncio.sleep(0.05)
+            self.events.append(("end", job.model_name))
+
+        async def set_keep_alive(self, endpoints, model_name, keep_alive):
+            self.events.append(("keep_alive", model_name, sorted(endpoints), keep_alive))
+
+    async def check():
+        queue = RecordingQueue()
+        # a's pool replicates onto b's endpoint; c's endpoint is unrelated
+        await asyncio.gather(queue.run(1, "http://gpu-1", "a", replica_endpoints=["http://gpu-2/"]),
+                             queue.run(2, "http://gpu-2", "b"),
+                             queue.run(3, "http://gpu-3", "c"))
+        return queue
+
+    queue = asyncio.run(check())
+    lanes = queue.status()
+    print(f"   Lanes: {[(lane['endpoint'], lane['completed'], lane['swaps']) for lane in lanes]}")
+    assert [(lane["endpoint"], lane["completed"]) for lane in lanes] == [("http://gpu-1", 2), ("http://gpu-3", 1)]
+    events = [event for event in queue.events if event[0] != "keep_alive" or event[1] != "c"]
+    assert events.index(("end", "a")) < events.index(("start", "b")), "b waits for a to leave its endpoint"
+    assert ("keep_alive", "a", ["http://gpu-1", "http://gpu-2"], 0) in events
+    assert events.index(("keep_alive", "a", ["http://gpu-1", "http://gpu-2"], 0)) < events.index(("start", "b"))
+    print("✅ An evaluation joins the lane of a replica it shares, so the replica isn't loaded with two models")
+
+
+if __name__ == "__main__":
+    test_next_model()
+    test_interleaved_evaluations()
+    test_duplicate_submission()
+    test_replica_residency()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Test resuming evaluations: only unanswered questions and infrastructure
+errors are asked again, legacy questions are matched on their id or text,
+aggregates are rebuilt from every stored result, and the lease keeps other
+processes from resuming or interrupting an evaluation that is still running
+somewhere.
+"""
+
+import asyncio
+import functools
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import evaluation_runner as evaluation_runner_module
+from app import models
+from app.datasets import get_evaluation_items, get_or_create_dataset
+from app.evaluation_runner import EvaluationOwnedError, evaluation_runner
+from app.model_pool import ModelPoolRegistry
+from app.ollama_simulator import SimulatorConfig, SimulatorServer
+from app.question_bank import load_question_bank
+from app.result_writer import ResultWriter
+from app.scheduler import WORKER_ID
+
+
+def _setup(endpoint: str, question_count: int, **evaluation_fields):
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'resume.db')}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = session_factory()
+    dataset = get_or_create_dataset(db, "resume", load_question_bank()[:question_count])
+    model = models.Model(name="resume", type="ollama", endpoint=endpoint, model_name="sim-llama:latest",
+                         parallel_requests=1)
+    db.add(model)
+    db.flush()
+    evaluation = models.Evaluation(name="resume", model_id=model.id, dataset_id=dataset.id,
+                                   total_questions=question_count, metrics='["bleu"]', **evaluation_fields)
+    db.add(evaluation)
+    db.commit()
+    return session_factory, db, evaluation
+
+
+def _run(session_factory, db, evaluation, resume: bool, during=None):
+    """Run the evaluation against a private writer and pool registry, with during() alongside it."""
+    original_writer, original_pools = evaluation_runner_module.ResultWriter, evaluation_runner_module.model_pools
+    evaluation_runner_module.ResultWriter = functools.partial(ResultWriter, session_factory=session_factory)
+    evaluation_runner_module.model_pools = ModelPoolRegistry()
+
+    async def run():
+        side = asyncio.create_task(during()) if during else None
+        try:
+            await evaluation_runner.run(evaluation, db, resume=resume)
+        finally:
+            if side:
+                await side
+
+    try:
+        asyncio.run(run())
+    finally:
+        evaluation_runner_module.ResultWriter = original_writer
+        evaluation_runner_module.model_pools = original_pools
+
+
+def _session():
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'resume.db')}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def _legacy_evaluation(db) -> models.Evaluation:
+    model = models.Model(name="resume", type="ollama", endpoint="http://127.0.0.1:9", model_name="resume")
+    db.add(model)
+    db.flush()
+    evaluation = models.Evaluation(name="resume", model_id=model.id, total_questions=4,
+                                   status="interrupted")
+    db.add(evaluation)
+    db.commit()
+    return evaluation
+
+
+def _stored(db, evaluation: models.Evaluation) -> list:
+    return db.query(models.Result).filter(models.Result.evaluation_id == evaluation.id).all()
+
+
+def _result(evaluation: models.Evaluation, item, **fields) -> models.Result:
+    return models.Result(evaluation_id=evaluation.id, dataset_item_id=item.id, question=item.question,
+                         expected_answer=item.expected_answer, response_time=1.0, **fields)
+
+
+def test_resume_asks_only_unanswered():
+    print("Testing a resumed evaluation...")
+    with SimulatorServer(SimulatorConfig(latency_ms=10.0, slots=1)) as server:
+        session_factory, db, evaluation = _setup(server.url, 8, status="interrupted")
+        items = get_evaluation_items(db, evaluation)
+        db.add_all([_result(evaluation, items[0], model_response="stored", is_correct=True),
+                    _result(evaluation, items[1], model_response="stored", is_correct=False),
+                    _result(evaluation, items[2], model_response="", is_correct=False, infrastructure_error=True)])
+        db.commit()
+
+        _run(session_factory, db, evaluation, resume=True)
+        requests = server.simulator.requests
+
+    results = db.query(models.Result).filter(models.Result.evaluation_id == evaluation.id).all()
+    by_item = {}
+    for result in results:
+        by_item.setdefault(result.dataset_item_id, []).append(result)
+    print(f"   {requests} requests, {len(results)} results, status {evaluation.status}")
+    assert requests == 6, "two answered questions are skipped, the infrastructure error is asked again"
+    assert evaluation.status == "completed" and len(results) == 8 and all(len(r) == 1 for r in by_item.values())
+    assert [r.model_response for r in by_item[items[0].id] + by_item[items[1].id]] == ["stored", "stored"]
+    assert not by_item[items[2].id][0].infrastructure_error and evaluation.infrastructure_errors == 0
+    assert evaluation.correct_answers + evaluation.incorrect_answers == 8, "aggregates include stored answers"
+    assert evaluation.owner_id == WORKER_ID and evaluation.lease_expires_at is None
+    db.close()
+    print("✅ Stored answers are kept and only unanswered questions and infrastructure errors are asked")
+
+
+def test_legacy_pending_questions():
+    print("Testing which legacy questions a resume asks...")
+    db = _session()
+    legacy = _legacy_evaluation(db)
+    questions = [models.Question(evaluation_id=legacy.id, question=q["question"], expected_answer=q["answer"])
+                 for q in load_question_bank()[:4]]
+    db.add_all(questions)
+    db.flush()
+    db.add_all([
+        models.Result(evaluation_id=legacy.id, question_id=questions[0].id, question=questions[0].question,
+                      expected_answer=questions[0].expected_answer, is_correct=True, response_time=1),
+        # Written before results recorded their question, so it is matched on text
+        models.Result(evaluation_id=legacy.id, question=questions[1].question,
+                      expected_answer=questions[1].expected_answer, is_correct=False, response_time=1)
+    ])
+    db.commit()
+    pending = evaluation_runner._pending_items(db, legacy, _stored(db, legacy))
+    assert [q.id for q in pending] == [q.id for q in questions[2:]]
+    db.close()
+    print("✅ Legacy questions are matched on their id, or on their text for older results")
+
+
+def test_rebuild_aggregates():
+    print("Testing aggregates rebuilt from stored results...")
+    db = _session()
+    evaluation = _legacy_evaluation(db)
+    db.add_all([
+        models.Result(evaluation_id=evaluation.id, question="a", expected_answer="a", is_correct=True,
+                      bleu_score=0.5, response_time=100),
+        models.Result(evaluation_id=evaluation.id, question="b", expected_answer="b", is_correct=True,
+                      bleu_score=None, response_time=200),
+        models.Result(evaluation_id=evaluation.id, question="c", expected_answer="c", is_correct=False,
+                      bleu_score=0.2, response_time=300)
+    ])
+    db.commit()
+    evaluation_runner.rebuild_aggregates(db, evaluation)
+    assert evaluation.correct_answers == 2 and evaluation.incorrect_answers == 1
+    assert abs(evaluation.accuracy - 2 / 3) < 1e-9 and evaluation.avg_response_time == 200
+    assert abs(evaluation.avg_bleu_score - 0.35) < 1e-9, "missing scores are left out of the averages"
+    assert evaluation.avg_semantic_similarity is None
+    db.close()
+    print("✅ Accuracy and averages cover every stored result, skipping missing scores")
+
+
+def test_live_lease_blocks_takeover():
+    print("Testing an evaluation another process is running...")
+    live = datetime.utcnow() + timedelta(seconds=60)
+    session_factory, db, evaluation = _setup("http://127.0.0.1:9", 4, status="running", owner_id="other:1:abc",
+                                             lease_expires_at=live)
+    try:
+        _run(session_factory, db, evaluation, resume=True)
+        assert False, "a running evaluation with a live lease must not be resumed"
+    except EvaluationOwnedError as e:
+        assert "other:1:abc" in str(e)
+    evaluation_runner.mark_interrupted_evaluations(session_factory)
+    db.refresh(evaluation)
+    assert evaluation.status == "running" and evaluation.owner_id == "other:1:abc"
+    print("✅ A live lease keeps other processes from resuming it or marking it interrupted")
+
+    evaluation.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    evaluation_runner.mark_interrupted_evaluations(session_factory)
+    db.refresh(evaluation)
+    assert evaluation.status == "interrupted"
+    db.close()
+    print("✅ Once the lease expires the evaluation is marked interrupted")
+
+
+def test_lost_lease_stops_run():
+    print("Testing a run whose lease is taken over...")
+    original_heartbeat = evaluation_runner_module.EVALUATION_HEARTBEAT_S
+    evaluation_runner_module.EVALUATION_HEARTBEAT_S = 0.05
+    try:
+        with SimulatorServer(SimulatorConfig(latency_ms=50.0, slots=1)) as server:
+            session_factory, db, evaluation = _setup(server.url, 40)
+
+            async def take_over():
+                # Another process resuming after this one missed its renewals
+                await asyncio.sleep(0.3)
+                other = session_factory()
+                other.query(models.Evaluation).filter(models.Evaluation.id == evaluation.id).update(
+                    {models.Evaluation.owner_id: "other:1:abc"})
+                other.commit()
+                other.close()
+
+            try:
+                _run(session_factory, db, evaluation, resume=False, during=take_over)
+                assert False, "losing the lease ends the run"
+            except EvaluationOwnedError:
+                pass
+    finally:
+        evaluation_runner_module.EVALUATION_HEARTBEAT_S = original_heartbeat
+
+    db.refresh(evaluation)
+    stored = db.query(models.Result).filter(models.Result.evaluation_id == evaluation.id).count()
+    print(f"   {stored} of 40 questions answered before stopping")
+    assert stored < 40 and evaluation.status == "running" and evaluation.owner_id == "other:1:abc"
+    db.close()
+    print("✅ A run that lost its lease stops asking and leaves the status to the new owner")
+
+
+if __name__ == "__main__":
+    test_resume_asks_only_unanswered()
+    test_legacy_pending_questions()
+    test_rebuild_aggregates()
+    test_live_lease_blocks_takeover()
+    test_lost_lease_stops_run()
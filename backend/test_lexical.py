@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Parity and speed test for the vectorized BLEU/ROUGE implementation.
+"""
+
+import random
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from app.lexical import LexicalScorer, _treebank_tokens
+from app.metrics import MetricsCalculator
+
+WORDS = [
+    "the", "a", "capital", "of", "France", "is", "Paris", "Paris.", "running", "runs", "ran",
+    "don't", "it's", "1945", "3.14", "e=mc2", "généralement", "answer:", "well,", "quickly",
+    "organization", "organizations", "U.S.", "(approximately)", "mother-in-law", "?", "!", "42",
+    "photosynthesis", "jumps", "jumping", "over", "lazy", "dog", "fox", "brown", "the", "the",
+    "cannot", "gonna", "wanna", "Gimme", "3,000", "wait...", "--", "really?!", "end.", "_x_", "A.", "no,"
+]
+
+
+def make_pairs(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        reference = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12)))
+        kind = rng.random()
+        if kind < 0.15:
+            candidate = reference
+        elif kind < 0.5:
+            words = reference.split()
+            rng.shuffle(words)
+            candidate = " ".join(words + [rng.choice(WORDS) for _ in range(rng.randint(0, 20))])
+        else:
+            candidate = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 30)))
+        pairs.append((reference, candidate))
+    return pairs
+
+
+def test_treebank_tokens():
+    """The regex subset must tokenize cleaned text exactly like NLTKWordTokenizer."""
+    from nltk.tokenize import NLTKWordTokenizer
+    calculator = MetricsCalculator()
+    tokenizer = NLTKWordTokenizer()
+
+    texts = [calculator._clean_text(text) for pair in make_pairs(3000, seed=2) for text in pair]
+    mismatches = [text for text in texts if _treebank_tokens(text) != tokenizer.tokenize(text)]
+    for text in mismatches[:5]:
+        print(f"❌ {text!r}: {_treebank_tokens(text)} != {tokenizer.tokenize(text)}")
+    if not mismatches:
+        print(f"✅ {len(texts)} texts tokenized like NLTK")
+    assert not mismatches
+
+
+def test_lexical_parity():
+    """Vectorized scores must equal the NLTK/rouge_score implementation."""
+    calculator = MetricsCalculator()
+    scorer = LexicalScorer()
+
+    pairs = [(calculator._clean_text(r), calculator._clean_text(c)) for r, c in make_pairs(2000)]
+    pairs = [(r, c) for r, c in pairs if r and c]
+    references = [r for r, _ in pairs]
+    candidates = [c for _, c in pairs]
+
+    print(f"Comparing {len(pairs)} pairs...")
+    bleu_scores = scorer.bleu_batch(references, candidates)
+    rouge_scores = scorer.rouge_batch(references, candidates)
+
+    mismatches = 0
+    for (reference, candidate), bleu, rouge in zip(pairs, bleu_scores, rouge_scores):
+        expected_bleu = calculator.calculate_bleu_score(reference, candidate)
+        expected_rouge = calculator.calculate_rouge_scores(reference, candidate)
+        if bleu != expected_bleu or rouge != expected_rouge:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"❌ {reference!r} / {candidate!r}: {bleu} {rouge} != {expected_bleu} {expected_rouge}")
+
+    if mismatches == 0:
+        print("✅ BLEU and ROUGE match the reference implementation")
+    assert mismatches == 0
+
+    # Single-pair calls go through the same batch path
+    assert scorer.bleu(references[0], candidates[0]) == bleu_scores[0]
+    assert scorer.rouge(references[0], candidates[0]) == rouge_scores[0]
+
+
+def test_lexical_speed():
+    """Score 100k pairs and report the throughput."""
+    calculator = MetricsCalculator()
+    scorer = LexicalScorer()
+    pairs = [(calculator._clean_text(r), calculator._clean_text(c)) for r, c in make_pairs(100000, seed=1)]
+    references = [r for r, _ in pairs]
+    candidates = [c for _, c in pairs]
+
+    start_time = time.perf_counter()
+    scorer.bleu_batch(references, candidates)
+    scorer.rouge_batch(references, candidates)
+    elapsed = time.perf_counter() - start_time
+    print(f"✅ BLEU + ROUGE for {len(pairs)} pairs in {elapsed:.2f}s")
+
+    # Second pass hits the token cache
+    start_time = time.perf_counter()
+    scorer.bleu_batch(references, candidates)
+    scorer.rouge_batch(references, candidates)
+    print(f"✅ Cached tokens: {time.perf_counter() - start_time:.2f}s")
+
+if __name__ == "__main__":
+    test_treebank_tokens()
+    test_lexical_parity()
+    test_lexical_speed()
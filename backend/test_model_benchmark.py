@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Test model benchmarks: percentiles, step summaries, the saturation point at
+its gain and error rate edges, step validation, the run endpoint rejecting
+a benchmark that is already running and marking failed runs, and an
+open-loop step whose offered concurrency exceeds httpx's default connection
+pool.
+"""
+
+import asyncio
+import sys
+import os
+import tempfile
+from datetime import datetime
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.benchmark import (MAX_ERROR_RATE, SATURATION_GAIN, ModelBenchmarkRunner, find_saturation_point,
+                           percentile, summarize_step)
+from app.database import get_db
+from app.ollama_simulator import SimulatorConfig, SimulatorServer
+
+
+def _step(level, throughput, error_rate=0.0):
+    return {"level": level, "throughput": throughput, "error_rate": error_rate}
+
+
+def test_percentiles():
+    print("Testing percentiles and step summaries...")
+    assert percentile([], 50) is None and percentile([7.0], 99) == 7.0
+    values = [10.0, 20.0, 30.0, 40.0, 50.0]
+    assert percentile(values, 0) == 10.0 and percentile(values, 100) == 50.0
+    assert percentile(values, 50) == 30.0 and percentile(values, 90) == 46.0
+    print("✅ Percentiles interpolate linearly between ranks")
+
+    samples = [{"ok": True, "latency_ms": 100.0 * (i + 1), "tokens": 10} for i in range(4)]
+    samples.append({"ok": False, "latency_ms": 5.0, "tokens": 0})
+    summary = summarize_step(samples, wall_time=2.0)
+    assert summary["total_requests"] == 5 and summary["failed_requests"] == 1
+    assert summary["error_rate"] == 0.2 and summary["throughput"] == 2.0 and summary["tokens_per_second"] == 20.0
+    assert summary["avg_latency"] == 250.0 and summary["p50_latency"] == 250.0, "failed requests have no latency"
+    print("✅ Summaries count failures but keep them out of latency and throughput")
+
+
+def test_saturation_point():
+    print("Testing the saturation point...")
+    assert find_saturation_point([_step(1, 10), _step(2, 20), _step(4, 40)]) is None
+    assert find_saturation_point([]) is None
+
+    gain = 1 + SATURATION_GAIN
+    assert find_saturation_point([_step(1, 100), _step(2, 100 * gain * 1.01), _step(4, 200)]) is None
+    assert find_saturation_point([_step(1, 100), _step(2, 100 * gain * 0.99)]) == 1
+    print(f"✅ A step must add more than {SATURATION_GAIN:.0%} throughput to count as scaling")
+
+    assert find_saturation_point([_step(1, 10), _step(2, 20, MAX_ERROR_RATE)]) is None
+    assert find_saturation_point([_step(1, 10), _step(2, 20, MAX_ERROR_RATE + 0.001)]) == 1
+    assert find_saturation_point([_step(1, 10, 0.5)]) == 1, "a failing first step is its own saturation point"
+    print(f"✅ An error rate above {MAX_ERROR_RATE:.0%} ends scaling at the previous step")
+
+
+def test_step_validation():
+    print("Testing benchmark step validation...")
+    runner = ModelBenchmarkRunner()
+    db_model = models.Model(type="ollama", endpoint="http://127.0.0.1:9", model_name="m")
+    for step in (runner.run_concurrency_step, runner.run_rate_step):
+        try:
+            asyncio.run(step(db_model, ["q"], 1, 0, 8))
+            assert False, step.__name__
+        except ValueError:
+            pass
+
+    from app import main
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = session_factory()
+    db.add(models.Model(name="m", type="ollama", endpoint="http://127.0.0.1:9", model_name="m"))
+    db.commit()
+    model_id = db.query(models.Model).first().id
+    db.close()
+
+    def benchmark_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    main.app.dependency_overrides[get_db] = benchmark_db
+    try:
+        client = TestClient(main.app)
+        statuses = [client.post("/api/benchmarks", json={"name": "b", "model_id": model_id,
+                                                         "requests_per_step": count}).status_code
+                    for count in (0, -5, 1)]
+    finally:
+        main.app.dependency_overrides.pop(get_db, None)
+    assert statuses == [400, 400, 200], statuses
+    print("✅ Steps need at least one request")
+
+
+def test_run_endpoint():
+    print("Testing the benchmark run endpoint...")
+    from app import main
+    from app.database import run_db
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = session_factory()
+    model = models.Model(name="m", type="ollama", endpoint="http://127.0.0.1:9", model_name="m")
+    db.add(model)
+    db.flush()
+    running = models.Benchmark(name="running", model_id=model.id, status="running", levels="[1]",
+                               created_at=datetime.utcnow())
+    draft = models.Benchmark(name="draft", model_id=model.id, status="draft", levels="[1]",
+                             created_at=datetime.utcnow())
+    db.add_all([running, draft])
+    db.flush()
+    db.add(models.BenchmarkStep(benchmark_id=running.id, level=1.0, total_requests=1))
+    db.commit()
+    running_id, draft_id, model_id = running.id, draft.id, model.id
+    db.close()
+
+    def benchmark_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def broken_run(benchmark, session):
+        def duplicate():
+            # A failed flush, like "database is locked", leaves the session needing a rollback
+            session.add(models.Benchmark(id=benchmark.id, name="duplicate", model_id=model_id))
+            session.flush()
+        await run_db(duplicate)
+
+    original_run = main.benchmark_runner.run_benchmark
+    main.app.dependency_overrides[get_db] = benchmark_db
+    try:
+        client = TestClient(main.app)
+        rejected = client.post(f"/api/benchmarks/{running_id}/run")
+        main.benchmark_runner.run_benchmark = broken_run
+        failed = client.post(f"/api/benchmarks/{draft_id}/run")
+    finally:
+        main.benchmark_runner.run_benchmark = original_run
+        main.app.dependency_overrides.pop(get_db, None)
+
+    db = session_factory()
+    steps = db.query(models.BenchmarkStep).filter(models.BenchmarkStep.benchmark_id == running_id).count()
+    statuses = {b.id: b.status for b in db.query(models.Benchmark)}
+    db.close()
+    assert rejected.status_code == 400 and "already running" in rejected.json()["detail"]
+    assert steps == 1 and statuses[running_id] == "running", "the running benchmark's steps are left alone"
+    print("✅ Running a benchmark that is already running is a 400 and doesn't touch its steps")
+
+    assert failed.status_code == 500 and "Benchmark failed" in failed.json()["detail"]
+    assert statuses[draft_id] == "failed"
+    print("✅ A benchmark whose database work fails is marked failed instead of staying running")
+
+
+def test_open_loop_step_is_not_client_limited():
+    print("Testing an open-loop step offering more concurrency than the default connection pool...")
+    latency_ms = 1000.0
+    # 150 requests at 200/s keep about 150 in flight, above httpx's default of 100 connections
+    with SimulatorServer(SimulatorConfig(latency_ms=latency_ms, slots=200)) as server:
+        db_model = models.Model(type="ollama", endpoint=server.url, model_name="sim-llama:latest")
+        summary = asyncio.run(ModelBenchmarkRunner().run_rate_step(db_model, ["q"], 200, 150, 8))
+        peak = server.simulator.stats()["peak_active"]
+
+    print(f"   p50 {summary['p50_latency']:.0f}ms, p99 {summary['p99_latency']:.0f}ms, "
+          f"server peak concurrency {peak}")
+    assert summary["failed_requests"] == 0
+    assert peak > 100, "every offered request reaches the server without waiting for a connection"
+    assert summary["p50_latency"] < latency_ms * 1.25
+    print("✅ The client's connection pool is sized to the step, so latency is the server's")
+
+
+if __name__ == "__main__":
+    test_percentiles()
+    test_saturation_point()
+    test_step_validation()
+    test_run_endpoint()
+    test_open_loop_step_is_not_client_limited()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Test model pools: least-outstanding routing, ejection and readmission of
+failing replicas, and one evaluation spread over two simulated replicas.
+"""
+
+import asyncio
+import functools
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import evaluation_runner as evaluation_runner_module
+from app import adaptive_concurrency, models
+from app.database import get_db
+from app.datasets import get_or_create_dataset
+from app.model_pool import ModelPool, ModelPoolRegistry, pool_endpoints
+from app.ollama_simulator import SimulatorConfig, SimulatorServer
+from app.question_bank import load_question_bank
+from app.result_writer import ResultWriter
+
+DEAD_ENDPOINT = "http://127.0.0.1:9"  # Nothing listens on the discard port
+
+
+def test_pool_endpoints():
+    print("Testing pool endpoint lists...")
+    assert pool_endpoints("http://a:11434/", None) == ["http://a:11434"]
+    assert pool_endpoints("http://a", '["http://b/", "http://a", "http://c"]') == ["http://a", "http://b", "http://c"]
+    for invalid in ('"http://b"', '[1, 2]', 'not json'):
+        try:
+            pool_endpoints("http://a", invalid)
+            assert False, invalid
+        except ValueError:
+            pass
+    print("✅ The model's endpoint comes first, duplicates and trailing slashes are dropped")
+
+
+def test_routing_and_ejection():
+    print("Testing least-outstanding routing and circuit breaking...")
+
+    async def check():
+        pool = ModelPool("m", ["http://a", "http://b", "http://c"], parallel_requests=2)
+        first = [await pool.acquire() for _ in range(3)]
+        assert sorted(replica.endpoint for replica in first) == ["http://a", "http://b", "http://c"]
+        pool.release(first[1], time.monotonic())
+        assert await pool.acquire() is first[1], "the replica with nothing outstanding is picked"
+        print("✅ Requests go to the replica with the fewest outstanding requests")
+
+        bad = first[0]
+        pool.release(bad, time.monotonic(), "ConnectError: refused")
+        for _ in range(adaptive_concurrency.CIRCUIT_FAILURES - 1):
+            assert await pool.acquire(avoid=first[2]) is bad
+            pool.release(bad, time.monotonic(), "ConnectError: refused")
+        assert not bad.healthy and bad.breaker.trips == 1
+        assert all([await pool.acquire() is not bad for _ in range(2)]), "the others take requests up to their limits"
+        stats = pool.stats()
+        print(f"   {stats['replicas'][0]}")
+        assert stats["replicas"][0]["circuit"] == "open" and stats["replicas"][0]["errors"] == 3
+        print("✅ A replica failing repeatedly has its circuit opened and gets no traffic")
+
+        bad.breaker.opened_at -= bad.breaker.cooldown_s
+        for replica in pool.replicas:
+            while replica.outstanding:
+                pool.release(replica, time.monotonic())
+        assert await pool.acquire() is not bad, "healthy replicas with room come before a trial request"
+        pool.replicas[1].outstanding = pool.replicas[2].outstanding = 10
+        assert await pool.acquire() is bad and bad.breaker.state == "half_open"
+        pool.release(bad, time.monotonic())
+        assert bad.healthy and bad.breaker.trips == 1
+        print("✅ After the cooldown one trial request probes the replica, and success closes the circuit")
+
+    asyncio.run(check())
+
+
+def test_registry():
+    print("Testing the pool registry...")
+    registry = ModelPoolRegistry()
+    db_model = models.Model(id=1, endpoint="http://a", model_name="m", replica_endpoints='["http://b"]',
+                            parallel_requests=2)
+    pool = registry.get(db_model)
+    assert pool.endpoints == ["http://a", "http://b"] and pool.replicas[0].limiter.allowed == 2
+    assert pool.max_concurrency == 2 * adaptive_concurrency.MAX_CONCURRENCY
+    assert registry.get(db_model) is pool, "health and stats persist across evaluations"
+    db_model.replica_endpoints = '["http://b", "http://c"]'
+    assert registry.get(db_model) is not pool and registry.find(1).endpoints[-1] == "http://c"
+    print("✅ Pools persist per model and are rebuilt when the endpoints change")
+
+
+def _evaluate(endpoint: str, replica_endpoints, questions):
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'pool.db')}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = session_factory()
+    dataset = get_or_create_dataset(db, "pool", questions)
+    model = models.Model(name="pool", type="ollama", endpoint=endpoint, model_name="sim-llama:latest",
+                         replica_endpoints=replica_endpoints, parallel_requests=1)
+    db.add(model)
+    db.flush()
+    evaluation = models.Evaluation(name="pool", model_id=model.id, dataset_id=dataset.id,
+                                   total_questions=len(questions), metrics='["bleu"]')
+    db.add(evaluation)
+    db.commit()
+    model_id = model.id
+
+    original_writer, original_pools = evaluation_runner_module.ResultWriter, evaluation_runner_module.model_pools
+    evaluation_runner_module.ResultWriter = functools.partial(ResultWriter, session_factory=session_factory)
+    evaluation_runner_module.model_pools = pools = ModelPoolRegistry()
+    try:
+        start = time.perf_counter()
+        asyncio.run(evaluation_runner_module.evaluation_runner.run(evaluation, db))
+        elapsed = time.perf_counter() - start
+    finally:
+        evaluation_runner_module.ResultWriter = original_writer
+        evaluation_runner_module.model_pools = original_pools
+    results = db.query(models.Result).filter(models.Result.evaluation_id == evaluation.id).all()
+    db.close()
+    return evaluation, results, pools.find(model_id), elapsed
+
+
+def test_evaluation_spreads_over_replicas():
+    print("Testing one evaluation over two replicas...")
+    questions = load_question_bank()[:16]
+    config = SimulatorConfig(latency_ms=200.0, slots=1)
+    with SimulatorServer(config) as first, SimulatorServer(config) as second:
+        single, _, _, single_elapsed = _evaluate(first.url, None, questions)
+        pooled, results, pool, pooled_elapsed = _evaluate(first.url, f'["{second.url}"]', questions)
+        requests = [first.simulator.requests - len(questions), second.simulator.requests]
+
+    print(f"   One endpoint: {single_elapsed:.2f}s; two replicas: {pooled_elapsed:.2f}s, requests {requests}")
+    assert single.status == pooled.status == "completed"
+    assert len(results) == len(questions) and pooled.correct_answers == single.correct_answers
+    assert requests == [8, 8]
+    assert pooled_elapsed < single_elapsed * 0.75
+    assert [replica["requests"] for replica in pool.stats()["replicas"]] == [8, 8]
+    print("✅ The evaluation is split evenly and finishes proportionally faster, with the same score")
+
+
+def test_failing_replica_is_ejected():
+    print("Testing an evaluation with a dead replica...")
+    questions = load_question_bank()[:12]
+    with SimulatorServer(SimulatorConfig(latency_ms=10.0, slots=1)) as server:
+        evaluation, results, pool, _ = _evaluate(server.url, f'["{DEAD_ENDPOINT}"]', questions)
+
+    dead = pool.stats()["replicas"][1]
+    print(f"   Dead replica: {dead}; {evaluation.infrastructure_errors} infrastructure errors")
+    assert evaluation.status == "completed" and len(results) == len(questions)
+    assert dead["circuit"] == "open" and dead["requests"] == adaptive_concurrency.CIRCUIT_FAILURES
+    assert evaluation.infrastructure_errors == 0, "failed requests are retried on the healthy replica"
+    print("✅ The dead replica's circuit opens after a few failures and its questions are retried elsewhere")
+
+
+def test_connection_check_probes_replicas():
+    print("Testing the model connection check over a pool...")
+    from app import main
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'probe.db')}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def probe_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    main.app.dependency_overrides[get_db] = probe_db
+    original_pools = main.model_pools
+    main.model_pools = ModelPoolRegistry()
+    try:
+        with SimulatorServer(SimulatorConfig(models=["sim-llama:latest"])) as server, \
+                SimulatorServer(SimulatorConfig(models=["other:latest"])) as other:
+            client = TestClient(main.app)
+            created = client.post("/api/models", json={
+                "name": "pool", "type": "ollama", "endpoint": server.url, "model_name": "sim-llama",
+                "replica_endpoints": f'["{other.url}"]'
+            }).json()
+            assert client.post("/api/models", json={
+                "name": "bad", "type": "ollama", "endpoint": server.url, "model_name": "m",
+                "replica_endpoints": "not json"
+            }).status_code == 400
+
+            tested = client.get(f"/api/models/{created['id']}/test").json()
+            replicas = client.get(f"/api/models/{created['id']}/replicas").json()["replicas"]
+    finally:
+        main.app.dependency_overrides.pop(get_db, None)
+        main.model_pools = original_pools
+
+    print(f"   Status {tested['status']}, replicas {[(r['endpoint'], r['healthy'], r['last_error']) for r in replicas]}")
+    assert tested["status"] == "connected"
+    assert replicas[0]["healthy"] and not replicas[1]["healthy"]
+    assert "sim-llama is not available" in replicas[1]["last_error"]
+    print("✅ Replicas missing the model get their circuit opened; the model stays connected through the others")
+
+
+if __name__ == "__main__":
+    test_pool_endpoints()
+    test_routing_and_ejection()
+    test_registry()
+    test_evaluation_spreads_over_replicas()
+    test_failing_replica_is_ejected()
+    test_connection_check_probes_replicas()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test the consistent hash ring that partitions synthetic tests across monitoring workers.
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from app.monitoring_runner import HashRing
+
+TEST_IDS = range(1, 10001)
+
+
+def test_hash_ring_balance():
+    print("Testing hash ring balance...")
+    workers = [f"host:monitor-{index}" for index in range(4)]
+    ring = HashRing(workers)
+    counts = {worker: 0 for worker in workers}
+    for test_id in TEST_IDS:
+        counts[ring.node_for(test_id)] += 1
+
+    # Each worker should get within 40% of an even share
+    share = len(TEST_IDS) / len(workers)
+    for worker, count in counts.items():
+        status = "✅" if abs(count - share) < 0.4 * share else "❌"
+        print(f"{status} {worker}: {count} tests")
+        assert abs(count - share) < 0.4 * share
+
+
+def test_hash_ring_stability():
+    print("Testing hash ring stability when a worker joins...")
+    workers = [f"host:monitor-{index}" for index in range(4)]
+    before = HashRing(workers)
+    after = HashRing(workers + ["host:monitor-4"])
+
+    moved = [test_id for test_id in TEST_IDS if before.node_for(test_id) != after.node_for(test_id)]
+    # Only tests taken over by the new worker move, roughly a fifth of them
+    assert all(after.node_for(test_id) == "host:monitor-4" for test_id in moved)
+    assert len(moved) < 0.35 * len(TEST_IDS)
+    print(f"✅ {len(moved)} of {len(TEST_IDS)} tests moved, all to the new worker")
+
+    assert HashRing([]).node_for(1) is None
+    print("✅ Empty ring owns nothing")
+
+if __name__ == "__main__":
+    test_hash_ring_balance()
+    test_hash_ring_stability()
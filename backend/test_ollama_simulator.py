@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Test the Ollama-compatible simulator: the tags and generate APIs in both
+modes, deterministic answers, model residency and keep_alive, concurrency
+slots, injected failures, and a full evaluation run against it as a
+registered model.
+"""
+
+import asyncio
+import functools
+import json
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+import httpx
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import evaluation_runner as evaluation_runner_module
+from app import models
+from app.datasets import get_or_create_dataset
+from app.ollama_simulator import (UNKNOWN_ANSWER, OllamaSimulator, SimulatorConfig, SimulatorServer,
+                                  create_simulator_app, parse_keep_alive)
+from app.result_writer import ResultWriter
+
+QUESTIONS = [
+    {"question": "What is the capital of France?", "answer": "Paris"},
+    {"question": "How many continents are there?", "answer": "7"},
+    {"question": "Who wrote Hamlet?", "answer": "William Shakespeare"},
+    {"question": "What is the chemical symbol for gold?", "answer": "Au"}
+]
+
+
+def _client(**options) -> TestClient:
+    return TestClient(create_simulator_app(SimulatorConfig(latency_ms=0.0, **options), questions=QUESTIONS))
+
+
+def test_config_validation():
+    print("Testing simulator configuration checks...")
+    for options in ({"latency": "pareto"}, {"slots": 0}, {"error_rate": 1.5}, {"accuracy": -0.1}):
+        try:
+            SimulatorConfig(**options)
+            assert False, options
+        except ValueError:
+            pass
+    print("✅ Unknown distributions, zero slots and out-of-range rates are rejected")
+
+
+def test_answers():
+    print("Testing deterministic answers...")
+    always = OllamaSimulator(SimulatorConfig(accuracy=1.0), QUESTIONS)
+    never = OllamaSimulator(SimulatorConfig(accuracy=0.0), QUESTIONS)
+    for q in QUESTIONS:
+        assert q["answer"].lower() in always.answer("m", q["question"]).lower()
+        assert q["answer"].lower() not in never.answer("m", q["question"]).lower()
+    assert always.answer("m", "  what is the capital of   FRANCE? ") == "The answer is Paris."
+    assert always.answer("m", "Tell me a joke") == UNKNOWN_ANSWER
+    print("✅ Bank questions answered right or wrong by accuracy; unknown prompts get a fixed reply")
+
+    half = OllamaSimulator(SimulatorConfig(accuracy=0.5, seed=3), QUESTIONS)
+    again = OllamaSimulator(SimulatorConfig(accuracy=0.5, seed=3), QUESTIONS)
+    answers = [half.answer("m", q["question"]) for q in QUESTIONS]
+    assert answers == [again.answer("m", q["question"]) for q in QUESTIONS]
+    print("✅ The same seed gives the same answers")
+
+    for latency in ("uniform", "normal", "lognormal"):
+        simulator = OllamaSimulator(SimulatorConfig(latency=latency, latency_ms=100, latency_spread_ms=30), [])
+        delays = [simulator.first_token_delay() for _ in range(2000)]
+        mean = sum(delays) / len(delays)
+        print(f"   {latency}: mean {mean * 1000:.1f}ms")
+        assert 0.09 < mean < 0.11 and min(delays) >= 0 and max(delays) > min(delays)
+    print("✅ Latency distributions have the configured mean")
+
+
+def test_generate_api():
+    print("Testing /api/tags and /api/generate...")
+    client = _client(models=["sim-a:latest", "sim-b:latest"], accuracy=1.0)
+    tags = client.get("/api/tags").json()["models"]
+    assert [tag["name"] for tag in tags] == ["sim-a:latest", "sim-b:latest"]
+
+    response = client.post("/api/generate", json={"model": "sim-a:latest", "prompt": "Who wrote Hamlet?",
+                                                  "stream": False})
+    result = response.json()
+    print(f"   {result}")
+    assert result["response"] == "The answer is William Shakespeare." and result["done"] is True
+    assert result["eval_count"] == 5 and result["prompt_eval_count"] == 3
+    assert result["total_duration"] >= result["eval_duration"] >= 0
+
+    truncated = client.post("/api/generate", json={"model": "sim-a:latest", "prompt": "Who wrote Hamlet?",
+                                                   "stream": False, "options": {"num_predict": 2}}).json()
+    assert truncated["response"] == "The answer" and truncated["done_reason"] == "length"
+    assert client.post("/api/generate", json={"model": "other", "prompt": "hi"}).status_code == 404
+    print("✅ Non-streaming responses carry Ollama's fields and respect num_predict")
+
+    with client.stream("POST", "/api/generate", json={"model": "sim-b:latest",
+                                                     "prompt": "What is the capital of France?"}) as stream:
+        chunks = [json.loads(line) for line in stream.iter_lines() if line]
+    assert all(not chunk["done"] for chunk in chunks[:-1]) and chunks[-1]["done"]
+    assert "".join(chunk["response"] for chunk in chunks) == "The answer is Paris."
+    assert chunks[-1]["eval_count"] == len(chunks) - 1
+    print("✅ Streaming sends one NDJSON chunk per token and a final stats chunk")
+
+
+def test_model_residency():
+    print("Testing model loads, eviction and keep_alive...")
+    for value, seconds in ((None, 300), ("5m", 300), ("1h30m", 5400), ("250ms", 0.25), (30, 30), ("0", 0),
+                           (0, 0), ("-1", None), (-1, None), ("-5m", None)):
+        assert parse_keep_alive(value) == seconds, (value, parse_keep_alive(value))
+    for value in ("soon", "5x", "m5"):
+        try:
+            parse_keep_alive(value)
+            assert False, value
+        except ValueError:
+            pass
+
+    client = _client(models=["sim-a:latest", "sim-b:latest"], load_ms=100.0, max_loaded_models=1)
+
+    def ask(model, **options):
+        return client.post("/api/generate", json={"model": model, "prompt": "Who wrote Hamlet?", "stream": False,
+                                                  **options}).json()
+
+    assert ask("sim-a:latest")["load_duration"] >= 100e6
+    assert ask("sim-a:latest")["load_duration"] == 0
+    assert ask("sim-b:latest")["load_duration"] >= 100e6
+    assert [m["name"] for m in client.get("/api/ps").json()["models"]] == ["sim-b:latest"]
+    print("✅ A model loads once and evicts the other past max_loaded_models")
+
+    unload = client.post("/api/generate", json={"model": "sim-b:latest", "keep_alive": 0}).json()
+    assert unload["done_reason"] == "unload" and client.get("/api/ps").json()["models"] == []
+    load = client.post("/api/generate", json={"model": "sim-a:latest"}).json()
+    assert load["done_reason"] == "load" and load["load_duration"] >= 100e6
+    assert ask("sim-a:latest", keep_alive="200ms")["load_duration"] == 0
+    time.sleep(0.25)
+    assert client.get("/api/ps").json()["models"] == []
+    stats = client.get("/simulator/stats").json()
+    print(f"   {stats}")
+    assert stats["loads"] == 3 and stats["unloads"] == 3
+    print("✅ Empty prompts load or unload; models expire after keep_alive")
+
+
+def test_failures():
+    print("Testing error, timeout and queue-full injection...")
+    body = {"model": "sim-llama:latest", "prompt": "Who wrote Hamlet?", "stream": False}
+    client = _client(error_rate=1.0)
+    response = client.post("/api/generate", json=body)
+    assert response.status_code == 500 and "error" in response.json()
+
+    client = _client(timeout_rate=1.0, timeout_s=0.2)
+    start = time.perf_counter()
+    assert client.post("/api/generate", json=body).status_code == 500
+    assert time.perf_counter() - start >= 0.2
+    print("✅ Injected errors fail fast; injected timeouts hang first")
+
+    with SimulatorServer(SimulatorConfig(latency_ms=200.0, slots=1, max_queue=1), questions=QUESTIONS) as server:
+        async def burst():
+            async with httpx.AsyncClient(base_url=server.url, timeout=10) as client:
+                return await asyncio.gather(*(client.post("/api/generate", json=body) for _ in range(4)))
+        codes = sorted(response.status_code for response in asyncio.run(burst()))
+        stats = server.simulator.stats()
+    print(f"   Status codes: {codes}, stats: {stats}")
+    assert codes == [200, 200, 503, 503] and stats["rejected"] == 2
+    print("✅ Requests beyond the slots and queue get 503")
+
+
+def test_slots():
+    print("Testing concurrency slots...")
+    body = {"model": "sim-llama:latest", "prompt": "Who wrote Hamlet?", "stream": False}
+    with SimulatorServer(SimulatorConfig(latency_ms=100.0, slots=2), questions=QUESTIONS) as server:
+        async def burst():
+            async with httpx.AsyncClient(base_url=server.url, timeout=10) as client:
+                return await asyncio.gather(*(client.post("/api/generate", json=body) for _ in range(6)))
+        start = time.perf_counter()
+        responses = asyncio.run(burst())
+        elapsed = time.perf_counter() - start
+        stats = server.simulator.stats()
+    print(f"   6 requests over 2 slots in {elapsed:.2f}s, stats: {stats}")
+    assert all(response.status_code == 200 for response in responses)
+    assert stats["peak_active"] == 2 and stats["requests"] == 6
+    assert elapsed >= 0.3
+    print("✅ At most `slots` requests generate at once; the rest queue")
+
+
+def test_evaluation_against_simulator():
+    print("Testing an evaluation against the simulator as a registered model...")
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'simulator.db')}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    original_writer = evaluation_runner_module.ResultWriter
+    evaluation_runner_module.ResultWriter = functools.partial(ResultWriter, session_factory=session_factory)
+    try:
+        with SimulatorServer(SimulatorConfig(latency_ms=5.0, accuracy=0.5, seed=7), questions=QUESTIONS) as server:
+            db = session_factory()
+            model = models.Model(name="simulator", type="ollama", endpoint=server.url,
+                                 model_name="sim-llama:latest")
+            dataset = get_or_create_dataset(db, "simulator", QUESTIONS)
+            db.add(model)
+            db.flush()
+            evaluation = models.Evaluation(name="simulator", model_id=model.id, dataset_id=dataset.id,
+                                           total_questions=len(QUESTIONS), metrics='["bleu"]')
+            db.add(evaluation)
+            db.commit()
+
+            asyncio.run(evaluation_runner_module.evaluation_runner.run(evaluation, db))
+            expected_correct = sum(
+                q["answer"].lower() in server.simulator.answer("sim-llama:latest", q["question"]).lower()
+                for q in QUESTIONS
+            )
+            db.refresh(evaluation)
+            db.close()
+    finally:
+        evaluation_runner_module.ResultWriter = original_writer
+
+    print(f"   Status {evaluation.status}, {evaluation.correct_answers}/{len(QUESTIONS)} correct")
+    assert evaluation.status == "completed"
+    assert evaluation.correct_answers == expected_correct
+    assert evaluation.correct_answers + evaluation.incorrect_answers == len(QUESTIONS)
+    print("✅ The evaluation runner scores the simulator's deterministic answers")
+
+
+if __name__ == "__main__":
+    test_config_validation()
+    test_answers()
+    test_generate_api()
+    test_model_residency()
+    test_failures()
+    test_slots()
+    test_evaluation_against_simulator()
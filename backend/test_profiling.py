@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Test the opt-in profiling hooks: span timing, SQL time attributed to the
+current request across the database threads, the slow-query log, CPU and
+memory captures, and the admin profile endpoints.
+"""
+
+import asyncio
+import sys
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from sqlalchemy import create_engine, event, text
+
+from app import profiling
+from app.database import run_db
+from app.profiling import ProfileManager, SpanTimings, current_spans, slow_queries, trace_queries
+
+
+def _wait(profile, timeout=30):
+    deadline = time.time() + timeout
+    while profile.status == "running" and time.time() < deadline:
+        time.sleep(0.05)
+    return profile
+
+
+def test_span_timings():
+    print("Testing span timings...")
+    disabled = SpanTimings(enabled=False)
+    with disabled.span("generation"):
+        pass
+    disabled.record("db_write", 5.0)
+    assert disabled.summary() == {}
+
+    spans = SpanTimings()
+    for _ in range(3):
+        with spans.span("generation"):
+            time.sleep(0.01)
+    spans.record("db_write", 4.0)
+    spans.record("db_write", 8.0)
+    summary = spans.summary()
+    print(f"   {summary}")
+    assert summary["generation"]["calls"] == 3 and summary["generation"]["total_ms"] >= 30
+    assert summary["db_write"] == {"calls": 2, "total_ms": 12.0, "avg_ms": 6.0, "max_ms": 8.0}
+    assert 'db_write;dur=12.0;desc="2 calls"' in spans.server_timing()
+    print("✅ Spans accumulate calls, total and max; disabled spans record nothing")
+
+
+def test_query_tracing():
+    print("Testing SQL spans and the slow-query log...")
+    enabled, threshold = profiling.PROFILING_ENABLED, profiling.SLOW_QUERY_MS
+    profiling.PROFILING_ENABLED, profiling.SLOW_QUERY_MS = True, 20.0
+    try:
+        engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'profile.db')}",
+                               connect_args={"check_same_thread": False})
+        # A SQL function that sleeps, for a statement that is slow on purpose
+        event.listen(engine, "connect",
+                     lambda connection, record: connection.create_function("pause", 1, lambda s: time.sleep(s) or s))
+        trace_queries(engine)
+
+        def query(statement):
+            with engine.connect() as connection:
+                return connection.execute(text(statement)).scalar()
+
+        async def request():
+            spans = SpanTimings()
+            current_spans.set(spans)
+            await run_db(query, "SELECT 1")
+            await run_db(query, "SELECT pause(0.05)")
+            return spans
+
+        slow_queries.clear()
+        spans = asyncio.run(request())
+    finally:
+        profiling.PROFILING_ENABLED, profiling.SLOW_QUERY_MS = enabled, threshold
+
+    summary = spans.summary()
+    print(f"   Request spans: {summary}, slow: {list(slow_queries)}")
+    assert summary["db"]["calls"] == 2 and summary["db"]["total_ms"] >= 50
+    print("✅ Statements on the database threads count towards the request's db span")
+    assert len(slow_queries) == 1 and "pause" in slow_queries[0]["statement"]
+    assert slow_queries[0]["thread"].startswith("eval-forge-db")
+    print("✅ Only the statement over the threshold is logged as slow")
+
+
+def test_cpu_profile():
+    print("Testing the sampling CPU profile...")
+    stop = threading.Event()
+
+    def busy_loop():
+        while not stop.is_set():
+            sum(i * i for i in range(1000))
+
+    worker = threading.Thread(target=busy_loop, name="busy")
+    worker.start()
+    try:
+        manager = ProfileManager(directory=tempfile.mkdtemp())
+        profile = _wait(manager.start("cpu", duration_s=0.5, interval_ms=5))
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profile.status == "completed", profile.error
+    summary = profile.summary
+    print(f"   {summary['samples']} samples, top: {summary['top_total'][:3]}")
+    assert summary["threads"]["busy"] >= 20
+    assert any(row["function"].startswith("busy_loop (") for row in summary["top_total"])
+
+    with open(profile.path) as f:
+        lines = f.read().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+    assert any(line.startswith("busy;") and "busy_loop (" in line for line in lines)
+    print("✅ Folded stacks written per thread, with a per-function summary")
+
+    try:
+        manager.start("cpu", duration_s=0.2)
+        manager.start("cpu", duration_s=0.2)
+        assert False, "only one capture of a kind at a time"
+    except ValueError:
+        pass
+    for kind, duration in (("disk", 1), ("cpu", 0), ("memory", 10000)):
+        try:
+            manager.start(kind, duration_s=duration)
+            assert False, (kind, duration)
+        except ValueError:
+            pass
+    print("✅ Overlapping and invalid captures are rejected")
+
+
+def test_memory_profile():
+    print("Testing the tracemalloc memory profile...")
+    retained = []
+
+    def allocate():
+        time.sleep(0.1)
+        retained.extend(bytearray(1024) for _ in range(2000))
+
+    manager = ProfileManager(directory=tempfile.mkdtemp())
+    profile = manager.start("memory", duration_s=0.5)
+    allocate()
+    _wait(profile)
+
+    assert profile.status == "completed", profile.error
+    assert not tracemalloc.is_tracing(), "tracing stops with the capture"
+    growth = profile.summary["top_growth"]
+    print(f"   Top growth: {growth[:2]}")
+    assert growth and growth[0]["location"].startswith("backend/test_profiling.py")
+    assert growth[0]["size_diff_bytes"] >= 2000 * 1024
+
+    snapshot = tracemalloc.Snapshot.load(profile.path)
+    assert snapshot.statistics("lineno")
+    print("✅ Allocation growth summarized; the snapshot loads with tracemalloc")
+
+
+def test_admin_endpoints():
+    print("Testing admin profile endpoints and Server-Timing...")
+    from fastapi.testclient import TestClient
+    from app import main
+
+    client = TestClient(main.app)
+    token, enabled, manager = main.ADMIN_TOKEN, main.PROFILING_ENABLED, main.profile_manager
+    try:
+        main.ADMIN_TOKEN = None
+        assert client.get("/api/admin/profiles").status_code == 403
+
+        main.ADMIN_TOKEN = "secret"
+        main.profile_manager = ProfileManager(directory=tempfile.mkdtemp())
+        assert client.get("/api/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 401
+        headers = {"X-Admin-Token": "secret"}
+
+        response = client.post("/api/admin/profiles", json={"kind": "gpu"}, headers=headers)
+        assert response.status_code == 400
+        response = client.post("/api/admin/profiles", json={"kind": "cpu", "duration_s": 0.3}, headers=headers)
+        assert response.status_code == 200 and response.json()["status"] == "running"
+        profile_id = response.json()["id"]
+        assert client.get(f"/api/admin/profiles/{profile_id}/download", headers=headers).status_code == 400
+
+        _wait(main.profile_manager.get(profile_id))
+        detail = client.get(f"/api/admin/profiles/{profile_id}", headers=headers).json()
+        assert detail["status"] == "completed" and detail["summary"]["samples"] > 0
+        download = client.get(f"/api/admin/profiles/{profile_id}/download", headers=headers)
+        assert download.status_code == 200
+        assert detail["filename"] in download.headers["content-disposition"]
+        assert client.get("/api/admin/profiles", headers=headers).json()[0]["id"] == profile_id
+        assert client.get("/api/admin/profiles/999", headers=headers).status_code == 404
+        print("✅ Profiles start, report and download behind the admin token")
+
+        assert "server-timing" not in client.get("/").headers
+        main.PROFILING_ENABLED = True
+        timing = client.get("/").headers["server-timing"]
+        print(f"   Server-Timing: {timing}")
+        assert timing.startswith("app;dur=")
+        print("✅ Server-Timing header only when profiling is enabled")
+    finally:
+        main.ADMIN_TOKEN, main.PROFILING_ENABLED, main.profile_manager = token, enabled, manager
+
+
+if __name__ == "__main__":
+    test_span_timings()
+    test_query_tracing()
+    test_cpu_profile()
+    test_memory_profile()
+    test_admin_endpoints()
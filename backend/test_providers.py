@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Test model providers: token buckets and Retry-After parsing, and evaluations
+of OpenAI-compatible models against the simulator's /v1 API within a
+client-side rate limit, through server 429s, and in batched requests.
+"""
+
+import asyncio
+import functools
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+import httpx
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import evaluation_runner as evaluation_runner_module
+from app import models
+from app.database import get_db
+from app.datasets import get_or_create_dataset
+from app.model_pool import ModelPoolRegistry
+from app.ollama_simulator import SimulatorConfig, SimulatorServer
+from app.providers import Provider, get_provider
+from app.question_bank import load_question_bank
+from app.rate_limit import RateLimiter, TokenBucket, retry_after_seconds
+from app.result_writer import ResultWriter
+
+MODEL_NAME = "sim-gpt"
+
+
+def test_token_bucket():
+    print("Testing token buckets...")
+    bucket = TokenBucket(rate_per_minute=600)  # 10 per second, bursts of 10
+    now = 100.0
+    bucket._updated = now
+    assert bucket.wait_time(10, now) == 0
+    bucket.take(10, now)
+    assert abs(bucket.wait_time(1, now) - 0.1) < 1e-9
+    assert abs(bucket.wait_time(50, now) - 1.0) < 1e-9, "amounts above the capacity wait for a full bucket"
+    assert bucket.wait_time(1, now + 0.1) < 1e-9
+    bucket.adjust(-5)
+    assert bucket.tokens < 0
+    print("✅ Buckets refill at their per-minute rate and track usage corrections")
+
+    async def check():
+        limiter = RateLimiter(requests_per_minute=1200)  # 20 per second, bursts of 20
+        start = time.monotonic()
+        for _ in range(30):
+            await limiter.acquire()
+        return time.monotonic() - start, limiter.stats()
+
+    elapsed, stats = asyncio.run(check())
+    print(f"   30 requests at 20/s with a burst of 20: {elapsed:.2f}s, {stats}")
+    assert 0.4 < elapsed < 0.8 and stats["waited_s"] > 0
+    print("✅ The limiter spends the burst, then paces requests at the allowed rate")
+
+
+def test_retry_after():
+    print("Testing Retry-After parsing...")
+    response = lambda headers: httpx.Response(429, headers=headers)
+    assert retry_after_seconds(response({"retry-after-ms": "1500", "Retry-After": "2"})) == 1.5
+    assert retry_after_seconds(response({"Retry-After": "3"})) == 3.0
+    in_future = retry_after_seconds(response({"Retry-After": "Wed, 21 Oct 2099 07:28:00 GMT"}))
+    assert in_future is not None and in_future > 0
+    assert retry_after_seconds(response({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert retry_after_seconds(response({"Retry-After": "soon"})) is None
+    assert retry_after_seconds(response({})) is None
+    print("✅ Milliseconds, seconds and HTTP dates are understood; unusable values are ignored")
+
+
+def test_openai_requests():
+    print("Testing OpenAI request bodies...")
+    provider = get_provider("openai")
+    assert provider.url("http://host:8000", "/completions") == "http://host:8000/v1/completions"
+    assert provider.url("https://api.example.com/v1", "/models") == "https://api.example.com/v1/models"
+    assert provider.headers("secret") == {"Authorization": "Bearer secret"} and provider.headers(None) == {}
+    path, body = provider.generate_request("m", "Q?", {"temperature": 0.0, "max_tokens": None})
+    assert path == "/chat/completions" and body == {"model": "m", "messages": [{"role": "user", "content": "Q?"}],
+                                                     "temperature": 0.0}
+    generations = provider.parse_batch({
+        "choices": [{"index": 1, "text": " b"}, {"index": 0, "text": "a "}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 4}
+    }, 2)
+    assert [g.text for g in generations] == ["a", "b"] and generations[0].total_tokens == 7
+    try:
+        get_provider("bedrock")
+        assert False
+    except ValueError:
+        pass
+    print("✅ Chat requests, batch answers in prompt order and unknown types are handled")
+
+    class Incomplete(Provider):
+        def generate_request(self, model_name, prompt, settings):
+            return "/generate", {"prompt": prompt}
+
+    try:
+        Incomplete()
+        assert False, "a provider without parse_generation and probe"
+    except TypeError:
+        pass
+    print("✅ A provider must implement requests, parsing and probing")
+
+
+class _Setup:
+    """A temporary database with one OpenAI-compatible model on a simulator and one evaluation of it."""
+
+    def __init__(self, endpoint: str, questions, **model_fields):
+        engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'providers.db')}",
+                               connect_args={"check_same_thread": False})
+        models.Base.metadata.create_all(bind=engine)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = self.session_factory()
+        dataset = get_or_create_dataset(db, "providers", questions)
+        model = models.Model(name="openai", type="openai", endpoint=endpoint, model_name=MODEL_NAME,
+                             **model_fields)
+        db.add(model)
+        db.flush()
+        evaluation = models.Evaluation(name="openai", model_id=model.id, dataset_id=dataset.id,
+                                       total_questions=len(questions), metrics='["bleu"]')
+        db.add(evaluation)
+        db.commit()
+        self.registry = ModelPoolRegistry()
+        self.pool = self.registry.get(model)
+        self.evaluation_id = evaluation.id
+        db.close()
+
+    def run(self):
+        original_writer, original_pools = evaluation_runner_module.ResultWriter, evaluation_runner_module.model_pools
+        evaluation_runner_module.ResultWriter = functools.partial(ResultWriter, session_factory=self.session_factory)
+        evaluation_runner_module.model_pools = self.registry
+        db = self.session_factory()
+        try:
+            evaluation = db.query(models.Evaluation).filter(models.Evaluation.id == self.evaluation_id).first()
+            start = time.perf_counter()
+            asyncio.run(evaluation_runner_module.evaluation_runner.run(evaluation, db))
+            elapsed = time.perf_counter() - start
+            db.refresh(evaluation)
+            results = db.query(models.Result).filter(models.Result.evaluation_id == evaluation.id).all()
+            return evaluation, results, elapsed
+        finally:
+            db.close()
+            evaluation_runner_module.ResultWriter = original_writer
+            evaluation_runner_module.model_pools = original_pools
+
+
+def _expected_correct(server, questions) -> int:
+    return sum(q["answer"].lower() in server.simulator.answer(MODEL_NAME, q["question"]).lower()
+               for q in questions)
+
+
+def test_openai_evaluation():
+    print("Testing an evaluation of an OpenAI-compatible model...")
+    questions = load_question_bank()[:20]
+    os.environ["EVAL_FORGE_TEST_API_KEY"] = "test-key"
+    try:
+        with SimulatorServer(SimulatorConfig(models=[MODEL_NAME], latency_ms=10.0, api_key="test-key")) as server:
+            evaluation, results, _ = _Setup(server.url, questions, api_key_env="EVAL_FORGE_TEST_API_KEY").run()
+            unauthorized, unauthorized_results, _ = _Setup(server.url, questions[:3]).run()
+            expected = _expected_correct(server, questions)
+    finally:
+        os.environ.pop("EVAL_FORGE_TEST_API_KEY")
+
+    print(f"   {evaluation.correct_answers}/{len(questions)} correct (expected {expected}); "
+          f"without the key: {unauthorized.infrastructure_errors} infrastructure errors")
+    assert evaluation.status == "completed" and evaluation.correct_answers == expected
+    assert evaluation.infrastructure_errors == 0 and all(r.model_response.startswith("The answer is") for r in results)
+    assert unauthorized.infrastructure_errors == 3
+    assert all("HTTP 401" in r.model_response for r in unauthorized_results)
+    print("✅ Chat completions answer every question with the API key named by the model")
+
+
+def test_client_rate_limit():
+    print("Testing an evaluation under a client-side rate limit...")
+    questions = load_question_bank()[:30]
+    # The server allows 600 requests per minute (bursts of 10); the model is configured under it
+    config = SimulatorConfig(models=[MODEL_NAME], latency_ms=5.0, requests_per_minute=600)
+    with SimulatorServer(config) as server:
+        evaluation, _, elapsed = _Setup(server.url, questions, requests_per_minute=480).run()
+        stats = server.simulator.stats()
+
+    print(f"   {elapsed:.2f}s, server stats {stats}")
+    assert evaluation.status == "completed" and evaluation.infrastructure_errors == 0
+    # The in-process server sees some jitter in arrival times; without the client limit it answers dozens of 429s
+    assert stats["rate_limited"] <= 2, "the client stays under the server's limit instead of collecting 429s"
+    # 8 in the first burst, then 8 per second
+    assert 2.2 < elapsed < 4.5
+    print("✅ Requests are paced at the configured rate with no 429s")
+
+
+def test_server_rate_limit():
+    print("Testing an evaluation against a server that answers 429...")
+    questions = load_question_bank()[:30]
+    config = SimulatorConfig(models=[MODEL_NAME], latency_ms=5.0, requests_per_minute=600)
+    with SimulatorServer(config) as server:
+        setup = _Setup(server.url, questions)
+        evaluation, _, elapsed = setup.run()
+        stats = server.simulator.stats()
+        expected = _expected_correct(server, questions)
+
+    pool_stats = setup.pool.stats()
+    print(f"   {elapsed:.2f}s, {stats['rate_limited']} responses were 429, "
+          f"rate limits {pool_stats['rate_limits']}, replica {pool_stats['replicas'][0]}")
+    assert stats["rate_limited"] > 0 and pool_stats["rate_limits"]["pauses"] > 0
+    assert evaluation.status == "completed" and evaluation.infrastructure_errors == 0
+    assert evaluation.correct_answers == expected
+    assert pool_stats["replicas"][0]["healthy"], "rate limiting is not an endpoint failure"
+    print("✅ 429s pause the model's requests for the Retry-After and are retried without errors")
+
+
+def test_batched_requests():
+    print("Testing batched requests...")
+    questions = load_question_bank()[:24]
+    config = SimulatorConfig(models=[MODEL_NAME], latency_ms=50.0, slots=1)
+    with SimulatorServer(config) as server:
+        single, _, single_elapsed = _Setup(server.url, questions, parallel_requests=1).run()
+        single_requests = server.simulator.requests
+        batched, results, batched_elapsed = _Setup(server.url, questions, parallel_requests=1, batch_size=4).run()
+        batched_requests = server.simulator.requests - single_requests
+
+    print(f"   One question per request: {single_requests} requests, {single_elapsed:.2f}s; "
+          f"four: {batched_requests} requests, {batched_elapsed:.2f}s")
+    assert batched_requests == len(questions) // 4 and single_requests == len(questions)
+    assert batched.correct_answers == single.correct_answers and len(results) == len(questions)
+    assert batched.infrastructure_errors == 0
+    assert batched_elapsed < single_elapsed * 0.6
+    print("✅ Batches of four prompts take a quarter of the requests and score the same")
+
+
+def test_connection_check():
+    print("Testing the connection check of an OpenAI-compatible model...")
+    from app import main
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'probe.db')}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def probe_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    main.app.dependency_overrides[get_db] = probe_db
+    original_pools = main.model_pools
+    main.model_pools = ModelPoolRegistry()
+    try:
+        with SimulatorServer(SimulatorConfig(models=[MODEL_NAME])) as server:
+            client = TestClient(main.app)
+            statuses = {}
+            for name, model_name in (("served", MODEL_NAME), ("missing", "gpt-missing")):
+                created = client.post("/api/models", json={
+                    "name": name, "type": "openai", "endpoint": f"{server.url}/v1", "model_name": model_name,
+                    "requests_per_minute": 60, "batch_size": 4
+                }).json()
+                statuses[name] = client.get(f"/api/models/{created['id']}/test").json()["status"]
+            invalid = [client.post("/api/models", json={"name": "bad", "endpoint": server.url, "model_name": "m",
+                                                        **fields}).status_code
+                       for fields in ({"type": "bedrock"}, {"type": "ollama", "batch_size": 4},
+                                      {"type": "openai", "tokens_per_minute": 0})]
+    finally:
+        main.app.dependency_overrides.pop(get_db, None)
+        main.model_pools = original_pools
+
+    print(f"   Statuses {statuses}, invalid models {invalid}")
+    assert statuses == {"served": "connected", "missing": "error"}
+    assert invalid == [400, 400, 400]
+    print("✅ OpenAI-compatible models are probed through /v1/models; invalid settings are rejected")
+
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_retry_after()
+    test_openai_requests()
+    test_openai_evaluation()
+    test_client_rate_limit()
+    test_server_rate_limit()
+    test_batched_requests()
+    test_connection_check()
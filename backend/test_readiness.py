@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test scorer warm-up and the readiness endpoint: scorers move from not_loaded
+through loading to ready or failed, the API answers 503 while warming, and a
+scorer that failed to load is reported instead of retried on every result.
+"""
+
+import sys
+import os
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app import metrics as metrics_module
+from app.metrics import MetricsCalculator
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts):
+        self.encoded.extend(texts)
+        return [[1.0, 0.0] for _ in texts]
+
+
+def _ready(calculator: MetricsCalculator):
+    """Status code and body of GET /api/ready served from calculator."""
+    original_calculator, original_client = main.metrics_calculator, main.scoring_client
+    main.metrics_calculator, main.scoring_client = calculator, None
+    try:
+        response = TestClient(main.app).get("/api/ready")
+        return response.status_code, response.json()
+    finally:
+        main.metrics_calculator, main.scoring_client = original_calculator, original_client
+
+
+def test_warm_up_states():
+    print("Testing warm-up states...")
+    release = threading.Event()
+    loading = threading.Event()
+    embeddings = FakeEmbeddings()
+
+    def slow_backend(*args, **kwargs):
+        loading.set()
+        release.wait(10)
+        return embeddings
+
+    calculator = MetricsCalculator(embedding_backend="torch")
+    status_code, body = _ready(calculator)
+    assert status_code == 503 and body["status"] == "warming"
+    assert set(body["scorers"].values()) == {"not_loaded"}
+    print("✅ Before warm-up every scorer is not_loaded and the API is not ready")
+
+    original_loader = metrics_module.load_embedding_backend
+    metrics_module.load_embedding_backend = slow_backend
+    try:
+        thread = calculator.start_warm_up()
+        assert loading.wait(10)
+        status_code, body = _ready(calculator)
+        print(f"   While loading: {body['scorers']}")
+        assert status_code == 503 and body["scorers"]["semantic_similarity"] == "loading"
+        assert body["scorers"]["bleu"] == body["scorers"]["rouge"] == "ready"
+        print("✅ While the embedding model loads it is reported as loading, on a background thread")
+
+        release.set()
+        thread.join(10)
+    finally:
+        metrics_module.load_embedding_backend = original_loader
+
+    status_code, body = _ready(calculator)
+    assert status_code == 200 and body["status"] == "ready" and body["embedding_backend"] == "torch"
+    assert embeddings.encoded == ["warm up"], "warm-up runs one encode so the first evaluation doesn't"
+    print("✅ Once every scorer has loaded the API is ready")
+
+
+def test_failed_scorer():
+    print("Testing a scorer that fails to load...")
+    calls = []
+
+    def missing_backend(*args, **kwargs):
+        calls.append(args)
+        raise OSError("model not found in model-cache")
+
+    calculator = MetricsCalculator(embedding_backend="onnx")
+    original_loader = metrics_module.load_embedding_backend
+    metrics_module.load_embedding_backend = missing_backend
+    try:
+        calculator.warm_up()
+        scores = [calculator.calculate_semantic_similarity("a cat", "a dog") for _ in range(3)]
+    finally:
+        metrics_module.load_embedding_backend = original_loader
+
+    status_code, body = _ready(calculator)
+    print(f"   {body}")
+    assert status_code == 200 and body["status"] == "degraded"
+    assert body["scorers"]["semantic_similarity"] == "failed" and "model-cache" in body["errors"]["semantic_similarity"]
+    assert scores == [None, None, None] and len(calls) == 1, "a failed load is not retried per result"
+    assert calculator.calculate_bleu_score("the cat sat", "the cat sat") is not None, "other scorers still work"
+    print("✅ A failed scorer leaves the API serving, degraded, and its metric empty")
+
+
+if __name__ == "__main__":
+    test_warm_up_states()
+    test_failed_scorer()
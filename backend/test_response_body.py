@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test bounded response body reading for synthetic API checks: content checks
+across chunk boundaries, early stopping and the byte cap.
+"""
+
+import asyncio
+import json
+import re
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+import httpx
+
+from app.models import SyntheticTest
+from app.response_body import RESPONSE_BODY_MAX_BYTES, StreamingBodyCheck
+from app.synthetic_monitoring import SyntheticMonitoringService
+
+CHUNK = b"x" * 65536
+BODY_CHUNKS = 200  # About 13 MB
+
+
+def _service(needle_at: int = None):
+    """Service whose client streams a large body, with b"needle" split across chunk needle_at and the next."""
+    served = {"chunks": 0}
+
+    async def body():
+        for index in range(BODY_CHUNKS):
+            served["chunks"] += 1
+            if index == needle_at:
+                yield CHUNK[:-3] + b"nee"
+            elif needle_at is not None and index == needle_at + 1:
+                yield b"dle" + CHUNK[3:]
+            else:
+                yield CHUNK
+
+    def handler(request):
+        return httpx.Response(200, content=body())
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return SyntheticMonitoringService(client=client), served
+
+
+def _test(expected=None):
+    return SyntheticTest(id=1, name="big", test_type="api", url="http://monitored.test/big", method="GET",
+                         expected_status=200, expected_response_contains=expected, timeout=10, auth_type="none")
+
+
+def test_streaming_body_check():
+    print("Testing streaming body check...")
+    check = StreamingBodyCheck(substring=b"needle")
+    assert not check.feed(b"hay nee")
+    assert check.feed(b"dle hay")
+    check = StreamingBodyCheck(pattern=re.compile(rb"status\":\s*\"ok"))
+    assert not check.feed(b'{"status": ')
+    assert check.feed(b'"ok"}')
+    print("✅ Substring and regex matches across chunk boundaries")
+
+
+def test_api_check_stops_early():
+    service, served = _service(needle_at=2)
+    result = asyncio.run(service.execute_api_test(_test("needle")))
+    details = result["details"]
+    status = "✅" if result["status"] == "success" and served["chunks"] <= 4 else "❌"
+    print(f"{status} Found across chunks after reading {details['body_bytes_read']} bytes ({served['chunks']} chunks)")
+    assert result["status"] == "success"
+    assert served["chunks"] <= 4
+    assert not details["body_complete"]
+    assert len(result["response_body"]) == 1000
+
+
+def test_api_check_byte_cap():
+    service, served = _service()
+    result = asyncio.run(service.execute_api_test(_test("needle")))
+    details = result["details"]
+    status = "✅" if result["status"] == "failure" and details["body_truncated"] else "❌"
+    print(f"{status} Missing content: stopped at the cap after {details['body_bytes_read']} bytes")
+    assert result["status"] == "failure"
+    assert details["body_bytes_read"] == RESPONSE_BODY_MAX_BYTES
+    assert "searched the first" in result["error_message"]
+    assert json.dumps(details)
+
+if __name__ == "__main__":
+    test_streaming_body_check()
+    test_api_check_stops_early()
+    test_api_check_byte_cap()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test the batched result writer: flushes when a batch fills, when the flush
+interval passes, and on close, on the database threads, and surfaces failed
+flushes to the run.
+"""
+
+import asyncio
+import sys
+import os
+import tempfile
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.result_writer import ResultWriter
+
+
+def _session_factory():
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'writer.db')}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _row(index: int) -> dict:
+    return {"evaluation_id": 1, "question": f"q{index}", "model_response": f"a{index}", "is_correct": index % 2 == 0,
+            "response_time": index}
+
+
+def _stored(session_factory) -> int:
+    db = session_factory()
+    try:
+        return db.query(models.Result).count()
+    finally:
+        db.close()
+
+
+def test_flush_on_size():
+    print("Testing flushes when a batch fills...")
+    session_factory = _session_factory()
+
+    async def check():
+        writer = ResultWriter(flush_rows=5, flush_interval_ms=60_000, session_factory=session_factory)
+        await writer.start()
+        for index in range(12):
+            await writer.add(_row(index))
+        await asyncio.sleep(0.2)
+        before_close = (writer.rows_written, writer.flush_count, _stored(session_factory))
+        await writer.close()
+        return before_close, writer.stats()
+
+    (written, flushes, stored), stats = asyncio.run(check())
+    print(f"   Before close: {written} rows in {flushes} flushes; after: {stats}")
+    assert (written, flushes, stored) == (10, 2, 10), "two full batches are committed without waiting"
+    assert stats["rows_written"] == 12 and stats["flush_count"] == 3 and stats["rows_pending"] == 0
+    assert _stored(session_factory) == 12
+    print("✅ Full batches are written immediately, the remainder on close")
+
+
+def test_flush_on_interval():
+    print("Testing flushes when the interval passes...")
+    session_factory = _session_factory()
+
+    async def check():
+        writer = ResultWriter(flush_rows=100, flush_interval_ms=100, session_factory=session_factory)
+        await writer.start()
+        for index in range(3):
+            await writer.add(_row(index))
+        await asyncio.sleep(0.02)
+        early = _stored(session_factory)
+        await asyncio.sleep(0.3)
+        late = (_stored(session_factory), writer.flush_count)
+        await writer.add(_row(3))
+        await writer.close()
+        return early, late, writer.flush_count
+
+    early, (late, flushes), total_flushes = asyncio.run(check())
+    print(f"   Stored after 20ms: {early}, after 320ms: {late} in {flushes} flush")
+    assert early == 0 and late == 3 and flushes == 1 and total_flushes == 2
+    print("✅ A partial batch is committed once the interval passes")
+
+
+def test_flush_on_close():
+    print("Testing flushes on close...")
+    session_factory = _session_factory()
+
+    async def check():
+        writer = ResultWriter(flush_rows=100, flush_interval_ms=60_000, session_factory=session_factory)
+        await writer.start()
+        for index in range(4):
+            await writer.add(_row(index))
+        await asyncio.sleep(0.05)
+        before = _stored(session_factory)
+        await writer.close()
+        return before
+
+    assert asyncio.run(check()) == 0 and _stored(session_factory) == 4
+    print("✅ Closing writes whatever is still buffered")
+
+
+def test_flush_on_db_threads():
+    print("Testing where flushes run...")
+    session_factory = _session_factory()
+    threads = []
+
+    class ThreadRecordingWriter(ResultWriter):
+        def _write_batch(self, batch):
+            threads.append(threading.current_thread().name)
+            super()._write_batch(batch)
+
+    async def check():
+        writer = ThreadRecordingWriter(flush_rows=2, session_factory=session_factory)
+        await writer.start()
+        for index in range(4):
+            await writer.add(_row(index))
+        await writer.close()
+
+    asyncio.run(check())
+    assert len(threads) == 2 and all(name.startswith("eval-forge-db") for name in threads), threads
+    print("✅ Batches are written on the database threads, like every other query")
+
+
+def test_failed_flush():
+    print("Testing a failed flush...")
+    engine = create_engine("sqlite://")  # No tables: every insert fails
+    broken = sessionmaker(bind=engine)
+
+    async def check():
+        writer = ResultWriter(flush_rows=1, session_factory=broken)
+        await writer.start()
+        await writer.add(_row(0))
+        await asyncio.sleep(0.1)
+        errors = []
+        for action in (lambda: writer.add(_row(1)), writer.close):
+            try:
+                await action()
+            except Exception as e:
+                errors.append(type(e).__name__)
+        return errors
+
+    errors = asyncio.run(check())
+    assert errors == ["OperationalError", "OperationalError"], errors
+    print("✅ A failed flush is raised to the next add and to close")
+
+
+if __name__ == "__main__":
+    test_flush_on_size()
+    test_flush_on_interval()
+    test_flush_on_close()
+    test_flush_on_db_threads()
+    test_failed_flush()
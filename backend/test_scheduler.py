@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test the synthetic test scheduler's leader lease: only one worker holds it at a
+time, and another takes over once it is released or expires. Deleting a test
+drops its queued runs so no worker claims them.
+"""
+
+import sys
+import os
+import tempfile
+import time
+from datetime import datetime
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import get_db
+from app.scheduler import LeaderLease
+
+
+def _session_factory():
+    path = os.path.join(tempfile.mkdtemp(), "scheduler.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def test_leader_lease():
+    print("Testing scheduler leader lease...")
+    session_factory = _session_factory()
+    first = LeaderLease("test_scheduler", "worker-1", ttl_s=1, session_factory=session_factory)
+    second = LeaderLease("test_scheduler", "worker-2", ttl_s=1, session_factory=session_factory)
+
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    assert first.try_acquire(), "holder must be able to renew"
+    print("✅ Only one worker holds the lease")
+
+    first.release()
+    assert second.try_acquire()
+    assert not first.try_acquire()
+    print("✅ Released lease is taken over immediately")
+
+    time.sleep(1.1)
+    assert first.try_acquire()
+    assert first.current().holder == "worker-1"
+    print("✅ Expired lease is taken over")
+
+
+def test_delete_drops_queued_runs():
+    print("Testing deleting a test with queued runs...")
+    from app import main
+    session_factory = _session_factory()
+    db = session_factory()
+    test = models.SyntheticTest(name="t", test_type="api", url="http://127.0.0.1:9", created_at=datetime.utcnow())
+    db.add(test)
+    db.flush()
+    db.add_all([models.SyntheticTestRun(test_id=test.id, enqueued_at=datetime.utcnow()),
+                models.SyntheticTestRun(test_id=test.id, enqueued_at=datetime.utcnow(), claimed_by="worker-1",
+                                        claimed_at=datetime.utcnow())])
+    db.commit()
+    test_id = test.id
+    db.close()
+
+    def scheduler_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    main.app.dependency_overrides[get_db] = scheduler_db
+    try:
+        response = TestClient(main.app).delete(f"/api/synthetic-tests/{test_id}")
+    finally:
+        main.app.dependency_overrides.pop(get_db, None)
+
+    db = session_factory()
+    runs = db.query(models.SyntheticTestRun).count()
+    db.close()
+    assert response.status_code == 200 and runs == 0, (response.status_code, runs)
+    print("✅ A deleted test's queued runs go with it instead of being claimed by a worker")
+
+
+if __name__ == "__main__":
+    test_leader_lease()
+    test_delete_drops_queued_runs()
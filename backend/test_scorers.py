@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test the scorer registry: resolving metric selections, rejecting malformed
+ones at request time, the per-pair LRU cache, batch scoring, and scorer
+devices following the embedding backend actually loaded.
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from fastapi.testclient import TestClient
+
+from app.metrics import MetricsCalculator
+from app.scorers import DEFAULT_SCORERS, Scorer, ScorerRegistry, ScorerTimings, scorer_registry
+
+
+def _counting_registry(cache_size: int):
+    calls = []
+
+    def length_ratio(reference, candidate):
+        calls.append((reference, candidate))
+        return {"length_ratio": len(candidate) / len(reference)}
+
+    registry = ScorerRegistry(cache_size=cache_size)
+    registry.register(Scorer("length_ratio", length_ratio, ["length_ratio"]))
+    registry.register(Scorer("flaky", lambda reference, candidate: {"flaky": None}, ["flaky"]))
+    return registry, calls
+
+
+def test_resolve():
+    print("Testing metric selections...")
+    assert [scorer.name for scorer in scorer_registry.resolve(None)] == DEFAULT_SCORERS
+    assert [scorer.name for scorer in scorer_registry.resolve(["rouge", "exact_match"])] == ["rouge", "exact_match"]
+    for invalid in (["bleu", "nope"], "bleu", 5, {"bleu": True}, [1]):
+        try:
+            scorer_registry.resolve(invalid)
+            assert False, invalid
+        except ValueError:
+            pass
+    print("✅ Selections resolve in order; unknown names and anything but a list of names are rejected")
+
+    from app import main
+    client = TestClient(main.app)
+    for metrics in ('["bleu", "nope"]', '5', '"bleu"', '{"bleu": 1}', 'not json'):
+        response = client.post("/api/evaluations", data={"name": "e", "model_id": 1, "metrics": metrics})
+        assert response.status_code == 422 and "Invalid metrics selection" in response.json()["detail"], metrics
+    print("✅ Creating an evaluation with a malformed selection is a 422, not a server error")
+
+
+def test_cache():
+    print("Testing the scorer cache...")
+    registry, calls = _counting_registry(cache_size=2)
+    for reference in ("alpha", "beta", "alpha"):
+        registry.score(reference, "candidate", ["length_ratio"])
+    assert len(calls) == 2, "the repeated pair is served from the cache"
+
+    registry.score("gamma", "candidate", ["length_ratio"])  # Evicts beta, the least recently used
+    registry.score("alpha", "candidate", ["length_ratio"])
+    assert len(calls) == 3
+    registry.score("beta", "candidate", ["length_ratio"])
+    assert len(calls) == 4 and calls[-1][0] == "beta"
+    print("✅ The cache keeps the most recently used pairs up to its size")
+
+    timings = ScorerTimings()
+    metrics = registry.score("  Alpha!!  ", "candidate", ["length_ratio", "flaky"], timings)
+    assert metrics["flaky"] is None and len(calls) == 5
+    registry.score("  Alpha!!  ", "candidate", ["flaky"], timings)
+    assert len(registry._cache) == 2 and all(key[0] == "length_ratio" for key in registry._cache)
+    assert timings.summary()["length_ratio"]["cache_hits"] == 0 and timings.summary()["flaky"]["calls"] == 2
+    print("✅ Results with missing values aren't cached, so a scorer that failed is tried again")
+
+    batch = registry.score_batch([("beta", "candidate"), ("delta", "candidate"), ("", "candidate")], ["length_ratio"])
+    assert len(calls) == 6 and batch[2] == {"length_ratio": None}
+    assert batch[0]["length_ratio"] == len("candidate") / len("beta")
+    print("✅ Batch scoring shares the cache and skips empty pairs")
+
+
+def test_devices():
+    print("Testing scorer devices...")
+
+    class LoadedModel:
+        def __init__(self, device):
+            self.device = device
+
+    assert MetricsCalculator(embedding_backend="onnx-int8").embedding_device() == "cpu"
+    torch_calculator = MetricsCalculator(embedding_backend="torch")
+    scorer = Scorer("semantic", lambda reference, candidate: {}, [], device=torch_calculator.embedding_device)
+    assert scorer.device is None, "a PyTorch model's device isn't known until it loads"
+    torch_calculator._sentence_model = LoadedModel("gpu")
+    assert scorer.describe()["device"] == "gpu"
+    torch_calculator._sentence_model = LoadedModel("cpu")
+    assert scorer.describe()["device"] == "cpu"
+    assert scorer_registry.get("bleu").device == "cpu"
+    print("✅ The embedding scorer reports the device of the backend actually loaded")
+
+
+if __name__ == "__main__":
+    test_resolve()
+    test_cache()
+    test_devices()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test the scoring sidecar: concurrent requests from several clients are coalesced
+into batches and score exactly like the in-process registry. In-process scoring
+runs off the event loop, and a failing scorer only empties its own metrics.
+"""
+
+import asyncio
+import functools
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import evaluation_runner as evaluation_runner_module
+from app import models
+from app import scoring_service
+from app import scoring_stage
+from app.datasets import get_or_create_dataset
+from app.model_pool import ModelPoolRegistry
+from app.ollama_simulator import SimulatorConfig, SimulatorServer
+from app.question_bank import load_question_bank
+from app.result_writer import ResultWriter
+from app.scorers import Scorer, ScorerRegistry, scorer_registry
+from app.scoring_service import ScoringClient, ScoringServer
+
+METRICS = ["exact_match", "bleu", "rouge"]
+
+
+async def _run_sidecar():
+    socket_path = os.path.join(tempfile.mkdtemp(), "scorer.sock")
+    server = ScoringServer(socket_path, window_ms=20)
+    await server.start()
+    clients = [ScoringClient(socket_path) for _ in range(4)]
+    pairs = [(f"The capital of France is Paris {i}", f"Paris is the capital of France {i}") for i in range(100)]
+    try:
+        results = await asyncio.gather(*[
+            clients[i % len(clients)].score(reference, candidate, METRICS)
+            for i, (reference, candidate) in enumerate(pairs)
+        ])
+        try:
+            await clients[0].score("a", "b", ["not_a_scorer"])
+            rejected = False
+        except RuntimeError:
+            rejected = True
+        return pairs, results, server.stats(), rejected
+    finally:
+        for client in clients:
+            await client.close()
+        await server.stop()
+
+
+def test_scoring_sidecar():
+    print("Testing scoring sidecar...")
+    pairs, results, stats, rejected = asyncio.run(_run_sidecar())
+
+    expected = [scorer_registry.score(reference, candidate, METRICS) for reference, candidate in pairs]
+    status = "✅" if results == expected else "❌"
+    print(f"{status} Sidecar scores match in-process scoring")
+    assert results == expected
+
+    print(f"✅ {stats['requests']} requests scored in {stats['batches']} batch(es)")
+    assert stats["batches"] < stats["requests"]
+
+    status = "✅" if rejected else "❌"
+    print(f"{status} Unknown scorer rejected")
+    assert rejected
+
+
+def test_local_scoring_off_loop():
+    print("Testing in-process scoring...")
+    threads = []
+
+    def slow(reference, candidate):
+        threads.append(threading.current_thread().name)
+        time.sleep(0.3)  # Like a first call loading the embedding model
+        return {"slow": 1.0}
+
+    async def check():
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        metrics = await scoring_service.score_pair("reference", "candidate", ["slow"])
+        ticker.cancel()
+        return metrics, max(later - earlier for earlier, later in zip(ticks, ticks[1:]))
+
+    scorer_registry.register(Scorer("slow", slow, ["slow"], cacheable=False))
+    original_client = scoring_service.scoring_client
+    scoring_service.scoring_client = None
+    try:
+        metrics, longest_gap = asyncio.run(check())
+    finally:
+        scoring_service.scoring_client = original_client
+        del scorer_registry._scorers["slow"]
+
+    print(f"   Longest event loop gap while scoring: {longest_gap * 1000:.0f}ms")
+    assert metrics == {"slow": 1.0} and threads[0].startswith("eval-forge-scorer")
+    assert longest_gap < 0.15, "the event loop keeps running while a pair is scored"
+    print("✅ Scoring runs on the scoring threads while the event loop keeps serving")
+
+
+def test_failing_scorer():
+    print("Testing a failing scorer...")
+
+    def broken(reference, candidate):
+        raise RuntimeError("CUDA out of memory")
+
+    registry = ScorerRegistry()
+    registry.register(scorer_registry.get("exact_match"))
+    registry.register(Scorer("broken", broken, ["broken"], batch_fn=lambda references, candidates: broken("", "")))
+    assert registry.score("Paris", "paris", ["exact_match", "broken"]) == {"exact_match": 1.0, "broken": None}
+    assert registry.score_batch([("Paris", "paris"), ("Paris", "Rome")], ["broken", "exact_match"]) == [
+        {"exact_match": 1.0, "broken": None}, {"exact_match": 0.0, "broken": None}]
+    print("✅ A scorer that raises leaves only its own outputs empty, singly and in batches")
+
+
+def test_scoring_failure_keeps_answers():
+    print("Testing an evaluation whose scoring fails...")
+    questions = load_question_bank()[:6]
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'scoring.db')}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    async def sidecar_error(*args, **kwargs):
+        raise RuntimeError("Scoring sidecar error: scorer crashed")
+
+    originals = (evaluation_runner_module.ResultWriter, evaluation_runner_module.model_pools,
+                 scoring_stage.score_pairs)
+    evaluation_runner_module.ResultWriter = functools.partial(ResultWriter, session_factory=session_factory)
+    evaluation_runner_module.model_pools = ModelPoolRegistry()
+    scoring_stage.score_pairs = sidecar_error
+    try:
+        with SimulatorServer(SimulatorConfig(latency_ms=10.0, accuracy=1.0)) as server:
+            db = session_factory()
+            dataset = get_or_create_dataset(db, "scoring", questions)
+            model = models.Model(name="scoring", type="ollama", endpoint=server.url, model_name="sim-llama:latest")
+            db.add(model)
+            db.flush()
+            evaluation = models.Evaluation(name="scoring", model_id=model.id, dataset_id=dataset.id,
+                                           total_questions=len(questions), metrics='["bleu", "rouge"]')
+            db.add(evaluation)
+            db.commit()
+            asyncio.run(evaluation_runner_module.evaluation_runner.run(evaluation, db))
+    finally:
+        (evaluation_runner_module.ResultWriter, evaluation_runner_module.model_pools,
+         scoring_stage.score_pairs) = originals
+
+    results = db.query(models.Result).filter(models.Result.evaluation_id == evaluation.id).all()
+    print(f"   {len(results)} results, accuracy {evaluation.accuracy}, "
+          f"{evaluation.infrastructure_errors} infrastructure errors")
+    assert evaluation.status == "completed" and len(results) == len(questions)
+    assert evaluation.infrastructure_errors == 0 and evaluation.accuracy == 1.0
+    assert all(r.model_response and not r.model_response.startswith("Error") for r in results)
+    assert all(r.bleu_score is None and r.rouge_1_score is None for r in results)
+    db.close()
+    print("✅ Answers are kept and graded; only their metrics are missing")
+
+
+if __name__ == "__main__":
+    test_scoring_sidecar()
+    test_local_scoring_off_loop()
+    test_failing_scorer()
+    test_scoring_failure_keeps_answers()
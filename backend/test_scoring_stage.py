@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test the batched scoring stage: answers queued while a batch is scored are
+scored together and passed on in order, a failure downstream is raised to the
+workers instead of blocking them, and an evaluation keeps the model's slots
+busy while its answers are scored.
+"""
+
+import asyncio
+import functools
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import evaluation_runner as evaluation_runner_module
+from app import models
+from app import scoring_service
+from app.datasets import get_or_create_dataset
+from app.evaluation_runner import evaluation_runner
+from app.model_pool import ModelPoolRegistry
+from app.ollama_simulator import SimulatorConfig, SimulatorServer
+from app.question_bank import load_question_bank
+from app.result_writer import ResultWriter
+from app.scorers import Scorer, scorer_registry
+from app.scoring_stage import ScoringStage
+
+
+def _with_slow_scorer(check, delay_s: float):
+    """Run check() with a "slow" batch scorer registered in-process, returning it and the batch sizes seen."""
+    batches = []
+
+    def slow_batch(references, candidates):
+        batches.append(len(references))
+        time.sleep(delay_s)
+        return [{"slow": float(len(candidate))} for candidate in candidates]
+
+    scorer_registry.register(Scorer("slow", lambda reference, candidate: slow_batch([reference], [candidate])[0],
+                                    ["slow"], batch_fn=slow_batch, cacheable=False))
+    original_client = scoring_service.scoring_client
+    scoring_service.scoring_client = None
+    try:
+        return check(), batches
+    finally:
+        scoring_service.scoring_client = original_client
+        del scorer_registry._scorers["slow"]
+
+
+def test_batches_in_order():
+    print("Testing batches and ordering...")
+
+    async def check():
+        passed = []
+
+        async def on_scored(row, metrics):
+            passed.append((row["id"], metrics))
+
+        stage = ScoringStage(["slow"], on_scored, batch_pairs=4)
+        await stage.start()
+        for index in range(10):
+            # Row 3 has no answer, like an infrastructure error
+            await stage.add({"id": index}, None if index == 3 else ("ref", "x" * (index + 1)))
+            await asyncio.sleep(0.01)
+        await stage.close()
+        return passed, stage.stats()
+
+    (passed, stats), batches = _with_slow_scorer(lambda: asyncio.run(check()), delay_s=0.05)
+    print(f"   Batch sizes: {batches}, {stats}")
+    assert [row_id for row_id, _ in passed] == list(range(10)), "rows are passed on in the order they arrived"
+    assert passed[3][1] is None and passed[9][1] == {"slow": 10.0}
+    assert sum(batches) == 9 and len(batches) < 9 and max(batches) <= 4
+    assert stats["pairs_scored"] == 9 and stats["rows_pending"] == 0
+    print("✅ Answers arriving during a batch are scored together, in order, and unanswered rows pass through")
+
+
+def test_failure_downstream():
+    print("Testing a failure after scoring...")
+
+    async def check():
+        async def on_scored(row, metrics):
+            raise RuntimeError("result flush failed")
+
+        stage = ScoringStage(["exact_match"], on_scored, max_pending=2)
+        await stage.start()
+        errors = []
+        try:
+            for index in range(20):
+                await asyncio.wait_for(stage.add({"id": index}, ("a", "a")), 5)
+                await asyncio.sleep(0.01)
+        except RuntimeError as e:
+            errors.append(str(e))
+        try:
+            await stage.close()
+        except RuntimeError as e:
+            errors.append(str(e))
+        return errors
+
+    errors = asyncio.run(check())
+    assert errors == ["result flush failed", "result flush failed"], errors
+    print("✅ A failure passing rows on is raised to the next add and to close, without blocking the workers")
+
+
+def test_generation_overlaps_scoring():
+    print("Testing an evaluation whose scoring is slow...")
+    questions = load_question_bank()[:24]
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'stage.db')}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def run():
+        originals = evaluation_runner_module.ResultWriter, evaluation_runner_module.model_pools
+        evaluation_runner_module.ResultWriter = functools.partial(ResultWriter, session_factory=session_factory)
+        evaluation_runner_module.model_pools = ModelPoolRegistry()
+        try:
+            with SimulatorServer(SimulatorConfig(latency_ms=50.0, slots=4)) as server:
+                db = session_factory()
+                dataset = get_or_create_dataset(db, "stage", questions)
+                model = models.Model(name="stage", type="ollama", endpoint=server.url,
+                                     model_name="sim-llama:latest", parallel_requests=4)
+                db.add(model)
+                db.flush()
+                evaluation = models.Evaluation(name="stage", model_id=model.id, dataset_id=dataset.id,
+                                               total_questions=len(questions), metrics='["slow"]')
+                db.add(evaluation)
+                db.commit()
+                start_time = time.perf_counter()
+                asyncio.run(evaluation_runner.run(evaluation, db))
+                elapsed = time.perf_counter() - start_time
+                stats = server.simulator.stats()
+        finally:
+            evaluation_runner_module.ResultWriter, evaluation_runner_module.model_pools = originals
+        results = db.query(models.Result).filter(models.Result.evaluation_id == evaluation.id).all()
+        db.close()
+        return elapsed, stats, evaluation, results
+
+    (elapsed, stats, evaluation, results), batches = _with_slow_scorer(run, delay_s=0.1)
+    print(f"   {elapsed:.2f}s, peak {stats['peak_active']} requests in flight, scoring batches {batches}")
+    assert evaluation.status == "completed" and len(results) == len(questions)
+    assert all(r.extra_metrics and '"slow"' in r.extra_metrics for r in results)
+    assert stats["peak_active"] == 4, "every slot stays busy while answers are scored"
+    assert len(batches) < len(questions) / 2, "answers that queue up during a batch are scored together"
+    # Scoring each answer inline would take 24 x 100ms on the one scoring thread
+    assert elapsed < len(questions) * 0.1, elapsed
+    print("✅ Workers keep asking while earlier answers are scored in batches")
+
+
+if __name__ == "__main__":
+    test_batches_in_order()
+    test_failure_downstream()
+    test_generation_overlaps_scoring()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test the sequential statistics behind adaptive evaluations: Wilson and
+running-mean intervals, stopping on interval width, the confidence sequence
+used for baseline comparisons, and the false-stop rate of two equally
+accurate models compared after every answer.
+"""
+
+import random
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from app.sequential import RunningMean, SequentialEstimator, mixture_radius, mixture_rho, wilson_interval
+
+
+def test_intervals():
+    print("Testing intervals...")
+    assert wilson_interval(0, 0, 1.96) == (0.0, 1.0)
+    lower, upper = wilson_interval(70, 100, 1.96)
+    assert abs(lower - 0.6041) < 1e-3 and abs(upper - 0.7810) < 1e-3
+    lower, upper = wilson_interval(0, 20, 1.96)
+    assert lower == 0.0 and 0 < upper < 0.2
+    print("✅ Wilson intervals match reference values and stay within [0, 1]")
+
+    running = RunningMean()
+    assert running.interval(1.96) is None
+    for value in (1.0, 2.0, 3.0, 4.0):
+        running.add(value)
+    lower, upper = running.interval(1.96)
+    assert running.mean == 2.5 and abs((upper - lower) / 2 - 1.96 * (5 / 3 / 4) ** 0.5) < 1e-9
+    print("✅ Running means track the mean and standard error")
+
+    alpha, rho = 0.025, mixture_rho(400, 0.025)
+    radii = [mixture_radius(n, alpha, rho) for n in (50, 100, 400, 1600)]
+    assert radii == sorted(radii, reverse=True)
+    fixed = 2.2414 * 0.5 / 400 ** 0.5  # Fixed-sample normal radius at the same level, worst-case variance
+    assert fixed < radii[2] < fixed * 1.6, "the sequence costs a modest widening around its horizon"
+    print("✅ The confidence sequence narrows with samples, a little wider than a fixed-sample interval")
+
+
+def test_stopping_rules():
+    print("Testing stopping rules...")
+    estimator = SequentialEstimator(confidence_level=0.95, target_width=0.2, min_samples=30)
+    for i in range(29):
+        estimator.add(i % 2 == 0)
+    assert estimator.stop_reason() is None, "never before min_samples"
+    while estimator.stop_reason() is None:
+        estimator.add(estimator.total % 2 == 0)
+    lower, upper = estimator.accuracy_interval()
+    assert estimator.stop_reason() == "target_width_reached" and upper - lower <= 0.2 and 85 <= estimator.total <= 100
+    print(f"✅ Stops on interval width after {estimator.total} answers")
+
+    estimator = SequentialEstimator(baseline=(50, 100), min_samples=10, horizon=200)
+    estimator.add(True, {"bleu_score": 0.5, "rouge1": None})
+    estimator.add(True, {"bleu_score": 0.7})
+    assert set(estimator.metric_intervals()) == {"bleu_score"}
+    while estimator.stop_reason() is None:
+        estimator.add(True)
+    assert estimator.stop_reason() == "better_than_baseline" and estimator.total < 40
+    print(f"✅ A clearly better model stops as better than the baseline after {estimator.total} answers")
+
+
+def _simulate(accuracy: float, baseline_accuracy: float, runs: int, questions: int, seed: int):
+    rng = random.Random(seed)
+    outcomes = {}
+    for _ in range(runs):
+        baseline_correct = sum(rng.random() < baseline_accuracy for _ in range(questions))
+        estimator = SequentialEstimator(confidence_level=0.95, baseline=(baseline_correct, questions),
+                                        min_samples=30, horizon=questions)
+        reason = None
+        for _ in range(questions):
+            estimator.add(rng.random() < accuracy)
+            reason = estimator.stop_reason()
+            if reason:
+                break
+        outcomes[reason] = outcomes.get(reason, 0) + 1
+    return outcomes
+
+
+def test_identical_models_rarely_stop():
+    print("Testing baseline comparisons of two equally accurate models...")
+    runs = 400
+    outcomes = _simulate(0.7, 0.7, runs=runs, questions=400, seed=7)
+    false_stops = runs - outcomes.get(None, 0)
+    print(f"   {runs} evaluations checked after every answer: {outcomes}")
+    # At 95% confidence the false-stop rate must stay at or below alpha; allow sampling noise over 400 runs
+    assert false_stops / runs <= 0.05 + 0.02
+    print("✅ Checking after every answer declares a difference no more often than alpha")
+
+    outcomes = _simulate(0.85, 0.7, runs=100, questions=400, seed=8)
+    print(f"   A 15-point better model: {outcomes}")
+    assert outcomes.get("better_than_baseline", 0) >= 70 and not outcomes.get("worse_than_baseline")
+    print("✅ Real differences are still detected")
+
+
+if __name__ == "__main__":
+    test_intervals()
+    test_stopping_rules()
+    test_identical_models_rarely_stop()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test the in-process metrics: Prometheus text rendering, histogram buckets,
+outbound transport and SQL statement instrumentation, and the /metrics endpoint
+with per-route request metrics.
+"""
+
+import asyncio
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from app.telemetry import (
+    CONTENT_TYPE, InstrumentedTransport, MetricsRegistry, db_query_duration, instrument_engine,
+    outbound_request_duration, outbound_requests_in_flight, registry
+)
+
+
+def _sample(rendered, line_prefix):
+    """Value of the first sample line starting with line_prefix"""
+    for line in rendered.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_rendering():
+    print("Testing Prometheus text rendering...")
+    metrics = MetricsRegistry()
+    requests = metrics.counter("demo_requests_total", "Requests", ("route", "status"))
+    in_progress = metrics.gauge("demo_in_progress", "In progress")
+    latency = metrics.histogram("demo_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    metrics.gauge("demo_ready", "Ready", ("name",), function=lambda: {("bleu",): 1, ("rouge",): 0})
+    metrics.gauge("demo_broken", "Raises at scrape time", function=lambda: 1 / 0)
+
+    requests.labels("/api/items/{item_id}", 200).inc()
+    requests.labels("/api/items/{item_id}", 200).inc(2)
+    requests.labels('/quote"d', 404).inc()
+    in_progress.inc()
+    in_progress.inc()
+    in_progress.dec()
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value)
+
+    rendered = metrics.render()
+    print(rendered)
+    assert "# HELP demo_requests_total Requests" in rendered
+    assert "# TYPE demo_requests_total counter" in rendered
+    assert _sample(rendered, 'demo_requests_total{route="/api/items/{item_id}",status="200"}') == 3
+    assert _sample(rendered, 'demo_requests_total{route="/quote\\"d",status="404"}') == 1
+    assert _sample(rendered, "demo_in_progress") == 1
+    assert _sample(rendered, 'demo_latency_seconds_bucket{le="0.1"}') == 1
+    assert _sample(rendered, 'demo_latency_seconds_bucket{le="1"}') == 3
+    assert _sample(rendered, 'demo_latency_seconds_bucket{le="+Inf"}') == 4
+    assert _sample(rendered, "demo_latency_seconds_count") == 4
+    assert abs(_sample(rendered, "demo_latency_seconds_sum") - 4.05) < 1e-9
+    assert _sample(rendered, 'demo_ready{name="rouge"}') == 0
+    assert "# TYPE demo_broken gauge" in rendered and _sample(rendered, "demo_broken") is None
+    assert rendered.endswith("\n")
+    print("✅ Counters, gauges, histograms and callback metrics render in the text format")
+
+    try:
+        metrics.counter("demo_requests_total", "Again")
+        assert False, "duplicate names are rejected"
+    except ValueError:
+        pass
+    try:
+        requests.labels("/only-one")
+        assert False, "label count is checked"
+    except ValueError:
+        pass
+    print("✅ Duplicate names and wrong label counts are rejected")
+
+
+class _Body(httpx.AsyncByteStream):
+    """A body streamed in chunks, like a real connection's"""
+
+    async def __aiter__(self):
+        for _ in range(4):
+            await asyncio.sleep(0.005)
+            yield b"ok" * 100
+
+
+def test_outbound_transport():
+    print("Testing outbound request instrumentation...")
+
+    async def handler(request):
+        if request.url.path == "/down":
+            raise httpx.ConnectError("refused", request=request)
+        if request.url.path == "/buffered":
+            return httpx.Response(200, text="ok")
+        return httpx.Response(200, stream=_Body())
+
+    async def main():
+        transport = InstrumentedTransport("telemetry_test", httpx.MockTransport(handler))
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with client.stream("GET", "http://svc.test/slow") as response:
+                # The connection is in use until the body has been read
+                assert outbound_requests_in_flight.labels("telemetry_test").value == 1
+                await response.aread()
+            await client.get("http://svc.test/fast")
+            await client.get("http://svc.test/buffered")
+            try:
+                await client.get("http://svc.test/down")
+            except httpx.ConnectError:
+                pass
+
+    asyncio.run(main())
+    rendered = registry.render()
+    assert outbound_requests_in_flight.labels("telemetry_test").value == 0
+    assert _sample(rendered, 'eval_forge_outbound_request_duration_seconds_count{pool="telemetry_test"}') == 3
+    assert _sample(rendered, 'eval_forge_outbound_request_errors_total{pool="telemetry_test"}') == 1
+    assert outbound_request_duration.labels("telemetry_test").sum >= 0.02
+    print("✅ In-flight requests, durations and connection errors recorded per pool")
+
+
+def test_engine_instrumentation():
+    print("Testing SQL statement timing...")
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'telemetry.db')}")
+    instrument_engine(engine)
+    before = {operation: db_query_duration.labels(operation).count for operation in ("select", "insert", "other")}
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        connection.execute(text("INSERT INTO items (name) VALUES (:name)"), [{"name": "a"}, {"name": "b"}])
+        connection.execute(text("SELECT * FROM items")).all()
+        try:
+            connection.execute(text("SELECT * FROM missing"))
+        except Exception:
+            pass
+        connection.execute(text("SELECT count(*) FROM items")).scalar()
+        assert connection.info["query_start_time"] == [], "failed statements don't leak start times"
+
+    counts = {operation: db_query_duration.labels(operation).count - before[operation] for operation in before}
+    print(f"   Statements: {counts}")
+    assert counts == {"select": 2, "insert": 1, "other": 1}
+    print("✅ Statements timed by operation; failures are not counted")
+
+
+def test_metrics_endpoint():
+    print("Testing /metrics and request metrics...")
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import sessionmaker
+    from app import models
+    from app.database import get_db
+    from app.main import app
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'api.db')}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+    def temporary_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = temporary_db
+    client = TestClient(app)
+    try:
+        assert client.get("/").status_code == 200
+        assert client.get("/api/models/999999/test").status_code == 404
+        assert client.get("/no/such/route").status_code == 404
+        response = client.get("/metrics")
+    finally:
+        app.dependency_overrides.clear()
+
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE
+    rendered = response.text
+    assert _sample(rendered, 'eval_forge_http_requests_total{method="GET",route="/",status="200"}') >= 1
+    assert _sample(rendered, 'eval_forge_http_requests_total{method="GET",route="/api/models/{model_id}/test",status="404"}') >= 1
+    assert _sample(rendered, 'eval_forge_http_requests_total{method="GET",route="unmatched",status="404"}') >= 1
+    assert _sample(rendered, 'eval_forge_http_request_duration_seconds_count{method="GET",route="/"}') >= 1
+    for name in ("eval_forge_event_loop_blocked_seconds_total", "eval_forge_scheduler_is_leader",
+                 "eval_forge_db_query_duration_seconds", "eval_forge_evaluations_running"):
+        assert f"# TYPE {name} " in rendered, name
+    assert _sample(rendered, 'eval_forge_db_query_duration_seconds_count{operation="select"}') >= 1
+    print("✅ /metrics serves request metrics by route template alongside the other metrics")
+
+
+if __name__ == "__main__":
+    test_rendering()
+    test_outbound_transport()
+    test_engine_instrumentation()
+    test_metrics_endpoint()
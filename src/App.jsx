@@ -4,6 +4,7 @@ import Layout from './components/Layout'
 import Dashboard from './pages/Dashboard'
 import Models from './pages/Models'
 import Evaluations from './pages/Evaluations'
+import Benchmarks from './pages/Benchmarks'
 import Results from './pages/Results'
 import SyntheticMonitoring from './pages/SyntheticMonitoring'
 import ExternalApps from './pages/ExternalApps'
@@ -17,6 +18,7 @@ function App() {
           <Route path="/" element={<Dashboard />} />
           <Route path="/models" element={<Models />} />
           <Route path="/evaluations" element={<Evaluations />} />
+          <Route path="/benchmarks" element={<Benchmarks />} />
           <Route path="/results" element={<Results />} />
           <Route path="/synthetic-monitoring" element={<SyntheticMonitoring />} />
           <Route path="/external-apps" element={<ExternalApps />} />
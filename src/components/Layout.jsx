@@ -1,6 +1,6 @@
 import React from 'react'
 import { Link, useLocation } from 'react-router-dom'
-import { Brain, Database, BarChart3, Settings, Activity } from 'lucide-react'
+import { Brain, Database, BarChart3, Settings, Activity, Gauge } from 'lucide-react'
 
 const Layout = ({ children }) => {
   const location = useLocation()
@@ -9,6 +9,7 @@ const Layout = ({ children }) => {
     { name: 'Dashboard', href: '/', icon: BarChart3 },
     { name: 'Models', href: '/models', icon: Brain },
     { name: 'Evaluations', href: '/evaluations', icon: Settings },
+    { name: 'Benchmarks', href: '/benchmarks', icon: Gauge },
     { name: 'Results', href: '/results', icon: Database },
     { name: 'Synthetic Monitoring', href: '/synthetic-monitoring', icon: Activity },
   ]
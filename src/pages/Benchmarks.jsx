@@ -0,0 +1,398 @@
+import React, { useState, useEffect } from 'react'
+import { Plus, Play, Trash2, Loader } from 'lucide-react'
+import { useNavigate } from 'react-router-dom'
+
+const emptyBenchmark = {
+  name: '',
+  model_id: '',
+  mode: 'concurrency',
+  levels: '1, 2, 4, 8',
+  requests_per_step: 20,
+  max_tokens: 128
+}
+
+const BarChart = ({ title, steps, valueKey, unit, color, highlightLevel }) => {
+  const maxValue = Math.max(...steps.map(step => step[valueKey] || 0), 0)
+
+  return (
+    <div className="bg-white shadow rounded-lg p-6">
+      <h3 className="text-sm font-medium text-gray-900 mb-4">{title}</h3>
+      <div className="space-y-2">
+        {steps.map((step) => {
+          const value = step[valueKey] || 0
+          const width = maxValue > 0 ? (value / maxValue) * 100 : 0
+          const isSaturation = step.level === highlightLevel
+          return (
+            <div key={step.id} className="flex items-center text-xs">
+              <span className={`w-12 text-right mr-3 ${isSaturation ? 'font-semibold text-orange-600' : 'text-gray-500'}`}>
+                {step.level}
+              </span>
+              <div className="flex-1 bg-gray-100 rounded h-4">
+                <div
+                  className={`${isSaturation ? 'bg-orange-500' : color} h-4 rounded`}
+                  style={{ width: `${width}%` }}
+                />
+              </div>
+              <span className="w-24 text-right ml-3 text-gray-700">
+                {value.toFixed(1)} {unit}
+              </span>
+            </div>
+          )
+        })}
+      </div>
+    </div>
+  )
+}
+
+const Benchmarks = () => {
+  const [benchmarks, setBenchmarks] = useState([])
+  const [models, setModels] = useState([])
+  const [selected, setSelected] = useState(null)
+  const [showCreate, setShowCreate] = useState(false)
+  const [runningId, setRunningId] = useState(null)
+  const [newBenchmark, setNewBenchmark] = useState(emptyBenchmark)
+  const navigate = useNavigate()
+
+  useEffect(() => {
+    fetchBenchmarks()
+    fetchModels()
+  }, [])
+
+  const fetchBenchmarks = async () => {
+    try {
+      const response = await fetch('http://localhost:8000/api/benchmarks')
+      if (response.ok) {
+        const data = await response.json()
+        setBenchmarks(data)
+      }
+    } catch (error) {
+      navigate('/error')
+    }
+  }
+
+  const fetchModels = async () => {
+    try {
+      const response = await fetch('http://localhost:8000/api/models')
+      if (response.ok) {
+        const data = await response.json()
+        setModels(data.filter(model => model.status === 'connected'))
+      }
+    } catch (error) {
+      navigate('/error')
+    }
+  }
+
+  const handleCreateBenchmark = async (e) => {
+    e.preventDefault()
+
+    const levels = newBenchmark.levels
+      .split(',')
+      .map(level => parseFloat(level.trim()))
+      .filter(level => !isNaN(level) && level > 0)
+
+    try {
+      const response = await fetch('http://localhost:8000/api/benchmarks', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          ...newBenchmark,
+          model_id: parseInt(newBenchmark.model_id),
+          levels: JSON.stringify(levels)
+        }),
+      })
+
+      if (response.ok) {
+        await fetchBenchmarks()
+        setShowCreate(false)
+        setNewBenchmark(emptyBenchmark)
+      } else {
+        navigate('/error')
+      }
+    } catch (error) {
+      navigate('/error')
+    }
+  }
+
+  const runBenchmark = async (benchmarkId) => {
+    setRunningId(benchmarkId)
+    try {
+      const response = await fetch(`http://localhost:8000/api/benchmarks/${benchmarkId}/run`, {
+        method: 'POST'
+      })
+      if (response.ok) {
+        const data = await response.json()
+        setSelected(data)
+        await fetchBenchmarks()
+      } else {
+        navigate('/error')
+      }
+    } catch (error) {
+      navigate('/error')
+    } finally {
+      setRunningId(null)
+    }
+  }
+
+  const deleteBenchmark = async (benchmarkId) => {
+    try {
+      const response = await fetch(`http://localhost:8000/api/benchmarks/${benchmarkId}`, {
+        method: 'DELETE'
+      })
+      if (response.ok) {
+        if (selected?.id === benchmarkId) setSelected(null)
+        await fetchBenchmarks()
+      } else {
+        navigate('/error')
+      }
+    } catch (error) {
+      navigate('/error')
+    }
+  }
+
+  const getStatusColor = (status) => {
+    switch (status) {
+      case 'completed':
+        return 'bg-green-100 text-green-800'
+      case 'running':
+        return 'bg-blue-100 text-blue-800'
+      case 'failed':
+        return 'bg-red-100 text-red-800'
+      default:
+        return 'bg-gray-100 text-gray-800'
+    }
+  }
+
+  const levelLabel = (mode) => (mode === 'rate' ? 'Requests/sec' : 'Concurrency')
+
+  return (
+    <div>
+      <div className="sm:flex sm:items-center">
+        <div className="sm:flex-auto">
+          <h1 className="text-2xl font-semibold text-gray-900">Benchmarks</h1>
+          <p className="mt-2 text-sm text-gray-700">
+            Load test model endpoints to find latency, throughput and the saturation point.
+          </p>
+        </div>
+        <div className="mt-4 sm:mt-0 sm:ml-16 sm:flex-none">
+          <button
+            type="button"
+            onClick={() => setShowCreate(true)}
+            className="inline-flex items-center justify-center rounded-md border border-transparent bg-blue-600 px-4 py-2 text-sm font-medium text-white shadow-sm hover:bg-blue-700 focus:outline-none focus:ring-2 focus:ring-blue-500 focus:ring-offset-2 sm:w-auto"
+          >
+            <Plus className="h-4 w-4 mr-2" />
+            New Benchmark
+          </button>
+        </div>
+      </div>
+
+      {/* Benchmarks List */}
+      <div className="mt-8 overflow-hidden shadow ring-1 ring-black ring-opacity-5 md:rounded-lg">
+        <table className="min-w-full divide-y divide-gray-300">
+          <thead className="bg-gray-50">
+            <tr>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Benchmark</th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Model</th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Mode</th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Status</th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Peak Throughput</th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Saturation</th>
+              <th className="relative px-6 py-3"><span className="sr-only">Actions</span></th>
+            </tr>
+          </thead>
+          <tbody className="bg-white divide-y divide-gray-200">
+            {benchmarks.length === 0 ? (
+              <tr>
+                <td colSpan="7" className="px-6 py-4 text-center text-sm text-gray-500">
+                  No benchmarks created yet.
+                </td>
+              </tr>
+            ) : (
+              benchmarks.map((benchmark) => (
+                <tr key={benchmark.id} className="hover:bg-gray-50 cursor-pointer" onClick={() => setSelected(benchmark)}>
+                  <td className="px-6 py-4 whitespace-nowrap">
+                    <div className="text-sm font-medium text-gray-900">{benchmark.name}</div>
+                    <div className="text-sm text-gray-500">{new Date(benchmark.created_at).toLocaleDateString()}</div>
+                  </td>
+                  <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">{benchmark.model_name}</td>
+                  <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">{levelLabel(benchmark.mode)}</td>
+                  <td className="px-6 py-4 whitespace-nowrap">
+                    <span className={`inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium ${getStatusColor(runningId === benchmark.id ? 'running' : benchmark.status)}`}>
+                      {runningId === benchmark.id && <Loader className="w-3 h-3 mr-1 animate-spin" />}
+                      {runningId === benchmark.id ? 'running' : benchmark.status}
+                    </span>
+                  </td>
+                  <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
+                    {benchmark.peak_throughput != null ? `${benchmark.peak_throughput.toFixed(2)} req/s` : '-'}
+                  </td>
+                  <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
+                    {benchmark.saturation_level != null
+                      ? benchmark.saturation_level
+                      : (benchmark.status === 'completed' ? 'Not reached' : '-')}
+                  </td>
+                  <td className="px-6 py-4 whitespace-nowrap text-right text-sm font-medium">
+                    <button
+                      onClick={(e) => { e.stopPropagation(); runBenchmark(benchmark.id) }}
+                      disabled={runningId !== null}
+                      className="text-blue-600 hover:text-blue-900 mr-4 disabled:opacity-50"
+                    >
+                      <Play className="w-4 h-4" />
+                    </button>
+                    <button
+                      onClick={(e) => { e.stopPropagation(); deleteBenchmark(benchmark.id) }}
+                      className="text-red-600 hover:text-red-900"
+                    >
+                      <Trash2 className="w-4 h-4" />
+                    </button>
+                  </td>
+                </tr>
+              ))
+            )}
+          </tbody>
+        </table>
+      </div>
+
+      {/* Selected Benchmark Charts */}
+      {selected && selected.steps && selected.steps.length > 0 && (
+        <div className="mt-8">
+          <h2 className="text-lg font-medium text-gray-900 mb-4">
+            {selected.name} — by {levelLabel(selected.mode).toLowerCase()}
+          </h2>
+          <div className="grid grid-cols-1 md:grid-cols-3 gap-4 mb-6">
+            <BarChart title="Throughput" steps={selected.steps} valueKey="throughput" unit="req/s" color="bg-blue-500" highlightLevel={selected.saturation_level} />
+            <BarChart title="p95 Latency" steps={selected.steps} valueKey="p95_latency" unit="ms" color="bg-purple-500" highlightLevel={selected.saturation_level} />
+            <BarChart title="Tokens/sec" steps={selected.steps} valueKey="tokens_per_second" unit="tok/s" color="bg-green-500" highlightLevel={selected.saturation_level} />
+          </div>
+
+          <div className="overflow-hidden shadow ring-1 ring-black ring-opacity-5 md:rounded-lg">
+            <table className="min-w-full divide-y divide-gray-300">
+              <thead className="bg-gray-50">
+                <tr>
+                  {[levelLabel(selected.mode), 'Requests', 'Error Rate', 'Throughput', 'Tokens/sec', 'p50', 'p90', 'p95', 'p99'].map((heading) => (
+                    <th key={heading} className="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">{heading}</th>
+                  ))}
+                </tr>
+              </thead>
+              <tbody className="bg-white divide-y divide-gray-200">
+                {selected.steps.map((step) => (
+                  <tr key={step.id} className={step.level === selected.saturation_level ? 'bg-orange-50' : ''}>
+                    <td className="px-4 py-3 text-sm text-gray-900">{step.level}</td>
+                    <td className="px-4 py-3 text-sm text-gray-900">{step.total_requests}</td>
+                    <td className="px-4 py-3 text-sm text-gray-900">{(step.error_rate * 100).toFixed(1)}%</td>
+                    <td className="px-4 py-3 text-sm text-gray-900">{step.throughput.toFixed(2)} req/s</td>
+                    <td className="px-4 py-3 text-sm text-gray-900">{step.tokens_per_second.toFixed(1)}</td>
+                    {['p50_latency', 'p90_latency', 'p95_latency', 'p99_latency'].map((key) => (
+                      <td key={key} className="px-4 py-3 text-sm text-gray-900">
+                        {step[key] != null ? `${step[key].toFixed(0)} ms` : '-'}
+                      </td>
+                    ))}
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+        </div>
+      )}
+
+      {/* Create Benchmark Modal */}
+      {showCreate && (
+        <div className="fixed inset-0 bg-gray-600 bg-opacity-50 overflow-y-auto h-full w-full z-50">
+          <div className="relative top-10 mx-auto p-5 border w-full max-w-2xl shadow-lg rounded-md bg-white">
+            <div className="mt-3">
+              <h3 className="text-lg font-medium text-gray-900 mb-4">Create New Benchmark</h3>
+              <form onSubmit={handleCreateBenchmark}>
+                <div className="grid grid-cols-1 md:grid-cols-2 gap-4 mb-4">
+                  <div>
+                    <label className="block text-sm font-medium text-gray-700">Benchmark Name</label>
+                    <input
+                      type="text"
+                      required
+                      value={newBenchmark.name}
+                      onChange={(e) => setNewBenchmark({...newBenchmark, name: e.target.value})}
+                      className="mt-1 block w-full border-gray-300 rounded-md shadow-sm focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
+                      placeholder="e.g., llama3.2 on gpu-host-1"
+                    />
+                  </div>
+                  <div>
+                    <label className="block text-sm font-medium text-gray-700">Model</label>
+                    <select
+                      required
+                      value={newBenchmark.model_id}
+                      onChange={(e) => setNewBenchmark({...newBenchmark, model_id: e.target.value})}
+                      className="mt-1 block w-full border-gray-300 rounded-md shadow-sm focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
+                    >
+                      <option value="">Select a model</option>
+                      {models.map((model) => (
+                        <option key={model.id} value={model.id}>{model.name}</option>
+                      ))}
+                    </select>
+                  </div>
+                  <div>
+                    <label className="block text-sm font-medium text-gray-700">Mode</label>
+                    <select
+                      value={newBenchmark.mode}
+                      onChange={(e) => setNewBenchmark({...newBenchmark, mode: e.target.value})}
+                      className="mt-1 block w-full border-gray-300 rounded-md shadow-sm focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
+                    >
+                      <option value="concurrency">Concurrency levels</option>
+                      <option value="rate">Target request rate</option>
+                    </select>
+                  </div>
+                  <div>
+                    <label className="block text-sm font-medium text-gray-700">{levelLabel(newBenchmark.mode)} steps</label>
+                    <input
+                      type="text"
+                      required
+                      value={newBenchmark.levels}
+                      onChange={(e) => setNewBenchmark({...newBenchmark, levels: e.target.value})}
+                      className="mt-1 block w-full border-gray-300 rounded-md shadow-sm focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
+                      placeholder="1, 2, 4, 8"
+                    />
+                  </div>
+                  <div>
+                    <label className="block text-sm font-medium text-gray-700">Requests per Step</label>
+                    <input
+                      type="number"
+                      min="1"
+                      value={newBenchmark.requests_per_step}
+                      onChange={(e) => setNewBenchmark({...newBenchmark, requests_per_step: parseInt(e.target.value)})}
+                      className="mt-1 block w-full border-gray-300 rounded-md shadow-sm focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
+                    />
+                  </div>
+                  <div>
+                    <label className="block text-sm font-medium text-gray-700">Max Tokens</label>
+                    <input
+                      type="number"
+                      min="1"
+                      max="4096"
+                      value={newBenchmark.max_tokens}
+                      onChange={(e) => setNewBenchmark({...newBenchmark, max_tokens: parseInt(e.target.value)})}
+                      className="mt-1 block w-full border-gray-300 rounded-md shadow-sm focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
+                    />
+                  </div>
+                </div>
+
+                <div className="flex justify-end space-x-3">
+                  <button
+                    type="button"
+                    onClick={() => setShowCreate(false)}
+                    className="px-4 py-2 text-sm font-medium text-gray-700 bg-gray-100 border border-gray-300 rounded-md hover:bg-gray-200"
+                  >
+                    Cancel
+                  </button>
+                  <button
+                    type="submit"
+                    className="px-4 py-2 text-sm font-medium text-white bg-blue-600 border border-transparent rounded-md hover:bg-blue-700"
+                  >
+                    Create Benchmark
+                  </button>
+                </div>
+              </form>
+            </div>
+          </div>
+        </div>
+      )}
+    </div>
+  )
+}
+
+export default Benchmarks
@@ -1,10 +1,12 @@
 import React, { useState, useEffect } from 'react'
-import { Plus, Play, Upload, FileText, Loader } from 'lucide-react'
+import { Plus, Play, Upload, FileText, Loader, RotateCcw } from 'lucide-react'
 import { useNavigate } from 'react-router-dom'
 
 const Evaluations = () => {
   const [evaluations, setEvaluations] = useState([])
   const [models, setModels] = useState([])
+  const [datasets, setDatasets] = useState([])
+  const [scorers, setScorers] = useState([])
   const [showCreateEval, setShowCreateEval] = useState(false)
   const [loading, setLoading] = useState(false)
   const [uploadingDataset, setUploadingDataset] = useState(false)
@@ -14,15 +16,24 @@ const Evaluations = () => {
     name: '',
     model_id: '',
     dataset_file: null,
+    dataset_id: '',
     use_sample: false,
     temperature: 0.7,
     max_tokens: 512,
-    top_p: 0.9
+    top_p: 0.9,
+    mode: 'full',
+    target_ci_width: 0.1,
+    confidence_level: 0.95,
+    min_questions: 30,
+    baseline_evaluation_id: '',
+    metrics: ['bleu', 'rouge', 'semantic_similarity']
   })
 
   useEffect(() => {
     fetchEvaluations()
     fetchModels()
+    fetchDatasets()
+    fetchScorers()
   }, [])
 
   const fetchEvaluations = async () => {
@@ -49,6 +60,37 @@ const Evaluations = () => {
     }
   }
 
+  const fetchDatasets = async () => {
+    try {
+      const response = await fetch('http://localhost:8000/api/datasets')
+      if (response.ok) {
+        const data = await response.json()
+        setDatasets(data)
+      }
+    } catch (error) {
+      navigate('/error')
+    }
+  }
+
+  const fetchScorers = async () => {
+    try {
+      const response = await fetch('http://localhost:8000/api/scorers')
+      if (response.ok) {
+        const data = await response.json()
+        setScorers(data)
+      }
+    } catch (error) {
+      navigate('/error')
+    }
+  }
+
+  const toggleMetric = (name) => {
+    const metrics = newEvaluation.metrics.includes(name)
+      ? newEvaluation.metrics.filter(metric => metric !== name)
+      : [...newEvaluation.metrics, name]
+    setNewEvaluation({...newEvaluation, metrics})
+  }
+
   const handleCreateEvaluation = async (e) => {
     e.preventDefault()
     setLoading(true)
@@ -61,8 +103,20 @@ const Evaluations = () => {
       formData.append('temperature', newEvaluation.temperature)
       formData.append('max_tokens', newEvaluation.max_tokens)
       formData.append('top_p', newEvaluation.top_p)
+      formData.append('mode', newEvaluation.mode)
+      formData.append('metrics', JSON.stringify(newEvaluation.metrics))
+      if (newEvaluation.mode === 'adaptive') {
+        formData.append('target_ci_width', newEvaluation.target_ci_width)
+        formData.append('confidence_level', newEvaluation.confidence_level)
+        formData.append('min_questions', newEvaluation.min_questions)
+        if (newEvaluation.baseline_evaluation_id) {
+          formData.append('baseline_evaluation_id', newEvaluation.baseline_evaluation_id)
+        }
+      }
       
-      if (newEvaluation.dataset_file) {
+      if (newEvaluation.dataset_id) {
+        formData.append('dataset_id', newEvaluation.dataset_id)
+      } else if (newEvaluation.dataset_file) {
         formData.append('dataset_file', newEvaluation.dataset_file)
       }
 
@@ -73,15 +127,23 @@ const Evaluations = () => {
 
       if (response.ok) {
         await fetchEvaluations()
+        await fetchDatasets()
         setShowCreateEval(false)
         setNewEvaluation({
           name: '',
           model_id: '',
           dataset_file: null,
+          dataset_id: '',
           use_sample: false,
           temperature: 0.7,
           max_tokens: 512,
-          top_p: 0.9
+          top_p: 0.9,
+          mode: 'full',
+          target_ci_width: 0.1,
+          confidence_level: 0.95,
+          min_questions: 30,
+          baseline_evaluation_id: '',
+          metrics: ['bleu', 'rouge', 'semantic_similarity']
         })
       } else {
         navigate('/error')
@@ -108,6 +170,21 @@ const Evaluations = () => {
     }
   }
 
+  const resumeEvaluation = async (evaluationId) => {
+    try {
+      const response = await fetch(`http://localhost:8000/api/evaluations/${evaluationId}/resume`, {
+        method: 'POST'
+      })
+      if (response.ok) {
+        await fetchEvaluations()
+      } else {
+        navigate('/error')
+      }
+    } catch (error) {
+      navigate('/error')
+    }
+  }
+
   const handleFileChange = (e) => {
     const file = e.target.files[0]
     if (file && file.type === 'text/csv') {
@@ -125,6 +202,8 @@ const Evaluations = () => {
         return 'bg-blue-100 text-blue-800'
       case 'failed':
         return 'bg-red-100 text-red-800'
+      case 'interrupted':
+        return 'bg-yellow-100 text-yellow-800'
       default:
         return 'bg-gray-100 text-gray-800'
     }
@@ -209,6 +288,16 @@ const Evaluations = () => {
                         </td>
                         <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
                           {evaluation.accuracy ? `${(evaluation.accuracy * 100).toFixed(1)}%` : '-'}
+                          {evaluation.accuracy_ci_lower != null && evaluation.accuracy_ci_upper != null && (
+                            <div className="text-xs text-gray-500">
+                              {(evaluation.accuracy_ci_lower * 100).toFixed(1)}–{(evaluation.accuracy_ci_upper * 100).toFixed(1)}%
+                            </div>
+                          )}
+                          {evaluation.stop_reason && (
+                            <div className="text-xs text-blue-600">
+                              Stopped early: {evaluation.stop_reason.replace(/_/g, ' ')}
+                            </div>
+                          )}
                         </td>
                         <td className="px-6 py-4 whitespace-nowrap text-right text-sm font-medium">
                           {evaluation.status === 'draft' && (
@@ -219,6 +308,15 @@ const Evaluations = () => {
                               <Play className="w-4 h-4" />
                             </button>
                           )}
+                          {(evaluation.status === 'interrupted' || evaluation.status === 'failed') && (
+                            <button
+                              onClick={() => resumeEvaluation(evaluation.id)}
+                              title="Resume from the last answered question"
+                              className="text-yellow-600 hover:text-yellow-900 mr-4"
+                            >
+                              <RotateCcw className="w-4 h-4" />
+                            </button>
+                          )}
                           {evaluation.status === 'completed' && (
                             <button
                               onClick={() => navigate(`/results?eval=${evaluation.id}`)}
@@ -283,7 +381,7 @@ const Evaluations = () => {
                         id="sample"
                         name="dataset"
                         checked={newEvaluation.use_sample}
-                        onChange={(e) => setNewEvaluation({...newEvaluation, use_sample: true, dataset_file: null})}
+                        onChange={(e) => setNewEvaluation({...newEvaluation, use_sample: true, dataset_file: null, dataset_id: ''})}
                         className="h-4 w-4 text-blue-600 focus:ring-blue-500 border-gray-300"
                       />
                       <label htmlFor="sample" className="ml-3 block text-sm font-medium text-gray-700">
@@ -295,15 +393,45 @@ const Evaluations = () => {
                         type="radio"
                         id="upload"
                         name="dataset"
-                        checked={!newEvaluation.use_sample}
-                        onChange={(e) => setNewEvaluation({...newEvaluation, use_sample: false})}
+                        checked={!newEvaluation.use_sample && !newEvaluation.dataset_id}
+                        onChange={(e) => setNewEvaluation({...newEvaluation, use_sample: false, dataset_id: ''})}
                         className="h-4 w-4 text-blue-600 focus:ring-blue-500 border-gray-300"
                       />
                       <label htmlFor="upload" className="ml-3 block text-sm font-medium text-gray-700">
                         Upload CSV Dataset
                       </label>
                     </div>
-                    {!newEvaluation.use_sample && (
+                    {datasets.length > 0 && (
+                      <div className="flex items-center">
+                        <input
+                          type="radio"
+                          id="existing"
+                          name="dataset"
+                          checked={!!newEvaluation.dataset_id}
+                          onChange={(e) => setNewEvaluation({...newEvaluation, use_sample: false, dataset_file: null, dataset_id: datasets[0].id})}
+                          className="h-4 w-4 text-blue-600 focus:ring-blue-500 border-gray-300"
+                        />
+                        <label htmlFor="existing" className="ml-3 block text-sm font-medium text-gray-700">
+                          Use Stored Dataset
+                        </label>
+                      </div>
+                    )}
+                    {newEvaluation.dataset_id && (
+                      <div className="ml-7">
+                        <select
+                          value={newEvaluation.dataset_id}
+                          onChange={(e) => setNewEvaluation({...newEvaluation, dataset_id: e.target.value})}
+                          className="block w-full border-gray-300 rounded-md shadow-sm focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
+                        >
+                          {datasets.map((dataset) => (
+                            <option key={dataset.id} value={dataset.id}>
+                              {dataset.name} v{dataset.version} ({dataset.item_count} questions)
+                            </option>
+                          ))}
+                        </select>
+                      </div>
+                    )}
+                    {!newEvaluation.use_sample && !newEvaluation.dataset_id && (
                       <div className="ml-7">
                         <input
                           type="file"
@@ -358,6 +486,87 @@ const Evaluations = () => {
                   </div>
                 </div>
 
+                {/* Sampling */}
+                <div className="mb-6">
+                  <label className="block text-sm font-medium text-gray-700 mb-2">Sampling</label>
+                  <select
+                    value={newEvaluation.mode}
+                    onChange={(e) => setNewEvaluation({...newEvaluation, mode: e.target.value})}
+                    className="block w-full border-gray-300 rounded-md shadow-sm focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
+                  >
+                    <option value="full">Answer every question</option>
+                    <option value="adaptive">Adaptive - stop once results are statistically settled</option>
+                  </select>
+                  {newEvaluation.mode === 'adaptive' && (
+                    <div className="grid grid-cols-1 md:grid-cols-2 gap-4 mt-3">
+                      <div>
+                        <label className="block text-sm font-medium text-gray-700">Target Interval Width</label>
+                        <input
+                          type="number"
+                          min="0.01"
+                          max="1"
+                          step="0.01"
+                          value={newEvaluation.target_ci_width}
+                          onChange={(e) => setNewEvaluation({...newEvaluation, target_ci_width: parseFloat(e.target.value)})}
+                          className="mt-1 block w-full border-gray-300 rounded-md shadow-sm focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
+                        />
+                      </div>
+                      <div>
+                        <label className="block text-sm font-medium text-gray-700">Confidence Level</label>
+                        <input
+                          type="number"
+                          min="0.5"
+                          max="0.999"
+                          step="0.01"
+                          value={newEvaluation.confidence_level}
+                          onChange={(e) => setNewEvaluation({...newEvaluation, confidence_level: parseFloat(e.target.value)})}
+                          className="mt-1 block w-full border-gray-300 rounded-md shadow-sm focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
+                        />
+                      </div>
+                      <div>
+                        <label className="block text-sm font-medium text-gray-700">Minimum Questions</label>
+                        <input
+                          type="number"
+                          min="1"
+                          value={newEvaluation.min_questions}
+                          onChange={(e) => setNewEvaluation({...newEvaluation, min_questions: parseInt(e.target.value)})}
+                          className="mt-1 block w-full border-gray-300 rounded-md shadow-sm focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
+                        />
+                      </div>
+                      <div>
+                        <label className="block text-sm font-medium text-gray-700">Baseline Evaluation</label>
+                        <select
+                          value={newEvaluation.baseline_evaluation_id}
+                          onChange={(e) => setNewEvaluation({...newEvaluation, baseline_evaluation_id: e.target.value})}
+                          className="mt-1 block w-full border-gray-300 rounded-md shadow-sm focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
+                        >
+                          <option value="">None</option>
+                          {evaluations.filter(evaluation => evaluation.status === 'completed').map((evaluation) => (
+                            <option key={evaluation.id} value={evaluation.id}>{evaluation.name}</option>
+                          ))}
+                        </select>
+                      </div>
+                    </div>
+                  )}
+                </div>
+
+                <div>
+                  <label className="block text-sm font-medium text-gray-700">Metrics</label>
+                  <div className="mt-2 grid grid-cols-2 gap-2">
+                    {scorers.map((scorer) => (
+                      <label key={scorer.name} className="flex items-center text-sm text-gray-700" title={scorer.description}>
+                        <input
+                          type="checkbox"
+                          checked={newEvaluation.metrics.includes(scorer.name)}
+                          onChange={() => toggleMetric(scorer.name)}
+                          className="mr-2"
+                        />
+                        {scorer.name}
+                      </label>
+                    ))}
+                  </div>
+                </div>
+
                 <div className="flex justify-end space-x-3">
                   <button
                     type="button"
@@ -219,6 +219,7 @@ const Models = () => {
                     className="mt-1 block w-full border-gray-300 rounded-md shadow-sm focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
                   >
                     <option value="ollama">Ollama</option>
+                    <option value="openai">OpenAI-compatible</option>
                   </select>
                 </div>
                 <div className="mb-4">
@@ -586,6 +586,7 @@ const CreateTestModal = ({ onClose, onSuccess, externalApps, onCreateApp }) => {
     method: 'GET',
     expected_status: 200,
     expected_response_contains: '',
+    assertions: '',
     timeout: 30,
     interval: 300,
     is_active: true,
@@ -642,6 +643,7 @@ const CreateTestModal = ({ onClose, onSuccess, externalApps, onCreateApp }) => {
       } else {
         processedData.auth_credentials = null
       }
+      processedData.assertions = formData.assertions.trim() || null
       
       const response = await fetch('http://localhost:8000/api/synthetic-tests', {
         method: 'POST',
@@ -654,6 +656,9 @@ const CreateTestModal = ({ onClose, onSuccess, externalApps, onCreateApp }) => {
       if (response.ok) {
         onSuccess()
         setError(null)
+      } else if (response.status === 400) {
+        const data = await response.json()
+        setError(data.detail)
       } else {
         throw new Error('Failed to create test')
       }
@@ -774,6 +779,24 @@ const CreateTestModal = ({ onClose, onSuccess, externalApps, onCreateApp }) => {
             />
           </div>
 
+          {formData.test_type === 'api' && (
+            <div>
+              <label className="block text-sm font-medium text-gray-700 mb-1">
+                Assertions (Optional)
+              </label>
+              <textarea
+                value={formData.assertions}
+                onChange={(e) => setFormData({ ...formData, assertions: e.target.value })}
+                placeholder='[{"type": "jsonpath", "path": "$.status", "op": "equals", "value": "ok"}, {"type": "latency", "max_ms": 500}]'
+                rows={3}
+                className="w-full px-3 py-2 border border-gray-300 rounded-md font-mono text-sm focus:outline-none focus:ring-2 focus:ring-blue-500"
+              />
+              <p className="text-sm text-gray-500 mt-1">
+                JSON list of jsonpath, regex, header and latency checks
+              </p>
+            </div>
+          )}
+
           <div className="grid grid-cols-2 gap-4">
             <div>
               <label className="block text-sm font-medium text-gray-700 mb-1">